@@ -0,0 +1,80 @@
+"""
+Measures the throughput of the binscope hardening checker on ELF binaries built with gcc in several
+hardening variants, sequentially and in a process pool, against running readelf on every binary.
+
+Run it from the repository root, with gcc and readelf installed:
+
+    python -m benchmarks.bench_binscope [--files 2000] [--workers 4] [--readelf-sample 100]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mozz_sec.services.scanners.binscope import check_file, check_files
+
+SOURCE = """
+#include <stdio.h>
+#include <string.h>
+int main(int argc, char **argv) { char b[64]; strcpy(b, argv[0]); printf("%s %d\\n", b, argc); return 0; }
+"""
+VARIANTS = [
+    ["-O2", "-fPIE", "-pie", "-fstack-protector-strong", "-D_FORTIFY_SOURCE=2", "-Wl,-z,relro,-z,now"],
+    ["-O0", "-no-pie", "-fno-stack-protector", "-Wl,-z,norelro", "-z", "execstack"],
+    ["-O2", "-fPIE", "-pie", "-Wl,-z,relro", "-Wl,-rpath,lib"],
+    ["-O2", "-shared", "-fPIC", "-Wl,--enable-new-dtags,-rpath,$ORIGIN"],
+    ["-O2", "-static"],
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--readelf-sample", type=int, default=100)
+    args = parser.parse_args()
+    if shutil.which("gcc") is None:
+        sys.exit("gcc is needed to build the binaries")
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = Path(directory) / "main.c"
+        source.write_text(SOURCE)
+        built = []
+        for index, flags in enumerate(VARIANTS):
+            path = str(Path(directory) / f"variant{index}")
+            subprocess.run(["gcc", *flags, str(source), "-o", path], check=True, capture_output=True)
+            built.append(path)
+        paths = []
+        for index in range(args.files):
+            path = str(Path(directory) / f"bin{index}")
+            shutil.copyfile(built[index % len(built)], path)
+            paths.append(path)
+        size = sum(os.path.getsize(path) for path in paths) / 1e6
+        print(f"{args.files} binaries, {size:.0f} MB, {len(VARIANTS)} hardening variants, {os.cpu_count()} CPUs")
+
+        if shutil.which("readelf"):
+            sample = paths[: args.readelf_sample]
+            started = time.perf_counter()
+            for path in sample:
+                subprocess.run(["readelf", "-lWd", "--dyn-syms", path], check=True, capture_output=True)
+            elapsed = time.perf_counter() - started
+            print(f"{'readelf':>16} {len(sample) / elapsed:>10.0f} files/s")
+
+        started = time.perf_counter()
+        issues = sum(len(check_file(path).issues) for path in paths)
+        elapsed = time.perf_counter() - started
+        print(f"{'sequential':>16} {args.files / elapsed:>10.0f} files/s {issues:>8} issues")
+
+        started = time.perf_counter()
+        issues = sum(len(result.issues) for _, result in check_files(paths, workers=args.workers))
+        elapsed = time.perf_counter() - started
+        label = f"pool of {args.workers}"
+        print(f"{label:>16} {args.files / elapsed:>10.0f} files/s {issues:>8} issues")
+
+
+if __name__ == "__main__":
+    main()
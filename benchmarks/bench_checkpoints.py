@@ -0,0 +1,49 @@
+"""
+Measures the cost of checkpointing sub-tasks, with an fsync per checkpoint and with batched fsyncs,
+and the time it takes to load the log when resuming.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_checkpoints [--checkpoints 20000] [--sub-tasks 1000] [--batch 256]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from mozz_sec.services.stores.checkpoints import Checkpoint, CheckpointLog
+
+
+def run(args, path: str, sync_batch: int) -> float:
+    log = CheckpointLog(path, sync_interval=3600, sync_batch=sync_batch)
+    started = time.perf_counter()
+    for count in range(args.checkpoints):
+        index = count % args.sub_tasks
+        log.write(Checkpoint(task_id="bench", index=index, progress=count % 100, state={"files": count}))
+    log.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoints", type=int, default=20000)
+    parser.add_argument("--sub-tasks", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'fsync':>16} {'elapsed':>10} {'checkpoints/s':>14} {'per checkpoint':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, sync_batch in (("every write", 1), (f"every {args.batch}", args.batch)):
+            path = str(Path(directory) / f"{sync_batch}.jsonl")
+            elapsed = run(args, path, sync_batch)
+            print(
+                f"{name:>16} {elapsed:>8.2f} s {args.checkpoints / elapsed:>14.0f}"
+                f" {elapsed / args.checkpoints * 1e6:>12.1f} us"
+            )
+        started = time.perf_counter()
+        saved = CheckpointLog(path).load()
+        print(f"load: {len(saved['bench'])} sub-tasks in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Measures the throughput of the SBC file filter on a synthetic tree of extracted files.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_file_filter [--paths 1000000] [--rules 200]
+"""
+import argparse
+import random
+import re
+import time
+from typing import List
+
+from mozz_sec.services.scanners.file_filter import FileFilter
+
+EXTENSIONS = ["so", "a", "jar", "py", "json", "xml", "txt", "md", "conf", "bin"]
+
+
+def make_paths(count: int) -> List[str]:
+    rnd = random.Random(0)
+    directories = [f"opt/app{i % 50}/lib{i % 7}/mod{i}" for i in range(2000)]
+    return [f"{rnd.choice(directories)}/file{i}.{rnd.choice(EXTENSIONS)}" for i in range(count)]
+
+
+def make_rules(count: int) -> List[str]:
+    return [rf"^vendor{i}_.*\.(json|xml)$" for i in range(count - 2)] + [r".*\.md$", r"^test_.*"]
+
+
+def naive(paths: List[str], whitelist: List[str], rules: List[str]) -> int:
+    accepted = 0
+    for path in paths:
+        if whitelist and not any(path.startswith(prefix + "/") for prefix in whitelist):
+            continue
+        name = path.rsplit("/", 1)[-1]
+        if any(re.match(rule, name) for rule in rules):
+            continue
+        accepted += 1
+    return accepted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", type=int, default=1_000_000)
+    parser.add_argument("--rules", type=int, default=200)
+    args = parser.parse_args()
+
+    paths = make_paths(args.paths)
+    whitelist = [f"opt/app{i}" for i in range(0, 50, 2)]
+    rules = make_rules(args.rules)
+
+    start = time.perf_counter()
+    file_filter = FileFilter(whitelist, rules)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    accepted = sum(1 for _ in file_filter.filter(paths))
+    compiled = time.perf_counter() - start
+
+    sample = paths[: max(len(paths) // 20, 1)]
+    start = time.perf_counter()
+    expected = naive(sample, whitelist, rules)
+    baseline = (time.perf_counter() - start) * len(paths) / len(sample)
+    assert expected == sum(1 for _ in file_filter.filter(sample))
+
+    print(f"{len(paths)} paths, {len(whitelist)} whitelisted directories, {len(rules)} blacklist rules")
+    print(f"build           {build * 1000:8.2f} ms")
+    print(f"compiled filter {compiled:8.2f} s  {len(paths) / compiled:12,.0f} paths/s  ({accepted} accepted)")
+    print(
+        f"rule by rule    {baseline:8.2f} s  {len(paths) / baseline:12,.0f} paths/s"
+        f"  (extrapolated from {len(sample)} paths)"
+    )
+    print(f"speedup         x{baseline / compiled:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Measures the open-source fingerprint index: the time to build and open it, and the batch matching of
+synthetic packages holding the strings of a few components among unknown ones, against the same
+fingerprints in an indexed SQLite table queried in batches.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_opensource [--components 2000] [--fingerprints 500] [--packages 200]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from mozz_sec.services.scanners.opensource import file_fingerprints, match_components
+from mozz_sec.services.stores.fingerprints import Component, FingerprintIndex, build_index, fingerprint
+
+
+def component_string(component: int, number: int) -> bytes:
+    return f"component {component} symbol {number}".encode()
+
+
+def make_package(rnd: random.Random, components: int, fingerprints: int, unknown: int) -> bytes:
+    strings = [f"unknown string {rnd.random()}".encode() for _ in range(unknown)]
+    for component in rnd.sample(range(components), 3):
+        strings.extend(component_string(component, number) for number in rnd.sample(range(fingerprints), 100))
+    rnd.shuffle(strings)
+    return b"".join(os.urandom(16) + string for string in strings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--components", type=int, default=2000)
+    parser.add_argument("--fingerprints", type=int, default=500, help="fingerprints per component")
+    parser.add_argument("--packages", type=int, default=200)
+    parser.add_argument("--unknown", type=int, default=5000, help="strings of a package in no component")
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    signatures = [
+        (
+            Component(name=f"component{component}", version="1.0"),
+            [fingerprint(component_string(component, number)) for number in range(args.fingerprints)],
+        )
+        for component in range(args.components)
+    ]
+    packages = [make_package(rnd, args.components, args.fingerprints, args.unknown) for _ in range(args.packages)]
+    queries = [file_fingerprints(package) for package in packages]
+    total = sum(len(values) for values in queries)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "opensource.idx")
+        started = time.perf_counter()
+        entries = build_index(path, signatures)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(path) / 1e6
+        print(f"built {entries} fingerprints of {args.components} components in {elapsed:.1f} s, {size:.1f} MB")
+
+        started = time.perf_counter()
+        index = FingerprintIndex(path)
+        print(f"opened in {(time.perf_counter() - started) * 1e3:.1f} ms")
+        started = time.perf_counter()
+        index.components
+        print(f"components decoded in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+        started = time.perf_counter()
+        for package in packages:
+            file_fingerprints(package)
+        extraction = time.perf_counter() - started
+        print(f"{args.packages} packages, {total} fingerprints, extracted in {extraction:.2f} s")
+
+        started = time.perf_counter()
+        found = sum(len(match_components(index, values, 8)) for values in queries)
+        elapsed = time.perf_counter() - started
+        passed = sum(1 for values in queries for value in values if value in index.bloom)
+        print(f"{'index':>10} {total / elapsed / 1e3:>8.0f} k fingerprints/s {found:>6} components")
+        print(f"{passed} fingerprints passed the Bloom filter")
+        index.close()
+
+        conn = sqlite3.connect(str(Path(directory) / "opensource.db"))
+        started = time.perf_counter()
+        conn.execute("CREATE TABLE fingerprints (hash INTEGER, component INTEGER)")
+        conn.executemany(
+            "INSERT INTO fingerprints VALUES (?, ?)",
+            ((value - (1 << 63), position) for position, (_, values) in enumerate(signatures) for value in values),
+        )
+        conn.execute("CREATE INDEX fingerprints_hash ON fingerprints (hash)")
+        conn.commit()
+        print(f"sqlite built in {time.perf_counter() - started:.1f} s")
+        started = time.perf_counter()
+        found = 0
+        for values in queries:
+            counts: Counter = Counter()
+            values = [value - (1 << 63) for value in values]
+            for start in range(0, len(values), 500):
+                batch = values[start : start + 500]
+                rows = conn.execute(
+                    f"SELECT component FROM fingerprints WHERE hash IN ({','.join('?' * len(batch))})", batch
+                )
+                counts.update(row[0] for row in rows)
+            found += sum(1 for matched in counts.values() if matched >= 8)
+        elapsed = time.perf_counter() - started
+        print(f"{'sqlite':>10} {total / elapsed / 1e3:>8.0f} k fingerprints/s {found:>6} components")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measures the time to plan the plugins of a large BAS test suite.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_plugin_resolver [--test-cases 5000] [--plugins 2000] [--tasks 20]
+"""
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+from mozz_sec.data.bas_data import PluginInfoType, TestDataBas
+from mozz_sec.services.plugins.resolver import PluginCatalog, PluginIndex
+
+
+def make_catalog(plugins: int, sets: int = 50) -> PluginCatalog:
+    return PluginCatalog({f"set{s}": [f"plugin{p}" for p in range(s, plugins, sets // 5)] for s in range(sets)})
+
+
+def make_params(test_cases: int, plugins: int) -> TestDataBas:
+    return TestDataBas.model_validate(
+        {
+            "plugin_set_names": [f"set{s}" for s in range(0, 50, 3)],
+            "plugin_name_blacklist": [f"plugin{p}" for p in range(0, plugins, 7)],
+            "config": {"VM": {"timeout": 10}, "Container": {"timeout": 20}},
+            "container_info": {},
+            "plugin_extra": [{"type": "Container", "params": {"plugin_set_names": ["set1", "set2"]}}],
+            "plugin_extra_tc": {
+                f"tc{t}": [
+                    {
+                        "type": "VM",
+                        "params": {"plugin_set_names": [f"set{t % 50}"], "plugin_name_blacklist": ["plugin1"]},
+                    }
+                ]
+                for t in range(0, test_cases, 4)
+            },
+        }
+    )
+
+
+def naive(params: TestDataBas, catalog: PluginCatalog, test_cases: List[str]) -> Dict[Tuple[str, PluginInfoType], list]:
+    """Resolves every test case and type from scratch with list lookups."""
+
+    def resolve(param) -> list:
+        plugins = []
+        for name in param.plugin_set_names:
+            for plugin in catalog.get(name, ()):
+                if plugin in param.plugin_name_blacklist:
+                    continue
+                if param.plugin_name_whitelist and plugin not in param.plugin_name_whitelist:
+                    continue
+                if plugin not in plugins:
+                    plugins.append(plugin)
+        return plugins
+
+    plan = {}
+    for test_case in test_cases:
+        for plugin_type in PluginInfoType:
+            plugins = resolve(params)
+            infos = [info for info in params.plugin_extra if info.type is plugin_type]
+            infos += [info for info in params.plugin_extra_tc.get(test_case, []) if info.type is plugin_type]
+            for info in infos:
+                plugins += [plugin for plugin in resolve(info.params) if plugin not in plugins]
+            plan[(test_case, plugin_type)] = plugins
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--test-cases", type=int, default=5000)
+    parser.add_argument("--plugins", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=20)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.plugins)
+    params = make_params(args.test_cases, args.plugins)
+    test_cases = [f"tc{t}" for t in range(args.test_cases)]
+
+    start = time.perf_counter()
+    index = PluginIndex.for_task(params, catalog)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.tasks):
+        task_params = params.model_copy(deep=True)
+        index = PluginIndex.for_task(task_params, catalog)
+        plan = {(tc, t): index.plugins(tc, t) for tc in test_cases for t in PluginInfoType}
+    shared = (time.perf_counter() - start) / args.tasks
+
+    sample = test_cases[: max(len(test_cases) // 200, 1)]
+    start = time.perf_counter()
+    expected = naive(params, catalog, sample)
+    baseline = (time.perf_counter() - start) * len(test_cases) / len(sample)
+    assert all(list(plan[key]) == plugins for key, plugins in expected.items())
+
+    print(f"{len(test_cases)} test cases, {len(catalog)} plugin sets, {args.plugins} plugins")
+    print(f"first task      {first * 1000:10.2f} ms")
+    print(f"further tasks   {shared * 1000:10.2f} ms per task ({args.tasks} tasks)")
+    print(f"ad hoc          {baseline * 1000:10.2f} ms per task (extrapolated from {len(sample)} test cases)")
+
+
+if __name__ == "__main__":
+    main()
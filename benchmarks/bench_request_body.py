@@ -0,0 +1,75 @@
+"""
+Measures the latency and the allocations of validating task bodies the way FastAPI does (``json.loads``
+then ``validate_python``) against validating them straight from the request bytes (``JsonBody``).
+
+The bodies are the task fixtures of ``tests/data``, optionally with a large BAS ``config`` and
+``container_info`` and many SBC sub-tasks. Run it from the repository root:
+
+    python -m benchmarks.bench_request_body [--scale 200] [--repeat 200]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+from mozz_sec.services.bodies import JsonBody
+from mozz_sec.services.responses import type_adapter
+from mozz_sec.services.tasks.bas_task import BasExecTask
+from mozz_sec.services.tasks.sbc_task import SbcExecTask
+
+DATA_DIR = Path(__file__).parent.parent / "tests" / "data"
+
+
+def load_bodies(scale: int):
+    bas = json.loads((DATA_DIR / "bas_exec" / "task-001.json").read_text(encoding="utf-8"))
+    sbc = json.loads((DATA_DIR / "sbc_exec" / "task-001.json").read_text(encoding="utf-8"))
+    yield "bas task-001", BasExecTask, json.dumps(bas).encode("utf-8")
+    yield "sbc task-001", SbcExecTask, json.dumps(sbc).encode("utf-8")
+
+    params = bas["detail"]["params"]
+    params["config"] = {f"case{i}": {f"option{j}": f"value{i}-{j}" for j in range(10)} for i in range(scale)}
+    params["container_info"] = {f"container{i}": {"grep": f"pattern{i}", "path": f"/opt/app{i}"} for i in range(scale)}
+    yield f"bas x{scale} config", BasExecTask, json.dumps(bas).encode("utf-8")
+
+    sub_task = sbc["detail"]["details"][0]
+    sbc["detail"]["details"] = [dict(sub_task, category=f"file{i}.so") for i in range(scale * 10)]
+    yield f"sbc x{scale * 10} sub-tasks", SbcExecTask, json.dumps(sbc).encode("utf-8")
+
+
+def measure(parse: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    parse()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse()
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    parse()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'body':<24} {'bytes':>10} {'two passes':>12} {'peak':>10} {'from bytes':>12} {'peak':>10}")
+    for name, model, body in load_bodies(args.scale):
+        adapter, raw = type_adapter(model), JsonBody(model)
+        repeat = max(5, args.repeat * 2000 // max(len(body), 2000))
+        two_passes, two_passes_peak = measure(
+            lambda: adapter.validate_python(json.loads(body), from_attributes=True), repeat
+        )
+        from_bytes, from_bytes_peak = measure(lambda: raw.parse(body, "application/json"), repeat)
+        print(
+            f"{name:<24} {len(body):>10,} {two_passes * 1e6:>9.1f} us {two_passes_peak / 1024:>7.1f} KB"
+            f" {from_bytes * 1e6:>9.1f} us {from_bytes_peak / 1024:>7.1f} KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures planning the rerun of a large SBC task after a partial failure: how long the diff against the
+previous run takes and how many sub-tasks it leaves to scan, with the sub-tasks read back from JSON.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_rerun [--files 50000] [--failed 0.02] [--changed 0.01]
+"""
+import argparse
+import random
+import time
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.tasks.rerun import plan_rerun
+from mozz_sec.services.tasks.sbc_task import SbcExecTask
+
+PARAMS = {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}
+
+
+def make_task(details, rerun: bool) -> SbcExecTask:
+    task = SbcExecTask.model_validate({"detail": {"params": {**PARAMS, "rerun": rerun}}})
+    task.detail.details.extend(details)
+    return SbcExecTask.model_validate_json(task.model_dump_json(by_alias=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--failed", type=float, default=0.02)
+    parser.add_argument("--changed", type=float, default=0.01)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    previous, rerun = [], []
+    for index in range(args.files):
+        failed = rng.random() < args.failed
+        status = TaskStatus.Fault if failed else TaskStatus.Finished
+        previous.append({"file": f"/pkg/{index}.so", "fileHash": f"{index:064x}", "status": status.value})
+        file_hash = "changed" if rng.random() < args.changed else f"{index:064x}"
+        rerun.append({"file": f"/pkg/{index}.so", "fileHash": file_hash})
+    previous_task, task = make_task(previous, False), make_task(rerun, True)
+
+    started = time.perf_counter()
+    plan = plan_rerun(previous_task, task)
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.files} files: plan in {elapsed * 1e3:.0f} ms")
+    print(f"reused {len(plan.reused)}, rescanned {len(plan.pending)} ({len(plan.pending) / args.files:.1%})")
+
+
+if __name__ == "__main__":
+    main()
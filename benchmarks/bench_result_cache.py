@@ -0,0 +1,59 @@
+"""
+Measures the scan result cache: the cost of storing a result, of a hit, and of a miss answered by the
+Bloom filter compared with the same miss answered by a query, and the eviction within a budget.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_result_cache [--entries 20000] [--lookups 20000] [--budget 2000000]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from mozz_sec.data.sbc_data import ScanType
+from mozz_sec.services.stores.result_cache import ScanResultCache, result_key
+
+RESULT = {"message": "", "category": "binscope", "remark": "clean", "reportUrl": "https://r.example/report/1"}
+
+
+def timed(label: str, count: int, run) -> None:
+    started = time.perf_counter()
+    for index in range(count):
+        run(index)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>14} {count / elapsed:>12.0f}/s {elapsed / count * 1e6:>10.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--budget", type=int, default=2000000)
+    args = parser.parse_args()
+
+    scan_type = ScanType(binscope=True)
+    keys = [result_key(f"{index:064x}", scan_type, "1") for index in range(args.entries)]
+    missing = [result_key(f"{index:064x}", scan_type, "2") for index in range(args.lookups)]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ScanResultCache(str(Path(directory) / "results.db"), budget=None, refresh=3600)
+        print(f"{'operation':>14} {'throughput':>14} {'latency':>13}")
+        timed("put", args.entries, lambda index: cache.put(keys[index], RESULT))
+        timed("hit", args.lookups, lambda index: cache.get(keys[index % args.entries]))
+        timed("bloom miss", args.lookups, lambda index: cache.get(missing[index]))
+        conn = cache._connect()
+        query = "SELECT result FROM scan_results WHERE key = ?"
+        timed("query miss", args.lookups, lambda index: conn.execute(query, (missing[index],)).fetchone())
+        stats = cache.stats()
+        print(f"filtered {stats.filtered} of {stats.misses} misses, {stats.entries} results, {stats.size} bytes")
+        cache.close()
+
+        bounded = ScanResultCache(str(Path(directory) / "bounded.db"), budget=args.budget)
+        timed("bounded put", args.entries, lambda index: bounded.put(keys[index], RESULT))
+        stats = bounded.stats()
+        print(f"budget {args.budget} bytes: {stats.entries} results, {stats.size} bytes, {stats.evictions} evicted")
+        bounded.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures the wall-clock speedup of the runner modes on CPU bound and I/O bound sub runners.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_runner [--sub-tasks 16] [--concurrency 4]
+"""
+import argparse
+import hashlib
+import os
+import time
+from typing import ClassVar, Dict, Type
+
+from mozz_sec.services.runners.runner import BaseRunner, RunMode, SubRunner
+from mozz_sec.services.tasks.task import BaseExecTask, BaseSubTask, TaskWithDetail
+
+
+class CpuSubRunner(SubRunner):
+    io_bound: ClassVar[bool] = False
+
+    def run_task(self):
+        digest = b""
+        for _ in range(60_000):
+            digest = hashlib.sha256(digest).digest()
+
+
+class IoSubRunner(SubRunner):
+    io_bound: ClassVar[bool] = True
+
+    def run_task(self):
+        time.sleep(0.05)
+
+
+def measure(sub_runner_class: Type[SubRunner], mode: RunMode, sub_tasks: int, concurrency: int) -> float:
+    task = BaseExecTask(task_id="bench", detail=TaskWithDetail(params=None))
+    task.detail.details.extend(BaseSubTask() for _ in range(sub_tasks))
+    runner = BaseRunner(task=task, mode=mode, concurrency=concurrency)
+    runner.sub_runners = [sub_runner_class(name="bench", task=sub_task) for sub_task in task.detail.details]
+
+    start = time.perf_counter()
+    runner.run_task()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sub-tasks", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=min(os.cpu_count() or 1, 8))
+    args = parser.parse_args()
+
+    print(f"{args.sub_tasks} sub-tasks, concurrency {args.concurrency}, {os.cpu_count()} CPUs")
+    for sub_runner_class in (CpuSubRunner, IoSubRunner):
+        timings: Dict[RunMode, float] = {}
+        for mode in (RunMode.sequential, RunMode.thread, RunMode.process, RunMode.auto):
+            timings[mode] = measure(sub_runner_class, mode, args.sub_tasks, args.concurrency)
+        baseline = timings[RunMode.sequential]
+        for mode, elapsed in timings.items():
+            print(f"{sub_runner_class.__name__:<12} {mode.value:<10} {elapsed:8.3f}s  x{baseline / elapsed:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Measures the throughput of CPU-bound SBC sub-tasks run by scan worker processes in the shared executor
+mode, pulling from the work queue of a temporary database, for a growing number of processes.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_scan_workers [--tasks 8] [--sub-tasks 50] [--work-ms 20] [--processes 1 2 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import ClassVar, Type
+
+from mozz_sec.services.runners.runner import SubRunner
+from mozz_sec.services.runners.sbc_runner import SbcRunner, SbcSubRunner
+from mozz_sec.services.runners.worker import queue_sub_tasks, start_workers, stop_workers
+from mozz_sec.services.settings import ExecutorSettings
+from mozz_sec.services.stores.task_store import create_task_store
+from mozz_sec.services.stores.work_queue import create_work_queue
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+# The CPU time every sub-task burns, set by the main process for the workers.
+WORK_MS = float(os.environ.get("BENCH_WORK_MS", "20"))
+
+
+class BusySubRunner(SbcSubRunner):
+    def run_task(self):
+        deadline = time.process_time() + WORK_MS / 1e3
+        while time.process_time() < deadline:
+            pass
+
+
+class BusyRunner(SbcRunner):
+    sub_runner_class: ClassVar[Type[SubRunner]] = BusySubRunner
+
+
+def make_task(task_id: str, sub_tasks: int) -> SbcExecTask:
+    task = SbcExecTask.model_validate(
+        {"detail": {"params": {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}}}
+    )
+    task.task_id = task_id
+    task.detail.details.extend(SubSbcTask(file_path=f"/bench/{index}") for index in range(sub_tasks))
+    return task
+
+
+def run(args, processes: int, directory: str) -> float:
+    settings = ExecutorSettings(
+        executor_mode="shared", task_store=f"sqlite:///{directory}/tasks-{processes}.db", work_batch=args.batch
+    )
+    store = create_task_store(SbcExecTask, "sbc_tasks", settings)
+    queue = create_work_queue("sbc_tasks", settings)
+    for index in range(args.tasks):
+        store[f"t{index}"] = make_task(f"t{index}", args.sub_tasks)
+    # Start the workers first, so that the time they take to import is not measured.
+    workers, stop = start_workers(BusyRunner, "sbc_tasks", processes, settings)
+    time.sleep(args.warmup)
+
+    started = time.perf_counter()
+    for index in range(args.tasks):
+        queue_sub_tasks(queue, store[f"t{index}"])
+    while queue.depth():
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    stop_workers(workers, stop)
+    queue.close()
+    store.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=8)
+    parser.add_argument("--sub-tasks", type=int, default=50)
+    parser.add_argument("--work-ms", type=float, default=20.0)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--warmup", type=float, default=5.0)
+    args = parser.parse_args()
+    os.environ["BENCH_WORK_MS"] = str(args.work_ms)
+
+    total = args.tasks * args.sub_tasks
+    print(f"{total} sub-tasks of {args.work_ms} ms CPU on {os.cpu_count()} CPUs")
+    print(f"{'processes':>10} {'elapsed':>10} {'sub-tasks/s':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        base = None
+        for processes in args.processes:
+            elapsed = run(args, processes, directory)
+            base = base or elapsed
+            print(f"{processes:>10} {elapsed:>8.2f} s {total / elapsed:>12.1f} {base / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
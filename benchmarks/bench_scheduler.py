@@ -0,0 +1,63 @@
+"""
+Measures how long the tasks of a small tenant wait behind a tenant that submitted a large batch,
+with the work started in submission order (as with ``BackgroundTasks``) and with the fair scheduler.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_scheduler [--batch 2000] [--small 20] [--workers 4] [--job-ms 1]
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from mozz_sec.services.scheduler import TaskScheduler
+
+
+def job(duration: float, tenant: str, submitted: float, waits: Dict[str, List[float]], lock: threading.Lock):
+    wait = time.perf_counter() - submitted
+    with lock:
+        waits[tenant].append(wait)
+    time.sleep(duration)
+
+
+def run(args, fair: bool) -> Dict[str, List[float]]:
+    waits: Dict[str, List[float]] = {"batch": [], "small": []}
+    lock = threading.Lock()
+    duration = args.job_ms / 1e3
+    submissions = [("batch", index) for index in range(args.batch)] + [("small", index) for index in range(args.small)]
+    if fair:
+        scheduler = TaskScheduler("bench", workers=args.workers, max_queue=len(submissions))
+        for tenant, _ in submissions:
+            scheduler.submit(job, duration, tenant, time.perf_counter(), waits, lock, tenant=tenant)
+        while scheduler.stats().completed < len(submissions):
+            time.sleep(0.01)
+        scheduler.shutdown()
+    else:
+        with ThreadPoolExecutor(args.workers) as executor:
+            for tenant, _ in submissions:
+                executor.submit(job, duration, tenant, time.perf_counter(), waits, lock)
+    return waits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--small", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--job-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'order':>12} {'small max wait':>15} {'small avg wait':>15} {'batch max wait':>15}")
+    for name, fair in (("submission", False), ("fair", True)):
+        waits = run(args, fair)
+        small, batch = waits["small"], waits["batch"]
+        print(
+            f"{name:>12} {max(small) * 1e3:>12.1f} ms {sum(small) / len(small) * 1e3:>12.1f} ms"
+            f" {max(batch) * 1e3:>12.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Measures the memory taken by the SBC sub-tasks of a task, kept as a list of ``SubSbcTask`` models
+and stored as columns, and the time to serialize them.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_sub_task_columns [--sizes 1000 50000] [--repeat 5]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+from mozz_sec.services.tasks.sbc_task import SbcCleanseTask, SbcExecTask, SubSbcTask
+
+CATEGORIES = ("binscope", "seninfo", "securecat")
+
+
+class ListCleanseTask(SbcCleanseTask):
+    """The detail of an SBC task keeping its sub-tasks as a list of models, as before."""
+
+    sub_task_model = None
+
+
+def make_sub_tasks(size: int) -> List[SubSbcTask]:
+    return [
+        SubSbcTask(
+            file_path=f"/opt/package/lib/module{i // 100}/lib{i}.so",
+            category=CATEGORIES[i % 3],
+            category_url=f"https://secguard.example.com/{CATEGORIES[i % 3]}",
+            report_url="https://secguard.example.com/report",
+            progress=100 if i % 4 else 50,
+        )
+        for i in range(size)
+    ]
+
+
+def make_detail(detail_class: type, size: int) -> SbcCleanseTask:
+    params = {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}
+    return detail_class(details=make_sub_tasks(size), params=params)
+
+
+def measure_memory(build: Callable[[], object]) -> Tuple[object, int]:
+    """The built object and the bytes it keeps allocated."""
+    gc.collect()
+    tracemalloc.start()
+    built = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return built, current
+
+
+def measure_time(function: Callable[[], object], repeat: int) -> float:
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    header = ("list bytes", "column bytes", "list dump", "column dump", "slim dump")
+    print(f"{'sub-tasks':>10}" + "".join(f" {column:>14}" for column in header))
+    for size in args.sizes:
+        as_list, list_bytes = measure_memory(lambda: make_detail(ListCleanseTask, size))
+        as_columns, column_bytes = measure_memory(lambda: make_detail(SbcCleanseTask, size))
+        task = SbcExecTask(detail=as_columns)
+        assert as_list.model_dump_json(by_alias=True) == as_columns.model_dump_json(by_alias=True)
+        list_time = measure_time(lambda: as_list.model_dump_json(by_alias=True), args.repeat)
+        column_time = measure_time(lambda: as_columns.model_dump_json(by_alias=True), args.repeat)
+        slim_time = measure_time(lambda: task.dump_json_cached(slim=True) and task.touch(), args.repeat)
+        print(
+            f"{size:>10} {list_bytes / size:>9.0f} B/st {column_bytes / size:>9.0f} B/st"
+            f" {list_time * 1e3:>11.1f} ms {column_time * 1e3:>11.1f} ms {slim_time * 1e3:>11.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares submitting SBC tasks one request at a time with one batch request.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_task_batch [--tasks 2000]
+"""
+import argparse
+import json
+import time
+
+from fastapi.testclient import TestClient
+from loguru import logger
+
+from mozz_sec.services.apps.sbc_exec_app import app, TASK_LIST
+from mozz_sec.services.tasks.sbc_task import SbcExecTask
+
+
+def make_task() -> dict:
+    data = {
+        "detail": {
+            "params": {
+                "username": "p_mozzps",
+                "password": "Huawei12#$",
+                "url-list": [f"https://example.com/pkg{i}.tar.gz" for i in range(20)],
+                "scan-type": {"binscope": True},
+            }
+        }
+    }
+    return json.loads(SbcExecTask.model_validate(data).model_dump_json(by_alias=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=2000)
+    args = parser.parse_args()
+
+    logger.remove()
+    client = TestClient(app)
+    task = make_task()
+
+    start = time.perf_counter()
+    for i in range(args.tasks):
+        response = client.post(f"/executor/v1/tools/sbc/tasks/single-{i}", json=task)
+        assert response.status_code == 201
+    single = time.perf_counter() - start
+
+    body = [{"taskId": f"batch-{i}", "task": task} for i in range(args.tasks)]
+    start = time.perf_counter()
+    response = client.post("/executor/v1/tools/sbc/tasks:batchCreate", json=body)
+    batch = time.perf_counter() - start
+    assert response.status_code == 200
+    assert all(result["statusCode"] == 201 for result in response.json())
+    assert len(TASK_LIST) == 2 * args.tasks
+
+    print(f"{args.tasks} tasks")
+    print(f"single posts  {single:8.2f} s  {args.tasks / single:10,.0f} tasks/s")
+    print(f"one batch     {batch:8.2f} s  {args.tasks / batch:10,.0f} tasks/s")
+    print(f"speedup       x{single / batch:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Measures how fast task changes reach thousands of event stream subscribers.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_task_events [--subscribers 5000] [--changes 500]
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from mozz_sec.services.events import TaskEventHub
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+
+def make_task() -> SbcExecTask:
+    task = SbcExecTask.model_validate(
+        {
+            "taskId": "bench",
+            "detail": {"params": {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}},
+        }
+    )
+    task.detail.details.extend(SubSbcTask() for _ in range(100))
+    return task
+
+
+async def run(subscribers: int, changes: int):
+    hub = TaskEventHub(max_queue=changes * 4)
+    task = make_task()
+    hub.watch(task)
+    subscriptions = [hub.subscribe("bench" if i % 2 else None) for i in range(subscribers)]
+
+    def work():
+        for i in range(changes):
+            task.detail.details[i % 100].message = str(i)
+
+    start = time.perf_counter()
+    worker = threading.Thread(target=work)
+    worker.start()
+    while worker.is_alive():
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0)
+    delivered = sum(subscription._queue.qsize() for subscription in subscriptions)
+    elapsed = time.perf_counter() - start
+    dropped = sum(subscription.dropped for subscription in subscriptions)
+    return elapsed, delivered, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--changes", type=int, default=500)
+    args = parser.parse_args()
+
+    elapsed, delivered, dropped = asyncio.run(run(args.subscribers, args.changes))
+    print(f"{args.subscribers} subscribers, {args.changes} sub-task changes")
+    print(f"elapsed      {elapsed:8.2f} s")
+    print(f"delivered    {delivered:,} events ({delivered / elapsed:,.0f} events/s), {dropped} subscribers dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures status listings and batch lookups on a large in-memory task store.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_task_listing [--tasks 100000]
+"""
+import argparse
+import time
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.stores.task_index import TaskFilter, TaskSummary
+from mozz_sec.services.stores.task_store import MemoryTaskStore
+from mozz_sec.services.tasks.sbc_task import SbcExecTask
+
+
+def make_store(count: int) -> MemoryTaskStore:
+    template = SbcExecTask.model_validate(
+        {"detail": {"params": {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}}}
+    )
+    store = MemoryTaskStore(SbcExecTask)
+    for i in range(count):
+        task = template.model_copy(deep=True)
+        task.task_id = f"task-{i:07}"
+        task.common.pbi = str(i % 50)
+        store[task.task_id] = task
+        if i % 100 == 0:
+            task.status = TaskStatus.Fault
+        elif i % 10 == 0:
+            task.status = TaskStatus.Running
+    return store
+
+
+def timed(function, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    args = parser.parse_args()
+
+    store = make_store(args.tasks)
+    failed = TaskFilter(status=TaskStatus.Fault)
+    running_of_pbi = TaskFilter(status=TaskStatus.Running, pbi="10")
+
+    def scan(task_filter: TaskFilter):
+        matching = sorted(task_id for task_id, task in store._tasks.items() if task_filter.matches(task))
+        return [TaskSummary.of(task_id, store[task_id]) for task_id in matching[:100]]
+
+    task_ids = [f"task-{i:07}" for i in range(0, args.tasks, max(args.tasks // 1000, 1))]
+
+    print(f"{args.tasks} tasks")
+    print(f"failed tasks, first page      {timed(lambda: store.select(failed)) * 1000:8.2f} ms")
+    print(f"  full scan                   {timed(lambda: scan(failed), 3) * 1000:8.2f} ms")
+    print(f"running tasks of a PBI        {timed(lambda: store.select(running_of_pbi)) * 1000:8.2f} ms")
+    print(f"  full scan                   {timed(lambda: scan(running_of_pbi), 3) * 1000:8.2f} ms")
+    print(f"batch lookup of {len(task_ids)} tasks   {timed(lambda: store.summaries(task_ids)) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
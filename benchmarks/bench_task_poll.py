@@ -0,0 +1,50 @@
+"""
+Measures the cost of polling an unchanged SBC task with and without conditional requests.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_task_poll [--sub-tasks 2000] [--polls 200]
+"""
+import argparse
+import time
+
+from mozz_sec.services.conditional import task_etag, task_response
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+
+def make_task(sub_tasks: int) -> SbcExecTask:
+    task = SbcExecTask.model_validate(
+        {"detail": {"params": {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}}}
+    )
+    task.detail.details.extend(SubSbcTask(category=f"file{i}.so", progress=i % 100) for i in range(sub_tasks))
+    return task
+
+
+def measure(polls: int, poll) -> float:
+    start = time.perf_counter()
+    for _ in range(polls):
+        poll()
+    return (time.perf_counter() - start) / polls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sub-tasks", type=int, default=2000)
+    parser.add_argument("--polls", type=int, default=200)
+    args = parser.parse_args()
+
+    task = make_task(args.sub_tasks)
+    etag = task_etag(task)
+
+    full = measure(args.polls, lambda: task.model_dump_json(by_alias=True))
+    cached = measure(args.polls, lambda: task_response(task))
+    not_modified = measure(args.polls, lambda: task_response(task, etag))
+
+    print(f"task with {args.sub_tasks} sub-tasks, {len(task.dump_json_cached()):,} bytes of JSON")
+    print(f"serialize every poll  {full * 1e6:10.1f} us")
+    print(f"cached JSON (200)     {cached * 1e6:10.1f} us")
+    print(f"If-None-Match (304)   {not_modified * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures the cost of serving an SBC task through FastAPI's ``response_model`` path, through the
+prebuilt pydantic-core serializer and through the slim view.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_task_response [--sizes 10 1000 50000] [--requests 20]
+"""
+import argparse
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import Response
+
+from mozz_sec.services.responses import ModelResponse, dump_json
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+app = FastAPI()
+TASK = {}
+
+
+@app.get("/validated", response_model=SbcExecTask)
+async def validated() -> SbcExecTask:
+    return TASK["task"]
+
+
+@app.get("/fast")
+async def fast() -> Response:
+    return ModelResponse(TASK["task"])
+
+
+@app.get("/slim")
+async def slim() -> Response:
+    return ModelResponse(TASK["task"], slim=True)
+
+
+def make_task(sub_tasks: int) -> SbcExecTask:
+    task = SbcExecTask.model_validate(
+        {"detail": {"params": {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}}}
+    )
+    task.detail.details.extend(
+        SubSbcTask(category=f"file{i}.so", progress=100 if i % 3 else 0) for i in range(sub_tasks)
+    )
+    return task
+
+
+def measure(client: TestClient, path: str, requests: int) -> float:
+    client.get(path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 50000])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    columns = ("response_model", "fast path", "slim", "full bytes", "slim bytes")
+    print(f"{'sub-tasks':>10} {columns[0]:>16}" + "".join(f" {column:>12}" for column in columns[1:]))
+    for size in args.sizes:
+        TASK["task"] = make_task(size)
+        requests = max(2, args.requests * 1000 // max(size, 1000))
+        validated_time = measure(client, "/validated", requests)
+        fast_time = measure(client, "/fast", requests)
+        slim_time = measure(client, "/slim", requests)
+        print(
+            f"{size:>10} {validated_time * 1e3:>13.2f} ms {fast_time * 1e3:>9.2f} ms {slim_time * 1e3:>9.2f} ms"
+            f" {len(dump_json(TASK['task'])):>12,} {len(dump_json(TASK['task'], slim=True)):>12,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures the time to build SBC sub-tasks with URL fields, validating the URLs with a ``TypeAdapter``
+built per value as before and with the shared adapter and cache of ``services._types.Url``.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_url [--sizes 1000 10000] [--urls 3]
+"""
+import argparse
+import time
+from typing import Any, Dict, List
+
+from pydantic import BeforeValidator, HttpUrl, TypeAdapter
+from typing_extensions import Annotated
+
+from mozz_sec.services.tasks.sbc_task import SubSbcTask
+
+LegacyUrl = Annotated[str, BeforeValidator(lambda value: str(TypeAdapter(HttpUrl).validate_python(value)))]
+
+
+class LegacySubSbcTask(SubSbcTask):
+    """An SBC sub-task validating its URLs like ``Url`` did before."""
+
+    category_url: LegacyUrl = "https://www.huawei.com"
+    sub_category_url: LegacyUrl = "https://www.huawei.com"
+    report_url: LegacyUrl = "https://www.huawei.com"
+
+
+def make_details(size: int, urls: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "file": f"/opt/package/lib{i}.so",
+            "categoryUrl": f"https://secguard.example.com/category{i % urls}",
+            "subCategoryUrl": f"https://secguard.example.com/sub{i % urls}",
+            "reportUrl": "https://secguard.example.com/report",
+        }
+        for i in range(size)
+    ]
+
+
+def measure(adapter: TypeAdapter, details: List[Dict[str, Any]]) -> float:
+    start = time.perf_counter()
+    adapter.validate_python(details)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--urls", type=int, default=3, help="The number of distinct category URLs.")
+    args = parser.parse_args()
+
+    legacy, cached = TypeAdapter(List[LegacySubSbcTask]), TypeAdapter(List[SubSbcTask])
+    print(f"{'sub-tasks':>10} {'adapter per value':>18} {'shared and cached':>18} {'speed-up':>9}")
+    for size in args.sizes:
+        details = make_details(size, args.urls)
+        legacy_time, cached_time = measure(legacy, details), measure(cached, details)
+        print(
+            f"{size:>10} {legacy_time * 1e3:>15.1f} ms {cached_time * 1e3:>15.1f} ms"
+            f" {legacy_time / cached_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from enum import Enum
+from functools import lru_cache
+from typing import Any
 
 from pydantic import BeforeValidator, HttpUrl, TypeAdapter
 from typing_extensions import Annotated
@@ -24,8 +26,33 @@ class TaskStatus(Enum):
     Fault: str = "F"
     Stop: str = "S"
 
+    @property
+    def is_terminal(self) -> bool:
+        """Whether the task will not change any more."""
+        return self in (TaskStatus.Finished, TaskStatus.Fault, TaskStatus.Stop)
 
-Url = Annotated[str, BeforeValidator(lambda value: str(TypeAdapter(HttpUrl).validate_python(value)))]
+
+_HTTP_URL = TypeAdapter(HttpUrl)
+
+
+@lru_cache(maxsize=1024)
+def _normalize_url(value: str) -> str:
+    return str(_HTTP_URL.validate_python(value))
+
+
+def normalize_url(value: Any) -> str:
+    """
+    Validates ``value`` as an HTTP URL and returns its normalized form, e.g. with a trailing slash.
+
+    Tasks repeat the same few URLs in every sub-task, so the results for strings are cached. Invalid
+    values raise a ``ValidationError`` every time.
+    """
+    if type(value) is str:
+        return _normalize_url(value)
+    return str(_HTTP_URL.validate_python(value))
+
+
+Url = Annotated[str, BeforeValidator(normalize_url)]
 
 
 if __name__ == "__main__":
@@ -1,18 +1,45 @@
+from contextlib import asynccontextmanager
 from typing import List, Dict
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends
 from loguru import logger
 from starlette import status
 
+from mozz_sec.services.bodies import JsonBody, document_bodies
+from mozz_sec.services.scheduler import (
+    Priority,
+    SchedulerFull,
+    SchedulerStats,
+    TaskScheduler,
+    tenant_key,
+    too_many_requests,
+)
 from mozz_sec.services.tasks.cleanse_task import AnalyseTask
 from mozz_sec.services.tasks.sbc_task import SbcCleanseTask
 from mozz_sec.services.tasks.bas_task import BasCleanseTask
 
-app = FastAPI()
+TASK_BODY = JsonBody(AnalyseTask)
+SCHEDULER = TaskScheduler.from_settings("cleanse")
 
 
-@app.post("/cleanse/v1/tools/{tool}/tasks", status_code=status.HTTP_201_CREATED)
-async def create_task(tool: str, task: AnalyseTask, bt: BackgroundTasks):
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    await SCHEDULER.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+document_bodies(app, TASK_BODY)
+
+
+@app.get("/cleanse/v1/scheduler", status_code=status.HTTP_200_OK, response_model=SchedulerStats)
+async def get_scheduler_stats() -> SchedulerStats:
+    """Returns the queue depth, the wait times and the counters of the cleanse scheduler."""
+    return SCHEDULER.stats()
+
+
+@app.post("/cleanse/v1/tools/{tool}/tasks", status_code=status.HTTP_201_CREATED, openapi_extra=TASK_BODY.openapi)
+async def create_task(tool: str, task: AnalyseTask = Depends(TASK_BODY), priority: Priority = Priority.normal):
     logger.info(f"Create Task: {tool}, {task}")
     logger.error(type(task.data))
     if tool == "bas":
@@ -21,4 +48,7 @@ async def create_task(tool: str, task: AnalyseTask, bt: BackgroundTasks):
         assert type(task.data) == SbcCleanseTask
     else:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    bt.add_task(task.data.start_cleanse)
+    try:
+        SCHEDULER.submit(task.data.start_cleanse, tenant=tenant_key(task.pbi, task.instance_id), priority=priority)
+    except SchedulerFull as exc:
+        raise too_many_requests(exc)
@@ -1,38 +1,258 @@
-from typing import List, Dict
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
 from loguru import logger
 from starlette import status
+from starlette.responses import Response, StreamingResponse
 
+from mozz_sec.services.batch import TaskBatch, TaskBatchGet, TaskBatchGetResult, TaskBatchResult, TaskPage
+from mozz_sec.services.bodies import JsonBody, document_bodies
+from mozz_sec.services.conditional import task_response
+from mozz_sec.services.events import TaskEventHub, sse_headers
+from mozz_sec.services.http_client import HTTP_CLIENT
+from mozz_sec.services.responses import ModelResponse
+from mozz_sec.services.scheduler import (
+    Priority,
+    SchedulerFull,
+    SchedulerStats,
+    TaskScheduler,
+    tenant_key,
+    too_many_requests,
+)
+from mozz_sec.services.stores.checkpoints import (
+    TaskCheckpoints,
+    create_checkpoint_log,
+    restore_sub_tasks,
+    resume_tasks,
+)
+from mozz_sec.services.stores.retention import RetentionStats
+from mozz_sec.services.stores.task_index import TaskFilter, decode_cursor, encode_cursor, parse_status
+from mozz_sec.services.stores.task_store import BaseTaskStore, create_task_store
+from mozz_sec.services.stores.work_queue import create_work_queue
+from mozz_sec.services.tasks.rerun import plan_rerun
 from mozz_sec.services.tasks.sbc_task import SbcCleanseTask, SbcExecTask
 
-app = FastAPI()
+TASK_LIST: BaseTaskStore[SbcExecTask] = create_task_store(SbcExecTask, "sbc_tasks")
+# Set in the shared executor mode, where the scan worker processes run the sub-tasks.
+WORK_QUEUE = create_work_queue("sbc_tasks")
+CHECKPOINTS = create_checkpoint_log("sbc_tasks")
+EVENTS = TaskEventHub.from_settings()
+BATCH = TaskBatch(SbcExecTask)
+SCHEDULER = TaskScheduler.from_settings("sbc")
+TASK_BODY = JsonBody(SbcExecTask)
 
-TASK_LIST: Dict[str, SbcExecTask] = {}
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # In the shared executor mode, the scan workers resume the sub-tasks whose lease expired instead.
+    if CHECKPOINTS is not None and WORK_QUEUE is None:
+        resumed = resume_tasks(TASK_LIST, CHECKPOINTS, lambda task, saved: _schedule(task, Priority.normal, saved))
+        logger.info(f"Resume {resumed} interrupted tasks")
+    yield
+    await SCHEDULER.aclose()
+    if WORK_QUEUE is not None:
+        WORK_QUEUE.close()
+    if CHECKPOINTS is not None:
+        CHECKPOINTS.close()
+    TASK_LIST.close()
+    await HTTP_CLIENT.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+document_bodies(app, TASK_BODY)
+
+
+@app.get("/executor/v1/tools/sbc/stats", status_code=status.HTTP_200_OK, response_model=RetentionStats)
+async def get_stats() -> RetentionStats:
+    return TASK_LIST.stats()
+
+
+@app.get("/executor/v1/tools/sbc/scheduler", status_code=status.HTTP_200_OK, response_model=SchedulerStats)
+async def get_scheduler_stats() -> SchedulerStats:
+    """Returns the queue depth, the wait times and the counters of the task scheduler."""
+    return SCHEDULER.stats()
+
+
+@app.post("/executor/v1/tools/sbc/tasks:batchGet", status_code=status.HTTP_200_OK, response_model=TaskBatchGetResult)
+async def batch_get_tasks(query: TaskBatchGet) -> Response:
+    found = TASK_LIST.summaries(query.task_ids)
+    result = TaskBatchGetResult(
+        tasks=list(found.values()), missing=[task_id for task_id in query.task_ids if task_id not in found]
+    )
+    return ModelResponse(result)
+
+
+@app.get("/executor/v1/tools/sbc/tasks:list", status_code=status.HTTP_200_OK, response_model=TaskPage)
+async def list_tasks(
+    task_status: Optional[str] = Query(None, alias="status"),
+    task_type: Optional[str] = Query(None, alias="taskType"),
+    pbi: Optional[str] = None,
+    instance_id: Optional[str] = Query(None, alias="instanceId"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+) -> Response:
+    """Lists the tasks matching all given criteria, ordered by task ID, one page at a time."""
+    try:
+        task_filter = TaskFilter(parse_status(task_status), task_type, pbi, instance_id)
+        after = decode_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+    tasks, after = TASK_LIST.select(task_filter, after, limit)
+    return ModelResponse(TaskPage(tasks=tasks, next_cursor=encode_cursor(after) if after is not None else None))
 
 
 @app.get("/executor/v1/tools/sbc/tasks/{task_id}", status_code=status.HTTP_200_OK, response_model=SbcExecTask)
-async def get_task(task_id: str) -> SbcExecTask:
-    if task_id not in TASK_LIST:
+async def get_task(
+    task_id: str,
+    if_none_match: Optional[str] = Header(None),
+    view: Optional[str] = Query(None, pattern="^(full|slim)$"),
+) -> Response:
+    """Returns the task. ``view=slim`` leaves out the fields of sub-tasks that have their default value."""
+    try:
+        task = TASK_LIST[task_id]
+    except KeyError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
-    return TASK_LIST[task_id]
+    return task_response(task, if_none_match, slim=view == "slim")
 
 
-@app.post("/executor/v1/tools/sbc/tasks/{task_id}", status_code=status.HTTP_201_CREATED, response_model=SbcExecTask)
-async def create_task(task_id: str, task: SbcExecTask, bt: BackgroundTasks) -> SbcExecTask:
-    logger.info(f"Create Task: {task_id}, {task}")
-    if task_id in TASK_LIST:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Task with task_id {task_id} already exists.")
+@app.get("/executor/v1/tools/sbc/events")
+async def stream_events() -> StreamingResponse:
+    """Streams the changes of all tasks as server-sent events."""
+    return StreamingResponse(EVENTS.stream(), media_type="text/event-stream", headers=sse_headers())
+
+
+@app.get("/executor/v1/tools/sbc/tasks/{task_id}/events")
+async def stream_task_events(task_id: str) -> StreamingResponse:
+    """Streams a snapshot of the task, then its changes as server-sent events until it ends."""
+    try:
+        task = TASK_LIST[task_id]
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
+    EVENTS.watch(task)
+    return StreamingResponse(EVENTS.stream(task), media_type="text/event-stream", headers=sse_headers())
 
+
+@app.post(
+    "/executor/v1/tools/sbc/tasks/{task_id}",
+    status_code=status.HTTP_201_CREATED,
+    response_model=SbcExecTask,
+    openapi_extra=TASK_BODY.openapi,
+)
+async def create_task(
+    task_id: str, task: SbcExecTask = Depends(TASK_BODY), priority: Priority = Priority.normal
+) -> Response:
+    """
+    Creates the task. With ``rerun`` in its params, it replaces the ended task of the same ID instead,
+    rescanning only the files whose previous scan did not finish or whose content changed.
+    """
+    logger.info(f"Create Task: {task_id}, {task}")
     if not task:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Task is None.")
 
+    previous = _previous_run(task_id, task)
     task.task_id = task_id
-
+    # Stored and watched first, the scheduler may run the task before this returns.
     TASK_LIST[task_id] = task
-    bt.add_task(_create_task, task)
-    return task
+    EVENTS.watch(task)
+    try:
+        _schedule(task, priority, previous=previous)
+    except SchedulerFull as exc:
+        if previous is None:
+            del TASK_LIST[task_id]
+        else:
+            TASK_LIST[task_id] = previous
+        raise too_many_requests(exc)
+    return ModelResponse(task.dump_json_cached(), status_code=status.HTTP_201_CREATED)
+
+
+@app.post(
+    "/executor/v1/tools/sbc/tasks:batchCreate",
+    status_code=status.HTTP_200_OK,
+    response_model=List[TaskBatchResult],
+    openapi_extra={"requestBody": {"content": {"application/json": {"schema": {"type": "array"}}}, "required": True}},
+)
+async def create_tasks(request: Request, priority: Priority = Priority.normal) -> Response:
+    """
+    Creates a batch of ``{"taskId": ..., "task": ...}`` items, with a 201, 409, 422 or 429 result per item.
+    An item with ``rerun`` in its params replaces the ended task of the same ID, like ``create_task``.
+    The response has a ``Retry-After`` header when the scheduler rejected any item.
+    """
+    results, _ = BATCH.submit(
+        await request.body(),
+        TASK_LIST,
+        EVENTS.watch,
+        admit=lambda tasks, replaced: _schedule_batch(tasks, replaced, priority),
+        replace=_previous_run,
+    )
+    rejected = any(result.status_code == status.HTTP_429_TOO_MANY_REQUESTS for result in results)
+    headers = {"Retry-After": str(SCHEDULER.retry_after())} if rejected else None
+    return ModelResponse(results, model=List[TaskBatchResult], headers=headers)
+
+
+def _previous_run(task_id: str, task: SbcExecTask) -> Optional[SbcExecTask]:
+    """
+    Returns the task ``task`` reruns, or None if there is none.
+
+    Raises:
+        HTTPException: 409 if the ID is taken and ``task`` is no rerun, or the previous run has not ended.
+    """
+    try:
+        previous = TASK_LIST[task_id]
+    except KeyError:
+        return None
+    if not task.detail.params.rerun:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Task with task_id {task_id} already exists.")
+    if not previous.status.is_terminal:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"Task with task_id {task_id} is still running."
+        )
+    return previous
+
+
+def _schedule(
+    task: SbcExecTask,
+    priority: Priority,
+    resume_from: Optional[TaskCheckpoints] = None,
+    previous: Optional[SbcExecTask] = None,
+) -> None:
+    """
+    Queues the run of ``task``, shared fairly with the other tasks of its PBI and instance. A task
+    interrupted by a restart resumes from the checkpoints ``resume_from`` of its sub-tasks, a rerun
+    reuses the results of its ``previous`` run.
+    """
+    SCHEDULER.submit(_create_task, task, priority, resume_from, previous, tenant=_tenant(task), priority=priority)
+
+
+def _schedule_batch(
+    tasks: List[SbcExecTask], previous: List[Optional[SbcExecTask]], priority: Priority
+) -> Tuple[int, Optional[SchedulerFull]]:
+    """
+    Queues the runs of ``tasks``, reruns of their ``previous`` runs if any, in one step, see ``_schedule``
+    and ``TaskScheduler.submit_many``.
+    """
+    calls = [((task, priority, None, run), _tenant(task)) for task, run in zip(tasks, previous)]
+    return SCHEDULER.submit_many(_create_task, calls, priority=priority)
+
+
+def _tenant(task: SbcExecTask) -> Tuple[str, str]:
+    return tenant_key(task.common.pbi, task.common.instance_info.instance_id)
 
 
-def _create_task(task: SbcExecTask):
+def _create_task(
+    task: SbcExecTask,
+    priority: Priority = Priority.normal,
+    resume_from: Optional[TaskCheckpoints] = None,
+    previous: Optional[SbcExecTask] = None,
+):
+    pending = range(len(task.detail.details))
+    if resume_from:
+        logger.info(f"[{task.task_id}]Resume from the checkpoints of {len(resume_from)} sub-tasks")
+        restore_sub_tasks(task, resume_from)
+    elif task.detail.params.rerun:
+        plan = plan_rerun(previous, task)
+        logger.info(f"[{task.task_id}]Rerun {len(plan.pending)} sub-tasks, reuse {len(plan.reused)}")
+        pending = plan.pending
     logger.info("Run Mozz Sbc Exec Task")
+    if WORK_QUEUE is not None:
+        WORK_QUEUE.put(task.task_id, pending, priority=priority)
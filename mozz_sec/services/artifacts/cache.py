@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class CacheEntry(BaseModel):
+    """
+    Represents an artifact stored in the cache.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        url: The URL the artifact was downloaded from.
+        validator: The ETag or Last-Modified header the artifact was served with.
+        sha256: The SHA-256 digest of the artifact.
+        size: The size of the artifact in bytes.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    url: str
+    validator: str
+    sha256: str
+    size: int
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Represents the on-disk cache of downloaded artifacts.
+
+    Artifacts are stored once per content under ``objects/<sha256>``. An index maps every
+    (URL, ETag or Last-Modified) pair to the content it was served with, so a URL is only
+    downloaded again once the server reports a new version. Partial downloads live in ``partial``.
+
+    Attributes:
+        root: The root directory of the cache.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root).expanduser()
+        self.objects = self.root / "objects"
+        self.index = self.root / "index"
+        self.partial = self.root / "partial"
+        for directory in (self.objects, self.index, self.partial):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(url: str, validator: str) -> str:
+        return hashlib.sha256(f"{url}\n{validator}".encode("utf-8")).hexdigest()
+
+    def object_path(self, sha256: str) -> Path:
+        return self.objects / sha256[:2] / sha256
+
+    def lookup(self, url: str, validator: str) -> Optional[CacheEntry]:
+        """Returns the cached artifact of ``url`` with the given validator, if there is one."""
+        if not validator:
+            return None
+        index_path = self.index / self.key(url, validator)
+        try:
+            entry = CacheEntry.model_validate_json(index_path.read_bytes())
+        except (OSError, ValueError):
+            return None
+        path = self.object_path(entry.sha256)
+        if not path.is_file() or path.stat().st_size != entry.size:
+            _unlink(index_path)
+            return None
+        return entry
+
+    def store(self, url: str, validator: str, source: Path, sha256: str) -> CacheEntry:
+        """Moves the downloaded file ``source`` into the cache and indexes it."""
+        path = self.object_path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.is_file():
+            _unlink(source)
+        else:
+            os.replace(source, path)
+        entry = CacheEntry(url=url, validator=validator, sha256=sha256, size=path.stat().st_size)
+        if validator:
+            _write_atomic(self.index / self.key(url, validator), entry.model_dump_json(by_alias=True).encode("utf-8"))
+        return entry
+
+    def partial_paths(self, url: str, validator: str) -> Tuple[Path, Path]:
+        """Returns the paths of the partial file and of its download state."""
+        key = self.key(url, validator)
+        return self.partial / f"{key}.part", self.partial / f"{key}.json"
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def read_state(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def write_state(path: Path, state: dict) -> None:
+    _write_atomic(path, json.dumps(state).encode("utf-8"))
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.services.artifacts.cache import ArtifactCache, read_state, sha256_file, write_state
+from mozz_sec.services.http_client import HTTP_CLIENT, SharedHttpClient
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+
+CHECKSUM_HEADER = "X-Checksum-Sha256"
+
+
+class ChecksumError(Exception):
+    """Raised when a downloaded artifact does not match its expected SHA-256 digest."""
+
+
+class DownloadResult(BaseModel):
+    """
+    Represents a downloaded artifact.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        url: The URL of the artifact.
+        path: The path of the artifact in the cache.
+        sha256: The SHA-256 digest of the artifact.
+        size: The size of the artifact in bytes.
+        cached: Whether the artifact was served from the cache without downloading it.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    url: str
+    path: Path
+    sha256: str
+    size: int
+    cached: bool = False
+
+
+class _Remote(BaseModel):
+    """What a HEAD request tells about an artifact."""
+
+    size: Optional[int] = None
+    validator: str = ""
+    ranges: bool = False
+    sha256: Optional[str] = None
+
+
+class ArtifactDownloader:
+    """
+    Downloads the artifacts of an SBC task into an ``ArtifactCache``.
+
+    Artifacts are downloaded concurrently. When the server supports range requests, an artifact is
+    split into segments that are downloaded in parallel, and the completed segments are recorded so
+    an interrupted download resumes where it stopped. Every artifact is checked against the expected
+    SHA-256 digest, given by the caller or by the ``X-Checksum-Sha256`` response header.
+
+    Attributes:
+        cache: The artifact cache.
+        client: The HTTP client.
+        concurrency: The maximum number of artifacts downloaded at the same time.
+        segment_size: The size in bytes of the segments.
+        segments_per_file: The maximum number of segments of one artifact downloaded at the same time.
+    """
+
+    def __init__(
+        self,
+        cache: ArtifactCache,
+        client: Optional[SharedHttpClient] = None,
+        concurrency: int = 4,
+        segment_size: int = 32 * 1024 * 1024,
+        segments_per_file: int = 4,
+    ):
+        self.cache = cache
+        self.client = client or HTTP_CLIENT
+        self.concurrency = concurrency
+        self.segment_size = segment_size
+        self.segments_per_file = segments_per_file
+
+    @classmethod
+    def from_settings(
+        cls, settings: Optional[ExecutorSettings] = None, client: Optional[SharedHttpClient] = None
+    ) -> "ArtifactDownloader":
+        settings = settings or SETTINGS
+        return cls(
+            ArtifactCache(Path(settings.artifact_cache_dir)),
+            client=client,
+            concurrency=settings.download_concurrency,
+            segment_size=settings.download_segment_size,
+            segments_per_file=settings.download_segments_per_file,
+        )
+
+    async def fetch_all(
+        self, urls: Iterable[object], checksums: Optional[Dict[str, str]] = None
+    ) -> List[DownloadResult]:
+        """
+        Downloads all ``urls`` concurrently.
+
+        Args:
+            urls: The URLs of the artifacts, e.g. ``TestDataSbc.url_list``.
+            checksums: The expected SHA-256 digests by URL.
+
+        Returns:
+            List[DownloadResult]: The downloaded artifacts, in the order of ``urls``.
+        """
+        checksums = checksums or {}
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(url: str) -> DownloadResult:
+            async with slots:
+                return await self.fetch(url, checksums.get(url))
+
+        return list(await asyncio.gather(*(fetch(str(url)) for url in urls)))
+
+    async def fetch(self, url: str, sha256: Optional[str] = None) -> DownloadResult:
+        """Downloads one artifact, unless the cache already holds its current version."""
+        remote = await self._head(url)
+        entry = self.cache.lookup(url, remote.validator)
+        if entry is not None and sha256 in (None, entry.sha256):
+            logger.info(f"Artifact {url} served from cache")
+            path = self.cache.object_path(entry.sha256)
+            return DownloadResult(url=url, path=path, sha256=entry.sha256, size=entry.size, cached=True)
+
+        part, state_path = self.cache.partial_paths(url, remote.validator)
+        if remote.ranges and remote.size:
+            await self._fetch_segments(url, remote, part, state_path)
+        else:
+            await self._fetch_stream(url, part)
+
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, sha256_file, part)
+        expected = sha256 or remote.sha256
+        if expected is not None and digest != expected.lower():
+            part.unlink()
+            state_path.unlink(missing_ok=True)
+            raise ChecksumError(f"Artifact {url} has SHA-256 {digest}, expected {expected}")
+
+        entry = self.cache.store(url, remote.validator, part, digest)
+        state_path.unlink(missing_ok=True)
+        return DownloadResult(url=url, path=self.cache.object_path(digest), sha256=digest, size=entry.size)
+
+    async def _head(self, url: str) -> _Remote:
+        response = await self.client.request("HEAD", url, follow_redirects=True)
+        if response.status_code >= 400:
+            logger.warning(f"HEAD {url} returned {response.status_code}, download without cache")
+            return _Remote()
+        headers = response.headers
+        size = headers.get("Content-Length")
+        return _Remote(
+            size=int(size) if size and size.isdigit() else None,
+            validator=headers.get("ETag") or headers.get("Last-Modified") or "",
+            ranges=headers.get("Accept-Ranges", "").lower() == "bytes",
+            sha256=headers.get(CHECKSUM_HEADER),
+        )
+
+    async def _fetch_segments(self, url: str, remote: _Remote, part: Path, state_path: Path) -> None:
+        state = read_state(state_path)
+        if state.get("size") != remote.size or state.get("segmentSize") != self.segment_size or not part.is_file():
+            state = {"size": remote.size, "segmentSize": self.segment_size, "done": []}
+            with part.open("wb") as fp:
+                fp.truncate(remote.size)
+            write_state(state_path, state)
+
+        done = set(state["done"])
+        segments = [
+            (index, start, min(start + self.segment_size, remote.size) - 1)
+            for index, start in enumerate(range(0, remote.size, self.segment_size))
+            if index not in done
+        ]
+        if done:
+            logger.info(f"Resume {url}: {len(done)} segments already downloaded, {len(segments)} left")
+
+        slots = asyncio.Semaphore(self.segments_per_file)
+
+        async def fetch(segment: Tuple[int, int, int]):
+            async with slots:
+                await self._fetch_range(url, part, segment[1], segment[2], remote.validator)
+            done.add(segment[0])
+            write_state(state_path, {**state, "done": sorted(done)})
+
+        await asyncio.gather(*(fetch(segment) for segment in segments))
+
+    async def _fetch_range(self, url: str, part: Path, start: int, end: int, validator: str) -> None:
+        """Downloads the bytes ``start`` to ``end`` (inclusive), resuming within the range on retries."""
+        offset = start
+        attempt = 0
+        while True:
+            headers = {"Range": f"bytes={offset}-{end}"}
+            if validator:
+                headers["If-Range"] = validator
+            try:
+                async with self.client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+                    if response.status_code != 206:
+                        raise httpx.HTTPStatusError(
+                            f"Range request returned {response.status_code}",
+                            request=response.request,
+                            response=response,
+                        )
+                    with part.open("r+b") as fp:
+                        fp.seek(offset)
+                        async for chunk in response.aiter_bytes():
+                            fp.write(chunk)
+                            offset += len(chunk)
+                if offset > end:
+                    return
+                raise httpx.ReadError(f"Range {start}-{end} of {url} ended at {offset}")
+            except httpx.TransportError as exc:
+                if attempt >= self.client.retries:
+                    raise
+                logger.warning(f"GET {url} range {offset}-{end} failed ({exc!r}), retry {attempt + 1}")
+                await asyncio.sleep(self.client.backoff_delay(attempt))
+                attempt += 1
+
+    async def _fetch_stream(self, url: str, part: Path) -> None:
+        attempt = 0
+        while True:
+            try:
+                async with self.client.stream("GET", url, follow_redirects=True) as response:
+                    response.raise_for_status()
+                    with part.open("wb") as fp:
+                        async for chunk in response.aiter_bytes():
+                            fp.write(chunk)
+                return
+            except httpx.TransportError as exc:
+                if attempt >= self.client.retries:
+                    raise
+                logger.warning(f"GET {url} failed ({exc!r}), retry {attempt + 1}")
+                await asyncio.sleep(self.client.backoff_delay(attempt))
+                attempt += 1
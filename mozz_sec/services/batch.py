@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union
+
+from fastapi.exceptions import HTTPException, RequestValidationError
+from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, WrapValidator
+from pydantic.alias_generators import to_camel
+from starlette import status
+from typing_extensions import Annotated
+
+from mozz_sec.services.scheduler import SchedulerFull
+from mozz_sec.services.stores.task_index import TaskSummary
+from mozz_sec.services.stores.task_store import BaseTaskStore
+from mozz_sec.services.tasks.task import BaseExecTask
+
+T = TypeVar("T", bound=BaseExecTask)
+
+
+class TaskBatchItem(BaseModel, Generic[T]):
+    """
+    Represents one task of a batch submission.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        task_id: The ID of the task.
+        task: The task.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    task_id: str = Field(min_length=1)
+    task: T
+
+
+class TaskBatchResult(BaseModel):
+    """
+    Represents the outcome of one task of a batch submission.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        task_id: The ID of the task, if the item had one.
+        status_code: 201 if the task was created, 409 if the ID is taken, 422 if the item is invalid, 429 if
+            the executor has too many tasks waiting.
+        detail: The reason the task was rejected, in the format of the single-task endpoint.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    task_id: Optional[str] = None
+    status_code: int
+    detail: Any = None
+
+
+class TaskBatchGet(BaseModel):
+    """
+    Represents a status lookup of several tasks.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        task_ids: The IDs of the tasks.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    task_ids: List[str] = Field(max_length=10000)
+
+
+class TaskBatchGetResult(BaseModel):
+    """
+    Represents the result of a status lookup of several tasks.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        tasks: The summaries of the tasks found, in the order of the request.
+        missing: The IDs of the tasks not found.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    tasks: List[TaskSummary] = Field(default_factory=list)
+    missing: List[str] = Field(default_factory=list)
+
+
+class TaskPage(BaseModel):
+    """
+    Represents a page of a task listing.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        tasks: The summaries of the tasks, ordered by task ID.
+        next_cursor: The cursor of the next page, or None on the last page.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    tasks: List[TaskSummary] = Field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+class _InvalidItem:
+    """An item of a batch that failed validation, kept in place of the task."""
+
+    __slots__ = ("task_id", "errors")
+
+    def __init__(self, task_id: Optional[str], errors: List[Dict[str, Any]]):
+        self.task_id = task_id
+        self.errors = errors
+
+
+def _keep_invalid(value: Any, handler: Callable[[Any], Any]) -> Any:
+    try:
+        return handler(value)
+    except ValidationError as exc:
+        task_id = value.get("taskId", value.get("task_id")) if isinstance(value, dict) else None
+        return _InvalidItem(task_id if isinstance(task_id, str) else None, exc.errors(include_url=False))
+
+
+def _prefix_errors(errors: List[Dict[str, Any]], *loc: Union[str, int]) -> List[Dict[str, Any]]:
+    """Prefixes the locations of ``errors`` like FastAPI does for request bodies, with JSON-safe contexts."""
+    for error in errors:
+        error["loc"] = loc + tuple(error["loc"])
+        if "ctx" in error:
+            ctx = error["ctx"]
+            error["ctx"] = {key: str(value) if isinstance(value, Exception) else value for key, value in ctx.items()}
+    return errors
+
+
+class TaskBatch(Generic[T]):
+    """
+    Validates and stores the tasks of a batch submission.
+
+    The JSON array is validated in one pass by a ``TypeAdapter`` built once per task model. An
+    invalid item does not fail the whole batch, its errors are reported in its result instead.
+
+    Attributes:
+        model: The task model.
+    """
+
+    def __init__(self, model: Type[T]):
+        self.model = model
+        item = Annotated[TaskBatchItem[model], WrapValidator(_keep_invalid)]
+        self._adapter = TypeAdapter(List[item])
+
+    def parse(self, body: bytes) -> List[Union[TaskBatchItem[T], _InvalidItem]]:
+        """
+        Validates the request body.
+
+        Raises:
+            RequestValidationError: If the body is not a JSON array.
+        """
+        try:
+            return self._adapter.validate_json(body)
+        except ValidationError as exc:
+            raise RequestValidationError(_prefix_errors(exc.errors(include_url=False), "body"), body=body)
+
+    def submit(
+        self,
+        body: bytes,
+        store: BaseTaskStore[T],
+        on_created: Callable[[T], None],
+        admit: Optional[Callable[[List[T], List[Optional[T]]], Tuple[int, Optional[SchedulerFull]]]] = None,
+        replace: Optional[Callable[[str, T], Optional[T]]] = None,
+    ) -> Tuple[List[TaskBatchResult], List[T]]:
+        """
+        Stores the valid tasks of the body whose IDs are free.
+
+        Args:
+            body: The request body, a JSON array of ``{"taskId": ..., "task": ...}`` objects.
+            store: The task store.
+            on_created: Called with every created task, e.g. to publish its events.
+            admit: Called once with all the tasks stored and passed to ``on_created``, and the tasks they
+                replaced, e.g. to schedule them in one step, see ``TaskScheduler.submit_many``. It returns
+                the number of tasks admitted, the first ones, and the ``SchedulerFull`` the others were
+                rejected with. The rejected tasks are removed from the store, or replaced by the tasks
+                they replaced.
+            replace: Called with the ID and the task of every item whose ID is taken, e.g. to rerun it.
+                It returns the stored task the item replaces, or None to reject the item with a 409, or
+                raises an ``HTTPException`` that is the result of the item. Without it, every item whose
+                ID is taken is rejected with a 409.
+
+        Returns:
+            The result of every item, in order, and the created tasks.
+        """
+        results: List[TaskBatchResult] = []
+        created: List[T] = []
+        replaced: List[Optional[T]] = []
+        for index, item in enumerate(self.parse(body)):
+            if isinstance(item, _InvalidItem):
+                errors = _prefix_errors(item.errors, "body", index)
+                results.append(
+                    TaskBatchResult(
+                        task_id=item.task_id, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors
+                    )
+                )
+                continue
+            task_id, task = item.task_id, item.task
+            previous = None
+            if task_id in store:
+                try:
+                    previous = replace(task_id, task) if replace is not None else None
+                except HTTPException as exc:
+                    results.append(TaskBatchResult(task_id=task_id, status_code=exc.status_code, detail=exc.detail))
+                    continue
+                if previous is None:
+                    results.append(
+                        TaskBatchResult(
+                            task_id=task_id,
+                            status_code=status.HTTP_409_CONFLICT,
+                            detail=f"Task with task_id {task_id} already exists.",
+                        )
+                    )
+                    continue
+            task.task_id = task_id
+            store[task_id] = task
+            on_created(task)
+            created.append(task)
+            replaced.append(previous)
+            results.append(TaskBatchResult(task_id=task_id, status_code=status.HTTP_201_CREATED))
+        if admit is not None and created:
+            admitted, exc = admit(created, replaced)
+            rejected = {task.task_id for task in created[admitted:]}
+            for task, previous in zip(created[admitted:], replaced[admitted:]):
+                if previous is None:
+                    del store[task.task_id]
+                else:
+                    store[task.task_id] = previous
+            for result in results:
+                if result.task_id in rejected and result.status_code == status.HTTP_201_CREATED:
+                    result.status_code, result.detail = status.HTTP_429_TOO_MANY_REQUESTS, str(exc)
+            created = created[:admitted]
+        logger.info(f"Create {len(created)} of {len(results)} {self.model.__name__} tasks")
+        return results, created
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from starlette import status
+from starlette.responses import Response
+
+from mozz_sec.services.tasks.task import BaseExecTask
+
+
+def task_etag(task: BaseExecTask, slim: bool = False) -> str:
+    """
+    The ETag of the JSON of ``task``, a digest of its content rather than its version, which changes
+    whenever the task is loaded again from a store, in this process or in another one.
+    """
+    return f'"{task.json_digest(slim)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag``, using the weak comparison of RFC 9110."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def task_response(task: BaseExecTask, if_none_match: Optional[str] = None, slim: bool = False) -> Response:
+    """
+    Returns the JSON of ``task`` with its ETag, or an empty ``304 Not Modified`` response when the
+    client already holds the current version. ``slim`` leaves out the default fields of sub-tasks.
+    """
+    etag = task_etag(task, slim)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(task.dump_json_cached(slim), media_type="application/json", headers={"ETag": etag})
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional, Set
+
+from loguru import logger
+from pydantic.alias_generators import to_camel
+from pydantic_core import to_jsonable_python
+
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+from mozz_sec.services.tasks.task import BaseExecTask, TaskWithProgress
+
+# Fields of sub-tasks that are not worth an event of their own.
+_IGNORED_FIELDS = frozenset({"common", "params", "task_type"})
+
+
+class TaskEvent:
+    """
+    Represents a change of a task, serialized once as a server-sent event for all subscribers.
+
+    Attributes:
+        task_id: The ID of the changed task.
+        terminal: Whether the task is finished, failed or stopped after the change.
+        frame: The event in the ``text/event-stream`` format.
+    """
+
+    __slots__ = ("task_id", "terminal", "frame")
+
+    def __init__(self, task_id: str, kind: str, data: dict, version: int = 0, terminal: bool = False):
+        self.task_id = task_id
+        self.terminal = terminal
+        payload = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self.frame = f"id: {version}\nevent: {kind}\ndata: {payload}\n\n".encode("utf-8")
+
+
+def change_event(task: BaseExecTask, source: Optional[TaskWithProgress], name: Optional[str]) -> Optional[TaskEvent]:
+    """
+    Describes a change reported by a task observer as a delta event.
+
+    The event is one of ``task``, ``detail`` and ``subTask``, with the changed field and its new
+    value, or ``details`` when sub-tasks were added or removed. A change that cannot be described,
+    e.g. after ``touch``, is reported as a ``snapshot`` of the whole task.
+    """
+    data = {"taskId": task.task_id, "version": task.version}
+    detail = task.detail
+    if source is None:
+        kind = "snapshot"
+        data["task"] = json.loads(task.dump_json_cached())
+    elif name == "details":
+        kind = "details"
+        data["count"] = len(source.details)
+    else:
+        if source is task:
+            kind = "task"
+        elif source is detail:
+            kind = "detail"
+        else:
+            if name in _IGNORED_FIELDS:
+                return None
+            kind = "subTask"
+            data["index"] = detail.details.index_of(source)
+        data["field"] = to_camel(name)
+        data["value"] = to_jsonable_python(getattr(source, name))
+    return TaskEvent(task.task_id, kind, data, task.version, task.status.is_terminal)
+
+
+class Subscription:
+    """
+    Represents a consumer of task events, e.g. one open SSE response.
+
+    Events wait in a bounded queue. A subscriber that falls more than ``max_queue`` events behind
+    is dropped: it gets no more events and should reconnect and start from a fresh snapshot.
+
+    Attributes:
+        task_id: The task whose events are received, or None for the events of all tasks.
+        dropped: Whether the subscriber was dropped for being too slow.
+    """
+
+    def __init__(self, hub: "TaskEventHub", task_id: Optional[str], max_queue: int):
+        self.task_id = task_id
+        self.dropped = False
+        self._hub = hub
+        self._queue: "asyncio.Queue[TaskEvent]" = asyncio.Queue(max_queue)
+
+    def offer(self, event: TaskEvent) -> bool:
+        """Queues ``event`` on the event loop thread. Returns False when the queue is full."""
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[TaskEvent]:
+        """Returns the next event, or None after ``timeout`` seconds without one."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._hub.unsubscribe(self)
+
+
+class TaskEventHub:
+    """
+    Fans the changes of the tasks of one tool out to their subscribers.
+
+    Runners change tasks from worker threads. Their observers only build and serialize the event,
+    then hand it to the event loop in batches, where it is offered to the subscribers of the task
+    and to the subscribers of all tasks. Tasks without subscribers cost a dictionary lookup.
+
+    Attributes:
+        max_queue: The number of events a subscriber may fall behind before it is dropped.
+        keepalive: The number of seconds after which an idle stream sends a comment.
+    """
+
+    def __init__(self, max_queue: int = 256, keepalive: float = 15.0):
+        self.max_queue = max_queue
+        self.keepalive = keepalive
+        self._by_task: Dict[str, Set[Subscription]] = {}
+        self._all: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Deque[TaskEvent] = deque()
+        self._pending_lock = threading.Lock()
+        self._scheduled = False
+
+    @classmethod
+    def from_settings(cls, settings: Optional[ExecutorSettings] = None) -> "TaskEventHub":
+        settings = settings or SETTINGS
+        return cls(max_queue=settings.event_queue_size, keepalive=settings.event_keepalive)
+
+    def subscribe(self, task_id: Optional[str] = None) -> Subscription:
+        """Subscribes to the events of ``task_id``, or of all tasks. Must be called on the event loop."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self, task_id, self.max_queue)
+        if task_id is None:
+            self._all.add(subscription)
+        else:
+            self._by_task.setdefault(task_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription.task_id is None:
+            self._all.discard(subscription)
+            return
+        subscriptions = self._by_task.get(subscription.task_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._by_task[subscription.task_id]
+
+    def subscribers(self, task_id: Optional[str] = None) -> int:
+        if task_id is None:
+            return len(self._all) + sum(len(subscriptions) for subscriptions in self._by_task.values())
+        return len(self._by_task.get(task_id, ()))
+
+    def watch(self, task: BaseExecTask) -> None:
+        """Publishes the changes of ``task``."""
+        task.observe(self.on_change)
+
+    def on_change(self, task: BaseExecTask, source: Optional[TaskWithProgress], name: Optional[str]) -> None:
+        """The observer of watched tasks, called from the thread changing the task."""
+        if not self._all and task.task_id not in self._by_task:
+            return
+        try:
+            event = change_event(task, source, name)
+        except Exception as exc:  # the task is being modified concurrently, the next change is reported
+            logger.debug(f"Skip event of task {task.task_id}: {exc!r}")
+            return
+        if event is not None:
+            self.publish(event)
+
+    def publish(self, event: TaskEvent) -> None:
+        """Hands ``event`` to the event loop. Can be called from any thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        with self._pending_lock:
+            self._pending.append(event)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            loop.call_soon_threadsafe(self._dispatch)
+        except RuntimeError:  # the loop was closed meanwhile
+            with self._pending_lock:
+                self._pending.clear()
+                self._scheduled = False
+
+    def _dispatch(self) -> None:
+        with self._pending_lock:
+            events, self._pending = self._pending, deque()
+            self._scheduled = False
+        for event in events:
+            for subscriptions in (self._by_task.get(event.task_id, ()), self._all):
+                for subscription in list(subscriptions):
+                    if not subscription.offer(event):
+                        logger.warning(f"Drop slow subscriber of task events {subscription.task_id or '*'}")
+                        subscription.dropped = True
+                        self.unsubscribe(subscription)
+
+    async def stream(self, task: Optional[BaseExecTask] = None) -> AsyncIterator[bytes]:
+        """
+        Yields the ``text/event-stream`` frames of the events of ``task``, or of all tasks.
+
+        A task stream starts with a snapshot of the task and ends once the task is finished, failed
+        or stopped. A dropped subscriber gets a final ``dropped`` event.
+        """
+        subscription = self.subscribe(task.task_id if task is not None else None)
+        try:
+            yield b"retry: 3000\n\n"
+            if task is not None:
+                snapshot = change_event(task, None, None)
+                yield snapshot.frame
+                if snapshot.terminal:
+                    return
+            while True:
+                if subscription.dropped:
+                    yield TaskEvent(subscription.task_id or "", "dropped", {"taskId": subscription.task_id}).frame
+                    return
+                event = await subscription.get(self.keepalive)
+                if event is None:
+                    yield b": keepalive\n\n"
+                    continue
+                yield event.frame
+                if task is not None and event.terminal:
+                    return
+        finally:
+            subscription.close()
+
+
+def sse_headers() -> Dict[str, str]:
+    return {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import random
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, FrozenSet, Optional
+
+import httpx
+from loguru import logger
+
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+
+RETRY_STATUS_CODES: FrozenSet[int] = frozenset({429, 502, 503, 504})
+# Status codes telling that the request was not processed. A gateway error may come after the upstream
+# server processed the request, so other methods than IDEMPOTENT_METHODS are only retried on these.
+UNPROCESSED_STATUS_CODES: FrozenSet[int] = frozenset({429, 503})
+# Methods that may be sent again after any transport error. Other methods may already have had their
+# effect when the error happened, so they are only retried if the request was never sent.
+IDEMPOTENT_METHODS: FrozenSet[str] = frozenset({"GET", "HEAD", "OPTIONS"})
+# Transport errors raised before a request was sent.
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def http2_available() -> bool:
+    """Whether the ``h2`` package needed by httpx for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class SharedHttpClient:
+    """
+    Represents the HTTP client shared by all outbound calls of an executor process.
+
+    All requests go through one keep-alive ``httpx.AsyncClient`` connection pool. The number of
+    requests in flight per host is limited, HTTP/2 is used when ``h2`` is installed, and requests
+    failing with a transport error or a retryable status code are retried with exponential backoff
+    and jitter, honouring ``Retry-After`` up to ``max_retry_after`` seconds. Requests with other
+    methods than ``IDEMPOTENT_METHODS``, e.g. POST and PUT, are only retried after a transport error
+    if it happened before the request was sent, and on the ``UNPROCESSED_STATUS_CODES``.
+
+    The ``httpx.AsyncClient`` is bound to the event loop it was created in, so a new one is created
+    when the client is used from another event loop.
+
+    Attributes:
+        max_connections: The maximum number of connections of the pool.
+        max_keepalive_connections: The maximum number of idle connections kept alive.
+        max_connections_per_host: The maximum number of requests in flight per host.
+        retries: The number of times a failed request is retried.
+        backoff: The delay in seconds before the first retry, doubled for every further retry.
+        timeout: The timeout in seconds of a request.
+        max_retry_after: The longest delay in seconds taken from a ``Retry-After`` header.
+        http2: Whether HTTP/2 is negotiated.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 200,
+        max_keepalive_connections: int = 50,
+        max_connections_per_host: int = 20,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+        max_retry_after: float = 60.0,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_retry_after = max_retry_after
+        self.http2 = http2_available() if http2 is None else http2
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Optional[ExecutorSettings] = None) -> "SharedHttpClient":
+        settings = settings or SETTINGS
+        return cls(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            max_connections_per_host=settings.http_max_connections_per_host,
+            retries=settings.http_retries,
+            backoff=settings.http_backoff,
+            timeout=settings.http_timeout,
+            max_retry_after=settings.http_max_retry_after,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The ``httpx.AsyncClient`` of the running event loop."""
+        return self._bind_loop()
+
+    def _bind_loop(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+                timeout=self.timeout,
+                transport=self._transport,
+            )
+            self._loop = loop
+            self._host_slots = {}
+        return self._client
+
+    def host_slot(self, url: Any) -> asyncio.Semaphore:
+        """Returns the semaphore limiting the requests in flight to the host of ``url``."""
+        self._bind_loop()
+        host = httpx.URL(url).host
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return slot
+
+    async def request(self, method: str, url: Any, **kwargs: Any) -> httpx.Response:
+        """
+        Sends a request, retrying it on transport errors and retryable status codes. For methods other
+        than ``IDEMPOTENT_METHODS``, only errors raised before the request was sent and the
+        ``UNPROCESSED_STATUS_CODES`` are retried.
+
+        Returns:
+            httpx.Response: The last response. Its status is not checked.
+
+        Raises:
+            httpx.TransportError: If the last attempt failed with a transport error.
+        """
+        client = self.client
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_status_codes = RETRY_STATUS_CODES if idempotent else UNPROCESSED_STATUS_CODES
+        attempt = 0
+        while True:
+            last_attempt = attempt >= self.retries
+            try:
+                async with self.host_slot(url):
+                    response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as exc:
+                if last_attempt or (not idempotent and not isinstance(exc, UNSENT_ERRORS)):
+                    raise
+                logger.warning(f"{method} {url} failed ({exc!r}), retry {attempt + 1}/{self.retries}")
+                delay = self._delay(attempt)
+            else:
+                if response.status_code not in retry_status_codes or last_attempt:
+                    return response
+                await response.aclose()
+                logger.warning(f"{method} {url} returned {response.status_code}, retry {attempt + 1}/{self.retries}")
+                delay = self._delay(attempt, response)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: Any, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        """
+        Sends a request and streams its response body. Streamed requests are not retried, as the
+        caller may already have consumed a part of the body.
+        """
+        client = self.client
+        async with self.host_slot(url):
+            async with client.stream(method, url, **kwargs) as response:
+                yield response
+
+    def backoff_delay(self, attempt: int) -> float:
+        """The delay before the retry following the failed attempt ``attempt``, counted from 0."""
+        return self._delay(attempt)
+
+    async def get(self, url: Any, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: Any, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: Any, **kwargs: Any) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None and "Retry-After" in response.headers:
+            retry_after = _parse_retry_after(response.headers["Retry-After"])
+            if retry_after is not None:
+                return min(retry_after, self.max_retry_after)
+        return self.backoff * (2**attempt) * (0.5 + random.random() / 2)
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+HTTP_CLIENT = SharedHttpClient.from_settings()
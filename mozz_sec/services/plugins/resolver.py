@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, Iterator, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from mozz_sec.data.bas_data import PluginInfo, PluginInfoParam, PluginInfoType, TestDataBas
+
+# (plugin_set_names, plugin_name_blacklist, plugin_name_whitelist)
+_ParamKey = Tuple[Tuple[str, ...], FrozenSet[str], FrozenSet[str]]
+
+
+class PluginCatalog(Mapping[str, Tuple[str, ...]]):
+    """
+    Represents the plugins of every plugin set, as published by the BAS policy service.
+
+    The catalog is immutable and hashable, so plugin resolutions are memoized per catalog.
+
+    Attributes:
+        version: An optional version of the catalog, e.g. the ETag of the policy it was read from.
+    """
+
+    def __init__(self, plugin_sets: Mapping[str, Iterable[str]], version: str = ""):
+        self._plugin_sets: Dict[str, Tuple[str, ...]] = {name: tuple(plugins) for name, plugins in plugin_sets.items()}
+        self.version = version
+        self._hash = hash((version, frozenset(self._plugin_sets.items())))
+
+    def __getitem__(self, name: str) -> Tuple[str, ...]:
+        return self._plugin_sets[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._plugin_sets)
+
+    def __len__(self) -> int:
+        return len(self._plugin_sets)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PluginCatalog):
+            return NotImplemented
+        return self._hash == other._hash and self.version == other.version and self._plugin_sets == other._plugin_sets
+
+
+class PluginSelection(NamedTuple):
+    """
+    Represents the plugins run for one test case and one plugin information type.
+
+    Attributes:
+        plugins: The plugins to run, in order.
+        config: The configuration of the plugins. It is shared and must not be modified.
+    """
+
+    plugins: Tuple[str, ...]
+    config: Mapping[str, object]
+
+
+class PluginIndex:
+    """
+    Represents the plugins of a BAS task, resolved once per test case and plugin information type.
+
+    For a test case and a type, the plugins are those of the task parameters, followed by those of
+    the ``plugin_extra`` entries of that type and those of the ``plugin_extra_tc`` entries of the test
+    case and that type, without duplicates. Each parameter contributes the plugins of its plugin sets,
+    in order, restricted to its ``plugin_name_whitelist`` when that is not empty and without its
+    ``plugin_name_blacklist``.
+
+    The configuration of a test case and a type is ``config[type.value]`` updated with
+    ``config[test_case]``, so per-test-case settings override per-type ones.
+
+    Test cases without ``plugin_extra_tc`` entries all share the default selection of their type.
+
+    Attributes:
+        test_cases: The test cases with their own plugin selections.
+    """
+
+    def __init__(self, selections: Mapping[Tuple[Optional[str], PluginInfoType], PluginSelection]):
+        self._selections = MappingProxyType(dict(selections))
+        self.test_cases: FrozenSet[str] = frozenset(test_case for test_case, _ in selections if test_case is not None)
+
+    @classmethod
+    def for_task(cls, params: TestDataBas, catalog: PluginCatalog, test_cases: Iterable[str] = ()) -> "PluginIndex":
+        """
+        Returns the index of a task, shared by all tasks with the same parameters and catalog.
+
+        Args:
+            params: The BAS parameters of the task.
+            catalog: The plugins of every plugin set.
+            test_cases: The test cases whose configuration is looked up, in addition to those of
+                ``plugin_extra_tc``.
+        """
+        return _cached_index(params.model_dump_json(), catalog, frozenset(test_cases))
+
+    @classmethod
+    def build(cls, params: TestDataBas, catalog: PluginCatalog, test_cases: Iterable[str] = ()) -> "PluginIndex":
+        default = resolve_param(params, catalog)
+        extra = {
+            plugin_type: _resolve_extra(params.plugin_extra, plugin_type, catalog) for plugin_type in PluginInfoType
+        }
+        selections: Dict[Tuple[Optional[str], PluginInfoType], PluginSelection] = {}
+        for plugin_type in PluginInfoType:
+            plugins = _merge(default, extra[plugin_type])
+            selections[(None, plugin_type)] = PluginSelection(plugins, _merge_config(params.config, plugin_type))
+            for test_case in set(test_cases) | set(params.plugin_extra_tc):
+                extra_tc = _resolve_extra(params.plugin_extra_tc.get(test_case, ()), plugin_type, catalog)
+                selections[(test_case, plugin_type)] = PluginSelection(
+                    _merge(plugins, extra_tc), _merge_config(params.config, plugin_type, test_case)
+                )
+        return cls(selections)
+
+    def get(self, test_case: Optional[str], plugin_type: PluginInfoType) -> PluginSelection:
+        """Returns the selection of ``test_case``, or the default selection of ``plugin_type``."""
+        selection = self._selections.get((test_case, plugin_type))
+        if selection is None:
+            selection = self._selections[(None, plugin_type)]
+        return selection
+
+    def plugins(self, test_case: Optional[str], plugin_type: PluginInfoType) -> Tuple[str, ...]:
+        return self.get(test_case, plugin_type).plugins
+
+    def config(self, test_case: Optional[str], plugin_type: PluginInfoType) -> Mapping[str, object]:
+        return self.get(test_case, plugin_type).config
+
+
+def resolve_param(param: PluginInfoParam, catalog: PluginCatalog) -> Tuple[str, ...]:
+    """Returns the plugins selected by ``param``, memoized across tasks."""
+    key: _ParamKey = (
+        tuple(param.plugin_set_names),
+        frozenset(param.plugin_name_blacklist),
+        frozenset(param.plugin_name_whitelist),
+    )
+    return _resolve(key, catalog)
+
+
+@lru_cache(maxsize=4096)
+def _resolve(key: _ParamKey, catalog: PluginCatalog) -> Tuple[str, ...]:
+    plugin_set_names, blacklist, whitelist = key
+    plugins: Dict[str, None] = {}
+    for name in plugin_set_names:
+        try:
+            plugin_set = catalog[name]
+        except KeyError:
+            logger.warning(f"Unknown plugin set {name!r}")
+            continue
+        for plugin in plugin_set:
+            if plugin in blacklist or (whitelist and plugin not in whitelist):
+                continue
+            plugins[plugin] = None
+    return tuple(plugins)
+
+
+def _resolve_extra(infos: Sequence[PluginInfo], plugin_type: PluginInfoType, catalog: PluginCatalog) -> Tuple[str, ...]:
+    plugins: Tuple[str, ...] = ()
+    for info in infos:
+        if info.type is plugin_type:
+            plugins = _merge(plugins, resolve_param(info.params, catalog))
+    return plugins
+
+
+def _merge(first: Tuple[str, ...], second: Tuple[str, ...]) -> Tuple[str, ...]:
+    if not second:
+        return first
+    if not first:
+        return second
+    return tuple(dict.fromkeys(first + second))
+
+
+def _merge_config(
+    config: Mapping[str, Dict], plugin_type: PluginInfoType, test_case: Optional[str] = None
+) -> Mapping[str, object]:
+    merged: Dict[str, object] = dict(config.get(plugin_type.value) or {})
+    if test_case is not None:
+        merged.update(config.get(test_case) or {})
+    return MappingProxyType(merged)
+
+
+@lru_cache(maxsize=256)
+def _cached_index(params_json: str, catalog: PluginCatalog, test_cases: FrozenSet[str]) -> PluginIndex:
+    return PluginIndex.build(TestDataBas.model_validate_json(params_json), catalog, test_cases)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from pydantic import TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    """Returns the ``TypeAdapter`` of ``tp``, built once per type."""
+    return TypeAdapter(tp)
+
+
+def dump_json(value: Any, tp: Any = None, slim: bool = False) -> bytes:
+    """
+    Serializes ``value`` with its field aliases straight to JSON bytes.
+
+    Args:
+        value: The value to serialize.
+        tp: The type of ``value``. Defaults to ``type(value)``, which suits models but not lists.
+        slim: Whether sub-tasks leave out the fields that have their default value.
+    """
+    return type_adapter(tp or type(value)).dump_json(value, by_alias=True, context={"slim": True} if slim else None)
+
+
+class ModelResponse(Response):
+    """
+    A JSON response serialized by the prebuilt pydantic-core serializer of the content type.
+
+    Endpoints returning a response are not validated against their ``response_model`` again, so
+    declaring the model keeps the OpenAPI schema while skipping FastAPI's validate-then-encode path.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        model: Any = None,
+        slim: bool = False,
+        background: Optional[BackgroundTask] = None,
+    ):
+        self.model = model
+        self.slim = slim
+        super().__init__(content, status_code, headers, background=background)
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dump_json(content, self.model, self.slim)
@@ -0,0 +1,82 @@
+import asyncio
+from typing import ClassVar, Optional, Type
+
+from loguru import logger
+from pydantic import Field
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.http_client import HTTP_CLIENT, SharedHttpClient
+from mozz_sec.services.runners.runner import BaseRunner, SubRunner, SubTaskState, finish_sub_task
+from mozz_sec.services.settings import SETTINGS
+
+
+class AsyncSubRunner(SubRunner):
+    """
+    Represents the runner of one sub-task running as a coroutine.
+
+    Sub runners reach the SecGuard workspace, the BAS policies and the report service through
+    ``client``, so all of them share one pool of keep-alive connections.
+    """
+
+    async def run_task_async(self, client: SharedHttpClient):
+        logger.debug(f"[{self.name}]Run Task")
+
+    def run_task(self):
+        asyncio.run(_with_private_client(self.run_task_async))
+
+
+async def run_async_sub_runner(runner: AsyncSubRunner, client: SharedHttpClient) -> SubTaskState:
+    """The coroutine counterpart of ``run_sub_runner``."""
+    runner.task.status = TaskStatus.Running
+    try:
+        await runner.run_task_async(client)
+    except Exception as exc:
+        logger.exception(f"[{runner.name}]Run Task failed")
+        state = finish_sub_task(runner.task, exc)
+    else:
+        state = finish_sub_task(runner.task)
+    runner.checkpoint()
+    return state
+
+
+class AsyncBaseRunner(BaseRunner):
+    """
+    Represents the runner of an execution task running its sub runners as coroutines on one event loop.
+
+    Attributes:
+        concurrency: The maximum number of sub runners in flight.
+    """
+
+    sub_runner_class: ClassVar[Type[SubRunner]] = AsyncSubRunner
+
+    concurrency: int = Field(default_factory=lambda: SETTINGS.async_runner_concurrency, ge=1)
+
+    async def run_task_async(self, client: Optional[SharedHttpClient] = None):
+        client = client or HTTP_CLIENT
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def run(runner: AsyncSubRunner):
+            async with slots:
+                await run_async_sub_runner(runner, client)
+
+        await asyncio.gather(*(run(_runner) for _runner in self.sub_runners))
+        if self.checkpoints is not None:
+            self.checkpoints.end(self.task.task_id)
+            self.checkpoints.sync()
+
+    def run_task(self):
+        asyncio.run(_with_private_client(self.run_task_async))
+
+
+async def _with_private_client(run_task_async):
+    """
+    Runs ``run_task_async`` with a client of its own, closed afterwards.
+
+    The synchronous entry points create an event loop per call, while ``HTTP_CLIENT`` is meant to be
+    used by the long-lived event loop of the executor.
+    """
+    client = SharedHttpClient.from_settings()
+    try:
+        await run_task_async(client)
+    finally:
+        await client.aclose()
@@ -0,0 +1,37 @@
+from typing import ClassVar, Type
+
+from loguru import logger
+
+from mozz_sec.services.runners.runner import BaseRunner, SubRunner
+from mozz_sec.services.tasks.bas_task import BasExecTask, SubBasTask
+
+
+class BasSubRunner(SubRunner):
+    """
+    Represents the runner of a BAS sub-task.
+
+    BAS sub-tasks drive remote attack plugins and mostly wait for them, so they run in threads.
+
+    Attributes:
+        task: The BAS sub-task run by the runner.
+    """
+
+    io_bound: ClassVar[bool] = True
+
+    task: SubBasTask
+
+    def run_task(self):
+        logger.debug(f"[{self.name}]Run Bas Task")
+
+
+class BasRunner(BaseRunner):
+    """
+    Represents the runner of a BAS execution task.
+
+    Attributes:
+        task: The BAS execution task.
+    """
+
+    sub_runner_class: ClassVar[Type[SubRunner]] = BasSubRunner
+
+    task: BasExecTask
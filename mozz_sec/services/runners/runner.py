@@ -1,31 +1,228 @@
-from typing import List, Any
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import ClassVar, Dict, List, Any, Optional, Tuple, Type
 
 from loguru import logger
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.settings import SETTINGS
+from mozz_sec.services.stores.checkpoints import Checkpoint, CheckpointLog, TaskCheckpoints
 from mozz_sec.services.tasks.task import BaseSubTask, BaseExecTask
 
+SubTaskState = Tuple[int, TaskStatus, str]
+
+
+class RunMode(Enum):
+    """
+    Represents how a runner executes its sub runners.
+
+    Attributes:
+        sequential: One sub runner after the other in the calling thread.
+        thread: Concurrently in a thread pool.
+        process: Concurrently in a process pool.
+        auto: I/O bound sub runners in a thread pool, the others in a process pool.
+    """
+
+    sequential: str = "sequential"
+    thread: str = "thread"
+    process: str = "process"
+    auto: str = "auto"
+
 
 class SubRunner(BaseModel):
+    """
+    Represents the runner of one sub-task.
+
+    Long sub runners call ``checkpoint`` with their partial results now and then. If the executor
+    crashes, the sub-task resumes with the partial results of its last checkpoint in ``state``.
+
+    Attributes:
+        io_bound: Whether the runner mostly waits for I/O. I/O bound runners run in threads in the
+            ``auto`` mode, the others in processes.
+        name: The name of the runner, the ID of its execution task.
+        task: The sub-task run by the runner.
+        index: The index of the sub-task in the details of its execution task.
+        state: The partial results of the run, restored from the last checkpoint when the sub-task resumes.
+        checkpoints: The log the checkpoints are written to, or None to not write any.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    io_bound: ClassVar[bool] = True
+
     name: str
     task: BaseSubTask
+    index: int = 0
+    state: Dict[str, Any] = Field(default_factory=dict)
+    checkpoints: Optional[CheckpointLog] = Field(None, exclude=True)
 
     def run_task(self):
         logger.debug(f"[{self.name}]Run Task")
 
+    def checkpoint(self, **state: Any) -> None:
+        """Adds ``state`` to the partial results and writes them with the progress of the sub-task to the log."""
+        self.state.update(state)
+        if self.checkpoints is None:
+            return
+        task = self.task
+        self.checkpoints.write(
+            Checkpoint(
+                task_id=self.name,
+                index=self.index,
+                progress=task.progress,
+                status=task.status,
+                message=task.message,
+                state=self.state,
+            )
+        )
+
+
+def run_sub_runner(runner: SubRunner) -> SubTaskState:
+    """
+    Runs a sub runner and keeps the status of its sub-task up to date.
+
+    The sub-task is running while ``run_task`` runs. It is finished afterwards, unless ``run_task``
+    already set a terminal status itself, and it is faulted if ``run_task`` raises. Its final state is
+    checkpointed, so that it is not run again when its task resumes.
+
+    Returns:
+        SubTaskState: The final progress, status and message of the sub-task.
+    """
+    runner.task.status = TaskStatus.Running
+    try:
+        runner.run_task()
+    except Exception as exc:
+        logger.exception(f"[{runner.name}]Run Task failed")
+        state = finish_sub_task(runner.task, exc)
+    else:
+        state = finish_sub_task(runner.task)
+    runner.checkpoint()
+    return state
+
+
+def finish_sub_task(task: BaseSubTask, exc: Optional[BaseException] = None) -> SubTaskState:
+    """Sets the final status of a sub-task after its runner returned or raised ``exc``."""
+    if exc is not None:
+        task.status = TaskStatus.Fault
+        task.message = f"{type(exc).__name__}: {exc}"
+    elif not task.status.is_terminal:
+        task.progress = 100
+        task.status = TaskStatus.Finished
+    return task.progress, task.status, task.message
+
 
 class BaseRunner(BaseModel):
+    """
+    Represents the runner of an execution task, running one sub runner per sub-task.
+
+    A runner resuming an interrupted task restores its sub-tasks from ``resume_from``. Sub-tasks that
+    had ended are not run again, the others are run with the partial results of their last checkpoint.
+
+    Attributes:
+        sub_runner_class: The sub runner created for every sub-task.
+        task: The execution task.
+        sub_runners: The sub runners of the sub-tasks.
+        mode: How the sub runners are executed.
+        concurrency: The maximum number of sub runners running at the same time.
+        checkpoints: The log the sub runners write their checkpoints to, or None to not write any.
+        resume_from: The last checkpoints of the sub-tasks by index, when the task resumes.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    sub_runner_class: ClassVar[Type[SubRunner]] = SubRunner
+
     task: BaseExecTask
     sub_runners: List[SubRunner] = Field(default_factory=list)
+    mode: RunMode = Field(default_factory=lambda: RunMode(SETTINGS.runner_mode))
+    concurrency: int = Field(default_factory=lambda: SETTINGS.runner_concurrency, ge=1)
+    checkpoints: Optional[CheckpointLog] = Field(None, exclude=True)
+    resume_from: TaskCheckpoints = Field(default_factory=dict)
 
     def __init__(self, **data: Any):
         super().__init__(**data)
-        for sub_task in task.detail.details:
-            self.sub_runners.append(SubRunner(name=task.task_id, task=sub_task))
+        if self.sub_runners:
+            return
+        sub_task_class = self.sub_runner_class.model_fields["task"].annotation
+        for index, sub_task in enumerate(self.task.detail.details):
+            if not isinstance(sub_task, sub_task_class):
+                logger.warning(f"[{self.task.task_id}]Skip sub-task {sub_task!r}")
+                continue
+            saved = self.resume_from.get(index)
+            if saved is not None:
+                saved.restore(sub_task)
+                if sub_task.status.is_terminal:
+                    continue
+            self.sub_runners.append(
+                self.sub_runner_class(
+                    name=self.task.task_id,
+                    task=sub_task,
+                    index=index,
+                    state=dict(saved.state) if saved is not None else {},
+                    checkpoints=self.checkpoints,
+                    **self.sub_runner_fields(self.task),
+                )
+            )
+
+    @classmethod
+    def sub_runner_fields(cls, task: BaseExecTask) -> Dict[str, Any]:
+        """Returns the fields the sub runners of ``task`` take from the task, besides their sub-task."""
+        return {}
 
     def run_task(self):
-        for _runner in self.sub_runners:
-            _runner.run_task()
+        self._run_sub_runners()
+        if self.checkpoints is not None:
+            self.checkpoints.end(self.task.task_id)
+            self.checkpoints.sync()
+
+    def _run_sub_runners(self):
+        if self.mode == RunMode.sequential or len(self.sub_runners) <= 1:
+            for _runner in self.sub_runners:
+                run_sub_runner(_runner)
+            return
+
+        executors: Dict[bool, Executor] = {}
+        futures: List[Tuple[SubRunner, Future]] = []
+        try:
+            for _runner in self.sub_runners:
+                executor = self._executor(executors, _runner)
+                if isinstance(executor, ProcessPoolExecutor):
+                    # The sub runner updates a copy of the sub-task in the worker process.
+                    _runner.task.status = TaskStatus.Running
+                futures.append((_runner, executor.submit(run_sub_runner, _runner)))
+            for _runner, future in futures:
+                self._apply(_runner, future)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+
+    def _executor(self, executors: Dict[bool, Executor], runner: SubRunner) -> Executor:
+        in_thread = self.mode == RunMode.thread or (self.mode == RunMode.auto and runner.io_bound)
+        executor: Optional[Executor] = executors.get(in_thread)
+        if executor is None:
+            workers = min(self.concurrency, len(self.sub_runners))
+            executor = ThreadPoolExecutor(workers) if in_thread else ProcessPoolExecutor(workers)
+            executors[in_thread] = executor
+        return executor
+
+    @staticmethod
+    def _apply(runner: SubRunner, future: Future):
+        """Copies the result of a sub runner to its sub-task, which a process pool only updated in a copy."""
+        task = runner.task
+        try:
+            progress, status, message = future.result()
+        except Exception as exc:
+            logger.error(f"[{runner.name}]Run Task failed: {exc!r}")
+            task.status = TaskStatus.Fault
+            task.message = f"{type(exc).__name__}: {exc}"
+            return
+        if task.progress != progress:
+            task.progress = progress
+        if task.status != status:
+            task.status = status
+        if task.message != message:
+            task.message = message
 
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+from pathlib import Path
+from typing import Any, ClassVar, Dict, Optional, Type
+
+from loguru import logger
+from pydantic import Field
+
+from mozz_sec.data.sbc_data import ScanType
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.runners.runner import BaseRunner, SubRunner
+from mozz_sec.services.scanners.pipeline import FilePipeline, FileScan
+from mozz_sec.services.settings import SETTINGS
+from mozz_sec.services.stores.result_cache import ScanResultCache, create_result_cache, result_key
+from mozz_sec.services.tasks.rerun import SCAN_RESULT_FIELDS
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+from mozz_sec.services.tasks.task import BaseExecTask
+
+# The scan results shared by the SBC tasks of all processes, or None if the cache is disabled.
+SCAN_RESULTS: Optional[ScanResultCache] = create_result_cache()
+
+
+class SbcSubRunner(SubRunner):
+    """
+    Represents the runner of an SBC sub-task.
+
+    SBC sub-tasks scan files locally and are CPU bound, so they run in processes. A file whose content
+    was already scanned with the same scan type and scanner version, by any task, takes the result from
+    ``results`` instead of being scanned again, and the result of a scan without errors is added to it.
+    Results are keyed by the digest of the bytes the pipeline read, never by the hash sent with the
+    sub-task, which is replaced by that digest.
+
+    A file is scanned by the analyzers of all its scan types in one pass of a ``FilePipeline``. Their
+    findings are kept in ``state`` and cached with the result, their summaries make up the remark of
+    the sub-task, and the sub-task is faulted if one of them fails or if the file does not exist. A
+    sub-task none of whose scan types has an analyzer has nothing to scan, and nothing is cached for it.
+
+    Attributes:
+        scanner_version: The version of the scanners, part of the key of the cached results.
+        task: The SBC sub-task run by the runner.
+        scan_type: The scans run on the file, or None if unknown, in which case nothing is scanned.
+        results: The scan result cache, or None to always scan.
+    """
+
+    io_bound: ClassVar[bool] = False
+    scanner_version: ClassVar[str] = SETTINGS.sbc_scanner_version
+
+    task: SubSbcTask
+    scan_type: Optional[ScanType] = None
+    results: Optional[ScanResultCache] = Field(default_factory=lambda: SCAN_RESULTS, exclude=True)
+
+    def run_task(self):
+        logger.debug(f"[{self.name}]Run Sbc Task: {self.task.file_path}")
+        pipeline = self.pipeline()
+        if pipeline is None or not pipeline.analyzers:
+            return
+        path = Path(self.task.file_path)
+        if not path.is_file():
+            self.task.status = TaskStatus.Fault
+            self.task.message = f"File not found: {self.task.file_path}"
+            return
+        scan = pipeline.scan_file(str(path), reuse=lambda digest: self._cached(pipeline, digest))
+        self.task.file_hash = scan.digest
+        if scan.reused is not None:
+            logger.debug(f"[{self.name}]Reuse the scan result of {path}")
+            findings = scan.reused.pop("findings", None)
+            for name, value in scan.reused.items():
+                setattr(self.task, name, value)
+            if findings is not None:
+                self.state["findings"] = findings
+            return
+        self.report(pipeline, scan)
+        if self.results is not None and not scan.errors:
+            result = self.task.model_dump(mode="json", include=set(SCAN_RESULT_FIELDS))
+            result["findings"] = scan.findings
+            self.results.put(self._result_key(pipeline, scan.digest), result)
+
+    def pipeline(self) -> Optional[FilePipeline]:
+        """Returns the pipeline of the scan type of the sub-task, or None if it is unknown."""
+        if self.scan_type is None:
+            return None
+        return FilePipeline.for_scan_type(self.scan_type)
+
+    def report(self, pipeline: FilePipeline, scan: FileScan) -> None:
+        """Sets the remark, the findings and, if an analyzer failed, the fault of the sub-task from ``scan``."""
+        timings = ", ".join(f"{name} {seconds * 1e3:.1f} ms" for name, seconds in scan.seconds.items())
+        logger.debug(f"[{self.name}]Scanned {scan.size} bytes of {scan.path}: {timings}")
+        remarks = []
+        for analyzer in pipeline.analyzers:
+            summary = analyzer.summary(scan.findings[analyzer.name]) if analyzer.name in scan.findings else ""
+            if summary:
+                remarks.append(f"{analyzer.name}: {summary}")
+        if remarks:
+            self.task.remark = "; ".join(remarks)
+        self.checkpoint(findings=scan.findings)
+        if scan.errors:
+            self.task.status = TaskStatus.Fault
+            self.task.message = "; ".join(f"{name}: {error}" for name, error in scan.errors.items())
+
+    def _cached(self, pipeline: FilePipeline, digest: str) -> Optional[Dict[str, Any]]:
+        if self.results is None:
+            return None
+        return self.results.get(self._result_key(pipeline, digest))
+
+    def _result_key(self, pipeline: FilePipeline, digest: str) -> str:
+        # Analyzers depending on data of their own, e.g. the opensource index, add its version to the key.
+        versions = [self.scanner_version, *filter(None, (analyzer.version() for analyzer in pipeline.analyzers))]
+        return result_key(digest, self.scan_type, "+".join(versions))
+
+
+class SbcRunner(BaseRunner):
+    """
+    Represents the runner of an SBC execution task.
+
+    Attributes:
+        task: The SBC execution task.
+    """
+
+    sub_runner_class: ClassVar[Type[SubRunner]] = SbcSubRunner
+
+    task: SbcExecTask
+
+    @classmethod
+    def sub_runner_fields(cls, task: BaseExecTask) -> Dict[str, Any]:
+        return {"scan_type": task.detail.params.scan_type}
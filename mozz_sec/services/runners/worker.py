@@ -0,0 +1,266 @@
+"""
+Runs the sub-tasks queued by the API workers in the shared executor mode, in scan worker processes.
+
+Start them next to uvicorn with the same settings:
+
+    MOZZ_EXECUTOR_MODE=shared MOZZ_TASK_STORE=sqlite:///var/lib/mozz/tasks.db \
+        python -m mozz_sec.services.runners.worker sbc [--processes 8]
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from loguru import logger
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.runners.bas_runner import BasRunner
+from mozz_sec.services.runners.runner import BaseRunner, SubTaskState, run_sub_runner
+from mozz_sec.services.runners.sbc_runner import SbcRunner
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+from mozz_sec.services.stores.checkpoints import CheckpointLog, TaskCheckpoints, create_checkpoint_log
+from mozz_sec.services.stores.task_store import SqliteTaskStore, create_task_store
+from mozz_sec.services.stores.work_queue import SqliteWorkQueue, WorkItem, create_work_queue
+from mozz_sec.services.tasks.task import BaseExecTask, TaskWithProgress
+
+# The runner and the table of the tasks of every tool.
+TOOLS: Dict[str, Tuple[Type[BaseRunner], str]] = {"sbc": (SbcRunner, "sbc_tasks"), "bas": (BasRunner, "bas_tasks")}
+
+
+def queue_sub_tasks(queue: SqliteWorkQueue, task: BaseExecTask, **kwargs: Any) -> int:
+    """Queues all sub-tasks of ``task``. Returns their number."""
+    return queue.put(task.task_id, range(len(task.detail.details)), **kwargs)
+
+
+class ScanWorker:
+    """
+    Represents a scan worker, pulling sub-tasks from the work queue and running them one at a time.
+
+    A worker claims a batch of sub-tasks, preferring those of the task it ran last and stealing from
+    the other tasks otherwise, see ``SqliteWorkQueue.claim``. It marks the sub-tasks of a task as
+    running, runs them with the sub runner of the tool and writes their results back with one
+    ``apply`` per task and batch, so the workers of all processes can run sub-tasks of the same task.
+
+    A sub-task claimed again after its worker died resumes from its last checkpoint. If it had ended,
+    its result is taken from the checkpoint without running it again. The sub-tasks of a task missing
+    from the store, e.g. one its API worker has not flushed yet, are postponed by ``retry_delay`` and
+    only dropped once their attempts are used up.
+
+    Attributes:
+        runner_class: The runner of the tasks, whose sub runner runs the sub-tasks.
+        store: The shared task store.
+        queue: The work queue.
+        name: The name of the worker, unique across processes.
+        batch: The number of sub-tasks claimed at once.
+        attempts: The number of claims after which a sub-task is given up as faulted.
+        checkpoints: The log the sub runners write their checkpoints to, or None to not write any.
+        retry_delay: The number of seconds the sub-tasks of a missing task are postponed by.
+    """
+
+    def __init__(
+        self,
+        runner_class: Type[BaseRunner],
+        store: SqliteTaskStore,
+        queue: SqliteWorkQueue,
+        name: Optional[str] = None,
+        batch: int = 16,
+        attempts: int = 3,
+        checkpoints: Optional[CheckpointLog] = None,
+        retry_delay: float = 1.0,
+    ):
+        self.runner_class = runner_class
+        self.store = store
+        self.queue = queue
+        self.name = name or f"worker-{os.getpid()}"
+        self.batch = batch
+        self.attempts = attempts
+        self.checkpoints = checkpoints
+        self.retry_delay = retry_delay
+        self._affinity: Optional[str] = None
+
+    def run_once(self) -> int:
+        """Claims and runs one batch of sub-tasks. Returns the number of sub-tasks claimed."""
+        items = self.queue.claim(self.name, self.batch, self._affinity)
+        for task_id, group in groupby(items, key=lambda item: item.task_id):
+            self._affinity = task_id
+            self._run_task(task_id, list(group))
+        return len(items)
+
+    def run(self, stop: Any, idle: float = 0.2) -> None:
+        """Runs batches until ``stop``, a threading or multiprocessing event, is set."""
+        while not stop.is_set():
+            if not self.run_once():
+                stop.wait(idle)
+
+    def _run_task(self, task_id: str, items: List[WorkItem]) -> None:
+        try:
+            task = self.store[task_id]
+        except KeyError:
+            self._postpone(task_id, items)
+            return
+        results: Dict[int, Dict[str, Any]] = {}
+        runnable = []
+        for item in items:
+            if item.attempts > self.attempts:
+                message = f"Given up after {item.attempts - 1} attempts"
+                results[item.index] = {"status": TaskStatus.Fault, "message": message}
+            else:
+                runnable.append(item)
+        if runnable:
+            self._apply(task_id, {item.index: {"status": TaskStatus.Running} for item in runnable})
+        saved: TaskCheckpoints = {}
+        if self.checkpoints is not None and any(item.attempts > 1 for item in runnable):
+            saved = self.checkpoints.load().get(task_id, {})
+        claimed = time.monotonic()
+        for position, item in enumerate(runnable):
+            if time.monotonic() - claimed > self.queue.lease / 2:
+                self.queue.extend(self.name, runnable[position:])
+                claimed = time.monotonic()
+            state = self._run_sub_task(task, item, saved)
+            if state is not None:
+                progress, status, message = state
+                results[item.index] = {"progress": progress, "status": status, "message": message}
+        updated = self._apply(task_id, results)
+        if self.checkpoints is not None and updated is not None and updated.status.is_terminal:
+            self.checkpoints.end(task_id)
+        self.queue.complete(self.name, items)
+
+    def _postpone(self, task_id: str, items: List[WorkItem]) -> None:
+        """Postpones the sub-tasks of a task missing from the store, dropping those out of attempts."""
+        dropped = [item for item in items if item.attempts >= self.attempts]
+        if dropped:
+            logger.warning(f"[{self.name}]Drop {len(dropped)} sub-tasks of deleted task {task_id}")
+            self.queue.complete(self.name, dropped)
+        if len(dropped) < len(items):
+            self.queue.extend(self.name, [item for item in items if item.attempts < self.attempts], self.retry_delay)
+
+    def _run_sub_task(self, task: BaseExecTask, item: WorkItem, saved: TaskCheckpoints) -> Optional[SubTaskState]:
+        sub_runner_class = self.runner_class.sub_runner_class
+        sub_task_class = sub_runner_class.model_fields["task"].annotation
+        details = task.detail.details
+        sub_task = details[item.index] if item.index < len(details) else None
+        if isinstance(sub_task, dict):
+            # Sub-tasks read back from the store are plain dictionaries.
+            sub_task = sub_task_class.model_validate(sub_task)
+        if not isinstance(sub_task, sub_task_class):
+            logger.warning(f"[{task.task_id}]Skip sub-task {item.index}: {sub_task!r}")
+            return None
+        checkpoint = saved.get(item.index)
+        if checkpoint is not None:
+            if checkpoint.status.is_terminal:
+                # The sub-task ended, but its worker died before writing the result to the store.
+                return checkpoint.progress, checkpoint.status, checkpoint.message
+            checkpoint.restore(sub_task)
+        runner = sub_runner_class(
+            name=task.task_id,
+            task=sub_task,
+            index=item.index,
+            state=dict(checkpoint.state) if checkpoint is not None else {},
+            checkpoints=self.checkpoints,
+            **self.runner_class.sub_runner_fields(task),
+        )
+        return run_sub_runner(runner)
+
+    def _apply(self, task_id: str, results: Dict[int, Dict[str, Any]]) -> Optional[BaseExecTask]:
+        if not results:
+            return None
+        try:
+            return self.store.apply(task_id, lambda task: update_sub_tasks(task, results))
+        except KeyError:
+            logger.warning(f"[{self.name}]Task {task_id} was deleted while it ran")
+            return None
+
+
+def update_sub_tasks(task: BaseExecTask, changes: Dict[int, Dict[str, Any]]) -> None:
+    """Sets the fields of the sub-tasks of ``task`` by index, in models and in plain dictionaries alike."""
+    details = task.detail.details
+    for index, fields in changes.items():
+        if index >= len(details):
+            continue
+        sub_task = details[index]
+        if isinstance(sub_task, TaskWithProgress):
+            for name, value in fields.items():
+                setattr(sub_task, name, value)
+        elif isinstance(sub_task, dict):
+            values = {to_camel(name): getattr(value, "value", value) for name, value in fields.items()}
+            details[index] = {**sub_task, **values}
+
+
+def run_worker(runner_class: Type[BaseRunner], table: str, name: str, stop: Any, settings: ExecutorSettings) -> None:
+    """The main function of a scan worker process."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    store = create_task_store(runner_class.model_fields["task"].annotation, table, settings)
+    queue = create_work_queue(table, settings)
+    if not isinstance(store, SqliteTaskStore) or queue is None:
+        raise ValueError("Scan workers need the shared executor mode")
+    checkpoints = create_checkpoint_log(table, settings)
+    worker = ScanWorker(
+        runner_class,
+        store,
+        queue,
+        name,
+        batch=settings.work_batch,
+        attempts=settings.work_attempts,
+        checkpoints=checkpoints,
+    )
+    logger.info(f"[{name}]Start scan worker of {table}")
+    try:
+        worker.run(stop)
+    finally:
+        if checkpoints is not None:
+            checkpoints.close()
+        queue.close()
+        store.close()
+
+
+def start_workers(
+    runner_class: Type[BaseRunner], table: str, processes: int, settings: Optional[ExecutorSettings] = None
+) -> Tuple[List[multiprocessing.Process], Any]:
+    """Starts ``processes`` scan worker processes. Returns them and the event stopping them."""
+    settings = settings or SETTINGS
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    workers = [
+        context.Process(
+            target=run_worker,
+            args=(runner_class, table, f"{table}-{os.getpid()}-{index}", stop, settings),
+            name=f"{table}-worker-{index}",
+        )
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers, stop
+
+
+def stop_workers(workers: List[multiprocessing.Process], stop: Any, timeout: Optional[float] = None) -> None:
+    """Lets the workers finish their batch and waits for them."""
+    stop.set()
+    for worker in workers:
+        worker.join(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tool", choices=sorted(TOOLS))
+    parser.add_argument("--processes", type=int, default=SETTINGS.scan_workers)
+    args = parser.parse_args()
+
+    runner_class, table = TOOLS[args.tool]
+    workers, stop = start_workers(runner_class, table, args.processes)
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        logger.info(f"Stop {len(workers)} scan workers of {table}")
+        stop_workers(workers, stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import mmap
+import os
+import re
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.services.scanners.pipeline import Analyzer
+
+Buffer = Any  # bytes, bytearray, memoryview or mmap
+
+ELF_MAGIC = b"\x7fELF"
+ET_EXEC, ET_DYN = 2, 3
+PT_LOAD, PT_DYNAMIC, PT_INTERP = 1, 2, 3
+PT_GNU_STACK, PT_GNU_RELRO = 0x6474E551, 0x6474E552
+PF_X = 1
+SHT_SYMTAB = 2
+DT_NULL, DT_STRTAB, DT_STRSZ, DT_RPATH, DT_BIND_NOW, DT_RUNPATH, DT_FLAGS = 0, 5, 10, 15, 24, 29, 30
+DT_FLAGS_1 = 0x6FFFFFFB
+DF_BIND_NOW = 0x8
+DF_1_NOW, DF_1_PIE = 0x1, 0x08000000
+
+# The libc functions _FORTIFY_SOURCE replaces with a checked __<name>_chk variant.
+FORTIFIABLE = frozenset(
+    b"memcpy memmove mempcpy memset stpcpy stpncpy strcat strcpy strncat strncpy sprintf snprintf vsprintf "
+    b"vsnprintf printf fprintf vprintf vfprintf dprintf read pread fread fgets gets getcwd realpath confstr "
+    b"wcscpy wcsncpy wcscat wmemcpy wmemset recv recvfrom readlink poll ppoll".split()
+)
+_SYMBOL = re.compile(rb"\x00([A-Za-z_][A-Za-z0-9_.]*)(?=\x00)")
+
+
+class ElfError(ValueError):
+    """Raised for a file that starts like an ELF binary but whose headers are truncated or inconsistent."""
+
+
+class _Layout(NamedTuple):
+    """The struct formats of an ELF class and byte order."""
+
+    header: struct.Struct
+    program_header: struct.Struct
+    section_header: struct.Struct
+    dynamic: struct.Struct
+    # The positions of p_flags, p_offset, p_vaddr and p_filesz in a program header, which differ
+    # between ELF32 and ELF64.
+    flags_index: int
+    offset_index: int
+    vaddr_index: int
+    filesz_index: int
+
+
+def _layout(order: str, wide: bool) -> _Layout:
+    if wide:
+        return _Layout(
+            struct.Struct(f"{order}HHIQQQIHHHHHH"),
+            struct.Struct(f"{order}IIQQQQQQ"),
+            struct.Struct(f"{order}IIQQQQIIQQ"),
+            struct.Struct(f"{order}qQ"),
+            1,
+            2,
+            3,
+            5,
+        )
+    return _Layout(
+        struct.Struct(f"{order}HHIIIIIHHHHHH"),
+        struct.Struct(f"{order}IIIIIIII"),
+        struct.Struct(f"{order}IIIIIIIIII"),
+        struct.Struct(f"{order}iI"),
+        6,
+        1,
+        2,
+        4,
+    )
+
+
+_LAYOUTS = {(order, wide): _layout(order, wide) for order in "<>" for wide in (False, True)}
+
+
+class BinscopeResult(BaseModel):
+    """
+    Represents the hardening of an ELF binary.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        elf: Whether the file is an ELF binary. The other fields are only set for ELF binaries.
+        bits: The ELF class, 32 or 64.
+        kind: ``exec`` for a position dependent executable, ``pie`` for a position independent one,
+            ``dso`` for a shared object.
+        pie: Whether the binary is loaded at a random address, true for PIEs and shared objects.
+        relro: ``full``, ``partial`` or ``none``.
+        nx: Whether the stack is not executable.
+        canary: Whether the binary uses stack canaries, or None if its symbols are stripped.
+        fortify: Whether the binary calls functions checked by _FORTIFY_SOURCE, or None if its symbols are stripped.
+        fortified: The checked functions called, e.g. ``__memcpy_chk``.
+        unfortified: The fortifiable functions called unchecked.
+        rpath: The DT_RPATH entries.
+        runpath: The DT_RUNPATH entries.
+        issues: The hardening issues found, e.g. ``no-pie`` or ``exec-stack``.
+        error: Why the binary could not be checked, if it could not.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    elf: bool = True
+    bits: int = 0
+    kind: str = ""
+    pie: bool = False
+    relro: str = "none"
+    nx: bool = False
+    canary: Optional[bool] = None
+    fortify: Optional[bool] = None
+    fortified: List[str] = Field(default_factory=list)
+    unfortified: List[str] = Field(default_factory=list)
+    rpath: List[str] = Field(default_factory=list)
+    runpath: List[str] = Field(default_factory=list)
+    issues: List[str] = Field(default_factory=list)
+    error: str = ""
+
+
+def check_elf(data: Buffer) -> BinscopeResult:
+    """
+    Checks the hardening of the ELF binary ``data``, reading only its headers, its dynamic section and its
+    string tables. A file that is not an ELF binary gives a result with ``elf`` false.
+
+    Raises:
+        ElfError: If the headers of the binary are truncated or inconsistent.
+    """
+    if len(data) < 16 or data[:4] != ELF_MAGIC:
+        return BinscopeResult(elf=False)
+    elf_class, encoding = data[4], data[5]
+    if elf_class not in (1, 2) or encoding not in (1, 2):
+        raise ElfError(f"Unknown ELF class {elf_class} or encoding {encoding}")
+    layout = _LAYOUTS["<" if encoding == 1 else ">", elf_class == 2]
+    try:
+        return _check(data, layout, 64 if elf_class == 2 else 32)
+    except struct.error as exc:
+        raise ElfError(f"Truncated ELF binary: {exc}") from exc
+
+
+def _check(data: Buffer, layout: _Layout, bits: int) -> BinscopeResult:
+    header = layout.header.unpack_from(data, 16)
+    e_type, phoff, shoff, phentsize, phnum, shentsize, shnum = header[0], *header[4:6], *header[8:12]
+    if phnum and phentsize < layout.program_header.size:
+        raise ElfError(f"Program headers of {phentsize} bytes are too small")
+    segments = [layout.program_header.unpack_from(data, phoff + index * phentsize) for index in range(phnum)]
+    types = {segment[0] for segment in segments}
+    loads = [segment for segment in segments if segment[0] == PT_LOAD]
+
+    dynamic = _dynamic_entries(data, layout, segments)
+    flags = dynamic.get(DT_FLAGS, [0])[0]
+    flags_1 = dynamic.get(DT_FLAGS_1, [0])[0]
+    strings = b""
+    if DT_STRTAB in dynamic:
+        strings = _read_at_address(data, layout, loads, dynamic[DT_STRTAB][0], dynamic.get(DT_STRSZ, [0])[0])
+    elif shnum and shentsize >= layout.section_header.size:
+        strings = _static_strings(data, layout, shoff, shentsize, shnum)
+
+    result = BinscopeResult(bits=bits)
+    if e_type == ET_EXEC:
+        result.kind = "exec"
+    elif e_type == ET_DYN:
+        result.kind = "pie" if flags_1 & DF_1_PIE or PT_INTERP in types else "dso"
+        result.pie = True
+    else:
+        result.kind = f"type-{e_type}"
+    if PT_GNU_RELRO in types:
+        now = DT_BIND_NOW in dynamic or flags & DF_BIND_NOW or flags_1 & DF_1_NOW
+        result.relro = "full" if now else "partial"
+    stack = [segment for segment in segments if segment[0] == PT_GNU_STACK]
+    result.nx = bool(stack) and not stack[0][layout.flags_index] & PF_X
+    result.rpath = _paths(strings, dynamic.get(DT_RPATH, []))
+    result.runpath = _paths(strings, dynamic.get(DT_RUNPATH, []))
+    if strings:
+        symbols = set(_SYMBOL.findall(b"\x00" + strings))
+        result.canary = b"__stack_chk_fail" in symbols or b"__stack_chk_guard" in symbols
+        fortified = sorted(name for name in symbols if name.startswith(b"__") and name.endswith(b"_chk"))
+        result.fortified = [name.decode() for name in fortified]
+        result.unfortified = sorted(name.decode() for name in symbols & FORTIFIABLE)
+        result.fortify = bool(fortified)
+    result.issues = _issues(result)
+    return result
+
+
+def _dynamic_entries(data: Buffer, layout: _Layout, segments: List[Tuple[int, ...]]) -> Dict[int, List[int]]:
+    """Returns the values of the entries of the dynamic section by tag, in order."""
+    entries: Dict[int, List[int]] = {}
+    for segment in segments:
+        if segment[0] != PT_DYNAMIC:
+            continue
+        offset = segment[layout.offset_index]
+        end = min(offset + segment[layout.filesz_index], len(data))
+        for position in range(offset, end - layout.dynamic.size + 1, layout.dynamic.size):
+            tag, value = layout.dynamic.unpack_from(data, position)
+            if tag == DT_NULL:
+                break
+            entries.setdefault(tag, []).append(value)
+        break
+    return entries
+
+
+def _read_at_address(data: Buffer, layout: _Layout, loads: List[Tuple[int, ...]], address: int, size: int) -> bytes:
+    """Returns the ``size`` bytes loaded at the virtual ``address``, read from the segment holding them."""
+    for segment in loads:
+        offset, vaddr, filesz = segment[layout.offset_index], segment[layout.vaddr_index], segment[layout.filesz_index]
+        if vaddr <= address < vaddr + filesz:
+            start = offset + address - vaddr
+            return bytes(data[start : min(start + size, offset + filesz, len(data))])
+    return b""
+
+
+def _static_strings(data: Buffer, layout: _Layout, shoff: int, shentsize: int, shnum: int) -> bytes:
+    """Returns the string table of the symbol table of a binary without a dynamic section, if it has one."""
+    sections = [layout.section_header.unpack_from(data, shoff + index * shentsize) for index in range(shnum)]
+    for section in sections:
+        # sh_type, then sh_link, which is the index of the string table of a symbol table.
+        if section[1] == SHT_SYMTAB and section[6] < len(sections):
+            strtab = sections[section[6]]
+            offset, size = strtab[4], strtab[5]
+            return bytes(data[offset : min(offset + size, len(data))])
+    return b""
+
+
+def _paths(strings: bytes, offsets: Iterable[int]) -> List[str]:
+    """Returns the search path entries of DT_RPATH or DT_RUNPATH strings."""
+    paths: List[str] = []
+    for offset in offsets:
+        end = strings.find(b"\x00", offset)
+        value = strings[offset : end if end >= 0 else len(strings)].decode("utf-8", "replace")
+        paths += value.split(":")
+    return paths
+
+
+def _issues(result: BinscopeResult) -> List[str]:
+    issues = []
+    if not result.pie:
+        issues.append("no-pie")
+    if result.relro != "full":
+        issues.append("no-relro" if result.relro == "none" else "partial-relro")
+    if not result.nx:
+        issues.append("exec-stack")
+    if result.canary is False:
+        issues.append("no-canary")
+    if result.fortify is False and result.unfortified:
+        issues.append("no-fortify")
+    if result.rpath:
+        issues.append("rpath")
+    if result.runpath:
+        issues.append("runpath")
+    # Relative entries resolve against the working directory of the process, empty ones too.
+    if any(not path.startswith(("/", "$ORIGIN", "${ORIGIN}")) for path in result.rpath + result.runpath):
+        issues.append("insecure-rpath")
+    return issues
+
+
+def check_file(path: str) -> BinscopeResult:
+    """Checks the hardening of the ELF binary ``path``, mapping it rather than reading it."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return BinscopeResult(elf=False)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return check_elf(mapped)
+
+
+def check_files(paths: Iterable[str], workers: Optional[int] = None) -> Iterator[Tuple[str, BinscopeResult]]:
+    """
+    Yields the hardening of every binary of ``paths``, in order, checking them in a pool of ``workers``
+    processes. A binary that cannot be parsed gives a result with an ``invalid-elf`` issue.
+    """
+    paths = list(paths)
+    with ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+        # Binaries are cheap to check, batches keep the pool from spending its time on pickling.
+        batch = max(1, min(64, len(paths) // ((workers or os.cpu_count() or 1) * 4)))
+        yield from zip(paths, executor.map(_check_file_safely, paths, chunksize=batch))
+
+
+def _check_file_safely(path: str) -> BinscopeResult:
+    try:
+        return check_file(path)
+    except (ElfError, OSError, ValueError) as exc:
+        return BinscopeResult(issues=["invalid-elf"], error=f"{type(exc).__name__}: {exc}")
+
+
+class BinscopeAnalyzer(Analyzer):
+    """Represents the binscope scan of a file pipeline, checking the hardening of ELF binaries."""
+
+    name = "binscope"
+
+    def analyze(self, path: str, data: memoryview) -> Optional[Dict[str, Any]]:
+        result = check_elf(data)
+        return result.model_dump(by_alias=True) if result.elf else None
+
+    def summary(self, findings: Optional[Dict[str, Any]]) -> str:
+        if findings is None:
+            return ""
+        return ", ".join(findings["issues"]) or "hardened"
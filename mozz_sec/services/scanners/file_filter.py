@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Sequence, Tuple, Union
+
+from mozz_sec.data.sbc_data import FileBlackList, TestDataSbc
+
+# Numbered and named back references refer to groups by position or name, which changes once a
+# rule is embedded in the combined pattern, so such rules are matched on their own.
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+_GLOBAL_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+class FilterResult(NamedTuple):
+    """
+    Represents the decision of a file filter for one path.
+
+    Attributes:
+        accepted: Whether the file is scanned.
+        rule: The blacklist rule that rejected the file, if any.
+    """
+
+    accepted: bool
+    rule: Optional[str] = None
+
+
+class PathTrie:
+    """
+    Represents a set of directory prefixes, matched per path component.
+
+    ``covers("a/b/c.so")`` is true when ``a``, ``a/b`` or ``a/b/c.so`` was added, in time linear in the
+    depth of the path and independent of the number of prefixes.
+    """
+
+    _END = ""
+
+    def __init__(self, prefixes: Iterable[str] = ()):
+        self._root: Dict[str, dict] = {}
+        self._empty = True
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def __bool__(self) -> bool:
+        return not self._empty
+
+    def add(self, prefix: str) -> None:
+        node = self._root
+        for part in split_path(prefix):
+            node = node.setdefault(part, {})
+        node[self._END] = {}
+        self._empty = False
+
+    def covers(self, path: str) -> bool:
+        node = self._root
+        if self._END in node:
+            return True
+        for part in split_path(path):
+            node = node.get(part)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+
+def split_path(path: str) -> List[str]:
+    return [part for part in path.replace("\\", "/").split("/") if part and part != "."]
+
+
+class FileFilter:
+    """
+    Decides which extracted files of an SBC package are scanned.
+
+    A file is scanned when it lies under one of the ``path_whitelist`` directories (or the whitelist is
+    empty) and its name is not matched by any ``file_blacklist`` rule. The whitelist is kept in a
+    prefix trie. The blacklist rules are dispatched on the literal character they must start with and
+    combined into one compiled alternation per character, plus one for the rules that may start with
+    anything, so checking a file costs one trie walk and at most two regular expression matches
+    however many rules there are. Like ``FileBlackList``, rules are matched with ``re.match`` against
+    the file name.
+
+    Attributes:
+        whitelist: The whitelisted directories.
+        rules: The blacklist rules, in order. The first matching rule is reported.
+    """
+
+    def __init__(self, path_whitelist: Iterable[str] = (), file_blacklist: Iterable[Union[str, FileBlackList]] = ()):
+        self.whitelist = PathTrie(path_whitelist)
+        self.rules: Tuple[str, ...] = tuple(
+            rule.regex if isinstance(rule, FileBlackList) else rule for rule in file_blacklist
+        )
+        self._by_first, self._generic, self._separate = _compile_rules(self.rules)
+
+    @classmethod
+    def for_task(cls, params: TestDataSbc) -> "FileFilter":
+        """Returns the filter of a task, shared by all tasks with the same lists."""
+        return _cached_filter(tuple(params.path_whitelist), tuple(params.file_blacklist))
+
+    def match_blacklist(self, name: str) -> Optional[str]:
+        """Returns the first blacklist rule matching the file name ``name``, if any."""
+        first: Optional[int] = None
+        for pattern in (self._by_first.get(name[:1]), self._generic):
+            if pattern is None:
+                continue
+            match = pattern.match(name)
+            if match is not None:
+                index = int(match.lastgroup[1:])
+                first = index if first is None else min(first, index)
+        for index, pattern in self._separate:
+            if first is not None and index > first:
+                break
+            if pattern.match(name):
+                first = index
+                break
+        return None if first is None else self.rules[first]
+
+    def check(self, path: str) -> FilterResult:
+        if self.whitelist and not self.whitelist.covers(path):
+            return FilterResult(False)
+        parts = split_path(path)
+        rule = self.match_blacklist(parts[-1] if parts else path)
+        return FilterResult(rule is None, rule)
+
+    def accepts(self, path: str) -> bool:
+        return self.check(path).accepted
+
+    def filter(self, paths: Iterable[str]) -> Iterator[str]:
+        """Yields the paths of the files to scan."""
+        check = self.check
+        return (path for path in paths if check(path).accepted)
+
+
+def _first_literal(rule: str) -> Optional[str]:
+    """Returns the character every match of ``rule`` starts with, if it is obvious from the rule."""
+    if _GLOBAL_FLAGS.match(rule) or _top_level_alternation(rule):
+        return None
+    body = rule[1:] if rule.startswith("^") else rule
+    if not body or not (body[0].isalnum() or body[0] in "_- "):
+        return None
+    if len(body) > 1 and body[1] in "*?{":
+        return None
+    return body[0]
+
+
+def _top_level_alternation(rule: str) -> bool:
+    """Whether ``rule`` has a ``|`` outside of any group or character class."""
+    if "[]" in rule or "[^]" in rule:
+        # a leading "]" is part of the class, assume the worst rather than parse it
+        return True
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in rule:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def _compile_rules(
+    rules: Sequence[str],
+) -> Tuple[Dict[str, Pattern], Optional[Pattern], List[Tuple[int, Pattern]]]:
+    """
+    Compiles the rules into alternations with a named group per rule: one per literal first character
+    and one for the other rules. Rules that cannot be combined are returned separately. Every rule is
+    compiled on its own first, so an invalid rule raises ``re.error``.
+    """
+    buckets: Dict[Optional[str], List[str]] = {}
+    separate = []
+    for index, rule in enumerate(rules):
+        pattern = re.compile(rule)
+        if _BACKREFERENCE.search(rule):
+            separate.append((index, pattern))
+            continue
+        first = _first_literal(rule)
+        flags = _GLOBAL_FLAGS.match(rule)
+        if flags is not None:
+            rule = f"(?{flags.group(1)}:{rule[flags.end():]})"
+        buckets.setdefault(first, []).append(f"(?P<r{index}>{rule})")
+    try:
+        compiled = {first: re.compile("|".join(alternatives)) for first, alternatives in buckets.items()}
+    except re.error:
+        # e.g. two rules using the same group name, match every rule on its own
+        return {}, None, [(index, re.compile(rule)) for index, rule in enumerate(rules)]
+    generic = compiled.pop(None, None)
+    return compiled, generic, separate
+
+
+@lru_cache(maxsize=64)
+def _cached_filter(path_whitelist: Tuple[str, ...], file_blacklist: Tuple[str, ...]) -> FileFilter:
+    return FileFilter(path_whitelist, file_blacklist)
@@ -0,0 +1,122 @@
+"""
+Matches the files of a package against the fingerprints of known open-source components.
+
+The index is built offline from a directory holding the released files of every component, e.g.
+binaries, libraries or archives, under ``<root>/<name>/<version>/``:
+
+    python -m mozz_sec.services.scanners.opensource /var/lib/mozz/opensource.idx /srv/components \
+        [--max-components 4] [--error-rate 0.01]
+
+and used by the executor through ``MOZZ_OPENSOURCE_INDEX=/var/lib/mozz/opensource.idx``.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from loguru import logger
+
+from mozz_sec.services.scanners.pipeline import Analyzer
+from mozz_sec.services.settings import SETTINGS
+from mozz_sec.services.stores.fingerprints import (
+    Component,
+    FingerprintIndex,
+    FingerprintIndexError,
+    build_index,
+    create_fingerprint_index,
+    fingerprint,
+)
+
+# Runs of at least 8 printable ASCII characters, the strings a component leaves in the files built from it.
+STRING = re.compile(rb"[\x20-\x7e]{8,}")
+
+
+def file_fingerprints(data: Any) -> Set[int]:
+    """Returns the fingerprints of the bytes-like ``data``: that of the whole content and those of its strings."""
+    values = {fingerprint(string) for string in set(STRING.findall(data))}
+    if len(data):
+        values.add(fingerprint(data))
+    return values
+
+
+def match_components(index: FingerprintIndex, fingerprints: Set[int], min_matches: int) -> List[Dict[str, Any]]:
+    """
+    Returns the components of ``index`` that have at least ``min_matches`` of ``fingerprints``, or all of
+    theirs for the smaller ones, with the number matched and the share of the fingerprints of the
+    component it makes, the most matched first.
+    """
+    matches = []
+    for position, matched in index.match(fingerprints).items():
+        component = index.components[position]
+        if matched >= min(min_matches, component.fingerprints):
+            matches.append(
+                {
+                    "name": component.name,
+                    "version": component.version,
+                    "matched": matched,
+                    "coverage": round(matched / component.fingerprints, 4),
+                }
+            )
+    matches.sort(key=lambda match: (-match["matched"], match["name"], match["version"]))
+    return matches
+
+
+def component_signatures(root: str) -> Iterator[Tuple[Component, Set[int]]]:
+    """Yields every component under ``root``, as ``<name>/<version>/``, with the fingerprints of its files."""
+    for name in sorted(path for path in Path(root).iterdir() if path.is_dir()):
+        for version in sorted(path for path in name.iterdir() if path.is_dir()):
+            values: Set[int] = set()
+            for directory, _, files in os.walk(version):
+                for file in files:
+                    values |= file_fingerprints(Path(directory, file).read_bytes())
+            yield Component(name=name.name, version=version.name), values
+
+
+@lru_cache(maxsize=1)
+def default_index() -> FingerprintIndex:
+    return create_fingerprint_index()
+
+
+class OpensourceAnalyzer(Analyzer):
+    """
+    Represents the opensource scan of a file pipeline, matching every file against the configured index.
+
+    All the fingerprints of a file are looked up in one batch. The build of the index is part of the
+    version of the analyzer, so that cached results are not reused once the index is rebuilt.
+    """
+
+    name = "opensource"
+
+    def analyze(self, path: str, data: memoryview) -> List[Dict[str, Any]]:
+        return match_components(default_index(), file_fingerprints(data), SETTINGS.opensource_min_matches)
+
+    def summary(self, findings: List[Dict[str, Any]]) -> str:
+        return ", ".join(f"{match['name']} {match['version']}".strip() for match in findings)
+
+    def version(self) -> str:
+        try:
+            return default_index().build_id
+        except FingerprintIndexError:
+            return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("index", help="the path of the index file to write")
+    parser.add_argument("root", help="the directory of the components, as <name>/<version>/")
+    parser.add_argument("--max-components", type=int, default=None, help="drop fingerprints shared by more")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="the false positive rate of the Bloom filter")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    entries = build_index(args.index, component_signatures(args.root), args.error_rate, args.max_components)
+    logger.info(f"Wrote {entries} fingerprints to {args.index} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
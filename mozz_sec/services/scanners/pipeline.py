@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import hashlib
+import importlib
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, ClassVar, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple, Type
+
+from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.data.sbc_data import ScanType
+from mozz_sec.services.settings import SETTINGS
+
+# The analyzer of every scan type, as "module:class", imported the first time a pipeline needs it.
+ANALYZERS: Dict[str, str] = {
+    "binscope": "mozz_sec.services.scanners.binscope:BinscopeAnalyzer",
+    "opensource": "mozz_sec.services.scanners.opensource:OpensourceAnalyzer",
+    "seninfo": "mozz_sec.services.scanners.seninfo:SeninfoAnalyzer",
+}
+
+
+class Analyzer:
+    """
+    Represents a scanner of file contents, run by a ``FilePipeline`` on every file it reads.
+
+    ``analyze`` gets a read-only view of the whole file, shared with the other analyzers of the
+    pipeline and backed by a memory map for large files. It may slice it freely, which copies nothing,
+    but must not keep the view or a slice of it once it returns, the map is closed afterwards. The
+    findings are checkpointed with the sub-task, so they must be plain JSON values.
+
+    Attributes:
+        name: The name of the analyzer, the scan type it implements.
+    """
+
+    name: ClassVar[str] = ""
+
+    def analyze(self, path: str, data: memoryview) -> Any:
+        """Returns the findings of the analyzer in the content ``data`` of the file ``path``."""
+        raise NotImplementedError
+
+    def summary(self, findings: Any) -> str:
+        """Returns a one line summary of ``findings`` for the remark of the sub-task, or "" for none."""
+        return ""
+
+    def version(self) -> str:
+        """Returns the version of the data the analyzer depends on, part of the key of the cached results."""
+        return ""
+
+
+class FileScan(NamedTuple):
+    """
+    Represents the analysis of one file by every analyzer of a pipeline.
+
+    Attributes:
+        path: The path of the file.
+        size: The number of bytes read.
+        findings: The findings of every analyzer that succeeded, by analyzer name.
+        errors: The error of every analyzer that raised, by analyzer name.
+        seconds: The time every analyzer took, by analyzer name.
+        digest: The SHA-256 digest of the bytes read.
+        reused: The result returned by the ``reuse`` callback instead of running the analyzers, or None.
+    """
+
+    path: str
+    size: int
+    findings: Dict[str, Any]
+    errors: Dict[str, str]
+    seconds: Dict[str, float]
+    digest: str = ""
+    reused: Any = None
+
+
+class PipelineStats(BaseModel):
+    """
+    Represents the counters of a file pipeline.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        files: The number of files read.
+        bytes_read: The number of bytes read, once per file whatever the number of analyzers.
+        mapped: The number of files read through a memory map.
+        reused: The number of files whose analysis was reused, without running the analyzers.
+        read_seconds: The time spent opening, reading or mapping and hashing files.
+        analyzer_seconds: The time spent in every analyzer, by analyzer name.
+        analyzer_errors: The number of files every analyzer raised on, by analyzer name.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    files: int = 0
+    bytes_read: int = 0
+    mapped: int = 0
+    reused: int = 0
+    read_seconds: float = 0.0
+    analyzer_seconds: Dict[str, float] = Field(default_factory=dict)
+    analyzer_errors: Dict[str, int] = Field(default_factory=dict)
+
+
+class FilePipeline:
+    """
+    Reads every file once and hands its content to all the analyzers of the enabled scan types.
+
+    A file of at least ``mmap_threshold`` bytes is memory mapped, a smaller one is read into a buffer
+    in a single call, which costs less than setting up a map. Every analyzer gets a ``memoryview`` of
+    the same buffer, so the I/O per file is the same however many scan types are enabled. The time of
+    every analyzer is measured, and an analyzer raising does not keep the others from running.
+
+    The content is hashed as it is read, so that results can be cached by the digest of the bytes
+    actually analyzed rather than by a hash the file was announced with.
+
+    Attributes:
+        analyzers: The analyzers run on every file, in order.
+        mmap_threshold: The size in bytes from which files are memory mapped.
+    """
+
+    def __init__(self, analyzers: Sequence[Analyzer], mmap_threshold: Optional[int] = None):
+        self.analyzers: Tuple[Analyzer, ...] = tuple(analyzers)
+        self.mmap_threshold = SETTINGS.scan_mmap_threshold if mmap_threshold is None else mmap_threshold
+        self._lock = threading.Lock()
+        self._stats = PipelineStats()
+
+    @classmethod
+    def for_scan_type(cls, scan_type: ScanType) -> "FilePipeline":
+        """Returns the pipeline of the enabled scan types that have an analyzer, shared by all tasks."""
+        return _cached_pipeline(tuple(name for name, enabled in scan_type if enabled and name in ANALYZERS))
+
+    def scan_file(self, path: str, reuse: Optional[Callable[[str], Any]] = None) -> FileScan:
+        """
+        Reads the file ``path`` once and runs every analyzer on its content.
+
+        Args:
+            path: The path of the file.
+            reuse: Called with the digest of the content before the analyzers run. If it returns a
+                result other than None, e.g. a cached one, the analyzers are not run and the result
+                is returned as ``FileScan.reused``.
+        """
+        findings: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        seconds: Dict[str, float] = {}
+        reused = None
+        started = time.perf_counter()
+        with self._read(path) as (data, mapped):
+            digest = hashlib.sha256(data).hexdigest()
+            read_seconds = time.perf_counter() - started
+            if reuse is not None:
+                reused = reuse(digest)
+            for analyzer in self.analyzers if reused is None else ():
+                started = time.perf_counter()
+                try:
+                    findings[analyzer.name] = analyzer.analyze(path, data)
+                except Exception as exc:
+                    logger.warning(f"Analyzer {analyzer.name} failed on {path}: {exc!r}")
+                    errors[analyzer.name] = f"{type(exc).__name__}: {exc}"
+                seconds[analyzer.name] = time.perf_counter() - started
+            size = len(data)
+        with self._lock:
+            stats = self._stats
+            stats.files += 1
+            stats.bytes_read += size
+            stats.mapped += mapped
+            stats.reused += reused is not None
+            stats.read_seconds += read_seconds
+            for name, elapsed in seconds.items():
+                stats.analyzer_seconds[name] = stats.analyzer_seconds.get(name, 0.0) + elapsed
+            for name in errors:
+                stats.analyzer_errors[name] = stats.analyzer_errors.get(name, 0) + 1
+        return FileScan(path, size, findings, errors, seconds, digest, reused)
+
+    def scan_files(self, paths: Iterable[str]) -> Iterator[FileScan]:
+        """Yields the analysis of every file of ``paths``, reading one file at a time."""
+        for path in paths:
+            yield self.scan_file(path)
+
+    def stats(self) -> PipelineStats:
+        with self._lock:
+            return self._stats.model_copy(deep=True)
+
+    @contextmanager
+    def _read(self, path: str) -> Iterator[Tuple[memoryview, bool]]:
+        with open(path, "rb", buffering=0) as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0 or size < self.mmap_threshold:
+                buffer = bytearray(size)
+                view = memoryview(buffer)[: file.readinto(buffer) if size else 0]
+                try:
+                    yield view, False
+                finally:
+                    view.release()
+                return
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped)
+        try:
+            yield view, True
+        finally:
+            view.release()
+            try:
+                mapped.close()
+            except BufferError:
+                # An analyzer kept a slice of the view, the map is closed once that is collected.
+                logger.warning(f"An analyzer kept a view of {path}")
+
+
+def _analyzer_class(path: str) -> Type[Analyzer]:
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+@lru_cache(maxsize=16)
+def _cached_pipeline(scan_types: Tuple[str, ...]) -> FilePipeline:
+    return FilePipeline([_analyzer_class(ANALYZERS[name])() for name in scan_types])
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import mmap
+import os
+import re
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Sequence, Set, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.services.scanners.pipeline import Analyzer
+from mozz_sec.services.settings import SETTINGS
+
+Buffer = Any  # bytes, bytearray, memoryview or mmap
+
+
+class SeninfoRule(BaseModel):
+    """
+    Represents a pattern of sensitive information, e.g. a kind of credential or token.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        name: The name of the rule, reported with its findings.
+        pattern: The regular expression matched against the bytes of the files. A group named ``secret``
+            marks the part of a match that is masked in the findings.
+        literals: Strings of which every match contains at least one, matched case-insensitively. They
+            select where the pattern is tried; a rule without literals is matched against all the data.
+        ignore_case: Whether the pattern is matched case-insensitively.
+        max_length: The maximum length of a match, which bounds the data the pattern is tried on.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    name: str
+    pattern: str
+    literals: List[str] = Field(default_factory=list)
+    ignore_case: bool = False
+    max_length: int = Field(256, ge=1)
+
+
+class SeninfoFinding(NamedTuple):
+    """
+    Represents a match of a seninfo rule in a file.
+
+    Attributes:
+        rule: The name of the rule.
+        offset: The offset of the match in the file.
+        length: The length of the match.
+        excerpt: The match, with its secret masked.
+    """
+
+    rule: str
+    offset: int
+    length: int
+    excerpt: str
+
+
+DEFAULT_RULES = (
+    SeninfoRule(name="aws_access_key_id", pattern=r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b", literals=["AKIA", "ASIA"]),
+    SeninfoRule(
+        name="private_key",
+        pattern=r"-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP |ENCRYPTED )?PRIVATE KEY( BLOCK)?-----",
+        literals=["PRIVATE KEY"],
+    ),
+    SeninfoRule(
+        name="github_token",
+        pattern=r"\b(?:gh[pousr]_[A-Za-z0-9]{36}|github_pat_[A-Za-z0-9_]{82})\b",
+        literals=["ghp_", "gho_", "ghu_", "ghs_", "ghr_", "github_pat_"],
+    ),
+    SeninfoRule(name="slack_token", pattern=r"\bxox[abprs]-[A-Za-z0-9-]{10,72}", literals=["xox"]),
+    SeninfoRule(
+        name="slack_webhook",
+        pattern=r"https://hooks\.slack\.com/services/[A-Za-z0-9/]{20,100}",
+        literals=["hooks.slack.com"],
+    ),
+    SeninfoRule(name="google_api_key", pattern=r"\bAIza[0-9A-Za-z_-]{35}\b", literals=["AIza"]),
+    SeninfoRule(name="stripe_key", pattern=r"\b[rs]k_live_[0-9A-Za-z]{24,99}\b", literals=["k_live_"]),
+    SeninfoRule(
+        name="jwt",
+        pattern=r"\beyJ[A-Za-z0-9_-]{8,}\.eyJ[A-Za-z0-9_-]{8,}\.(?P<secret>[A-Za-z0-9_-]{8,})",
+        literals=["eyJ"],
+        max_length=4096,
+    ),
+    SeninfoRule(
+        name="password_assignment",
+        pattern=r"\b(?:password|passwd|pwd)\s*[:=]\s*[\"']?(?P<secret>[^\s\"'<>;,]{4,64})",
+        literals=["password", "passwd", "pwd"],
+        ignore_case=True,
+    ),
+    SeninfoRule(
+        name="secret_assignment",
+        pattern=(
+            r"\b(?:secret|secret_key|client_secret|api_key|apikey|access_token|auth_token)\s*[:=]\s*[\"']?"
+            r"(?P<secret>[A-Za-z0-9/+=_-]{8,128})"
+        ),
+        literals=["secret", "api_key", "apikey", "token"],
+        ignore_case=True,
+    ),
+    SeninfoRule(
+        name="url_credentials",
+        pattern=r"\b[a-z][a-z0-9+.-]{1,20}://[^\s:/@\"']{1,64}:(?P<secret>[^\s@/\"']{1,128})@[^\s/\"']+",
+        literals=["://"],
+        ignore_case=True,
+    ),
+    SeninfoRule(
+        name="jdbc_password",
+        pattern=r"jdbc:[a-z0-9]+:[^\s\"']*?password=(?P<secret>[^\s;&\"']+)",
+        literals=["jdbc:"],
+        ignore_case=True,
+        max_length=512,
+    ),
+    SeninfoRule(
+        name="bearer_token",
+        pattern=r"\bBearer\s+(?P<secret>[A-Za-z0-9._~+/-]{20,}=*)",
+        literals=["bearer"],
+        ignore_case=True,
+    ),
+)
+
+
+class SeninfoEngine:
+    """
+    Finds the matches of a set of seninfo rules in files, trying the patterns only where their literals occur.
+
+    The literals of all rules are compiled once into a trie shaped regular expression, which finds the
+    positions where any literal starts in a single pass of the ``re`` engine. That stands in for an
+    Aho–Corasick automaton, which could not be run at a comparable speed in pure Python: the data is
+    lowercased, one C level pass, so that the prefilter matches all literals case-insensitively while
+    keeping the fast path of case-sensitive literals. At every position found, the patterns of the rules
+    of the literals starting there, including the shorter literals the trie matched a prefix of, are
+    tried on a window of ``max_length`` bytes around the literal. Rules without literals are matched
+    against all the data.
+
+    Files are scanned in chunks of ``chunk_size`` bytes. A chunk is searched up to ``overlap`` bytes past
+    its end, the longest possible match, and only reports the matches starting in it, so that a match
+    across two chunks is found exactly once. Rules without literals are searched from ``overlap`` bytes
+    before the chunk, so that the tail of a match of the previous chunk is not taken for a new one.
+    Chunks are independent, so ``scan_files`` spreads them over a process pool.
+
+    Attributes:
+        rules: The rules, in order.
+        chunk_size: The number of bytes of a chunk.
+        overlap: The number of bytes a chunk is searched past its end.
+    """
+
+    def __init__(self, rules: Sequence[SeninfoRule] = DEFAULT_RULES, chunk_size: Optional[int] = None):
+        self.rules: Tuple[SeninfoRule, ...] = tuple(rules)
+        self.chunk_size = chunk_size or SETTINGS.seninfo_chunk_size
+        self.overlap = max((rule.max_length for rule in self.rules), default=0)
+        self._patterns: List[Pattern[bytes]] = [
+            re.compile(rule.pattern.encode(), re.IGNORECASE if rule.ignore_case else 0) for rule in self.rules
+        ]
+        literals: Dict[bytes, Set[int]] = {}
+        self._unfiltered: List[int] = []
+        for index, rule in enumerate(self.rules):
+            if not rule.literals:
+                self._unfiltered.append(index)
+            for literal in rule.literals:
+                literals.setdefault(literal.encode().lower(), set()).add(index)
+        # The trie matches the longest literal starting at a position, which also stands for its prefixes.
+        self._by_literal: Dict[bytes, Tuple[Tuple[int, int], ...]] = {
+            literal: tuple(
+                sorted(
+                    (index, len(prefix))
+                    for prefix, indexes in literals.items()
+                    if literal.startswith(prefix)
+                    for index in indexes
+                )
+            )
+            for literal in literals
+        }
+        self._prefilter: Optional[Pattern[bytes]] = re.compile(_trie_pattern(literals)) if literals else None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"rules": self.rules, "chunk_size": self.chunk_size}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def scan(self, data: Buffer) -> List[SeninfoFinding]:
+        """Returns the matches of all rules in ``data``, by offset."""
+        findings: List[SeninfoFinding] = []
+        for start in range(0, len(data), self.chunk_size):
+            findings += self.scan_chunk(data, start, min(start + self.chunk_size, len(data)))
+        return findings
+
+    def scan_chunk(self, data: Buffer, start: int, end: int) -> List[SeninfoFinding]:
+        """Returns the matches of all rules starting between ``start`` and ``end`` in ``data``, by offset."""
+        size = len(data)
+        stop = min(size, end + self.overlap)
+        matches: Dict[Tuple[int, int], re.Match] = {}
+        if self._prefilter is not None:
+            lowered = bytes(data[start:stop]).lower()
+            search = self._prefilter.search
+            by_literal = self._by_literal
+            patterns, rules = self._patterns, self.rules
+            hit = search(lowered)
+            while hit is not None:
+                position = start + hit.start()
+                for index, length in by_literal[hit.group()]:
+                    window = rules[index].max_length
+                    for match in patterns[index].finditer(
+                        data, max(0, position - window), min(size, position + length + window)
+                    ):
+                        if match.start() > position:
+                            break
+                        if match.end() >= position + length:
+                            if start <= match.start() < end:
+                                matches.setdefault((match.start(), index), match)
+                            break
+                # Literals may overlap, so the search goes on right after the start of the last one.
+                hit = search(lowered, hit.start() + 1)
+        # Searching from the start of the chunk would report the rest of a match of the previous chunk
+        # again. The search starts early enough to run into that match, which is left to its chunk.
+        for index in self._unfiltered:
+            for match in self._patterns[index].finditer(data, max(0, start - self.overlap), stop):
+                if match.start() >= end:
+                    break
+                if match.start() >= start:
+                    matches.setdefault((match.start(), index), match)
+        return [self._finding(index, matches[offset, index]) for offset, index in sorted(matches)]
+
+    def scan_file(self, path: str) -> List[SeninfoFinding]:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return self.scan(mapped)
+
+    def scan_files(
+        self, paths: Iterable[str], workers: Optional[int] = None
+    ) -> Iterator[Tuple[str, List[SeninfoFinding]]]:
+        """
+        Yields the matches in every file of ``paths``, in order, scanning the chunks of all files in a
+        pool of ``workers`` processes.
+        """
+        with ProcessPoolExecutor(workers or os.cpu_count(), initializer=_init_worker, initargs=(self,)) as executor:
+            pending: List[Tuple[str, List[Future]]] = []
+            for path in paths:
+                size = os.path.getsize(path)
+                chunks = [
+                    executor.submit(_scan_worker_chunk, path, start, min(start + self.chunk_size, size))
+                    for start in range(0, size, self.chunk_size)
+                ]
+                pending.append((path, chunks))
+            for path, chunks in pending:
+                yield path, [finding for chunk in chunks for finding in chunk.result()]
+
+    def _finding(self, index: int, match: re.Match) -> SeninfoFinding:
+        text = match.group().decode("latin-1")
+        start, end = match.span("secret") if "secret" in match.re.groupindex else match.span()
+        if start >= 0:
+            start, end = start - match.start(), end - match.start()
+            text = text[:start] + text[start:end][:2] + "***" + text[end:]
+        return SeninfoFinding(self.rules[index].name, match.start(), match.end() - match.start(), text[:128])
+
+
+def _trie_pattern(literals: Iterable[bytes]) -> bytes:
+    """Returns a regular expression matching the longest of ``literals`` starting at a position."""
+    root: Dict[Optional[int], dict] = {}
+    for literal in literals:
+        node = root
+        for byte in literal:
+            node = node.setdefault(byte, {})
+        node[None] = {}
+
+    def alternation(node: Dict[Optional[int], dict]) -> bytes:
+        children = sorted((byte, child) for byte, child in node.items() if byte is not None)
+        branches = [re.escape(bytes([byte])) + alternation(child) for byte, child in children]
+        if not branches:
+            return b""
+        pattern = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+        return b"(?:" + pattern + b")?" if None in node else pattern
+
+    return alternation(root)
+
+
+_WORKER_ENGINE: Optional[SeninfoEngine] = None
+
+
+def _init_worker(engine: SeninfoEngine) -> None:
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = engine
+
+
+def _scan_worker_chunk(path: str, start: int, end: int) -> List[SeninfoFinding]:
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return _WORKER_ENGINE.scan_chunk(mapped, start, end)
+
+
+@lru_cache(maxsize=1)
+def default_engine() -> SeninfoEngine:
+    return SeninfoEngine()
+
+
+class SeninfoAnalyzer(Analyzer):
+    """Represents the seninfo scan of a file pipeline, matching the default rules."""
+
+    name = "seninfo"
+
+    def analyze(self, path: str, data: memoryview) -> List[Dict[str, Any]]:
+        return [finding._asdict() for finding in default_engine().scan(data)]
+
+    def summary(self, findings: List[Dict[str, Any]]) -> str:
+        counts = Counter(finding["rule"] for finding in findings)
+        return ", ".join(f"{count} {rule}" for rule, count in counts.most_common())
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.alias_generators import to_camel
+from starlette import status
+
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+
+# The number of recent waits the percentiles are computed from.
+_WAIT_SAMPLES = 1024
+
+
+class Priority(Enum):
+    """
+    Represents the priority class of scheduled work. Queued work of a higher class always starts first.
+
+    Attributes:
+        high: Interactive work, e.g. a single task a user waits for.
+        normal: The default.
+        low: Bulk work, e.g. reruns and batches.
+    """
+
+    high: str = "high"
+    normal: str = "normal"
+    low: str = "low"
+
+    @property
+    def rank(self) -> int:
+        return _RANKS[self]
+
+
+_RANKS = {priority: rank for rank, priority in enumerate(Priority)}
+
+
+class SchedulerFull(Exception):
+    """
+    Raised when work is submitted while the queue of a scheduler is full.
+
+    Attributes:
+        retry_after: The number of seconds after which the queue is expected to have room.
+    """
+
+    def __init__(self, queued: int, retry_after: int):
+        super().__init__(f"The scheduler queue is full ({queued} queued), retry after {retry_after} s.")
+        self.retry_after = retry_after
+
+
+class SchedulerStats(BaseModel):
+    """
+    Represents the counters and the queue of a scheduler.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        workers: The number of worker slots.
+        running: The number of jobs running.
+        queued: The number of jobs waiting for a worker slot.
+        queued_by_priority: The number of waiting jobs per priority class.
+        tenants: The number of tenants with waiting jobs.
+        max_queue: The number of waiting jobs above which submissions are rejected.
+        submitted: The number of jobs accepted.
+        rejected: The number of jobs rejected because the queue was full.
+        completed: The number of jobs that returned.
+        failed: The number of jobs that raised.
+        cancelled: The number of waiting jobs dropped by a shutdown.
+        wait_seconds_avg: The average time jobs waited for a worker slot.
+        wait_seconds_p95: The 95th percentile of the recent waits.
+        wait_seconds_max: The longest wait.
+        run_seconds_avg: The average run time of the recent jobs.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    workers: int = 0
+    running: int = 0
+    queued: int = 0
+    queued_by_priority: Dict[str, int] = Field(default_factory=dict)
+    tenants: int = 0
+    max_queue: int = 0
+    submitted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    wait_seconds_avg: float = 0.0
+    wait_seconds_p95: float = 0.0
+    wait_seconds_max: float = 0.0
+    run_seconds_avg: float = 0.0
+
+
+class _Job:
+    __slots__ = ("function", "args", "kwargs", "tenant", "priority", "queued_at")
+
+    def __init__(self, function: Callable[..., Any], args: tuple, kwargs: dict, tenant: Hashable, priority: Priority):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.tenant = tenant
+        self.priority = priority
+        self.queued_at = time.monotonic()
+
+
+class TaskScheduler:
+    """
+    Runs submitted work in a bounded number of worker threads, by priority class and fairly across tenants.
+
+    Every priority class keeps one queue per tenant, e.g. per PBI and instance, and a worker takes the
+    next job of the highest class with work from its tenants in turn. A tenant submitting a thousand
+    tasks therefore delays the next task of another tenant by one job, not by a thousand.
+
+    Submissions are rejected with ``SchedulerFull`` once ``max_queue`` jobs wait, with an estimate of
+    when to retry derived from the recent run times. Worker threads are started on demand, so the
+    scheduler can be used again after ``shutdown``.
+
+    Attributes:
+        name: The name of the scheduler, used in the names of its threads.
+        workers: The number of worker slots.
+        max_queue: The number of waiting jobs above which submissions are rejected.
+        shutdown_timeout: The number of seconds ``aclose`` waits for the running jobs, or None to wait
+            until they return.
+    """
+
+    def __init__(
+        self,
+        name: str = "scheduler",
+        workers: int = 4,
+        max_queue: int = 1000,
+        shutdown_timeout: Optional[float] = None,
+    ):
+        if workers < 1:
+            raise ValueError("A scheduler needs at least one worker")
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.shutdown_timeout = shutdown_timeout
+        self._condition = threading.Condition()
+        self._queues: List["OrderedDict[Hashable, Deque[_Job]]"] = [OrderedDict() for _ in Priority]
+        self._queued = [0] * len(self._queues)
+        self._threads: List[threading.Thread] = []
+        self._idle = 0
+        self._running = 0
+        self._generation = 0
+        self._stats = SchedulerStats(workers=workers, max_queue=max_queue)
+        self._wait_total = 0.0
+        self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._runs: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    @classmethod
+    def from_settings(cls, name: str, settings: Optional[ExecutorSettings] = None) -> "TaskScheduler":
+        settings = settings or SETTINGS
+        return cls(
+            name,
+            workers=settings.scheduler_workers,
+            max_queue=settings.scheduler_max_queue,
+            shutdown_timeout=settings.scheduler_shutdown_timeout,
+        )
+
+    @property
+    def queued(self) -> int:
+        return sum(self._queued)
+
+    def submit(
+        self,
+        function: Callable[..., Any],
+        *args: Any,
+        tenant: Hashable = None,
+        priority: Priority = Priority.normal,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Queues ``function(*args, **kwargs)``.
+
+        Raises:
+            SchedulerFull: If ``max_queue`` jobs are waiting already.
+        """
+        job = _Job(function, args, kwargs, tenant, priority)
+        with self._condition:
+            if self._room() <= 0:
+                self._stats.rejected += 1
+                raise SchedulerFull(self.queued, self._retry_after(self.queued))
+            self._queue(job)
+            self._wake(1)
+
+    def submit_many(
+        self,
+        function: Callable[..., Any],
+        calls: Sequence[Tuple[tuple, Hashable]],
+        priority: Priority = Priority.normal,
+    ) -> Tuple[int, Optional[SchedulerFull]]:
+        """
+        Queues ``function(*args)`` for every ``(args, tenant)`` of ``calls`` in one step, checking the
+        room left in the queue once for all of them.
+
+        Returns:
+            The number of calls queued, the first ones, and the ``SchedulerFull`` the others were
+            rejected with, or None if all of them were queued.
+        """
+        with self._condition:
+            accepted = min(len(calls), max(self._room(), 0))
+            for args, tenant in calls[:accepted]:
+                self._queue(_Job(function, args, {}, tenant, priority))
+            self._wake(accepted)
+            if accepted == len(calls):
+                return accepted, None
+            self._stats.rejected += len(calls) - accepted
+            return accepted, SchedulerFull(self.queued, self._retry_after(self.queued))
+
+    def retry_after(self) -> int:
+        """The number of seconds after which a rejected submission should be retried."""
+        with self._condition:
+            return self._retry_after(self.queued)
+
+    def stats(self) -> SchedulerStats:
+        with self._condition:
+            waits = sorted(self._waits)
+            stats = self._stats.model_copy(
+                update={
+                    "running": self._running,
+                    "queued": self.queued,
+                    "queued_by_priority": {priority.value: self._queued[priority.rank] for priority in Priority},
+                    "tenants": len({tenant for queues in self._queues for tenant in queues}),
+                    "wait_seconds_avg": self._wait_total / max(self._stats.completed + self._stats.failed, 1),
+                    "wait_seconds_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                    "run_seconds_avg": sum(self._runs) / len(self._runs) if self._runs else 0.0,
+                }
+            )
+        return stats
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> None:
+        """
+        Drops the waiting jobs and stops the workers once their running jobs return. With ``wait``, it
+        also waits for the running jobs, for up to ``timeout`` seconds in all.
+        """
+        with self._condition:
+            self._generation += 1
+            for rank, queues in enumerate(self._queues):
+                self._stats.cancelled += self._queued[rank]
+                self._queued[rank] = 0
+                queues.clear()
+            self._condition.notify_all()
+            threads, self._threads = self._threads, []
+        if wait:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for thread in threads:
+                if thread is not threading.current_thread():
+                    thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+            running = sum(1 for thread in threads if thread.is_alive() and thread is not threading.current_thread())
+            if running:
+                logger.warning(f"[{self.name}]Stop waiting for {running} running jobs")
+
+    async def aclose(self) -> None:
+        """
+        Shuts the scheduler down from an event loop, waiting up to ``shutdown_timeout`` for the running
+        jobs in another thread rather than blocking the loop.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.shutdown, True, self.shutdown_timeout)
+
+    def _room(self) -> int:
+        """The number of jobs that can be queued. Holds the lock."""
+        # Jobs about to be taken by an idle or a new worker do not wait.
+        return self.max_queue - (self.queued - self._idle - (self.workers - len(self._threads)))
+
+    def _queue(self, job: _Job) -> None:
+        """Adds ``job`` to the queue of its priority class and tenant. Holds the lock."""
+        self._queues[job.priority.rank].setdefault(job.tenant, deque()).append(job)
+        self._queued[job.priority.rank] += 1
+        self._stats.submitted += 1
+
+    def _wake(self, count: int) -> None:
+        """Wakes idle workers, and starts new ones if needed, for ``count`` jobs just queued. Holds the lock."""
+        if self._idle and count:
+            self._condition.notify(min(self._idle, count))
+        # Idle workers already notified may not have taken their job yet.
+        for _ in range(min(self.queued - self._idle, self.workers - len(self._threads))):
+            self._start_worker()
+
+    def _start_worker(self) -> None:
+        thread = threading.Thread(
+            target=self._work, args=(self._generation,), name=f"{self.name}-{len(self._threads)}", daemon=True
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _next(self) -> Optional[_Job]:
+        """Takes the next job from the highest priority class, from its tenants in turn. Holds the lock."""
+        for rank, queues in enumerate(self._queues):
+            if not queues:
+                continue
+            tenant, jobs = next(iter(queues.items()))
+            job = jobs.popleft()
+            if jobs:
+                queues.move_to_end(tenant)
+            else:
+                del queues[tenant]
+            self._queued[rank] -= 1
+            return job
+        return None
+
+    def _work(self, generation: int) -> None:
+        while True:
+            with self._condition:
+                if generation != self._generation:
+                    return
+                job = self._next()
+                while job is None:
+                    self._idle += 1
+                    self._condition.wait()
+                    self._idle -= 1
+                    if generation != self._generation:
+                        return
+                    job = self._next()
+                self._running += 1
+                wait = time.monotonic() - job.queued_at
+            started = time.monotonic()
+            failed = False
+            try:
+                job.function(*job.args, **job.kwargs)
+            except Exception:
+                failed = True
+                logger.exception(f"[{self.name}]Job {getattr(job.function, '__name__', job.function)} failed")
+            with self._condition:
+                self._running -= 1
+                self._runs.append(time.monotonic() - started)
+                self._waits.append(wait)
+                self._wait_total += wait
+                self._stats.wait_seconds_max = max(self._stats.wait_seconds_max, wait)
+                if failed:
+                    self._stats.failed += 1
+                else:
+                    self._stats.completed += 1
+
+    def _retry_after(self, queued: int) -> int:
+        """Seconds until the waiting jobs are expected to have started, from 1 to 300. Holds the lock."""
+        run = sum(self._runs) / len(self._runs) if self._runs else 1.0
+        return min(max(math.ceil(queued / self.workers * run), 1), 300)
+
+
+def tenant_key(pbi: Any, instance_id: Any) -> Tuple[str, str]:
+    """The tenant the work of a task is shared fairly with, its PBI and instance."""
+    return str(pbi), str(instance_id)
+
+
+def too_many_requests(exc: SchedulerFull) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}
+    )
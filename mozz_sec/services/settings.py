@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+ENV_PREFIX = "MOZZ_"
+
+
+class ExecutorSettings(BaseModel):
+    """
+    Represents the runtime settings of the executor services.
+
+    Every field can be overridden by an environment variable named after the field in upper case
+    with the ``MOZZ_`` prefix, e.g. ``MOZZ_TASK_STORE=sqlite:///var/lib/mozz/tasks.db``.
+
+    Attributes:
+        task_store: The task store URL. ``memory`` keeps tasks in process, ``sqlite:///<path>`` persists them.
+        store_flush_interval: The maximum delay in seconds before a task update is written to a persistent store.
+        store_flush_batch: The number of pending task updates that triggers an immediate flush.
+        task_ttl: The number of seconds finished tasks are kept in memory, or None to keep them forever.
+        task_memory_budget: The serialized size in bytes of the finished tasks kept in memory, or None for no limit.
+        task_archive: Whether finished tasks evicted from an in-memory store are kept zlib compressed.
+        task_archive_budget: The size in bytes of the compressed archive, or None for no limit.
+        runner_mode: How runners execute their sub runners: sequential, thread, process or auto.
+        runner_concurrency: The maximum number of sub runners a runner runs at the same time.
+        async_runner_concurrency: The maximum number of sub runners an async runner keeps in flight.
+        http_max_connections: The maximum number of connections of the shared HTTP client.
+        http_max_keepalive_connections: The maximum number of idle connections the shared HTTP client keeps alive.
+        http_max_connections_per_host: The maximum number of requests in flight per host.
+        http_retries: The number of times a failed outbound request is retried.
+        http_backoff: The delay in seconds before the first retry of an outbound request.
+        http_timeout: The timeout in seconds of an outbound request.
+        http_max_retry_after: The longest delay in seconds a ``Retry-After`` header may set before a retry.
+        artifact_cache_dir: The directory of the downloaded artifact cache.
+        download_concurrency: The maximum number of artifacts downloaded at the same time.
+        download_segment_size: The size in bytes of the ranges a large artifact is split into.
+        download_segments_per_file: The maximum number of ranges of one artifact downloaded at the same time.
+        event_queue_size: The number of task events a stream subscriber may fall behind before it is dropped.
+        event_keepalive: The number of seconds after which an idle event stream sends a keep-alive comment.
+        scheduler_workers: The number of tasks an executor runs at the same time.
+        scheduler_max_queue: The number of waiting tasks above which new tasks are rejected with 429.
+        scheduler_shutdown_timeout: The number of seconds a shutdown waits for the running tasks.
+        executor_mode: ``local`` runs tasks in the API process. ``shared`` lets several API and scan worker
+            processes share the ``sqlite:///`` task store and a work queue in the same database.
+        scan_workers: The number of scan worker processes started by ``python -m mozz_sec.services.runners.worker``.
+        work_batch: The number of sub-tasks a scan worker claims at once.
+        work_lease: The number of seconds a claimed sub-task stays with its worker before others may take it.
+        work_attempts: The number of times a sub-task is claimed before it is given up as faulted.
+        checkpoint_dir: The directory of the checkpoint logs of the sub-tasks, or None to disable checkpoints.
+        checkpoint_sync_interval: The maximum number of seconds between a checkpoint and its fsync.
+        checkpoint_sync_batch: The number of checkpoints that triggers an fsync.
+        result_cache: The path of the SQLite file caching scan results across tasks, or None to disable it.
+        result_cache_budget: The total size in bytes of the cached scan results, or None for no limit.
+        result_cache_refresh: The number of seconds after which a process reloads the keys of the cached results.
+        sbc_scanner_version: The version of the SBC scanners, part of the key of their cached results.
+        sbc_workspace_dir: The directory the files of the SBC packages are extracted to. A rerun hashes the files
+            under it that were sent without a hash, and no local file at all if None.
+        scan_mmap_threshold: The size in bytes from which scanned files are memory mapped instead of read.
+        seninfo_chunk_size: The number of bytes the seninfo engine scans at once, the unit of its process pool.
+        opensource_index: The path of the open-source fingerprint index built by
+            ``python -m mozz_sec.services.scanners.opensource``, or None if there is none.
+        opensource_min_matches: The number of fingerprints of a component a file must have for it to be reported.
+    """
+
+    task_store: str = "memory"
+    store_flush_interval: float = Field(0.5, gt=0)
+    store_flush_batch: int = Field(500, ge=1)
+    task_ttl: Optional[float] = Field(None, gt=0)
+    task_memory_budget: Optional[int] = Field(None, ge=0)
+    task_archive: bool = False
+    task_archive_budget: Optional[int] = Field(None, ge=0)
+    runner_mode: str = "sequential"
+    runner_concurrency: int = Field(default_factory=lambda: os.cpu_count() or 1, ge=1)
+    async_runner_concurrency: int = Field(256, ge=1)
+    http_max_connections: int = Field(200, ge=1)
+    http_max_keepalive_connections: int = Field(50, ge=0)
+    http_max_connections_per_host: int = Field(20, ge=1)
+    http_retries: int = Field(3, ge=0)
+    http_backoff: float = Field(0.5, ge=0)
+    http_timeout: float = Field(30.0, gt=0)
+    http_max_retry_after: float = Field(60.0, ge=0)
+    artifact_cache_dir: str = ".mozz/artifacts"
+    download_concurrency: int = Field(4, ge=1)
+    download_segment_size: int = Field(32 * 1024 * 1024, ge=1)
+    download_segments_per_file: int = Field(4, ge=1)
+    event_queue_size: int = Field(256, ge=1)
+    event_keepalive: float = Field(15.0, gt=0)
+    scheduler_workers: int = Field(default_factory=lambda: os.cpu_count() or 1, ge=1)
+    scheduler_max_queue: int = Field(1000, ge=0)
+    scheduler_shutdown_timeout: float = Field(30.0, ge=0)
+    executor_mode: str = Field("local", pattern="^(local|shared)$")
+    scan_workers: int = Field(default_factory=lambda: os.cpu_count() or 1, ge=1)
+    work_batch: int = Field(16, ge=1)
+    work_lease: float = Field(60.0, gt=0)
+    work_attempts: int = Field(3, ge=1)
+    checkpoint_dir: Optional[str] = None
+    checkpoint_sync_interval: float = Field(1.0, ge=0)
+    checkpoint_sync_batch: int = Field(256, ge=1)
+    result_cache: Optional[str] = None
+    result_cache_budget: Optional[int] = Field(256 * 1024 * 1024, ge=0)
+    result_cache_refresh: float = Field(60.0, ge=0)
+    sbc_scanner_version: str = "1"
+    sbc_workspace_dir: Optional[str] = None
+    scan_mmap_threshold: int = Field(256 * 1024, ge=0)
+    seninfo_chunk_size: int = Field(8 * 1024 * 1024, ge=1)
+    opensource_index: Optional[str] = None
+    opensource_min_matches: int = Field(8, ge=1)
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> "ExecutorSettings":
+        values: Dict[str, Any] = {}
+        for name in cls.model_fields:
+            env_name = f"{ENV_PREFIX}{name.upper()}"
+            if env_name in os.environ:
+                values[name] = os.environ[env_name]
+        values.update(overrides)
+        return cls.model_validate(values)
+
+
+SETTINGS = ExecutorSettings.from_env()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import struct
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+Key = Union[str, bytes, int]
+
+
+class BloomFilter:
+    """
+    Represents a Bloom filter, a set of keys answering "maybe" or "certainly not" in a fixed number of bits.
+
+    A key sets ``hashes`` bits of the array, taken from the 32-bit words of one BLAKE2b digest of the
+    key, or derived from it by double hashing for filters of more than 2^32 bits or 16 hashes. An int
+    key is taken to be a uniform 64-bit hash already, e.g. a fingerprint, whose halves are used for
+    double hashing without hashing it again. A key whose bits are not all set was never added, while
+    one whose bits are all set was added with a probability of ``1 - error_rate`` as long as the filter
+    holds at most ``capacity`` keys. Keys cannot be removed, a filter is rebuilt instead.
+
+    Attributes:
+        bits: The number of bits of the array.
+        hashes: The number of bits set per key.
+        count: The number of keys added.
+    """
+
+    __slots__ = ("bits", "hashes", "count", "_array", "_words")
+
+    def __init__(self, bits: int, hashes: int, array: Union[bytes, bytearray, None] = None, count: int = 0):
+        if bits < 1 or hashes < 1:
+            raise ValueError("A Bloom filter needs at least one bit and one hash")
+        self.bits = bits
+        self.hashes = hashes
+        self.count = count
+        self._array = bytearray(array) if array is not None else bytearray((bits + 7) // 8)
+        if len(self._array) != (bits + 7) // 8:
+            raise ValueError(f"A Bloom filter of {bits} bits needs {(bits + 7) // 8} bytes, not {len(self._array)}")
+        # A BLAKE2b digest holds at most 16 words, decoded as little endian to give the same bits everywhere.
+        self._words: Optional[Callable[[bytes], Tuple[int, ...]]] = (
+            struct.Struct(f"<{hashes}I").unpack if bits <= 1 << 32 and hashes <= 16 else None
+        )
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.01) -> "BloomFilter":
+        """Creates a filter holding ``capacity`` keys with a false positive rate of ``error_rate``."""
+        if not 0 < error_rate < 1:
+            raise ValueError(f"The error rate must be between 0 and 1, not {error_rate}")
+        capacity = max(capacity, 1)
+        bits = max(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        hashes = max(round(bits / capacity * math.log(2)), 1)
+        return cls(bits, hashes)
+
+    @classmethod
+    def of(cls, keys: Iterable[Key], capacity: int, error_rate: float = 0.01) -> "BloomFilter":
+        bloom = cls.for_capacity(capacity, error_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def add(self, key: Key) -> None:
+        array = self._array
+        for position in self._positions(key):
+            array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: Key) -> bool:
+        array = self._array
+        return all(array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def select(self, keys: Iterable[int]) -> List[int]:
+        """Returns the int ``keys`` that may have been added, the batch form of ``in`` for hashes."""
+        array = self._array
+        bits = self.bits
+        hashes = range(self.hashes)
+        selected = []
+        for key in keys:
+            position, step = key & 0xFFFFFFFF, (key >> 32) | 1
+            for _ in hashes:
+                bit = position % bits
+                if not array[bit >> 3] & (1 << (bit & 7)):
+                    break
+                position += step
+            else:
+                selected.append(key)
+        return selected
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._array)
+
+    @property
+    def error_rate(self) -> float:
+        """The expected false positive rate with the keys added so far."""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def _positions(self, key: Key) -> Sequence[int]:
+        bits = self.bits
+        if isinstance(key, int):
+            first, second = key & 0xFFFFFFFF, (key >> 32) | 1
+        else:
+            data = key.encode() if isinstance(key, str) else key
+            if self._words is not None:
+                digest = hashlib.blake2b(data, digest_size=4 * self.hashes).digest()
+                return [word % bits for word in self._words(digest)]
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            first = int.from_bytes(digest[:8], "little")
+            # An odd step visits distinct bits for up to ``bits`` hashes.
+            second = int.from_bytes(digest[8:], "little") | 1
+        return tuple((first + index * second) % bits for index in range(self.hashes))
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+from mozz_sec.services.stores.task_index import TaskFilter
+from mozz_sec.services.stores.task_store import BaseTaskStore
+from mozz_sec.services.tasks.task import BaseExecTask, BaseSubTask
+
+# The checkpoints of the sub-tasks of a task, by the index of the sub-task.
+TaskCheckpoints = Dict[int, "Checkpoint"]
+
+
+class Checkpoint(BaseModel):
+    """
+    Represents the state of a sub-task at one point of its run, a line of a checkpoint log.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        task_id: The ID of the execution task.
+        index: The index of the sub-task in the details of the task, or None for the end of the task,
+            which drops all checkpoints of the task.
+        progress: The progress of the sub-task.
+        status: The status of the sub-task.
+        message: The message of the sub-task.
+        state: The partial results of the sub runner, e.g. the files scanned so far, given back to it
+            when the sub-task resumes.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    task_id: str
+    index: Optional[int] = None
+    progress: int = 0
+    status: TaskStatus = TaskStatus.Running
+    message: str = ""
+    state: Dict[str, Any] = Field(default_factory=dict)
+
+    def restore(self, sub_task: BaseSubTask) -> None:
+        """Sets the progress, the status and the message of ``sub_task`` to those of the checkpoint."""
+        if sub_task.progress != self.progress:
+            sub_task.progress = self.progress
+        if sub_task.status != self.status:
+            sub_task.status = self.status
+        if sub_task.message != self.message:
+            sub_task.message = self.message
+
+
+class CheckpointLog:
+    """
+    Represents the checkpoints of the sub-tasks of a tool, appended to a JSON lines file.
+
+    Every checkpoint is appended with a single ``write`` to a file opened with ``O_APPEND``, so that it
+    survives a crash of the process as soon as it is written and the processes of a process pool or of
+    the scan workers can append to the same file. ``fsync``, which protects against a crash of the
+    machine, is batched: it runs once ``sync_batch`` checkpoints or ``sync_interval`` seconds have
+    passed since the last one, and on ``sync``.
+
+    The log is only appended to while tasks run. ``load`` reads the last checkpoint of every sub-task
+    of the tasks that have not ended, skipping lines torn by a crash, and ``compact`` rewrites the file
+    with just those, which must only be done while no other process appends.
+
+    Attributes:
+        path: The path of the log file.
+        sync_interval: The maximum number of seconds between a checkpoint and its ``fsync``.
+        sync_batch: The number of checkpoints that triggers an ``fsync``.
+    """
+
+    def __init__(self, path: str, sync_interval: float = 1.0, sync_batch: int = 256):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.sync_batch = sync_batch
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._pid = 0
+        self._pending = 0
+        self._synced = time.monotonic()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Sub runners are pickled into pool processes, which open the file themselves.
+        return {"path": self.path, "sync_interval": self.sync_interval, "sync_batch": self.sync_batch}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def write(self, checkpoint: Checkpoint) -> None:
+        """Appends ``checkpoint``, and syncs the log if the batch is full or the interval has passed."""
+        line = checkpoint.model_dump_json(by_alias=True, exclude_defaults=True).encode() + b"\n"
+        with self._lock:
+            fd = self._open()
+            os.write(fd, line)
+            self._pending += 1
+            if self._pending >= self.sync_batch or time.monotonic() - self._synced >= self.sync_interval:
+                self._sync(fd)
+
+    def end(self, task_id: str) -> None:
+        """Drops the checkpoints of ``task_id``, whose sub-tasks will not resume any more."""
+        self.write(Checkpoint(task_id=task_id))
+
+    def sync(self) -> None:
+        """Writes the appended checkpoints through to the disk."""
+        with self._lock:
+            if self._fd is not None and self._pending:
+                self._sync(self._fd)
+
+    def load(self) -> Dict[str, TaskCheckpoints]:
+        """Returns the last checkpoint of every sub-task of the tasks that have not ended, by task ID."""
+        tasks: Dict[str, TaskCheckpoints] = {}
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return tasks
+        torn = 0
+        with file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    checkpoint = Checkpoint.model_validate_json(line)
+                except ValidationError:
+                    torn += 1
+                    continue
+                if checkpoint.index is None:
+                    tasks.pop(checkpoint.task_id, None)
+                else:
+                    tasks.setdefault(checkpoint.task_id, {})[checkpoint.index] = checkpoint
+        if torn:
+            logger.warning(f"Skip {torn} torn checkpoints of {self.path}")
+        return tasks
+
+    def compact(self, tasks: Optional[Dict[str, TaskCheckpoints]] = None) -> None:
+        """Rewrites the log with the checkpoints ``load`` returns, or with ``tasks``."""
+        tasks = self.load() if tasks is None else tasks
+        temporary = f"{self.path}.tmp"
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            with open(temporary, "wb") as file:
+                for checkpoints in tasks.values():
+                    for checkpoint in checkpoints.values():
+                        file.write(checkpoint.model_dump_json(by_alias=True, exclude_defaults=True).encode() + b"\n")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.path)
+            self._close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None and self._pending:
+                self._sync(self._fd)
+            self._close()
+
+    def _open(self) -> int:
+        """The file descriptor of this process, opened on first use. Holds the lock."""
+        if self._fd is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+            self._pending = 0
+        return self._fd
+
+    def _sync(self, fd: int) -> None:
+        os.fsync(fd)
+        self._pending = 0
+        self._synced = time.monotonic()
+
+    def _close(self) -> None:
+        if self._fd is not None and self._pid == os.getpid():
+            os.close(self._fd)
+        self._fd = None
+
+
+def restore_sub_tasks(task: BaseExecTask, checkpoints: TaskCheckpoints) -> None:
+    """Sets the sub-tasks of ``task``, models and plain dictionaries alike, to their ``checkpoints``."""
+    details = task.detail.details
+    for index, checkpoint in checkpoints.items():
+        if index >= len(details):
+            continue
+        sub_task = details[index]
+        if isinstance(sub_task, BaseSubTask):
+            checkpoint.restore(sub_task)
+        elif isinstance(sub_task, dict):
+            # Sub-tasks read back from the store are plain dictionaries.
+            fields = checkpoint.model_dump(mode="json", by_alias=True, include={"progress", "status", "message"})
+            details[index] = {**sub_task, **fields}
+
+
+def create_checkpoint_log(table: str, settings: Optional[ExecutorSettings] = None) -> Optional[CheckpointLog]:
+    """Creates the checkpoint log of the tasks kept in ``table``, or returns None if checkpoints are disabled."""
+    settings = settings or SETTINGS
+    if settings.checkpoint_dir is None:
+        return None
+    return CheckpointLog(
+        str(Path(settings.checkpoint_dir) / f"{table}.jsonl"),
+        sync_interval=settings.checkpoint_sync_interval,
+        sync_batch=settings.checkpoint_sync_batch,
+    )
+
+
+def resume_tasks(
+    store: BaseTaskStore, log: CheckpointLog, resume: Callable[[BaseExecTask, TaskCheckpoints], None]
+) -> int:
+    """
+    Compacts ``log``, then calls ``resume`` with every task of ``store`` that was interrupted while
+    running and with the checkpoints of its sub-tasks. Returns the number of tasks resumed.
+    """
+    live = set(store)
+    saved = {task_id: checkpoints for task_id, checkpoints in log.load().items() if task_id in live}
+    # Compact before resuming, the resumed tasks append to the compacted log.
+    log.compact(saved)
+    resumed = 0
+    after: Optional[str] = None
+    more = True
+    while more:
+        summaries, after = store.select(TaskFilter(status=TaskStatus.Running), after)
+        more = after is not None
+        for summary in summaries:
+            try:
+                task = store[summary.task_id]
+            except KeyError:
+                continue
+            try:
+                resume(task, saved.get(task.task_id, {}))
+            except Exception:
+                logger.exception(f"[{task.task_id}]Resume Task failed")
+                continue
+            resumed += 1
+    return resumed
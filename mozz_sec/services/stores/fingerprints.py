@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+from mozz_sec.services.stores.bloom import BloomFilter
+
+MAGIC = b"MZFPIDX1"
+# magic, Bloom hashes, components, Bloom bits, entries, distinct fingerprints, build id, size of the components.
+_HEADER = struct.Struct("<8sIIQQQ8sQ")
+
+
+class FingerprintIndexError(ValueError):
+    """Raised when a fingerprint index is missing, truncated or not an index."""
+
+
+class Component(BaseModel):
+    """
+    Represents an open-source component of a fingerprint index.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        name: The name of the component.
+        version: The version of the component.
+        fingerprints: The number of fingerprints of the component in the index.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    name: str
+    version: str = ""
+    fingerprints: int = 0
+
+
+def fingerprint(data: Any) -> int:
+    """Returns the 64-bit fingerprint of the bytes-like ``data``."""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def build_index(
+    path: str,
+    signatures: Iterable[Tuple[Component, Iterable[int]]],
+    error_rate: float = 0.01,
+    max_components: Optional[int] = None,
+) -> int:
+    """
+    Writes the fingerprint index of ``signatures``, the fingerprints of every component, to ``path``.
+
+    A fingerprint found in more than ``max_components`` components is left out, it tells none of them
+    apart. The file is written next to ``path`` and renamed over it, so that processes that have the
+    previous index open keep reading it. Returns the number of entries written.
+    """
+    components: List[Component] = []
+    pairs: List[int] = []
+    for component, fingerprints in signatures:
+        index = len(components)
+        components.append(component)
+        pairs.extend(value << 32 | index for value in set(fingerprints))
+    pairs.sort()
+    hashes = array("Q")
+    ids = array("I")
+    counts: Counter = Counter()
+    start = 0
+    while start < len(pairs):
+        value = pairs[start] >> 32
+        stop = start + 1
+        while stop < len(pairs) and pairs[stop] >> 32 == value:
+            stop += 1
+        if max_components is None or stop - start <= max_components:
+            for pair in pairs[start:stop]:
+                hashes.append(value)
+                ids.append(pair & 0xFFFFFFFF)
+                counts[pair & 0xFFFFFFFF] += 1
+        start = stop
+    keys = sorted(set(hashes))
+    bloom = BloomFilter.of(keys, capacity=len(keys), error_rate=error_rate)
+    for index, component in enumerate(components):
+        components[index] = component.model_copy(update={"fingerprints": counts[index]})
+    table = json.dumps([component.model_dump() for component in components], separators=(",", ":")).encode()
+    if sys.byteorder != "little":
+        hashes.byteswap()
+        ids.byteswap()
+    body = [_padded(bloom.to_bytes()), _padded(hashes.tobytes()), _padded(ids.tobytes()), table]
+    build_id = hashlib.blake2b(b"".join(body[1:]), digest_size=8).digest()
+    header = _HEADER.pack(
+        MAGIC, bloom.hashes, len(components), bloom.bits, len(hashes), len(keys), build_id, len(table)
+    )
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(header)
+        for part in body:
+            file.write(part)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return len(hashes)
+
+
+def _padded(data: bytes) -> bytes:
+    return data + bytes(-len(data) % 8)
+
+
+class FingerprintIndex:
+    """
+    Represents a read-only index of the fingerprints of open-source components, built by ``build_index``.
+
+    The file holds a Bloom filter of the fingerprints, the fingerprints sorted with the component of
+    each, and the table of the components. Opening it maps the file and copies the Bloom filter, so it
+    takes milliseconds whatever the size of the index, and the pages of the sorted fingerprints are only
+    read as they are searched, shared by all the processes that map the same file. A fingerprint unknown
+    to the Bloom filter, most of those of a package, is answered without touching the map.
+
+    Attributes:
+        path: The path of the index file.
+        build_id: A digest of the content of the index, which changes whenever it is rebuilt differently.
+        bloom: The Bloom filter of the fingerprints.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, "rb") as file:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            raise FingerprintIndexError(f"Cannot open the fingerprint index {path}: {exc}") from exc
+        if len(self._map) < _HEADER.size or self._map[:8] != MAGIC:
+            self._map.close()
+            raise FingerprintIndexError(f"{path} is not a fingerprint index")
+        _, hashes, _, bits, entries, keys, build_id, table_size = _HEADER.unpack_from(self._map)
+        bloom_stop = _HEADER.size + (bits + 7) // 8
+        hashes_start = bloom_stop + -bloom_stop % 8
+        ids_start = hashes_start + 8 * entries
+        table_start = ids_start + 4 * entries + -(4 * entries) % 8
+        if len(self._map) < table_start + table_size:
+            self._map.close()
+            raise FingerprintIndexError(f"The fingerprint index {path} is truncated")
+        self.build_id = build_id.hex()
+        self.bloom = BloomFilter(bits, hashes, self._map[_HEADER.size : bloom_stop], keys)
+        self._table = (table_start, table_size)
+        self._components: Optional[List[Component]] = None
+        self._views: List[memoryview] = []
+        self._hashes: Sequence[int] = self._array("Q", hashes_start, entries)
+        self._ids: Sequence[int] = self._array("I", ids_start, entries)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"path": self.path}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @property
+    def components(self) -> List[Component]:
+        """The components of the index, decoded the first time they are needed."""
+        if self._components is None:
+            start, size = self._table
+            self._components = [Component.model_validate(item) for item in json.loads(self._map[start : start + size])]
+        return self._components
+
+    def lookup(self, value: int) -> List[Component]:
+        """Returns the components that have the fingerprint ``value``."""
+        return [self.components[index] for index in self.match([value])]
+
+    def match(self, fingerprints: Iterable[int]) -> Dict[int, int]:
+        """
+        Returns the number of distinct ``fingerprints`` of every component that has any, by component index.
+
+        The fingerprints that pass the Bloom filter are sorted and searched in one pass over the index,
+        every search starting where the previous one ended.
+        """
+        candidates = sorted(self.bloom.select(set(fingerprints)))
+        hashes, ids = self._hashes, self._ids
+        size = len(hashes)
+        counts: Counter = Counter()
+        position = 0
+        for value in candidates:
+            position = bisect_left(hashes, value, position)
+            while position < size and hashes[position] == value:
+                counts[ids[position]] += 1
+                position += 1
+        return dict(counts)
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._hashes = self._ids = ()
+        self._map.close()
+
+    def _array(self, code: str, start: int, count: int) -> Sequence[int]:
+        size = array(code).itemsize * count
+        if sys.byteorder != "little":
+            values = array(code, self._map[start : start + size])
+            values.byteswap()
+            return values
+        view = memoryview(self._map)[start : start + size].cast(code)
+        self._views.append(view)
+        return view
+
+
+def create_fingerprint_index(settings: Optional[ExecutorSettings] = None) -> FingerprintIndex:
+    """Opens the open-source fingerprint index of the settings."""
+    settings = settings or SETTINGS
+    if settings.opensource_index is None:
+        raise FingerprintIndexError("No open-source fingerprint index is configured, set MOZZ_OPENSOURCE_INDEX")
+    return FingerprintIndex(settings.opensource_index)
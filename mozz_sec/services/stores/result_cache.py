@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.data.sbc_data import ScanType
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+from mozz_sec.services.stores.bloom import BloomFilter
+
+# The number of seconds within which the last use of a result is not written again, sparing most hits a write.
+USE_RESOLUTION = 60.0
+
+
+class ResultCacheStats(BaseModel):
+    """
+    Represents the counters of a scan result cache, for the process it was read in.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        hits: The number of lookups that found a result.
+        misses: The number of lookups that found no result.
+        filtered: The number of misses answered by the Bloom filter, without reading the database.
+        stores: The number of results stored.
+        evictions: The number of results evicted to stay within the budget.
+        entries: The number of results in the cache.
+        size: The size in bytes of the results in the cache.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    hits: int = 0
+    misses: int = 0
+    filtered: int = 0
+    stores: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size: int = 0
+
+
+def result_key(file_hash: str, scan_type: ScanType, scanner_version: str) -> str:
+    """Returns the key of the result of scanning the content ``file_hash`` with ``scan_type`` and a scanner version."""
+    scans = "+".join(name for name, enabled in scan_type if enabled)
+    return f"{scanner_version}/{scans}/{file_hash}"
+
+
+class ScanResultCache:
+    """
+    Represents the results of scanning file contents, shared by all tasks and all processes in a SQLite file.
+
+    A result is keyed by ``result_key``: the content hash of the file, the scan type and the scanner
+    version, so that the same library scanned by several tasks is only scanned once, and a new scanner
+    version scans everything again. Lookups go through a Bloom filter of the keys first, so that most
+    misses, the common case of a new file, cost a few hashes instead of a query. The filter of a process
+    only knows the keys stored by other processes once it is rebuilt from the database, every ``refresh``
+    seconds; until then, their results are missed and scanned again.
+
+    The least recently used results are evicted once their total size exceeds ``budget`` bytes, down to
+    nine tenths of it. The last use of a result is only written once per ``USE_RESOLUTION`` seconds.
+    Evicted keys stay in the Bloom filter until it is rebuilt, which only costs a query.
+
+    Attributes:
+        path: The path of the database file.
+        budget: The total size in bytes of the results kept, or None for no limit.
+        refresh: The number of seconds after which the Bloom filter is rebuilt from the database.
+        error_rate: The false positive rate of the Bloom filter.
+    """
+
+    def __init__(self, path: str, budget: Optional[int] = None, refresh: float = 60.0, error_rate: float = 0.01):
+        self.path = path
+        self.budget = budget
+        self.refresh = refresh
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._bloom: Optional[BloomFilter] = None
+        self._capacity = 0
+        self._built = 0.0
+        self._stats = ResultCacheStats()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Sub runners are pickled into pool processes, which connect and build the filter themselves.
+        return {"path": self.path, "budget": self.budget, "refresh": self.refresh, "error_rate": self.error_rate}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the result stored under ``key``, or None if there is none."""
+        with self._lock:
+            conn = self._connect()
+            if key not in self._filter(conn):
+                self._stats.misses += 1
+                self._stats.filtered += 1
+                return None
+            row = conn.execute("SELECT result, used FROM scan_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats.misses += 1
+                return None
+            now = time.time()
+            if now - row[1] >= USE_RESOLUTION:
+                conn.execute("UPDATE scan_results SET used = ? WHERE key = ?", (now, key))
+            self._stats.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Stores ``result`` under ``key``, and evicts the least recently used results if over the budget."""
+        value = json.dumps(result, separators=(",", ":"), default=str)
+        size = len(key) + len(value)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT size FROM scan_results WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO scan_results (key, result, size, used) VALUES (?, ?, ?, ?)",
+                    (key, value, size, time.time()),
+                )
+                conn.execute("UPDATE scan_results_size SET total = total + ?", (size - (row[0] if row else 0),))
+                evicted = self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._filter(conn).add(key)
+            self._stats.stores += 1
+            self._stats.evictions += evicted
+
+    def stats(self) -> ResultCacheStats:
+        with self._lock:
+            entries, size = (
+                self._connect()
+                .execute("SELECT COUNT(*), (SELECT total FROM scan_results_size) FROM scan_results")
+                .fetchone()
+            )
+            return self._stats.model_copy(update={"entries": entries, "size": size})
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._bloom = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        # A connection must not be shared with a forked process, which connects again.
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS scan_results "
+            "(key TEXT PRIMARY KEY, result TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS scan_results_used ON scan_results (used)")
+        # The total size is kept up to date by every store, instead of summing the sizes of all results.
+        conn.execute("CREATE TABLE IF NOT EXISTS scan_results_size (total INTEGER NOT NULL)")
+        conn.execute("INSERT INTO scan_results_size SELECT 0 WHERE NOT EXISTS (SELECT * FROM scan_results_size)")
+        self._conn, self._pid, self._bloom = conn, os.getpid(), None
+        return conn
+
+    def _filter(self, conn: sqlite3.Connection) -> BloomFilter:
+        bloom = self._bloom
+        if bloom is not None and bloom.count <= self._capacity and time.monotonic() - self._built < self.refresh:
+            return bloom
+        count = conn.execute("SELECT COUNT(*) FROM scan_results").fetchone()[0]
+        # Room for twice the current results keeps the false positive rate down while new ones are stored,
+        # the filter is rebuilt larger once they are twice as many.
+        self._capacity = max(2 * count, 1024)
+        self._bloom = BloomFilter.of(
+            (key for key, in conn.execute("SELECT key FROM scan_results")), self._capacity, self.error_rate
+        )
+        self._built = time.monotonic()
+        return self._bloom
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        total = conn.execute("SELECT total FROM scan_results_size").fetchone()[0]
+        if self.budget is None or total <= self.budget:
+            return 0
+        target = self.budget * 9 // 10
+        evicted = freed = 0
+        while total - freed > target:
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM scan_results ORDER BY used LIMIT 256"):
+                if total - freed <= target:
+                    break
+                victims.append((key,))
+                freed += size
+            if not victims:
+                break
+            conn.executemany("DELETE FROM scan_results WHERE key = ?", victims)
+            evicted += len(victims)
+        conn.execute("UPDATE scan_results_size SET total = total - ?", (freed,))
+        logger.debug(f"Evict {evicted} scan results ({freed} bytes) from {self.path}")
+        return evicted
+
+
+def create_result_cache(settings: Optional[ExecutorSettings] = None) -> Optional[ScanResultCache]:
+    """Creates the scan result cache, or returns None if it is disabled."""
+    settings = settings or SETTINGS
+    if settings.result_cache is None:
+        return None
+    return ScanResultCache(
+        settings.result_cache, budget=settings.result_cache_budget, refresh=settings.result_cache_refresh
+    )
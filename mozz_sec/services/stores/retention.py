@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.services.tasks.task import BaseExecTask
+
+T = TypeVar("T", bound=BaseExecTask)
+
+
+class RetentionStats(BaseModel):
+    """
+    Represents the counters of a retention manager.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        hits: The number of lookups served from resident tasks.
+        misses: The number of lookups that found no resident task.
+        archive_hits: The number of lookups served from the archive.
+        evictions: The number of finished tasks evicted from memory.
+        expirations: The number of evictions caused by the TTL.
+        resident: The number of finished tasks kept in memory.
+        resident_bytes: The serialized size of the finished tasks kept in memory.
+        archived: The number of tasks in the archive.
+        archive_bytes: The compressed size of the archive.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    hits: int = 0
+    misses: int = 0
+    archive_hits: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    resident: int = 0
+    resident_bytes: int = 0
+    archived: int = 0
+    archive_bytes: int = 0
+
+
+class RetentionManager:
+    """
+    Decides which finished tasks are evicted from memory.
+
+    Only tasks in a terminal status (``Finished``, ``Fault`` or ``Stop``) are tracked. They are
+    evicted once they are older than ``ttl`` seconds, and the least recently used ones are evicted
+    while the serialized size of all tracked tasks exceeds ``memory_budget`` bytes. When ``archive``
+    is enabled, evicted tasks are kept as zlib compressed JSON, bounded by ``archive_budget`` bytes.
+
+    Attributes:
+        ttl: The number of seconds a finished task is retained, or None to retain it forever.
+        memory_budget: The number of bytes of finished tasks retained in memory, or None for no limit.
+        archive: Whether evicted tasks are moved to the compressed archive.
+        archive_budget: The number of bytes of the archive, or None for no limit.
+        stats: The counters of the manager.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        memory_budget: Optional[int] = None,
+        archive: bool = False,
+        archive_budget: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.memory_budget = memory_budget
+        self.archive = archive
+        self.archive_budget = archive_budget
+        self.stats = RetentionStats()
+        self._clock = clock
+        self._lock = threading.Lock()
+        # task_id -> (finished at, serialized size), in the order the tasks finished
+        self._finished: OrderedDict[str, Tuple[float, int]] = OrderedDict()
+        # task_id -> None, least recently used first
+        self._lru: OrderedDict[str, None] = OrderedDict()
+        self._archive: OrderedDict[str, bytes] = OrderedDict()
+
+    def track(self, task_id: str, task: BaseExecTask) -> None:
+        """Records that ``task`` was stored or changed."""
+        with self._lock:
+            if not task.status.is_terminal:
+                self._untrack(task_id)
+                return
+            size = len(task.model_dump_json(by_alias=True))
+            entry = self._finished.get(task_id)
+            if entry is not None:
+                # A re-saved task keeps its finish time, but its size may have changed.
+                self._finished[task_id] = (entry[0], size)
+                self._lru.move_to_end(task_id)
+                self.stats.resident_bytes += size - entry[1]
+                return
+            self._finished[task_id] = (self._clock(), size)
+            self._lru[task_id] = None
+            self.stats.resident += 1
+            self.stats.resident_bytes += size
+
+    def hit(self, task_id: str) -> None:
+        """Records that a resident task was read."""
+        with self._lock:
+            self.stats.hits += 1
+            if task_id in self._lru:
+                self._lru.move_to_end(task_id)
+
+    def miss(self) -> None:
+        """Records that a requested task was not resident."""
+        with self._lock:
+            self.stats.misses += 1
+
+    def forget(self, task_id: str) -> None:
+        """Stops tracking a deleted task."""
+        with self._lock:
+            self._untrack(task_id)
+            data = self._archive.pop(task_id, None)
+            if data is not None:
+                self.stats.archived -= 1
+                self.stats.archive_bytes -= len(data)
+
+    def collect(self) -> List[str]:
+        """
+        Selects the finished tasks that have to leave memory and stops tracking them.
+
+        Returns:
+            List[str]: The IDs of the evicted tasks.
+        """
+        evicted = []
+        with self._lock:
+            if self.ttl is not None:
+                deadline = self._clock() - self.ttl
+                while self._finished:
+                    task_id, (finished_at, _) = next(iter(self._finished.items()))
+                    if finished_at > deadline:
+                        break
+                    self._untrack(task_id)
+                    self.stats.expirations += 1
+                    evicted.append(task_id)
+            if self.memory_budget is not None:
+                while self._lru and self.stats.resident_bytes > self.memory_budget:
+                    task_id = next(iter(self._lru))
+                    self._untrack(task_id)
+                    evicted.append(task_id)
+            self.stats.evictions += len(evicted)
+        return evicted
+
+    def store(self, task_id: str, task: BaseExecTask) -> List[str]:
+        """
+        Moves an evicted task to the archive, if the archive is enabled.
+
+        Returns:
+            List[str]: The IDs of the tasks dropped for good: ``task_id`` without an archive, else
+            the archived tasks dropped to stay within ``archive_budget``.
+        """
+        if not self.archive:
+            return [task_id]
+        data = zlib.compress(task.model_dump_json(by_alias=True).encode("utf-8"))
+        dropped = []
+        with self._lock:
+            self._archive[task_id] = data
+            self.stats.archived += 1
+            self.stats.archive_bytes += len(data)
+            while self.archive_budget is not None and self.stats.archive_bytes > self.archive_budget:
+                dropped_id, dropped_data = self._archive.popitem(last=False)
+                self.stats.archived -= 1
+                self.stats.archive_bytes -= len(dropped_data)
+                dropped.append(dropped_id)
+        return dropped
+
+    def restore(self, task_id: str, model: Type[T]) -> Optional[T]:
+        """Rebuilds an archived task, or returns None if it is not archived."""
+        with self._lock:
+            data = self._archive.get(task_id)
+            if data is None:
+                return None
+            self._archive.move_to_end(task_id)
+            self.stats.archive_hits += 1
+        return model.model_validate_json(zlib.decompress(data))
+
+    def archived(self, task_id: str) -> bool:
+        return task_id in self._archive
+
+    def archived_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._archive)
+
+    def _untrack(self, task_id: str) -> None:
+        entry = self._finished.pop(task_id, None)
+        if entry is None:
+            return
+        del self._lru[task_id]
+        self.stats.resident -= 1
+        self.stats.resident_bytes -= entry[1]
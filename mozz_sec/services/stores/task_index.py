@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import base64
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.tasks.task import BaseExecTask
+
+# The root fields whose change moves a task between index entries.
+INDEXED_FIELDS = frozenset({"status", "task_type", "common"})
+
+
+class TaskSummary(BaseModel):
+    """
+    Represents the state of a task without its detail.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        task_id: The ID of the task.
+        task_type: The type of the task.
+        status: The status of the task. It is a TaskStatus object.
+        progress: The progress of the task as a percentage (0-100).
+        message: The message associated with the task.
+        pbi: The PBI of the task.
+        instance_id: The ID of the instance of the task.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    task_id: str
+    task_type: str
+    status: TaskStatus
+    progress: int
+    message: str = ""
+    pbi: str = ""
+    instance_id: str = ""
+
+    @classmethod
+    def of(cls, task_id: str, task: BaseExecTask) -> "TaskSummary":
+        return cls(
+            task_id=task_id,
+            task_type=task.task_type,
+            status=task.status,
+            progress=task.progress,
+            message=task.message,
+            pbi=str(task.common.pbi),
+            instance_id=task.common.instance_info.instance_id,
+        )
+
+
+class TaskFilter(NamedTuple):
+    """
+    Represents the criteria of a task listing. None matches every value.
+
+    Attributes:
+        status: The status of the tasks.
+        task_type: The type of the tasks.
+        pbi: The PBI of the tasks.
+        instance_id: The ID of the instance of the tasks.
+    """
+
+    status: Optional[TaskStatus] = None
+    task_type: Optional[str] = None
+    pbi: Optional[str] = None
+    instance_id: Optional[str] = None
+
+    def criteria(self) -> Dict[str, str]:
+        """The criteria that are set, by field, with the values used as index keys."""
+        criteria = {}
+        for name, value in zip(self._fields, self):
+            if value is not None:
+                criteria[name] = value.value if isinstance(value, TaskStatus) else str(value)
+        return criteria
+
+    def matches(self, task: BaseExecTask) -> bool:
+        keys = index_keys(task)
+        return all(keys[name] == value for name, value in self.criteria().items())
+
+
+def index_keys(task: BaseExecTask) -> Dict[str, str]:
+    """The values of the indexed fields of ``task``."""
+    return {
+        "status": task.status.value,
+        "task_type": task.task_type,
+        "pbi": str(task.common.pbi),
+        "instance_id": task.common.instance_info.instance_id,
+    }
+
+
+def encode_cursor(task_id: str) -> str:
+    return base64.urlsafe_b64encode(task_id.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[str]:
+    """
+    Returns the last task ID of the previous page.
+
+    Raises:
+        ValueError: If the cursor was not returned by a listing.
+    """
+    if not cursor:
+        return None
+    try:
+        return base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+
+
+class TaskIndex:
+    """
+    Represents secondary indexes of tasks by status, type, PBI and instance ID.
+
+    Every index maps a value to the sorted list of the IDs of the tasks having it. A listing seeks
+    to the cursor in the shortest list among its criteria with a binary search and walks it from
+    there, checking the other criteria against the indexed values of each task, until the page is
+    full. A page costs O(log n) plus the tasks walked, however many tasks match in all.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._keys: Dict[str, Dict[str, str]] = {}
+        self._index: Dict[str, Dict[str, List[str]]] = {name: {} for name in TaskFilter._fields}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def update(self, task_id: str, task: BaseExecTask) -> None:
+        """Indexes ``task``, or moves it to the entries of its current values."""
+        keys = index_keys(task)
+        with self._lock:
+            old = self._keys.get(task_id)
+            if old == keys:
+                return
+            for name, value in keys.items():
+                if old is not None and old[name] == value:
+                    continue
+                if old is not None:
+                    self._discard(name, old[name], task_id)
+                insort(self._index[name].setdefault(value, []), task_id)
+            if old is None:
+                insort(self._ids, task_id)
+            self._keys[task_id] = keys
+
+    def remove(self, task_id: str) -> None:
+        with self._lock:
+            old = self._keys.pop(task_id, None)
+            if old is None:
+                return
+            _remove_sorted(self._ids, task_id)
+            for name, value in old.items():
+                self._discard(name, value, task_id)
+
+    def select(self, task_filter: TaskFilter, after: Optional[str] = None, limit: int = 100) -> Tuple[List[str], bool]:
+        """
+        Returns the IDs of up to ``limit`` matching tasks following ``after``, in order, and whether
+        more tasks match.
+        """
+        criteria = task_filter.criteria()
+        with self._lock:
+            task_ids = self._ids
+            if criteria:
+                task_ids = min((self._index[name].get(value, []) for name, value in criteria.items()), key=len)
+            page: List[str] = []
+            start = 0 if after is None else bisect_right(task_ids, after)
+            for position in range(start, len(task_ids)):
+                task_id = task_ids[position]
+                keys = self._keys[task_id]
+                if all(keys[name] == value for name, value in criteria.items()):
+                    if len(page) == limit:
+                        return page, True
+                    page.append(task_id)
+        return page, False
+
+    def _discard(self, name: str, value: str, task_id: str) -> None:
+        entry = self._index[name].get(value)
+        if entry is not None:
+            _remove_sorted(entry, task_id)
+            if not entry:
+                del self._index[name][value]
+
+
+def _remove_sorted(task_ids: List[str], task_id: str) -> None:
+    position = bisect_left(task_ids, task_id)
+    if position < len(task_ids) and task_ids[position] == task_id:
+        del task_ids[position]
+
+
+def parse_status(value: Union[str, TaskStatus, None]) -> Optional[TaskStatus]:
+    """Accepts a status by value (``R``) or by name (``Finished``)."""
+    if value is None or isinstance(value, TaskStatus):
+        return value
+    try:
+        return TaskStatus(value)
+    except ValueError:
+        pass
+    try:
+        return TaskStatus[value]
+    except KeyError:
+        raise ValueError(f"Invalid status: {value}") from None
@@ -0,0 +1,575 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Generic, Iterable, Iterator, List, MutableMapping, Optional, Tuple, Type, TypeVar
+
+from loguru import logger
+
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+from mozz_sec.services.stores.retention import RetentionManager, RetentionStats
+from mozz_sec.services.stores.task_index import INDEXED_FIELDS, TaskFilter, TaskIndex, TaskSummary, index_keys
+from mozz_sec.services.tasks.task import BaseExecTask, TaskWithProgress
+
+T = TypeVar("T", bound=BaseExecTask)
+
+SQLITE_SCHEME = "sqlite:///"
+
+
+class BaseTaskStore(MutableMapping[str, T], Generic[T]):
+    """
+    Represents the storage of the execution tasks of one tool.
+
+    The store behaves like the ``Dict[str, Task]`` it replaces, so ``task_id in store``,
+    ``store[task_id]`` and ``store[task_id] = task`` keep working. Code that mutates a stored
+    task must call ``save`` afterwards so that persistent stores pick up the change.
+
+    Attributes:
+        model: The task model kept in the store.
+        retention: The retention manager deciding which finished tasks stay in memory, if any.
+    """
+
+    def __init__(self, model: Type[T], retention: Optional[RetentionManager] = None):
+        self.model = model
+        self.retention = retention
+
+    def save(self, task: T) -> None:
+        """Records that ``task`` changed."""
+        self[task.task_id] = task
+
+    def flush(self) -> None:
+        """Writes all pending changes to the backing storage."""
+
+    def close(self) -> None:
+        """Flushes pending changes and releases the backing storage."""
+        self.flush()
+
+    def stats(self) -> RetentionStats:
+        """Returns the retention counters of the store."""
+        if self.retention is None:
+            return RetentionStats()
+        return self.retention.stats.model_copy()
+
+    def summaries(self, task_ids: Iterable[str]) -> Dict[str, TaskSummary]:
+        """Returns the summaries of the tasks among ``task_ids`` that exist."""
+        found = {}
+        for task_id in task_ids:
+            try:
+                found[task_id] = TaskSummary.of(task_id, self[task_id])
+            except KeyError:
+                pass
+        return found
+
+    def select(
+        self, task_filter: TaskFilter, after: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[TaskSummary], Optional[str]]:
+        """
+        Returns the summaries of up to ``limit`` tasks matching ``task_filter`` whose IDs follow
+        ``after``, ordered by task ID, and the ID to pass as ``after`` for the next page, or None if
+        no more tasks match. This scans all tasks, stores override it with indexed lookups.
+        """
+        task_ids = sorted(task_id for task_id in self if after is None or task_id > after)
+        page = []
+        for task_id in task_ids:
+            try:
+                task = self[task_id]
+            except KeyError:  # deleted meanwhile
+                continue
+            if task_filter.matches(task):
+                if len(page) == limit:
+                    return page, page[-1].task_id
+                page.append(TaskSummary.of(task_id, task))
+        return page, None
+
+
+class MemoryTaskStore(BaseTaskStore[T]):
+    """
+    Keeps the tasks in a process-local dictionary. Nothing survives a restart.
+
+    Finished tasks evicted by the retention manager are either moved to its compressed archive
+    or dropped for good. The tasks are indexed by status, type, PBI and instance ID, and the
+    indexes follow the changes of the tasks as they happen.
+    """
+
+    def __init__(self, model: Type[T], retention: Optional[RetentionManager] = None):
+        super().__init__(model, retention)
+        self._tasks: Dict[str, T] = {}
+        self._index = TaskIndex()
+        self._observers: Dict[str, Callable] = {}
+
+    def __getitem__(self, task_id: str) -> T:
+        task = self._tasks.get(task_id)
+        if self.retention is None:
+            if task is None:
+                raise KeyError(task_id)
+            return task
+
+        if task is not None:
+            self.retention.hit(task_id)
+            self._collect()
+            return task
+        self.retention.miss()
+        task = self.retention.restore(task_id, self.model)
+        if task is None:
+            raise KeyError(task_id)
+        return task
+
+    def __setitem__(self, task_id: str, task: T) -> None:
+        old = self._tasks.get(task_id)
+        self._tasks[task_id] = task
+        if old is not task:
+            self._observe(task_id, task, old)
+        self._index.update(task_id, task)
+        if self.retention is not None:
+            self.retention.track(task_id, task)
+            self._collect()
+
+    def __delitem__(self, task_id: str) -> None:
+        archived = self.retention is not None and self.retention.archived(task_id)
+        task = self._tasks.pop(task_id, None)
+        if task is None and not archived:
+            raise KeyError(task_id)
+        self._observe(task_id, None, task)
+        self._index.remove(task_id)
+        if self.retention is not None:
+            self.retention.forget(task_id)
+
+    def __contains__(self, task_id: object) -> bool:
+        if task_id in self._tasks:
+            return True
+        return self.retention is not None and self.retention.archived(task_id)
+
+    def __iter__(self) -> Iterator[str]:
+        task_ids = list(self._tasks)
+        if self.retention is not None:
+            task_ids.extend(self.retention.archived_ids())
+        return iter(task_ids)
+
+    def __len__(self) -> int:
+        return len(self._tasks) + (self.retention.stats.archived if self.retention is not None else 0)
+
+    def save(self, task: T) -> None:
+        self[task.task_id] = task
+
+    def select(
+        self, task_filter: TaskFilter, after: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[TaskSummary], Optional[str]]:
+        task_ids, more = self._index.select(task_filter, after, limit)
+        # The cursor comes from the index, a task it returned may have been deleted since.
+        return list(self.summaries(task_ids).values()), task_ids[-1] if more else None
+
+    def _observe(self, task_id: str, task: Optional[T], old: Optional[T]) -> None:
+        """
+        Moves the observer keeping the index and the retention of ``task_id`` current from ``old`` to
+        ``task``. A task that turns terminal in place is tracked from then on, and evicted by the next
+        collection that finds it expired or over the budget.
+        """
+        observer = self._observers.pop(task_id, None)
+        if old is not None and observer is not None:
+            old.unobserve(observer)
+        if task is None:
+            return
+
+        def observer(changed: BaseExecTask, source: Optional[TaskWithProgress], name: Optional[str]) -> None:
+            if source is None or (source is changed and name in INDEXED_FIELDS):
+                self._index.update(task_id, changed)
+            if self.retention is not None and source is changed and name == "status":
+                self.retention.track(task_id, changed)
+
+        self._observers[task_id] = observer
+        task.observe(observer)
+
+    def _collect(self) -> None:
+        for task_id in self.retention.collect():
+            task = self._tasks.pop(task_id, None)
+            if task is not None:
+                self._observe(task_id, None, task)
+                # Archived tasks stay listed, those dropped for good leave the index too.
+                for dropped in self.retention.store(task_id, task):
+                    self._index.remove(dropped)
+
+
+class SqliteTaskStore(BaseTaskStore[T]):
+    """
+    Persists the tasks in an embedded SQLite database running in WAL mode.
+
+    Only tasks that are still running, or that were changed since the last flush, are kept in memory,
+    plus the finished tasks the retention manager decides to retain. Everything else is loaded from
+    the database when it is requested. Changes are written by a
+    background thread in batches, so the request path never waits for the disk.
+
+    Tasks held in memory are saved automatically whenever they change. The status, type, PBI and
+    instance ID of the tasks are kept in indexed columns for listings.
+
+    A ``shared`` store is used by several processes, e.g. the workers of uvicorn and the scan workers.
+    New tasks are written before ``store[task_id] = task`` returns, so any process can read them at
+    once, and only tasks with unwritten changes are served from memory, every other read loads the
+    current task from the database. Tasks that other processes may change at the same time must be
+    changed with ``apply``, which reads, changes and writes a task in one transaction.
+
+    Attributes:
+        path: The path of the database file.
+        table: The table holding the tasks of this store.
+        flush_interval: The maximum delay in seconds before a change is written.
+        flush_batch: The number of pending changes that triggers an immediate flush.
+        shared: Whether other processes use the database at the same time.
+    """
+
+    def __init__(
+        self,
+        model: Type[T],
+        path: str,
+        table: str,
+        flush_interval: float = 0.5,
+        flush_batch: int = 500,
+        retention: Optional[RetentionManager] = None,
+        shared: bool = False,
+    ):
+        super().__init__(model, retention)
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.path = path
+        self.table = table
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.shared = shared
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Waits for the write lock held by other processes rather than failing at once.
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "task_id TEXT PRIMARY KEY, status TEXT NOT NULL, task_type TEXT NOT NULL, "
+            "updated REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        self._migrate()
+
+        self._db_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._cache: Dict[str, T] = {}
+        self._dirty: Dict[str, T] = {}
+
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name=f"{table}-flusher", daemon=True)
+        self._flusher.start()
+
+    def _migrate(self) -> None:
+        """Adds the summary columns and the listing indexes to tables created by older versions."""
+        table = self.table
+        columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        added = [column for column in _SUMMARY_COLUMNS if column not in columns]
+        for column in added:
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {_SUMMARY_COLUMNS[column]}")
+        if added and columns:
+            self._conn.execute(
+                f"UPDATE {table} SET pbi = CAST(json_extract(data, '$.common.pbi') AS TEXT), "
+                "instance_id = json_extract(data, '$.common.instanceInfo.instanceId'), "
+                "progress = json_extract(data, '$.progress'), message = json_extract(data, '$.message')"
+            )
+        self._conn.execute(f"DROP INDEX IF EXISTS {table}_status")
+        for column in TaskFilter._fields:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column}, task_id)")
+
+    def __getitem__(self, task_id: str) -> T:
+        with self._lock:
+            task = self._cache.get(task_id)
+            if self.shared and task_id not in self._dirty:
+                task = None
+        if task is not None:
+            if self.retention is not None:
+                self.retention.hit(task_id)
+            return task
+
+        if self.retention is not None:
+            self.retention.miss()
+        with self._db_lock:
+            row = self._conn.execute(f"SELECT data FROM {self.table} WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            raise KeyError(task_id)
+        task = self.model.model_validate_json(row[0])
+        if self.shared:
+            return task
+        with self._lock:
+            # Another thread may have loaded or replaced the task in the meantime.
+            task = self._cache.setdefault(task_id, task)
+        task.observe(self._on_change)
+        if self.retention is not None:
+            self.retention.track(task_id, task)
+        return task
+
+    def __setitem__(self, task_id: str, task: T) -> None:
+        with self._lock:
+            self._cache[task_id] = task
+            self._dirty[task_id] = task
+            pending = len(self._dirty)
+        task.observe(self._on_change)
+        if self.shared:
+            self.flush()
+        elif pending >= self.flush_batch:
+            self._wakeup.set()
+
+    def apply(self, task_id: str, change: Callable[[T], None]) -> T:
+        """
+        Loads the current ``task_id``, calls ``change`` with it and writes it back in one transaction,
+        so that the changes of other processes are neither lost nor overwritten. Returns the task.
+
+        Raises:
+            KeyError: If there is no such task.
+        """
+        if not self.shared:
+            task = self[task_id]
+            change(task)
+            self.save(task)
+            return task
+        self.flush()
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(f"SELECT data FROM {self.table} WHERE task_id = ?", (task_id,)).fetchone()
+                if row is None:
+                    raise KeyError(task_id)
+                task = self.model.model_validate_json(row[0])
+                change(task)
+                self._conn.execute(_UPSERT.format(table=self.table), _row_of(task_id, task, time.time()))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return task
+
+    def _on_change(self, task: BaseExecTask, source: Optional[TaskWithProgress], name: Optional[str]) -> None:
+        task_id = task.task_id
+        with self._lock:
+            if self._cache.get(task_id) is not task:
+                return
+            self._dirty[task_id] = task
+            pending = len(self._dirty)
+        if pending >= self.flush_batch:
+            self._wakeup.set()
+
+    def __delitem__(self, task_id: str) -> None:
+        with self._lock:
+            cached = self._cache.pop(task_id, None)
+            self._dirty.pop(task_id, None)
+        if self.retention is not None:
+            self.retention.forget(task_id)
+        with self._db_lock:
+            deleted = self._conn.execute(f"DELETE FROM {self.table} WHERE task_id = ?", (task_id,)).rowcount
+        if cached is None and not deleted:
+            raise KeyError(task_id)
+
+    def __contains__(self, task_id: object) -> bool:
+        with self._lock:
+            if task_id in self._cache:
+                return True
+        with self._db_lock:
+            row = self._conn.execute(f"SELECT 1 FROM {self.table} WHERE task_id = ?", (task_id,)).fetchone()
+        return row is not None
+
+    def __iter__(self) -> Iterator[str]:
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(f"SELECT task_id FROM {self.table} ORDER BY task_id").fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._db_lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def flush(self) -> None:
+        # Serialize whole flushes, otherwise an older snapshot of a task could be committed last.
+        with self._flush_lock:
+            flushed = self._flush()
+        self._release_finished(flushed)
+
+    def _flush(self) -> Dict[str, T]:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if dirty:
+            rows = []
+            now = time.time()
+            for task_id, task in dirty.items():
+                try:
+                    data = task.model_dump_json(by_alias=True)
+                except Exception as exc:  # the task is being modified concurrently, retry on the next flush
+                    logger.warning(f"Postpone saving task {task_id}: {exc}")
+                    with self._lock:
+                        self._dirty.setdefault(task_id, task)
+                    continue
+                rows.append(_row_of(task_id, task, now, data))
+            with self._db_lock:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(_UPSERT.format(table=self.table), rows)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    with self._lock:
+                        for task_id, task in dirty.items():
+                            self._dirty.setdefault(task_id, task)
+                    raise
+        return dirty
+
+    def summaries(self, task_ids: Iterable[str]) -> Dict[str, TaskSummary]:
+        found: Dict[str, TaskSummary] = {}
+        missing = []
+        for task_id in task_ids:
+            with self._lock:
+                task = self._cache.get(task_id)
+            if task is not None:
+                found[task_id] = TaskSummary.of(task_id, task)
+            else:
+                missing.append(task_id)
+        for start in range(0, len(missing), _SQL_CHUNK):
+            chunk = missing[start : start + _SQL_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            with self._db_lock:
+                rows = self._conn.execute(
+                    f"SELECT {_SUMMARY_SELECT} FROM {self.table} WHERE task_id IN ({placeholders})", chunk
+                ).fetchall()
+            for row in rows:
+                found[row[0]] = _summary_of(row)
+        return {task_id: found[task_id] for task_id in task_ids if task_id in found}
+
+    def select(
+        self, task_filter: TaskFilter, after: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[TaskSummary], Optional[str]]:
+        self.flush()
+        criteria = task_filter.criteria()
+        clauses = [f"{column} = ?" for column in criteria]
+        params: List[object] = list(criteria.values())
+        if after is not None:
+            clauses.append("task_id > ?")
+            params.append(after)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_SELECT} FROM {self.table} {where}ORDER BY task_id LIMIT ?", params + [limit + 1]
+            ).fetchall()
+        return [_summary_of(row) for row in rows[:limit]], rows[limit - 1][0] if len(rows) > limit else None
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wakeup.set()
+        self._flusher.join()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def _release_finished(self, flushed: Dict[str, T]) -> None:
+        """Drops the persisted tasks that cannot change any more from memory."""
+        with self._lock:
+            if self.shared:
+                released = [task_id for task_id in self._cache if task_id not in self._dirty]
+            elif self.retention is None:
+                released = [k for k, v in self._cache.items() if v.status.is_terminal and k not in self._dirty]
+            else:
+                for task_id, task in flushed.items():
+                    if self._cache.get(task_id) is task:
+                        self.retention.track(task_id, task)
+                released = [task_id for task_id in self.retention.collect() if task_id not in self._dirty]
+            for task_id in released:
+                self._cache.pop(task_id, None)
+
+    def _flush_loop(self) -> None:
+        while not self._closed.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as exc:
+                logger.error(f"Failed to flush task store {self.table}: {exc}")
+
+
+_SUMMARY_COLUMNS = {
+    "pbi": "TEXT NOT NULL DEFAULT ''",
+    "instance_id": "TEXT NOT NULL DEFAULT ''",
+    "progress": "INTEGER NOT NULL DEFAULT 0",
+    "message": "TEXT NOT NULL DEFAULT ''",
+}
+_SUMMARY_SELECT = "task_id, task_type, status, progress, message, pbi, instance_id"
+_UPSERT = (
+    "INSERT OR REPLACE INTO {table} (task_id, status, task_type, updated, data, pbi, instance_id, progress, message) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# Stays below the default limit of 999 host parameters of older SQLite versions.
+_SQL_CHUNK = 500
+
+
+def _row_of(task_id: str, task: BaseExecTask, now: float, data: Optional[str] = None) -> tuple:
+    """The row of ``task`` for ``_UPSERT``."""
+    if data is None:
+        data = task.model_dump_json(by_alias=True)
+    keys = index_keys(task)
+    return (
+        task_id,
+        keys["status"],
+        keys["task_type"],
+        now,
+        data,
+        keys["pbi"],
+        keys["instance_id"],
+        task.progress,
+        task.message,
+    )
+
+
+def _summary_of(row: tuple) -> TaskSummary:
+    task_id, task_type, status, progress, message, pbi, instance_id = row
+    return TaskSummary(
+        task_id=task_id,
+        task_type=task_type,
+        status=status,
+        progress=progress,
+        message=message,
+        pbi=pbi,
+        instance_id=instance_id,
+    )
+
+
+def create_task_store(model: Type[T], table: str, settings: Optional[ExecutorSettings] = None) -> BaseTaskStore[T]:
+    """
+    Creates the task store configured by ``settings.task_store``.
+
+    Args:
+        model: The task model kept in the store.
+        table: The name of the table used by persistent stores.
+        settings: The executor settings. Defaults to the settings read from the environment.
+
+    Returns:
+        BaseTaskStore: The task store.
+    """
+    settings = settings or SETTINGS
+    retention = None
+    if settings.task_ttl is not None or settings.task_memory_budget is not None:
+        retention = RetentionManager(
+            ttl=settings.task_ttl,
+            memory_budget=settings.task_memory_budget,
+            archive=settings.task_archive,
+            archive_budget=settings.task_archive_budget,
+        )
+    if settings.executor_mode == "shared" and not settings.task_store.startswith(SQLITE_SCHEME):
+        raise ValueError(f"The shared executor mode needs a {SQLITE_SCHEME} task store, not {settings.task_store}")
+    if settings.task_store == "memory":
+        return MemoryTaskStore(model, retention)
+    if settings.task_store.startswith(SQLITE_SCHEME):
+        return SqliteTaskStore(
+            model,
+            path=settings.task_store[len(SQLITE_SCHEME) :],
+            table=table,
+            flush_interval=settings.store_flush_interval,
+            flush_batch=settings.store_flush_batch,
+            retention=retention,
+            shared=settings.executor_mode == "shared",
+        )
+    raise ValueError(f"Unsupported task store: {settings.task_store}")
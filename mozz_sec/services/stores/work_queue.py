@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+from mozz_sec.services.settings import SETTINGS, ExecutorSettings
+from mozz_sec.services.stores.task_store import SQLITE_SCHEME
+from mozz_sec.services.scheduler import Priority
+
+
+class WorkItem(NamedTuple):
+    """
+    Represents a sub-task claimed from a work queue.
+
+    Attributes:
+        item_id: The ID of the queue entry.
+        task_id: The ID of the execution task.
+        index: The index of the sub-task in the details of the task.
+        attempts: The number of times the sub-task was claimed, this claim included.
+    """
+
+    item_id: int
+    task_id: str
+    index: int
+    attempts: int
+
+
+class WorkQueueStats(BaseModel):
+    """
+    Represents the content of a work queue.
+
+    Attributes:
+        model_config: The configuration for the model. It is a ConfigDict object with the following properties:
+            - populate_by_name: A boolean indicating whether to populate the configuration by name.
+            - alias_generator: A function used to generate aliases for the configuration.
+        queued: The number of sub-tasks waiting for a worker.
+        leased: The number of sub-tasks claimed by a worker.
+        expired: The number of claimed sub-tasks whose lease ran out, e.g. because their worker died.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+
+    queued: int = 0
+    leased: int = 0
+    expired: int = 0
+
+
+class SqliteWorkQueue:
+    """
+    Represents the sub-tasks waiting to be run by the scan workers of all processes, in a SQLite table.
+
+    A worker claims a batch of sub-tasks in one ``BEGIN IMMEDIATE`` transaction, which SQLite
+    serializes across processes through the lock of the database file, and holds them for ``lease``
+    seconds. It prefers the sub-tasks of the task it ran last, whose task it has loaded already, and
+    steals the oldest sub-tasks of the highest priority from any other task once its own task has no
+    more. A sub-task whose worker died is claimed again once its lease has expired.
+
+    The claim reads then updates the rows instead of using ``UPDATE ... RETURNING``, which SQLite only
+    supports from 3.35 on.
+
+    Attributes:
+        path: The path of the database file.
+        table: The table holding the queue.
+        lease: The number of seconds a claim lasts.
+    """
+
+    def __init__(self, path: str, table: str, lease: float = 60.0):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.path = path
+        self.table = table
+        self.lease = lease
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "item_id INTEGER PRIMARY KEY, task_id TEXT NOT NULL, sub_index INTEGER NOT NULL, "
+            "priority INTEGER NOT NULL, owner TEXT, lease_until REAL NOT NULL DEFAULT 0, "
+            "attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        # Waiting sub-tasks have no owner. The indexes serve the claim of own and of stolen sub-tasks,
+        # and finding the expired leases.
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_own ON {table} (owner, task_id, item_id)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_next ON {table} (owner, priority, item_id)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_lease ON {table} (lease_until)")
+        self._lock = threading.Lock()
+
+    def put(self, task_id: str, indexes: Iterable[int], priority: Priority = Priority.normal) -> int:
+        """Queues the sub-tasks ``indexes`` of ``task_id``. Returns the number of sub-tasks queued."""
+        rows = [(task_id, index, priority.rank) for index in indexes]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO {self.table} (task_id, sub_index, priority) VALUES (?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def claim(self, worker: str, limit: int, affinity: Optional[str] = None) -> List[WorkItem]:
+        """
+        Claims up to ``limit`` sub-tasks for ``worker``, those of the task ``affinity`` first.
+
+        Returns:
+            The claimed sub-tasks, ordered by task.
+        """
+        table = self.table
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                self._conn.execute(
+                    f"UPDATE {table} SET owner = NULL WHERE lease_until < ? AND owner IS NOT NULL", (now,)
+                )
+                rows = []
+                if affinity is not None:
+                    rows = self._conn.execute(
+                        f"SELECT item_id, task_id, sub_index, attempts FROM {table} "
+                        "WHERE owner IS NULL AND task_id = ? ORDER BY item_id LIMIT ?",
+                        (affinity, limit),
+                    ).fetchall()
+                if len(rows) < limit:
+                    rows += self._conn.execute(
+                        f"SELECT item_id, task_id, sub_index, attempts FROM {table} "
+                        "WHERE owner IS NULL AND task_id IS NOT ? ORDER BY priority, item_id LIMIT ?",
+                        (affinity, limit - len(rows)),
+                    ).fetchall()
+                self._conn.executemany(
+                    f"UPDATE {table} SET owner = ?, lease_until = ?, attempts = attempts + 1 WHERE item_id = ?",
+                    [(worker, now + self.lease, row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        items = [WorkItem(item_id, task_id, index, attempts + 1) for item_id, task_id, index, attempts in rows]
+        items.sort(key=lambda item: (item.task_id, item.index))
+        return items
+
+    def extend(self, worker: str, items: Iterable[WorkItem], seconds: Optional[float] = None) -> None:
+        """
+        Renews the lease of sub-tasks ``worker`` is still running, for ``seconds`` or a full lease.
+        A short lease postpones sub-tasks, they are claimed again with one more attempt once it expires.
+        """
+        until = time.time() + (self.lease if seconds is None else seconds)
+        self._update(f"UPDATE {self.table} SET lease_until = ? WHERE item_id = ? AND owner = ?", items, until, worker)
+
+    def complete(self, worker: str, items: Iterable[WorkItem]) -> None:
+        """Removes sub-tasks ``worker`` has run from the queue."""
+        self._update(f"DELETE FROM {self.table} WHERE item_id = ? AND owner = ?", items, worker)
+
+    def release(self, worker: str, items: Iterable[WorkItem]) -> None:
+        """Hands sub-tasks ``worker`` has not run back to the other workers, e.g. when it stops."""
+        self._update(
+            f"UPDATE {self.table} SET owner = NULL, lease_until = 0, attempts = attempts - 1 "
+            "WHERE item_id = ? AND owner = ?",
+            items,
+            worker,
+        )
+
+    def depth(self) -> int:
+        """The number of sub-tasks not run yet, claimed or not."""
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> WorkQueueStats:
+        with self._lock:
+            queued, leased, expired = self._conn.execute(
+                f"SELECT COUNT(*) - COUNT(owner), COUNT(owner), "
+                f"COALESCE(SUM(owner IS NOT NULL AND lease_until < ?), 0) FROM {self.table}",
+                (time.time(),),
+            ).fetchone()
+        return WorkQueueStats(queued=queued, leased=leased, expired=expired)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _update(self, sql: str, items: Iterable[WorkItem], *params: object) -> None:
+        rows = [params[:-1] + (item.item_id,) + params[-1:] for item in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(sql, rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+def create_work_queue(table: str, settings: Optional[ExecutorSettings] = None) -> Optional[SqliteWorkQueue]:
+    """
+    Creates the work queue of the tasks kept in ``table`` in the shared executor mode, next to them in
+    the database of the task store, or returns None in the local mode.
+    """
+    settings = settings or SETTINGS
+    if settings.executor_mode != "shared":
+        return None
+    if not settings.task_store.startswith(SQLITE_SCHEME):
+        raise ValueError(f"The shared executor mode needs a {SQLITE_SCHEME} task store, not {settings.task_store}")
+    return SqliteWorkQueue(settings.task_store[len(SQLITE_SCHEME) :], f"{table}_queue", lease=settings.work_lease)
@@ -78,34 +78,16 @@ class BasExecTask(BaseExecTask):
             - populate_by_name: A boolean indicating whether to populate the configuration by name.
             - alias_generator: A function used to generate aliases for the configuration.
         detail: The task detail for BAS. It is a BasTaskDetail object.
-
-    Args:
-        **data: Additional keyword arguments to initialize the task.
-
-    Returns:
-        None.
     """
 
-    def __init__(self, **data: Any):
-        """
-        Initializes a new instance of BasExecTask.
-
-        Args:
-            **data: Additional keyword arguments to initialize the task.
-
-        Returns:
-            None.
-        """
-        super().__init__(**data)
-        self.task_type = "BAS_EXEC"
-
     model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
 
     detail: BasTaskDetail = Field(default_factory=BasTaskDetail)
 
-    def __init__(self, **data: Any):
-        super().__init__(**data)
-        self.task_type = "BAS_EXEC"
+    def model_post_init(self, __context: Any) -> None:
+        self.__dict__["task_type"] = "BAS_EXEC"
+        self.__pydantic_fields_set__.add("task_type")
+        super().model_post_init(__context)
 
 
 class BasExecTaskOut(BasExecTask):
@@ -1,6 +1,6 @@
-from typing import Union, List, Any
+from typing import Union, List
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from pydantic.alias_generators import to_camel
 
 from mozz_sec.services.tasks.bas_task import BasCleanseTask
@@ -39,8 +39,7 @@ class AnalyseTask(BaseModel):
 
     task_type: str = "DATA_CLEAN"
 
-    def __init__(self, **data: Any):
-        super().__init__(**data)
-        self.pbi = f"{self.pbi}"
-        self.strategy_task_id = f"{self.strategy_task_id}"
-        self.instance_id = f"{self.instance_id}"
+    @field_validator("instance_id", "pbi", "strategy_task_id")
+    @classmethod
+    def _as_str(cls, value: Union[str, int]) -> str:
+        return f"{value}"
@@ -0,0 +1,660 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from array import array
+from copy import deepcopy
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, MutableSequence, Optional, Sequence, Tuple, Type
+
+from annotated_types import Ge, Le
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.tasks.rollup import progress_of
+
+# Distinct values a string column encodes as small integer codes before it stores the strings themselves.
+_MAX_CODES = 4096
+_PATH = type(Path())
+
+
+class _Column:
+    """
+    Stores one field of every row.
+
+    A column only accepts values it can give back exactly; a value of another type, e.g. assigned
+    to a sub-task without validation, makes the row be kept as an object instead.
+    """
+
+    __slots__ = ("default", "data")
+
+    def __init__(self, default: Any):
+        self.default = default
+        self.data: Any = self._pack([])
+
+    def _pack(self, stored: List[Any]) -> Any:
+        return list(stored)
+
+    def empty(self) -> "_Column":
+        return type(self)(self.default)
+
+    def copy(self) -> "_Column":
+        column = self.empty()
+        column.data = self.data[:]
+        return column
+
+    def accepts(self, value: Any) -> bool:
+        return True
+
+    def _encode(self, value: Any) -> Any:
+        return value
+
+    def _decode(self, stored: Any) -> Any:
+        return stored
+
+    def insert(self, start: int, values: List[Any]) -> None:
+        self.data[start:start] = self._pack([self._encode(value) for value in values])
+
+    def get(self, row: int) -> Any:
+        return self._decode(self.data[row])
+
+    def set(self, row: int, value: Any) -> None:
+        self.data[row] = self._encode(value)
+
+    def values(self, mode: str) -> List[Any]:
+        """The values of all rows, in the given serialization mode."""
+        return [self._decode(stored) for stored in self.data]
+
+    def default_in(self, mode: str) -> Any:
+        return self.default
+
+
+class _FlagColumn(_Column):
+    __slots__ = ()
+
+    def _pack(self, stored: List[Any]) -> Any:
+        return bytearray(stored)
+
+    def accepts(self, value: Any) -> bool:
+        return type(value) is bool
+
+    def _decode(self, stored: int) -> bool:
+        return stored == 1
+
+    def values(self, mode: str) -> List[Any]:
+        return [stored == 1 for stored in self.data]
+
+
+class _IntColumn(_Column):
+    """Stores integers known to fit in a byte, such as progresses."""
+
+    __slots__ = ()
+
+    def _pack(self, stored: List[Any]) -> Any:
+        return bytearray(stored)
+
+    def accepts(self, value: Any) -> bool:
+        return type(value) is int and 0 <= value <= 255
+
+    def values(self, mode: str) -> List[Any]:
+        return list(self.data)
+
+
+class _WideIntColumn(_IntColumn):
+    __slots__ = ()
+
+    def _pack(self, stored: List[Any]) -> Any:
+        return array("q", stored)
+
+    def accepts(self, value: Any) -> bool:
+        return type(value) is int and -(2**63) <= value < 2**63
+
+
+class _EnumColumn(_Column):
+    __slots__ = ("members", "codes")
+
+    def __init__(self, default: Enum):
+        self.members = tuple(type(default))
+        self.codes = {member: code for code, member in enumerate(self.members)}
+        super().__init__(default)
+
+    def empty(self) -> "_EnumColumn":
+        return _EnumColumn(self.default)
+
+    def _pack(self, stored: List[Any]) -> Any:
+        return bytearray(stored)
+
+    def accepts(self, value: Any) -> bool:
+        return type(value) is type(self.default)
+
+    def _encode(self, value: Enum) -> int:
+        return self.codes[value]
+
+    def _decode(self, stored: int) -> Enum:
+        return self.members[stored]
+
+    def values(self, mode: str) -> List[Any]:
+        members = [member.value for member in self.members] if mode == "json" else self.members
+        return [members[stored] for stored in self.data]
+
+    def default_in(self, mode: str) -> Any:
+        return self.default.value if mode == "json" else self.default
+
+
+class _StrColumn(_Column):
+    """
+    Stores strings as codes into a table of the distinct strings, so that repeated values such as
+    URLs are stored once and take two bytes per row. A column with many distinct values, such as
+    file names, stores the strings themselves.
+    """
+
+    __slots__ = ("strings", "index")
+
+    def __init__(self, default: Any):
+        super().__init__(default)
+        self.strings: Optional[List[str]] = []
+        self.index: Dict[str, int] = {}
+
+    def _pack(self, stored: List[Any]) -> Any:
+        return array("H", stored) if getattr(self, "strings", []) is not None else list(stored)
+
+    def copy(self) -> "_StrColumn":
+        column = super().copy()
+        column.strings = None if self.strings is None else self.strings[:]
+        column.index = dict(self.index)
+        return column
+
+    def accepts(self, value: Any) -> bool:
+        return type(value) is str
+
+    def _text(self, value: Any) -> str:
+        return value
+
+    def insert(self, start: int, values: List[Any]) -> None:
+        texts = [self._text(value) for value in values]
+        if self.strings is not None and len(self.strings) + len(set(texts) - self.index.keys()) > _MAX_CODES:
+            self._store_strings()
+        self.data[start:start] = self._pack([self._code(text) for text in texts])
+
+    def set(self, row: int, value: Any) -> None:
+        text = self._text(value)
+        if self.strings is not None and text not in self.index and len(self.strings) == _MAX_CODES:
+            self._store_strings()
+        self.data[row] = self._code(text)
+
+    def _store_strings(self) -> None:
+        strings = self.strings
+        self.data = [strings[code] for code in self.data]
+        self.strings, self.index = None, {}
+
+    def _code(self, text: str) -> Any:
+        if self.strings is None:
+            return text
+        code = self.index.get(text)
+        if code is None:
+            code = self.index[text] = len(self.strings)
+            self.strings.append(text)
+        return code
+
+    def _decode(self, stored: Any) -> Any:
+        return stored if self.strings is None else self.strings[stored]
+
+    def values(self, mode: str) -> List[Any]:
+        strings = self.strings
+        if strings is None:
+            return list(self.data)
+        return [strings[code] for code in self.data]
+
+
+class _PathColumn(_StrColumn):
+    """Stores paths as strings. The default, an empty string that was never validated, is kept as it is."""
+
+    __slots__ = ()
+
+    def accepts(self, value: Any) -> bool:
+        return type(value) is _PATH or (type(value) is str and value == self.default)
+
+    def _text(self, value: Any) -> str:
+        return str(value)
+
+    def _decode(self, stored: Any) -> Any:
+        value = super()._decode(stored)
+        return value if value == self.default else Path(value)
+
+    def values(self, mode: str) -> List[Any]:
+        values = super().values(mode)
+        if mode == "json":
+            return values
+        default = self.default
+        return [value if value == default else Path(value) for value in values]
+
+
+@lru_cache(maxsize=None)
+def _layout(model: Type[BaseModel]) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[_Column, ...]]:
+    """The field names, the serialization aliases and empty columns of the fields of ``model``."""
+    names, aliases, columns = [], [], []
+    for name, field in model.model_fields.items():
+        default, annotation = field.default, field.annotation
+        if default is PydanticUndefined:
+            raise TypeError(f"{model.__name__}.{name} has no default value")
+        column: _Column
+        if annotation is bool:
+            column = _FlagColumn(default)
+        elif annotation is int:
+            low = max((meta.ge for meta in field.metadata if isinstance(meta, Ge)), default=None)
+            high = min((meta.le for meta in field.metadata if isinstance(meta, Le)), default=None)
+            in_byte = low is not None and high is not None and 0 <= low and high <= 255
+            column = _IntColumn(default) if in_byte else _WideIntColumn(default)
+        elif isinstance(annotation, type) and issubclass(annotation, Enum):
+            column = _EnumColumn(default)
+        elif annotation is str:
+            column = _StrColumn(default)
+        elif annotation is Path:
+            column = _PathColumn(default)
+        else:
+            raise TypeError(f"{model.__name__}.{name} of type {annotation} cannot be stored in columns")
+        names.append(name)
+        aliases.append(field.serialization_alias or field.alias or name)
+        columns.append(column)
+    return tuple(names), tuple(aliases), tuple(columns)
+
+
+class _RowBinding:
+    """The parent of a materialized sub-task, writing its changes back to its row."""
+
+    __slots__ = ("rows", "row", "view", "__weakref__")
+
+    def __init__(self, rows: "SubTaskColumns", row: int, view: Any):
+        self.rows = rows
+        self.row = row
+        self.view = weakref.ref(view)
+
+    def _touch(self, source: Any = None, name: Optional[str] = None) -> None:
+        if source is not None and name is not None:
+            self.rows._write_back(self, source, name)
+        self.rows._current_owner()._touch(source, name)
+
+    def _on_child_changed(self, child: Any, name: str, old: Any, new: Any) -> None:
+        self.rows._current_owner()._on_child_changed(child, name, old, new)
+
+
+class _Unowned:
+    """The owner of sub-task columns that do not belong to a task yet."""
+
+    def _touch(self, source: Any = None, name: Optional[str] = None) -> None:
+        pass
+
+    def _on_child_changed(self, child: Any, name: str, old: Any, new: Any) -> None:
+        pass
+
+    def _recount(self, added: Iterable[Tuple[int, TaskStatus]], removed: Iterable[Tuple[int, TaskStatus]]) -> None:
+        pass
+
+
+_UNOWNED = _Unowned()
+
+
+class SubTaskColumns(MutableSequence):
+    """
+    Represents the ``details`` of a task as columns, one per field of the sub-task model.
+
+    Strings repeated across sub-tasks, such as URLs, are stored once and referenced by small integer
+    codes, the statuses, progresses and flags take a byte per sub-task, so a sub-task takes tens of
+    bytes instead of a model instance with its dictionaries. Sub-tasks are materialized as model
+    instances when they are read. While a materialized sub-task is referenced, reading its row again
+    returns the same instance and its changes are written back to the columns and reported to the
+    task like the changes of any sub-task.
+
+    Items that are not exactly instances of the model, or whose values the columns cannot store
+    exactly, e.g. plain dictionaries, are kept as they are. The list serializes to the same JSON as a
+    list of the sub-tasks.
+
+    The owner must provide ``_recount(added, removed)``, ``_touch`` and ``_on_child_changed``. Copies
+    and pickles are not owned; the owning task binds them again.
+
+    Attributes:
+        model: The model of the sub-tasks.
+    """
+
+    def __init__(self, model: Type[BaseModel], iterable: Iterable[Any] = (), owner: Any = None):
+        self.model = model
+        names, self._aliases, columns = _layout(model)
+        self._names = {name: position for position, name in enumerate(names)}
+        self._columns = [column.empty() for column in columns]
+        self._progress = self._columns[self._names["progress"]]
+        self._status = self._columns[self._names["status"]]
+        self._defaults = {name: column.default for name, column in zip(names, columns)}
+        self._objects: Dict[int, Any] = {}
+        self._bindings: "weakref.WeakValueDictionary[int, _RowBinding]" = weakref.WeakValueDictionary()
+        self._lock = threading.RLock()
+        self._owner = owner
+        self._insert(0, list(iterable), bind=owner is not None)
+
+    @property
+    def owner(self) -> Any:
+        return self._owner
+
+    def bind(self, owner: Any, adopt: bool = True) -> None:
+        """Makes ``owner`` the owner of the list. ``adopt`` makes it the parent of the task items."""
+        self._owner = owner
+        if adopt:
+            for item in self._objects.values():
+                if callable(getattr(item, "_set_parent", None)):
+                    item._set_parent(owner)
+
+    def detach(self, owner: Any) -> None:
+        """Hands the list over to ``owner``, which ignores its changes, and releases its items."""
+        with self._lock:
+            previous, self._owner = self._owner, owner
+            for binding in list(self._bindings.values()):
+                view = binding.view()
+                if view is not None:
+                    view._set_parent(None)
+            self._bindings = weakref.WeakValueDictionary()
+            for item in self._objects.values():
+                if getattr(item, "_parent", None) is previous:
+                    item._set_parent(None)
+
+    def rollup_entries(self) -> Iterator[Tuple[int, TaskStatus]]:
+        """The progress and the status of every sub-task."""
+        statuses = self._status.members
+        objects = self._objects
+        for row, (progress, status) in enumerate(zip(self._progress.data, self._status.data)):
+            if row in objects:
+                yield progress_of(objects[row])
+            else:
+                yield progress, statuses[status]
+
+    def index_of(self, detail: Any) -> int:
+        """The index of ``detail`` itself, or -1."""
+        binding = getattr(detail, "_parent", None)
+        if isinstance(binding, _RowBinding) and binding.rows is self and binding.view() is detail:
+            return binding.row
+        for row, item in self._objects.items():
+            if item is detail:
+                return row
+        return -1
+
+    def dump(self, mode: str = "json", by_alias: bool = True, exclude_defaults: bool = False) -> List[Any]:
+        """Serializes the sub-tasks like the serializer of the model does, without materializing them."""
+        with self._lock:
+            keys = self._aliases if by_alias else tuple(self._names)
+            columns = [column.values(mode) for column in self._columns]
+            if exclude_defaults:
+                defaults = [column.default_in(mode) for column in self._columns]
+                dumped: List[Any] = [
+                    {key: value for key, value, default in zip(keys, row, defaults) if value != default}
+                    for row in zip(*columns)
+                ]
+            else:
+                dumped = [dict(zip(keys, row)) for row in zip(*columns)]
+            for row, item in self._objects.items():
+                if isinstance(item, BaseModel):
+                    item = item.model_dump(mode=mode, by_alias=by_alias, exclude_defaults=exclude_defaults)
+                dumped[row] = item
+        return dumped
+
+    def copy(self) -> "SubTaskColumns":
+        """A copy of the list that is not owned, sharing the items kept as they are."""
+        with self._lock:
+            copied = SubTaskColumns.__new__(SubTaskColumns)
+            copied.__dict__.update(self.__dict__)
+            copied._columns = [column.copy() for column in self._columns]
+            copied._progress = copied._columns[self._names["progress"]]
+            copied._status = copied._columns[self._names["status"]]
+            copied._objects = dict(self._objects)
+            copied._bindings = weakref.WeakValueDictionary()
+            copied._lock = threading.RLock()
+            copied._owner = None
+        return copied
+
+    def __copy__(self) -> "SubTaskColumns":
+        return self.copy()
+
+    def __deepcopy__(self, memo) -> "SubTaskColumns":
+        copied = self.copy()
+        copied._objects = {row: deepcopy(item, memo) for row, item in self._objects.items()}
+        return copied
+
+    def __reduce__(self):
+        with self._lock:
+            columns = [(column.data, getattr(column, "strings", None)) for column in self._columns]
+            return _restore, (self.model, columns, self._objects)
+
+    def __len__(self) -> int:
+        return len(self._progress.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[row] for row in range(*index.indices(len(self)))]
+        with self._lock:
+            row = self._row(index)
+            item = self._objects.get(row)
+            if item is not None or row in self._objects:
+                return item
+            binding = self._bindings.get(row)
+            view = binding.view() if binding is not None else None
+            if view is None:
+                view = self._materialize(row)
+            return view
+
+    def __iter__(self) -> Iterator[Any]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def __setitem__(self, index, value) -> None:
+        with self._lock:
+            if isinstance(index, slice):
+                rows = range(*index.indices(len(self)))
+                values = list(value)
+                if index.step not in (None, 1) and len(values) != len(rows):
+                    raise ValueError(
+                        f"attempt to assign sequence of size {len(values)} to extended slice of size {len(rows)}"
+                    )
+            else:
+                rows, values = range(self._row(index), self._row(index) + 1), [value]
+            if rows.step == 1 and len(rows) != len(values):
+                removed = self._delete(list(rows))
+                added = self._insert(rows.start, values)
+            else:
+                # As many items as rows replace them in place, without moving the rows after them.
+                removed, added = [], []
+                for row, item in zip(rows, values):
+                    removed.append(self._release(row))
+                    added.append(self._store(row, item))
+        # Reported without holding the lock, as the owner may read the list meanwhile.
+        self._recount(added, removed)
+
+    def __delitem__(self, index) -> None:
+        with self._lock:
+            rows = range(*index.indices(len(self))) if isinstance(index, slice) else [self._row(index)]
+            removed = self._delete(list(rows))
+        self._recount((), removed)
+
+    def insert(self, index: int, value: Any) -> None:
+        with self._lock:
+            length = len(self)
+            start = max(length + index, 0) if index < 0 else min(index, length)
+            added = self._insert(start, [value])
+        self._recount(added, ())
+
+    def append(self, value: Any) -> None:
+        with self._lock:
+            added = self._insert(len(self), [value])
+        self._recount(added, ())
+
+    def extend(self, values: Iterable[Any]) -> None:
+        values = list(values)
+        with self._lock:
+            added = self._insert(len(self), values)
+        self._recount(added, ())
+
+    def __iadd__(self, values: Iterable[Any]) -> "SubTaskColumns":
+        self.extend(values)
+        return self
+
+    def clear(self) -> None:
+        with self._lock:
+            removed = self._delete(list(range(len(self))))
+        self._recount((), removed)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(item == other_item for item, other_item in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.model.__name__}, {len(self)} rows)"
+
+    def _current_owner(self) -> Any:
+        return self._owner if self._owner is not None else _UNOWNED
+
+    def _row(self, index: int) -> int:
+        length = len(self)
+        row = index + length if index < 0 else index
+        if not 0 <= row < length:
+            raise IndexError("list index out of range")
+        return row
+
+    def _materialize(self, row: int) -> Any:
+        """Builds the sub-task of ``row`` without validation, like ``model_construct``."""
+        values = {}
+        fields_set = set()
+        for name, column in zip(self._names, self._columns):
+            value = values[name] = column.get(row)
+            if value != column.default:
+                fields_set.add(name)
+        view = self.model.__new__(self.model)
+        object.__setattr__(view, "__dict__", values)
+        object.__setattr__(view, "__pydantic_fields_set__", fields_set)
+        object.__setattr__(view, "__pydantic_extra__", None)
+        object.__setattr__(view, "__pydantic_private__", None)
+        self._bind_view(row, view)
+        return view
+
+    def _bind_view(self, row: int, view: Any) -> None:
+        binding = _RowBinding(self, row, view)
+        self._bindings[row] = binding
+        view._set_parent(binding)
+
+    def _fits(self, item: Any) -> bool:
+        """Whether ``item`` can be stored in the columns."""
+        if type(item) is not self.model:
+            return False
+        values = item.__dict__
+        return all(name in values and column.accepts(values[name]) for name, column in zip(self._names, self._columns))
+
+    def _insert(self, start: int, items: List[Any], bind: bool = True) -> List[Tuple[int, TaskStatus]]:
+        """Stores ``items`` from row ``start`` on. Returns what they add to the roll-up of the owner."""
+        if not items:
+            return []
+        owned = bind and self._owner is not None
+        self._shift(start, len(items))
+        rows: List[Dict[str, Any]] = []
+        added: List[Tuple[int, TaskStatus]] = []
+        for row, item in enumerate(items, start):
+            if self._fits(item):
+                rows.append(item.__dict__)
+                added.append((item.progress, item.status))
+                if owned:
+                    self._bind_view(row, item)
+                continue
+            # Kept as it is, over a row of default values.
+            rows.append(self._defaults)
+            self._objects[row] = item
+            added.append(progress_of(item))
+            if owned and callable(getattr(item, "_set_parent", None)):
+                item._set_parent(self._owner)
+        for name, column in zip(self._names, self._columns):
+            column.insert(start, [values[name] for values in rows])
+        return added
+
+    def _delete(self, rows: List[int]) -> List[Tuple[int, TaskStatus]]:
+        """Removes ``rows``. Returns what they removed from the roll-up of the owner."""
+        removed: List[Tuple[int, TaskStatus]] = []
+        for row in sorted(set(rows), reverse=True):
+            removed.append(self._release(row))
+            for column in self._columns:
+                del column.data[row]
+            self._shift(row + 1, -1)
+        return removed
+
+    def _release(self, row: int) -> Tuple[int, TaskStatus]:
+        """Detaches the sub-task of ``row`` from the list. Returns what it removes from the roll-up of the owner."""
+        if row in self._objects:
+            item = self._objects.pop(row)
+            if self._owner is not None and getattr(item, "_parent", None) is self._owner:
+                item._set_parent(None)
+            return progress_of(item)
+        binding = self._bindings.pop(row, None)
+        view = binding.view() if binding is not None else None
+        if view is not None:
+            view._set_parent(None)
+        return self._progress.get(row), self._status.get(row)
+
+    def _store(self, row: int, item: Any) -> Tuple[int, TaskStatus]:
+        """Stores ``item`` in the released ``row``. Returns what it adds to the roll-up of the owner."""
+        owned = self._owner is not None
+        if self._fits(item):
+            values = item.__dict__
+            for name, column in zip(self._names, self._columns):
+                column.set(row, values[name])
+            if owned:
+                self._bind_view(row, item)
+            return item.progress, item.status
+        for name, column in zip(self._names, self._columns):
+            column.set(row, self._defaults[name])
+        self._objects[row] = item
+        if owned and callable(getattr(item, "_set_parent", None)):
+            item._set_parent(self._owner)
+        return progress_of(item)
+
+    def _shift(self, start: int, delta: int) -> None:
+        """Moves the items and the materialized sub-tasks of the rows from ``start`` on by ``delta`` rows."""
+        if self._objects and max(self._objects) >= start:
+            self._objects = {row + delta if row >= start else row: item for row, item in self._objects.items()}
+        bindings = list(self._bindings.items())
+        if any(row >= start for row, _ in bindings):
+            moved: "weakref.WeakValueDictionary[int, _RowBinding]" = weakref.WeakValueDictionary()
+            for row, binding in bindings:
+                if row >= start:
+                    binding.row = row + delta
+                moved[binding.row] = binding
+            self._bindings = moved
+
+    def _recount(self, added: Iterable[Tuple[int, TaskStatus]], removed: Iterable[Tuple[int, TaskStatus]]) -> None:
+        self._current_owner()._recount(added, removed)
+
+    def _write_back(self, binding: _RowBinding, view: Any, name: str) -> None:
+        """Stores the new value of the field ``name`` of a materialized sub-task in its row."""
+        position = self._names.get(name)
+        if position is None or binding.view() is not view:
+            return
+        with self._lock:
+            if self._bindings.get(binding.row) is not binding:
+                return
+            column = self._columns[position]
+            value = getattr(view, name)
+            if column.accepts(value):
+                column.set(binding.row, value)
+                return
+            # The row cannot hold the value; the sub-task is kept as it is from now on.
+            del self._bindings[binding.row]
+            self._objects[binding.row] = view
+            view._set_parent(self._owner)
+
+
+def _restore(model: Type[BaseModel], columns: List[Tuple[Any, Optional[List[str]]]], objects: Dict[int, Any]):
+    rows = SubTaskColumns(model)
+    for column, (data, strings) in zip(rows._columns, columns):
+        column.data = data
+        if isinstance(column, _StrColumn):
+            column.strings = strings
+            column.index = {} if strings is None else {string: code for code, string in enumerate(strings)}
+    rows._objects = dict(objects)
+    return rows
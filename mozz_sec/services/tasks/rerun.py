@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from loguru import logger
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.artifacts.cache import sha256_file
+from mozz_sec.services.settings import SETTINGS
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+# The fields of an SBC sub-task set by its scanners, shared through the scan result cache.
+SCAN_RESULT_FIELDS = (
+    "message",
+    "category",
+    "category_url",
+    "sub_category",
+    "sub_category_url",
+    "cover",
+    "remark",
+    "report_url",
+)
+# The fields of an SBC sub-task holding the results of its scan, taken over by a rerun.
+RESULT_FIELDS = ("progress", "status") + SCAN_RESULT_FIELDS
+# The fields of an SBC sub-task reset before it is scanned again.
+RESET_FIELDS = ("progress", "status", "message")
+_ALIASES = {name: field.alias or name for name, field in SubSbcTask.model_fields.items()}
+
+
+class RerunPlan(NamedTuple):
+    """
+    Represents the difference between an SBC task and its previous run.
+
+    Attributes:
+        reused: The indexes of the sub-tasks whose results were taken from the previous run.
+        pending: The indexes of the sub-tasks to scan again.
+    """
+
+    reused: List[int]
+    pending: List[int]
+
+
+def plan_rerun(previous: Optional[SbcExecTask], task: SbcExecTask) -> RerunPlan:
+    """
+    Takes the results of the previous run of ``task`` over where they are still valid, and resets the
+    other sub-tasks of ``task`` so that they are scanned again.
+
+    A sub-task reuses the result of the sub-task of the previous run with the same file if that one
+    finished, the content hashes of both files are known and equal, and the scan type of the task is
+    unchanged. Faulted, stopped and unfinished sub-tasks, and changed or new files, are scanned again.
+    The content hash of a file missing from the request is computed from the file if it exists in the
+    workspace of the SBC packages, see ``content_hash``.
+
+    Returns:
+        RerunPlan: The indexes of the sub-tasks reused and of those to scan.
+    """
+    candidates: Dict[str, List[SubSbcTask]] = defaultdict(list)
+    if previous is not None and previous.detail.params.scan_type == task.detail.params.scan_type:
+        for item in previous.detail.details:
+            sub_task = _as_sub_task(item)
+            if sub_task is not None and sub_task.status == TaskStatus.Finished and sub_task.file_hash:
+                candidates[str(sub_task.file_path)].append(sub_task)
+
+    details = task.detail.details
+    plan = RerunPlan([], [])
+    for index, item in enumerate(details):
+        sub_task = _as_sub_task(item)
+        if sub_task is None:
+            continue
+        matches = candidates.get(str(sub_task.file_path))
+        file_hash = content_hash(sub_task) if matches else sub_task.file_hash
+        if matches and file_hash and matches[0].file_hash == file_hash:
+            match = matches.pop(0)
+            fields = {name: getattr(match, name) for name in RESULT_FIELDS}
+            plan.reused.append(index)
+        else:
+            fields = {name: SubSbcTask.model_fields[name].default for name in RESET_FIELDS}
+            plan.pending.append(index)
+        fields["file_hash"] = file_hash
+        _set(details, index, sub_task, fields)
+    return plan
+
+
+def _as_sub_task(item: Any) -> Optional[SubSbcTask]:
+    if isinstance(item, SubSbcTask):
+        return item
+    if isinstance(item, dict):
+        # Sub-tasks validated from JSON are plain dictionaries.
+        try:
+            return SubSbcTask.model_validate(item)
+        except ValueError:
+            return None
+    return None
+
+
+def content_hash(sub_task: SubSbcTask, workspace: Optional[str] = None) -> str:
+    """
+    Returns the content hash of the file of ``sub_task``: the one it was sent with, else the digest of
+    the file if it lies in ``workspace``, by default ``SETTINGS.sbc_workspace_dir``, or "". Other local
+    files are never hashed, the digest is returned to the client and would reveal their content.
+    """
+    if sub_task.file_hash:
+        return sub_task.file_hash
+    path = workspace_file(sub_task.file_path, SETTINGS.sbc_workspace_dir if workspace is None else workspace)
+    if path is None:
+        return ""
+    try:
+        return sha256_file(path)
+    except OSError as exc:
+        logger.warning(f"Cannot hash {path}: {exc}")
+        return ""
+
+
+def workspace_file(file_path: Any, workspace: Optional[str]) -> Optional[Path]:
+    """Returns the resolved path of the regular file ``file_path`` if it lies in ``workspace``, else None."""
+    if not workspace or not str(file_path):
+        return None
+    try:
+        path = Path(file_path).resolve()
+        root = Path(workspace).resolve()
+    except (OSError, RuntimeError):  # RuntimeError: a symlink loop
+        return None
+    if root not in path.parents or not path.is_file():
+        return None
+    return path
+
+
+def _set(details: Any, index: int, sub_task: SubSbcTask, fields: Dict[str, Any]) -> None:
+    """Sets ``fields`` of the sub-task ``index``, a model or a plain dictionary, where they differ."""
+    changed = {name: value for name, value in fields.items() if getattr(sub_task, name) != value}
+    if not changed:
+        return
+    item = details[index]
+    if item is sub_task:
+        for name, value in changed.items():
+            setattr(item, name, value)
+        return
+    # The result fields are plain values, only the status needs to be encoded.
+    values = {_ALIASES[name]: getattr(value, "value", value) for name, value in changed.items()}
+    details[index] = {**item, **values}
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import threading
+from copy import deepcopy
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from mozz_sec.services._types import TaskStatus
+
+
+def progress_of(detail: Any) -> Tuple[int, TaskStatus]:
+    """
+    Reads the progress and the status of a sub-task.
+
+    Sub-tasks are usually task models, but ``details`` accepts anything, so plain dictionaries
+    received from the API are read by key. Anything else counts as a waiting sub-task.
+    """
+    if isinstance(detail, dict):
+        try:
+            return int(detail.get("progress", 0)), TaskStatus(detail.get("status", TaskStatus.Waiting.value))
+        except (TypeError, ValueError):
+            return 0, TaskStatus.Waiting
+    return getattr(detail, "progress", 0), getattr(detail, "status", TaskStatus.Waiting)
+
+
+class ProgressRollup:
+    """
+    Keeps the running sums needed to derive the progress and the status of a task from its sub-tasks.
+
+    Every method is O(1), so a parent task can be kept up to date on every sub-task change.
+
+    Attributes:
+        count: The number of sub-tasks.
+        progress_sum: The sum of the progress of all sub-tasks.
+        status_counts: The number of sub-tasks per status.
+        lock: The lock to hold while updating the roll-up and the values derived from it, as sub-tasks
+            may be run by several threads.
+    """
+
+    __slots__ = ("count", "progress_sum", "status_counts", "lock")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.count = 0
+        self.progress_sum = 0
+        self.status_counts: Dict[TaskStatus, int] = dict.fromkeys(TaskStatus, 0)
+
+    def add(self, progress: int, status: TaskStatus) -> None:
+        self.count += 1
+        self.progress_sum += progress
+        self.status_counts[status] += 1
+
+    def remove(self, progress: int, status: TaskStatus) -> None:
+        self.count -= 1
+        self.progress_sum -= progress
+        self.status_counts[status] -= 1
+
+    def change_progress(self, old: int, new: int) -> None:
+        self.progress_sum += new - old
+
+    def change_status(self, old: TaskStatus, new: TaskStatus) -> None:
+        self.status_counts[old] -= 1
+        self.status_counts[new] += 1
+
+    @property
+    def progress(self) -> Optional[int]:
+        """The average progress of the sub-tasks, or None without sub-tasks."""
+        if self.count == 0:
+            return None
+        return int(self.progress_sum / self.count)
+
+    @property
+    def status(self) -> Optional[TaskStatus]:
+        """
+        The status of the parent task, or None without sub-tasks.
+
+        The parent is waiting until a sub-task starts and running while any sub-task has work left.
+        Once every sub-task reached a terminal status it is finished if all of them finished, faulted
+        if any of them faulted and stopped otherwise.
+        """
+        if self.count == 0:
+            return None
+        counts = self.status_counts
+        waiting = counts[TaskStatus.Waiting]
+        if waiting == self.count:
+            return TaskStatus.Waiting
+        if counts[TaskStatus.Running] or waiting:
+            return TaskStatus.Running
+        if counts[TaskStatus.Finished] == self.count:
+            return TaskStatus.Finished
+        if counts[TaskStatus.Fault]:
+            return TaskStatus.Fault
+        return TaskStatus.Stop
+
+
+def _number(details: Iterable[Any], start: int) -> None:
+    """Tells the sub-tasks among ``details`` that can keep it their index, counted from ``start``."""
+    for row, detail in enumerate(details, start):
+        set_row = getattr(detail, "_set_row", None)
+        if set_row is not None:
+            set_row(row)
+
+
+class DetailList(list):
+    """
+    Represents the ``details`` of a task, reporting every added or removed sub-task to its owner.
+
+    The owner must provide ``_adopt(detail)`` and ``_release(detail)``. Copies and pickles of the
+    list are plain lists; the owning task binds them again.
+
+    Sub-tasks that provide ``_set_row(row)`` are told their index whenever it changes, so that
+    ``index_of`` finds them in O(1). Appending keeps the other indexes, inserting or removing a
+    sub-task renumbers the ones after it, which the list moves anyway.
+    """
+
+    __slots__ = ("_owner",)
+
+    def __init__(self, iterable: Iterable[Any] = (), owner: Any = None):
+        super().__init__(iterable)
+        self._owner = owner
+        _number(self, 0)
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [deepcopy(detail, memo) for detail in self]
+
+    def index_of(self, detail: Any) -> int:
+        """The index of ``detail`` itself rather than of an equal sub-task, or -1."""
+        row = getattr(detail, "_row", None)
+        if row is not None and row < len(self) and self[row] is detail:
+            return row
+        return next((index for index, item in enumerate(self) if item is detail), -1)
+
+    def append(self, detail: Any) -> None:
+        super().append(detail)
+        _number((detail,), len(self) - 1)
+        self._owner._adopt(detail)
+
+    def extend(self, details: Iterable[Any]) -> None:
+        details = list(details)
+        start = len(self)
+        super().extend(details)
+        _number(details, start)
+        for detail in details:
+            self._owner._adopt(detail)
+
+    def __iadd__(self, details: Iterable[Any]) -> "DetailList":
+        self.extend(details)
+        return self
+
+    def insert(self, index: int, detail: Any) -> None:
+        start = min(index, len(self)) if index >= 0 else max(len(self) + index, 0)
+        super().insert(index, detail)
+        _number(self[start:], start)
+        self._owner._adopt(detail)
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            value = list(value)
+            removed, added = self[index], value
+            start = index.indices(len(self))[0]
+        else:
+            removed, added = [self[index]], [value]
+            start = index % len(self)
+        super().__setitem__(index, value)
+        # A slice may change the length, moving the sub-tasks after it.
+        _number(self[start:] if isinstance(index, slice) else added, start)
+        for detail in removed:
+            self._owner._release(detail)
+        for detail in added:
+            self._owner._adopt(detail)
+
+    def __delitem__(self, index) -> None:
+        if isinstance(index, slice):
+            removed = self[index]
+            start = index.indices(len(self))[0]
+        else:
+            removed = [self[index]]
+            start = index % len(self)
+        super().__delitem__(index)
+        _number(self[start:], start)
+        for detail in removed:
+            self._owner._release(detail)
+
+    def pop(self, index: int = -1) -> Any:
+        start = index % len(self) if self else 0
+        detail = super().pop(index)
+        _number(self[start:], start)
+        self._owner._release(detail)
+        return detail
+
+    def remove(self, detail: Any) -> None:
+        start = self.index(detail)
+        super().__delitem__(start)
+        _number(self[start:], start)
+        self._owner._release(detail)
+
+    def clear(self) -> None:
+        removed = list(self)
+        super().clear()
+        for detail in removed:
+            self._owner._release(detail)
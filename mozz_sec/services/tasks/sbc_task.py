@@ -1,6 +1,6 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Any
+from typing import Any, ClassVar, Optional, Type
 
 from pydantic import Field, BaseModel, ConfigDict
 from pydantic.alias_generators import to_camel
@@ -21,11 +21,13 @@ class SubSbcTask(BaseSubTask):
             - populate_by_name: A boolean indicating whether to populate the configuration by name.
             - alias_generator: A function used to generate aliases for the configuration.
         file_path: The path to the file associated with the subtask.
+        file_hash: The SHA-256 digest of the content of the file, which lets a rerun reuse the result.
     """
 
     model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
 
     file_path: Path = Field(default="", alias="file", exclude=False)
+    file_hash: str = ""
 
 
 class SbcCleanseData(TestDataSbc):
@@ -58,11 +60,14 @@ class SbcCleanseTask(TaskWithDetail):
         model_config: The configuration for the model. It is a ConfigDict object with the following properties:
             - populate_by_name: A boolean indicating whether to populate the configuration by name.
             - alias_generator: A function used to generate aliases for the configuration.
+        sub_task_model: The SBC sub-tasks, one per file, are stored as columns.
         params: The cleanse data for SBC. It is a SbcCleanseData object.
     """
 
     model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
 
+    sub_task_model: ClassVar[Optional[Type[BaseModel]]] = SubSbcTask
+
     params: SbcCleanseData
 
 
@@ -77,21 +82,16 @@ class SbcExecTask(BaseExecTask):
             - populate_by_name: A boolean indicating whether to populate the configuration by name.
             - alias_generator: A function used to generate aliases for the configuration.
         detail: The cleanse task detail for SBC. It is a SbcCleanseTask object.
-
-    Args:
-        **data: Additional keyword arguments to initialize the task.
-
-    Returns:
-        None.
     """
 
     model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
 
     detail: SbcCleanseTask
 
-    def __init__(self, **data: Any):
-        super().__init__(**data)
-        self.task_type = "SBC_EXEC"
+    def model_post_init(self, __context: Any) -> None:
+        self.__dict__["task_type"] = "SBC_EXEC"
+        self.__pydantic_fields_set__.add("task_type")
+        super().model_post_init(__context)
 
 
 if __name__ == "__main__":
@@ -1,14 +1,23 @@
 from __future__ import annotations
 
-from typing import List, Any
+import hashlib
+import itertools
+from functools import lru_cache
+from typing import Callable, ClassVar, Dict, Iterable, List, Any, Optional, Tuple, Type
 
 from loguru import logger
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, SerializationInfo, SerializerFunctionWrapHandler, TypeAdapter
+from pydantic import field_serializer
 from pydantic.alias_generators import to_camel
 
 from mozz_sec.services._types import TaskStatus, Url
+from mozz_sec.services.tasks.columnar import SubTaskColumns
+from mozz_sec.services.tasks.rollup import DetailList, ProgressRollup, progress_of
 from mozz_sec.data.common_data import InstanceInfo, Common
 
+# Shared by all tasks so that a version is never reused, even by a task loaded again from a store.
+_VERSIONS = itertools.count(1)
+
 
 class TaskWithProgress(BaseModel):
     """
@@ -22,8 +31,14 @@ class TaskWithProgress(BaseModel):
         status: The status of the task. It is a TaskStatus object.
         message: The message associated with the task.
         task_id: The ID of the task.
+
+    A task that is part of another task reports every field change to that parent task, which keeps
+    its own progress and status up to date without walking its children, and bumps the version of
+    the execution task it belongs to.
     """
 
+    __slots__ = ("_parent", "_row")
+
     model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
 
     progress: int = Field(0, ge=0, le=100)
@@ -31,6 +46,37 @@ class TaskWithProgress(BaseModel):
     message: str = ""
     task_id: str = ""
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name not in type(self).model_fields:
+            super().__setattr__(name, value)
+            return
+        parent = getattr(self, "_parent", None)
+        if parent is None:
+            super().__setattr__(name, value)
+            self._touch(self, name)
+            return
+        old = getattr(self, name)
+        super().__setattr__(name, value)
+        # Reported before the parent reacts, so observers see the change before its consequences.
+        self._touch(self, name)
+        parent._on_child_changed(self, name, old, value)
+
+    def _on_child_changed(self, child: "TaskWithProgress", name: str, old: Any, new: Any) -> None:
+        """Called after a field of a child task changed."""
+
+    def _touch(self, source: Optional["TaskWithProgress"] = None, name: Optional[str] = None) -> None:
+        """Called after the field ``name`` of the task ``source``, this task or one it contains, changed."""
+        parent = getattr(self, "_parent", None)
+        if parent is not None:
+            parent._touch(source, name)
+
+    def _set_parent(self, parent: Optional["TaskWithProgress"]) -> None:
+        object.__setattr__(self, "_parent", parent)
+
+    def _set_row(self, row: int) -> None:
+        """Remembers the index of the task in the details of its parent, see ``DetailList.index_of``."""
+        object.__setattr__(self, "_row", row)
+
 
 class BaseTask(TaskWithProgress):
     """
@@ -62,32 +108,206 @@ class TaskWithDetail(BaseTask):
         model_config: The configuration for the model. It is a ConfigDict object with the following properties:
             - populate_by_name: A boolean indicating whether to populate the configuration by name.
             - alias_generator: A function used to generate aliases for the configuration.
+        sub_task_model: The model of the sub-tasks, if they are stored as columns, see ``SubTaskColumns``.
         secguard_workspace_url: The URL for the SecGuard workspace.
         details: A list of details associated with the task.
         params: The parameters for the task.
+
+    The progress and the status of a task with details are derived from its details. They are kept up
+    to date incrementally whenever a detail is added, removed or changes its progress or status, so
+    reading them is O(1). Details given as plain dictionaries are counted as they were added. Once the
+    last detail is removed, the task is waiting again with no progress.
+
+    When serialized with ``context={"slim": True}``, the details leave out the fields that have their
+    default value.
     """
 
+    __slots__ = ("_rollup", "_derived")
+
     model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
 
+    sub_task_model: ClassVar[Optional[Type[BaseModel]]] = None
+
     secguard_workspace_url: Url = "https://www.huawei.com/"
     details: List[Any] = Field(default_factory=list)
     params: Any
 
-    def update_progress(self):
-        if len(self.details) == 0:
+    def model_post_init(self, __context: Any) -> None:
+        self.__dict__["details"] = self._bind_details(self.details)
+        self._refresh(notify=False)
+
+    @field_serializer("details", mode="wrap")
+    def _serialize_details(self, details: List[Any], handler: SerializerFunctionWrapHandler, info: SerializationInfo):
+        slim = bool(info.context and info.context.get("slim"))
+        if isinstance(details, SubTaskColumns):
+            return details.dump(info.mode, by_alias=info.by_alias, exclude_defaults=slim or info.exclude_defaults)
+        if not slim:
+            return handler(details)
+        kinds = {type(detail) for detail in details}
+        if len(kinds) == 1:
+            kind = kinds.pop()
+            if issubclass(kind, BaseModel):
+                # One pass through the serializer of the whole list rather than one call per detail.
+                return _list_adapter(kind).dump_python(details, mode=info.mode, by_alias=True, exclude_defaults=True)
+        return [
+            detail.model_dump(mode=info.mode, by_alias=True, exclude_defaults=True)
+            if isinstance(detail, BaseModel)
+            else detail
+            for detail in details
+        ]
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "details":
+            self._unbind_details()
+            value = self._bind_details(value)
+            super().__setattr__(name, value)
+            self._refresh()
             return
-        progress = 0
-        for detail in self.details:
-            self.progress += detail.progress
-        self.progress = int(self.progress / len(self.details))
+        super().__setattr__(name, value)
+
+    def __copy__(self):
+        copied = super().__copy__()
+        copied.__dict__["details"] = copied._bind_details(copied.details, adopt=False)
+        return copied
+
+    def __deepcopy__(self, memo=None):
+        copied = super().__deepcopy__(memo)
+        copied.__dict__["details"] = copied._bind_details(copied.details)
+        return copied
+
+    def __setstate__(self, state: Any) -> None:
+        super().__setstate__(state)
+        self.__dict__["details"] = self._bind_details(self.details)
+
+    def update_progress(self):
+        progress = self._rollup.progress
+        if progress is not None:
+            self.progress = progress
 
     def update_status(self):
-        logger.error("TODO")
+        status = self._rollup.status
+        if status is not None:
+            self.status = status
+
+    def _bind_details(self, details: Any, adopt: bool = True) -> List[Any]:
+        """Wraps ``details`` into a list reporting to this task and counts its entries."""
+        rollup = ProgressRollup()
+        object.__setattr__(self, "_rollup", rollup)
+        if getattr(self, "_derived", None) is None:
+            # Whether the progress and the status come from details, kept when the details are replaced.
+            object.__setattr__(self, "_derived", bool(details))
+        model = self.sub_task_model
+        if model is not None:
+            if isinstance(details, SubTaskColumns) and details.model is model:
+                columns = details if details.owner is None else details.copy()
+            else:
+                columns = SubTaskColumns(model, details, owner=self if adopt else None)
+            columns.bind(self, adopt)
+            for entry in columns.rollup_entries():
+                rollup.add(*entry)
+            return columns
+        bound = DetailList(details, owner=self)
+        for detail in bound:
+            if adopt and isinstance(detail, TaskWithProgress):
+                detail._set_parent(self)
+            rollup.add(*progress_of(detail))
+        return bound
+
+    def _unbind_details(self) -> None:
+        details = self.__dict__.get("details")
+        if isinstance(details, SubTaskColumns):
+            if details.owner is self:
+                details.detach(_DETACHED)
+            return
+        if isinstance(details, DetailList) and details._owner is self:
+            details._owner = _DETACHED
+        for detail in details or ():
+            if isinstance(detail, TaskWithProgress) and getattr(detail, "_parent", None) is self:
+                detail._set_parent(None)
+
+    def _adopt(self, detail: Any) -> None:
+        if isinstance(detail, TaskWithProgress):
+            detail._set_parent(self)
+        with self._rollup.lock:
+            self._rollup.add(*progress_of(detail))
+            self._touch(self, "details")
+            self._refresh()
+
+    def _release(self, detail: Any) -> None:
+        if isinstance(detail, TaskWithProgress) and getattr(detail, "_parent", None) is self:
+            detail._set_parent(None)
+        with self._rollup.lock:
+            self._rollup.remove(*progress_of(detail))
+            self._touch(self, "details")
+            self._refresh()
+
+    def _recount(self, added: Iterable[Tuple[int, TaskStatus]], removed: Iterable[Tuple[int, TaskStatus]]) -> None:
+        """Called by ``SubTaskColumns`` after sub-tasks were added or removed."""
+        with self._rollup.lock:
+            for entry in removed:
+                self._rollup.remove(*entry)
+            for entry in added:
+                self._rollup.add(*entry)
+            self._touch(self, "details")
+            self._refresh()
+
+    def _on_child_changed(self, child: TaskWithProgress, name: str, old: Any, new: Any) -> None:
+        if name not in ("progress", "status"):
+            return
+        with self._rollup.lock:
+            if name == "progress":
+                self._rollup.change_progress(old, new)
+            else:
+                self._rollup.change_status(old, new)
+            self._refresh()
+
+    def _refresh(self, notify: bool = True) -> None:
+        """Copies the progress and the status derived from the details, or resets them once there are none."""
+        progress, status = self._rollup.progress, self._rollup.status
+        if progress is None:
+            if not self._derived:
+                return
+            progress, status = 0, TaskStatus.Waiting
+        object.__setattr__(self, "_derived", self._rollup.count > 0)
+        if not notify:
+            self.__dict__["progress"], self.__dict__["status"] = progress, status
+            return
+        if self.progress != progress:
+            self.progress = progress
+        if self.status != status:
+            self.status = status
 
     def start_cleanse(self):
         logger.error("开始清洗: TODO")
 
 
+@lru_cache(maxsize=None)
+def _list_adapter(kind: type) -> TypeAdapter:
+    return TypeAdapter(List[kind])
+
+
+class _Detached:
+    """The owner of detail lists that no longer belong to a task."""
+
+    def _adopt(self, detail: Any) -> None:
+        pass
+
+    def _release(self, detail: Any) -> None:
+        pass
+
+    def _touch(self, source: Optional[TaskWithProgress] = None, name: Optional[str] = None) -> None:
+        pass
+
+    def _on_child_changed(self, child: TaskWithProgress, name: str, old: Any, new: Any) -> None:
+        pass
+
+    def _recount(self, added: Iterable[Tuple[int, TaskStatus]], removed: Iterable[Tuple[int, TaskStatus]]) -> None:
+        pass
+
+
+_DETACHED = _Detached()
+
+
 class BaseExecTask(BaseTask):
     """
     Represents the execution task.
@@ -96,10 +316,106 @@ class BaseExecTask(BaseTask):
 
     Attributes:
         detail: The detail of the task. It is a BaseTaskDetail object.
+
+    The progress and the status of a task whose detail derives them from sub-tasks are copied from the
+    detail when the task is built, and changes of them are mirrored to the task as they happen.
+
+    Every change of a field of the task, of its detail or of the sub-tasks of its detail, and every
+    sub-task added or removed, gives the task a new ``version``. Changes made inside a field value,
+    e.g. to the ``params`` of the detail, are not seen and must be followed by ``touch``. The JSON
+    of the task is cached per version and view, see ``dump_json_cached``. The changes are also reported to
+    the observers of the task, see ``observe``.
     """
 
+    __slots__ = ("_version", "_serialized", "_observers")
+
     detail: TaskWithDetail = Field(default_factory=TaskWithDetail)
 
+    def model_post_init(self, __context: Any) -> None:
+        self.detail._set_parent(self)
+        if self.detail._derived:
+            self.__dict__["progress"], self.__dict__["status"] = self.detail.progress, self.detail.status
+        self._touch()
+
+    @property
+    def version(self) -> int:
+        """The version of the task, increased whenever the task changes."""
+        return self._version
+
+    def touch(self) -> None:
+        """Gives the task a new version, after it was changed in a way that is not tracked."""
+        self._touch()
+
+    def observe(self, observer: TaskObserver) -> None:
+        """
+        Calls ``observer(task, source, name)`` after every change of the task, from the thread making
+        the change. ``source`` is the task, its detail or the sub-task whose field ``name`` changed,
+        ``name`` is ``"details"`` when sub-tasks were added or removed, and both are None after
+        ``touch``. Adding the same observer again has no effect.
+        """
+        observers = getattr(self, "_observers", ())
+        if observer not in observers:
+            object.__setattr__(self, "_observers", observers + (observer,))
+
+    def unobserve(self, observer: TaskObserver) -> None:
+        observers = getattr(self, "_observers", ())
+        object.__setattr__(self, "_observers", tuple(o for o in observers if o != observer))
+
+    def dump_json_cached(self, slim: bool = False) -> bytes:
+        """
+        Returns the JSON of the task with its field aliases, serialized at most once per version.
+        ``slim`` leaves out the fields of sub-tasks that have their default value.
+        """
+        return self._dump_cached(slim)[0]
+
+    def json_digest(self, slim: bool = False) -> str:
+        """
+        Returns a digest of the JSON of ``dump_json_cached``. Unlike the version, it only depends on the
+        content of the task, so it is the same in every process and after the task is loaded again.
+        """
+        return self._dump_cached(slim)[1]
+
+    def _dump_cached(self, slim: bool) -> Tuple[bytes, str]:
+        serialized: Dict[bool, Tuple[int, bytes, str]] = getattr(self, "_serialized", None) or {}
+        version = self._version
+        cached = serialized.get(slim)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        data = type(self).__pydantic_serializer__.to_json(self, by_alias=True, context={"slim": True} if slim else None)
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        # Cached under the version read before dumping, so a change made meanwhile is never hidden.
+        object.__setattr__(self, "_serialized", {**serialized, slim: (version, data, digest)})
+        return data, digest
+
+    def _touch(self, source: Optional[TaskWithProgress] = None, name: Optional[str] = None) -> None:
+        object.__setattr__(self, "_version", next(_VERSIONS))
+        for observer in getattr(self, "_observers", ()):
+            observer(self, source, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "detail":
+            if getattr(self.detail, "_parent", None) is self:
+                self.detail._set_parent(None)
+            if isinstance(value, TaskWithProgress):
+                value._set_parent(self)
+        super().__setattr__(name, value)
+
+    def __copy__(self):
+        copied = super().__copy__()
+        copied._touch()
+        return copied
+
+    def __deepcopy__(self, memo=None):
+        copied = super().__deepcopy__(memo)
+        copied.detail._set_parent(copied)
+        copied._touch()
+        return copied
+
+    def __setstate__(self, state: Any) -> None:
+        super().__setstate__(state)
+        self.detail._set_parent(self)
+        self._touch()
+
     def update_progress(self):
         self.detail.update_progress()
         self.progress = self.detail.progress
@@ -108,10 +424,17 @@ class BaseExecTask(BaseTask):
         self.detail.update_status()
         self.status = self.detail.status
 
+    def _on_child_changed(self, child: TaskWithProgress, name: str, old: Any, new: Any) -> None:
+        if child is self.detail and name in ("progress", "status"):
+            setattr(self, name, new)
+
     def update(self):
         pass
 
 
+TaskObserver = Callable[[BaseExecTask, Optional[TaskWithProgress], Optional[str]], None]
+
+
 class BaseSubTask(TaskWithProgress):
     """
     Represents a base subtask.
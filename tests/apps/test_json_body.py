@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from mozz_sec.services.apps.data_cleanse_app import app as cleanse_app
+from mozz_sec.services.bodies import JsonBody, document_bodies
+from mozz_sec.services.tasks.bas_task import BasExecTask
+from mozz_sec.services.tasks.sbc_task import SbcExecTask
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+SBC_BODY = JsonBody(SbcExecTask)
+BAS_BODY = JsonBody(BasExecTask)
+
+app = FastAPI()
+document_bodies(app, SBC_BODY)
+
+
+@app.post("/fastapi/sbc")
+async def fastapi_sbc(task: SbcExecTask) -> dict:
+    return json.loads(task.model_dump_json(by_alias=True))
+
+
+@app.post("/raw/sbc", openapi_extra=SBC_BODY.openapi)
+async def raw_sbc(task: SbcExecTask = Depends(SBC_BODY)) -> dict:
+    return json.loads(task.model_dump_json(by_alias=True))
+
+
+@app.post("/fastapi/bas")
+async def fastapi_bas(task: BasExecTask) -> dict:
+    return json.loads(task.model_dump_json(by_alias=True))
+
+
+@app.post("/raw/bas", openapi_extra=BAS_BODY.openapi)
+async def raw_bas(task: BasExecTask = Depends(BAS_BODY)) -> dict:
+    return json.loads(task.model_dump_json(by_alias=True))
+
+
+client = TestClient(app)
+
+
+def _with_params(tool: str, params_file: str) -> bytes:
+    task = json.loads((DATA_DIR / f"{tool}_exec" / "task-001.json").read_text(encoding="utf-8"))
+    task["detail"]["params"] = json.loads((DATA_DIR / tool / params_file).read_text(encoding="utf-8"))
+    return json.dumps(task).encode("utf-8")
+
+
+@pytest.mark.parametrize("tool", ["sbc", "bas"])
+@pytest.mark.parametrize(
+    "body, headers",
+    [
+        ("task-001", {}),
+        ("valid_01", {}),
+        ("invalid_01", {}),
+        ("invalid_02", {}),
+        (b"", {}),
+        (b"{", {}),
+        (b'{"detail": ', {}),
+        (b"null", {}),
+        (b"\xff\xfe{", {}),
+        ("task-001", {"Content-Type": "application/vnd.api+json"}),
+    ],
+)
+def test_same_result_as_fastapi(tool, body, headers):
+    if body == "task-001":
+        body = (DATA_DIR / f"{tool}_exec" / "task-001.json").read_bytes()
+    elif isinstance(body, str):
+        body = _with_params(tool, f"{body}.json")
+    headers = {"Content-Type": "application/json", **headers}
+
+    expected = client.post(f"/fastapi/{tool}", content=body, headers=headers)
+    response = client.post(f"/raw/{tool}", content=body, headers=headers)
+    assert response.status_code == expected.status_code
+    assert response.json() == expected.json()
+
+
+@pytest.mark.parametrize("tool", ["sbc", "bas"])
+@pytest.mark.parametrize("body, headers", [(b"[]", {}), (b"{}", {"Content-Type": "text/plain"})])
+def test_bodies_that_are_no_objects_are_rejected_without_reading_their_attributes(tool, body, headers):
+    headers = {"Content-Type": "application/json", **headers}
+
+    expected = client.post(f"/fastapi/{tool}", content=body, headers=headers)
+    response = client.post(f"/raw/{tool}", content=body, headers=headers)
+
+    assert response.status_code == expected.status_code == 422
+    [error] = response.json()["detail"]
+    assert (error["type"], error["loc"]) == ("model_type", ["body"])
+    assert expected.json()["detail"][0]["type"] == "model_attributes_type"
+
+
+def test_openapi_documents_the_body():
+    document = app.openapi()
+    body = document["paths"]["/raw/sbc"]["post"]["requestBody"]
+    assert body == document["paths"]["/fastapi/sbc"]["post"]["requestBody"]
+    assert "SbcExecTask" in document["components"]["schemas"]
+
+    document = cleanse_app.openapi()
+    assert document["paths"]["/cleanse/v1/tools/{tool}/tasks"]["post"]["requestBody"]["required"] is True
+    assert "AnalyseTask" in document["components"]["schemas"]
+
+
+@pytest.mark.parametrize("model, task_type", [(SbcExecTask, "SBC_EXEC"), (BasExecTask, "BAS_EXEC")])
+def test_task_type_is_set_once(model, task_type):
+    tool = task_type.split("_")[0].lower()
+    body = json.loads((DATA_DIR / f"{tool}_exec" / "task-001.json").read_text(encoding="utf-8"))
+    body["taskType"] = "OTHER"
+    task = JsonBody(model).parse(json.dumps(body).encode("utf-8"))
+    assert task.task_type == task_type
+    assert "task_type" in task.model_fields_set
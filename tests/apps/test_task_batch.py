@@ -0,0 +1,107 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.apps.sbc_exec_app import app, TASK_LIST
+from mozz_sec.services.tasks.sbc_task import SbcExecTask
+
+client = TestClient(app)
+
+URL = "/executor/v1/tools/sbc/tasks:batchCreate"
+
+
+@pytest.fixture
+def task_data():
+    data = {
+        "detail": {
+            "params": {
+                "username": "p_mozzps",
+                "password": "Huawei12#$",
+                "url-list": [],
+                "scan-type": {"binscope": True},
+            }
+        }
+    }
+    return json.loads(SbcExecTask.model_validate(data).model_dump_json(by_alias=True))
+
+
+def test_create_tasks(task_data):
+    TASK_LIST["batch-taken"] = SbcExecTask.model_validate(task_data)
+    invalid = json.loads(json.dumps(task_data))
+    invalid["detail"]["params"]["scan-type"] = {}
+
+    response = client.post(
+        URL,
+        json=[
+            {"taskId": "batch-1", "task": task_data},
+            {"taskId": "batch-taken", "task": task_data},
+            {"taskId": "batch-2", "task": invalid},
+            {"task": task_data},
+            {"taskId": "batch-1", "task": task_data},
+            {"taskId": "batch-3", "task": task_data},
+        ],
+    )
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [(result["taskId"], result["statusCode"]) for result in results] == [
+        ("batch-1", 201),
+        ("batch-taken", 409),
+        ("batch-2", 422),
+        (None, 422),
+        ("batch-1", 409),
+        ("batch-3", 201),
+    ]
+    assert results[1]["detail"] == "Task with task_id batch-taken already exists."
+    assert results[2]["detail"][0]["loc"] == ["body", 2, "task", "detail", "params", "scan-type"]
+    assert results[3]["detail"][0]["loc"] == ["body", 3, "taskId"]
+    assert TASK_LIST["batch-3"].task_id == "batch-3"
+    assert "batch-2" not in TASK_LIST
+
+
+@pytest.mark.parametrize("body", [b"{}", b"[", b'"tasks"'])
+def test_create_tasks_with_invalid_body(body):
+    response = client.post(URL, content=body, headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][0] == "body"
+
+
+def test_batch_get(task_data):
+    TASK_LIST["lookup-1"] = SbcExecTask.model_validate({**task_data, "taskId": "lookup-1"})
+    TASK_LIST["lookup-1"].progress = 30
+
+    response = client.post("/executor/v1/tools/sbc/tasks:batchGet", json={"taskIds": ["lookup-1", "lookup-missing"]})
+
+    assert response.status_code == 200
+    assert response.json()["missing"] == ["lookup-missing"]
+    [summary] = response.json()["tasks"]
+    assert (summary["taskId"], summary["progress"], summary["taskType"]) == ("lookup-1", 30, "SBC_EXEC")
+
+
+def test_list_tasks(task_data):
+    for i in range(5):
+        TASK_LIST[f"list-{i}"] = SbcExecTask.model_validate({**task_data, "taskId": f"list-{i}"})
+        TASK_LIST[f"list-{i}"].common.pbi = "list-pbi"
+        TASK_LIST.save(TASK_LIST[f"list-{i}"])
+    TASK_LIST["list-3"].status = TaskStatus.Fault
+
+    params = {"pbi": "list-pbi", "limit": 2}
+    pages = []
+    while True:
+        page = client.get("/executor/v1/tools/sbc/tasks:list", params=params).json()
+        pages.append([task["taskId"] for task in page["tasks"]])
+        if page["nextCursor"] is None:
+            break
+        params["cursor"] = page["nextCursor"]
+    assert pages == [["list-0", "list-1"], ["list-2", "list-3"], ["list-4"]]
+
+    page = client.get("/executor/v1/tools/sbc/tasks:list", params={"pbi": "list-pbi", "status": "F"}).json()
+    assert [task["taskId"] for task in page["tasks"]] == ["list-3"]
+
+
+@pytest.mark.parametrize("params", [{"status": "X"}, {"cursor": "%%"}, {"limit": 0}])
+def test_list_tasks_with_invalid_query(params):
+    assert client.get("/executor/v1/tools/sbc/tasks:list", params=params).status_code == 422
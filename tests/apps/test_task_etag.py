@@ -0,0 +1,110 @@
+import copy
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.apps.sbc_exec_app import app, TASK_LIST
+from mozz_sec.services.conditional import etag_matches, task_etag
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def sbc_task():
+    task = SbcExecTask.model_validate(
+        {
+            "detail": {
+                "params": {
+                    "username": "p_mozzps",
+                    "password": "Huawei12#$",
+                    "url-list": [],
+                    "scan-type": {"binscope": True},
+                }
+            }
+        }
+    )
+    task.detail.details.append(SubSbcTask())
+    return task
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda task: setattr(task, "message", "running"),
+        lambda task: setattr(task.detail, "message", "running"),
+        lambda task: setattr(task.detail.details[0], "status", TaskStatus.Running),
+        lambda task: setattr(task.detail.details[0], "remark", "retried"),
+        lambda task: task.detail.details.append(SubSbcTask()),
+        lambda task: task.detail.details.clear(),
+        lambda task: task.touch(),
+    ],
+)
+def test_version_is_bumped_on_change(sbc_task, change):
+    version = sbc_task.version
+    change(sbc_task)
+    assert sbc_task.version > version
+
+
+def test_copies_get_their_own_version(sbc_task):
+    copied = copy.deepcopy(sbc_task)
+    assert copied.version != sbc_task.version
+
+    version = sbc_task.version
+    copied.detail.details[0].progress = 50
+    assert sbc_task.version == version
+
+
+def test_serialized_once_per_version(sbc_task):
+    data = sbc_task.dump_json_cached()
+    assert sbc_task.dump_json_cached() is data
+    assert json.loads(data) == json.loads(sbc_task.model_dump_json(by_alias=True))
+
+    sbc_task.detail.details[0].progress = 50
+    assert json.loads(sbc_task.dump_json_cached())["detail"]["details"][0]["progress"] == 50
+
+
+def test_conditional_get(sbc_task):
+    TASK_LIST["task-etag"] = sbc_task
+
+    response = client.get("/executor/v1/tools/sbc/tasks/task-etag")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert response.json() == json.loads(sbc_task.model_dump_json(by_alias=True))
+
+    response = client.get("/executor/v1/tools/sbc/tasks/task-etag", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    sbc_task.detail.details[0].status = TaskStatus.Finished
+    response = client.get("/executor/v1/tools/sbc/tasks/task-etag", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["status"] == TaskStatus.Finished.value
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (None, False),
+        ("*", True),
+        ('"a-1"', True),
+        ('W/"a-1"', True),
+        ('"a-0", "a-1"', True),
+        ('"a-10"', False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, '"a-1"') is expected
+
+
+def test_etag_is_stable_across_reloads(sbc_task):
+    stored = sbc_task.model_dump_json(by_alias=True)
+    first, second = SbcExecTask.model_validate_json(stored), SbcExecTask.model_validate_json(stored)
+
+    assert first.version != second.version
+    assert task_etag(first) == task_etag(second) == task_etag(sbc_task)
+    assert task_etag(first, slim=True) == task_etag(second, slim=True)
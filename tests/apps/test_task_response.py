@@ -0,0 +1,79 @@
+import json
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.apps.sbc_exec_app import app, TASK_LIST
+from mozz_sec.services.batch import TaskBatchResult
+from mozz_sec.services.responses import ModelResponse, dump_json
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def sbc_task():
+    task = SbcExecTask.model_validate(
+        {"detail": {"params": {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}}}
+    )
+    task.detail.details.extend([SubSbcTask(), SubSbcTask(category="lib.so", progress=40, status=TaskStatus.Running)])
+    return task
+
+
+def test_dump_json_matches_model_dump_json(sbc_task):
+    assert dump_json(sbc_task) == sbc_task.model_dump_json(by_alias=True).encode("utf-8")
+
+    results = [TaskBatchResult(task_id="a", status_code=201), TaskBatchResult(status_code=422, detail=[])]
+    assert json.loads(dump_json(results, List[TaskBatchResult])) == [
+        result.model_dump(by_alias=True) for result in results
+    ]
+
+
+def test_model_response_renders_bytes_as_is():
+    response = ModelResponse(b'{"a":1}', status_code=201)
+    assert response.body == b'{"a":1}'
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+
+
+def test_slim_leaves_out_default_fields_of_sub_tasks(sbc_task):
+    full = json.loads(sbc_task.dump_json_cached())
+    slim = json.loads(sbc_task.dump_json_cached(slim=True))
+
+    assert slim["detail"]["details"] == [{}, {"category": "lib.so", "progress": 40, "status": TaskStatus.Running.value}]
+    del full["detail"]["details"], slim["detail"]["details"]
+    assert slim == full
+
+
+def test_slim_with_mixed_details(sbc_task):
+    sbc_task.detail.details.append({"category": "raw"})
+    slim = json.loads(sbc_task.dump_json_cached(slim=True))
+    running = {"category": "lib.so", "progress": 40, "status": TaskStatus.Running.value}
+    assert slim["detail"]["details"] == [{}, running, {"category": "raw"}]
+
+
+def test_views_are_cached_separately(sbc_task):
+    full, slim = sbc_task.dump_json_cached(), sbc_task.dump_json_cached(slim=True)
+    assert sbc_task.dump_json_cached() is full
+    assert sbc_task.dump_json_cached(slim=True) is slim
+
+    sbc_task.detail.details[0].progress = 10
+    assert json.loads(sbc_task.dump_json_cached(slim=True))["detail"]["details"][0] == {"progress": 10}
+
+
+def test_get_slim_view(sbc_task):
+    TASK_LIST["task-slim"] = sbc_task
+
+    full = client.get("/executor/v1/tools/sbc/tasks/task-slim")
+    slim = client.get("/executor/v1/tools/sbc/tasks/task-slim", params={"view": "slim"})
+    assert slim.status_code == 200
+    assert slim.json()["detail"]["details"][0] == {}
+    assert slim.headers["ETag"] != full.headers["ETag"]
+
+    headers = {"If-None-Match": full.headers["ETag"]}
+    response = client.get("/executor/v1/tools/sbc/tasks/task-slim", params={"view": "slim"}, headers=headers)
+    assert response.status_code == 200
+
+    assert client.get("/executor/v1/tools/sbc/tasks/task-slim", params={"view": "thin"}).status_code == 422
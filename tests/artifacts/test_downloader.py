@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mozz_sec.services.artifacts.cache import ArtifactCache, write_state
+from mozz_sec.services.artifacts.downloader import ArtifactDownloader, ChecksumError
+from mozz_sec.services.http_client import SharedHttpClient
+
+CONTENT = os.urandom(100_000)
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+class ArtifactHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.requests.append(("HEAD", self.path, None))
+        self.send_response(200)
+        self._send_headers(len(CONTENT))
+        self.end_headers()
+
+    def do_GET(self):
+        byte_range = self.headers.get("Range")
+        self.requests.append(("GET", self.path, byte_range))
+        if self.path == "/no-ranges" or byte_range is None:
+            body = CONTENT
+            self.send_response(200)
+        else:
+            start, end = byte_range[len("bytes=") :].split("-")
+            body = CONTENT[int(start) : int(end) + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(CONTENT)}")
+        self._send_headers(len(body))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_headers(self, length: int):
+        self.send_header("Content-Length", str(length))
+        if self.path != "/no-ranges":
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", '"v1"')
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ArtifactHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    ArtifactHandler.requests = []
+    return ArtifactDownloader(
+        ArtifactCache(tmp_path / "cache"), client=SharedHttpClient(backoff=0), segment_size=30_000, segments_per_file=3
+    )
+
+
+def ranges():
+    return sorted(r for method, _, r in ArtifactHandler.requests if method == "GET")
+
+
+def test_fetch_splits_into_range_requests(server, downloader):
+    results = asyncio.run(downloader.fetch_all([f"{server}/a.zip", f"{server}/b.zip"], {f"{server}/a.zip": SHA256}))
+
+    assert [result.sha256 for result in results] == [SHA256, SHA256]
+    assert results[0].path == results[1].path
+    assert results[0].path.read_bytes() == CONTENT
+    assert len(ranges()) == 8
+    assert "bytes=90000-99999" in ranges()
+
+
+def test_fetch_reuses_cached_artifacts(server, downloader):
+    asyncio.run(downloader.fetch(f"{server}/a.zip"))
+    ArtifactHandler.requests = []
+    result = asyncio.run(downloader.fetch(f"{server}/a.zip"))
+
+    assert result.cached
+    assert ranges() == []
+
+
+def test_fetch_resumes_partial_downloads(server, downloader):
+    url = f"{server}/a.zip"
+    part, state_path = downloader.cache.partial_paths(url, '"v1"')
+    part.write_bytes(CONTENT[:60_000] + bytes(40_000))
+    write_state(state_path, {"size": len(CONTENT), "segmentSize": 30_000, "done": [0, 1]})
+
+    result = asyncio.run(downloader.fetch(url))
+
+    assert result.path.read_bytes() == CONTENT
+    assert ranges() == ["bytes=60000-89999", "bytes=90000-99999"]
+    assert not state_path.exists()
+
+
+def test_fetch_without_range_support(server, downloader):
+    result = asyncio.run(downloader.fetch(f"{server}/no-ranges"))
+
+    assert result.sha256 == SHA256
+    assert ranges() == [None]
+
+
+def test_fetch_rejects_checksum_mismatch(server, downloader):
+    with pytest.raises(ChecksumError):
+        asyncio.run(downloader.fetch(f"{server}/a.zip", sha256="0" * 64))
+    assert list(downloader.cache.partial.iterdir()) == []
@@ -0,0 +1,47 @@
+from typing import Callable
+
+import pytest
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.tasks.bas_task import BasExecTask
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+BAS_DETAIL = {
+    "bas_vm_policy_url": "https://secguard.rnd.huawei.com/",
+    "bas_container_policy_url": "https://secguard.rnd.huawei.com/",
+    "params": {"plugin_set_names": ["http"], "config": {}, "container_info": {}},
+}
+SBC_PARAMS = {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}
+
+
+def bas_task(
+    task_id: str = "task-001", pbi: str = "1", instance_id: str = "i1", status: TaskStatus = TaskStatus.Waiting
+) -> BasExecTask:
+    """Returns a BAS execution task of the PBI ``pbi`` and the instance ``instance_id``, without sub-tasks."""
+    task = BasExecTask.model_validate(
+        {
+            "taskId": task_id,
+            "common": {"pbi": pbi, "instanceInfo": {"instanceId": instance_id, "taskId": task_id}},
+            "detail": BAS_DETAIL,
+        }
+    )
+    task.status = status
+    return task
+
+
+def sbc_task(*sub_tasks: SubSbcTask, task_id: str = "task-001", rerun: bool = False, **scan_type: bool) -> SbcExecTask:
+    """Returns an SBC execution task with ``sub_tasks``, scanning with ``scan_type``, binscope by default."""
+    params = {**SBC_PARAMS, "rerun": rerun, "scan-type": scan_type or SBC_PARAMS["scan-type"]}
+    task = SbcExecTask.model_validate({"taskId": task_id, "detail": {"params": params}})
+    task.detail.details.extend(sub_tasks)
+    return task
+
+
+@pytest.fixture
+def make_bas_task() -> Callable[..., BasExecTask]:
+    return bas_task
+
+
+@pytest.fixture
+def make_sbc_task() -> Callable[..., SbcExecTask]:
+    return sbc_task
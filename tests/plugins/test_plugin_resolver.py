@@ -0,0 +1,67 @@
+import pytest
+
+from mozz_sec.data.bas_data import PluginInfoType, TestDataBas
+from mozz_sec.services.plugins.resolver import PluginCatalog, PluginIndex, resolve_param
+
+CATALOG = PluginCatalog({"web": ["sqli", "xss", "ssrf"], "host": ["ssh", "xss", "smb"], "kube": ["rbac", "etcd"]})
+
+
+def make_params(**data) -> TestDataBas:
+    return TestDataBas.model_validate({"plugin_set_names": ["web", "host"], "config": {}, "container_info": {}, **data})
+
+
+def test_resolve_param_keeps_set_order_without_duplicates():
+    assert resolve_param(make_params(), CATALOG) == ("sqli", "xss", "ssrf", "ssh", "smb")
+
+
+def test_resolve_param_whitelist_and_blacklist():
+    params = make_params(plugin_name_whitelist=["ssh", "xss", "smb"], plugin_name_blacklist=["smb"])
+
+    assert resolve_param(params, CATALOG) == ("xss", "ssh")
+
+
+def test_unknown_plugin_set_is_skipped():
+    assert resolve_param(make_params(plugin_set_names=["missing", "kube"]), CATALOG) == ("rbac", "etcd")
+
+
+@pytest.mark.parametrize(
+    "test_case, plugin_type, expected",
+    [
+        (None, PluginInfoType.vm, ("sqli", "ssrf")),
+        (None, PluginInfoType.container, ("sqli", "ssrf", "rbac", "etcd")),
+        ("tc-1", PluginInfoType.vm, ("sqli", "ssrf", "ssh")),
+        ("tc-1", PluginInfoType.container, ("sqli", "ssrf", "rbac", "etcd")),
+        ("tc-2", PluginInfoType.container, ("sqli", "ssrf", "rbac", "etcd")),
+    ],
+)
+def test_index_plugins(test_case, plugin_type, expected):
+    params = make_params(
+        plugin_set_names=["web"],
+        plugin_name_blacklist=["xss"],
+        plugin_extra=[{"type": "Container", "params": {"plugin_set_names": ["kube"]}}],
+        plugin_extra_tc={
+            "tc-1": [{"type": "VM", "params": {"plugin_set_names": ["host"], "plugin_name_whitelist": ["ssh"]}}]
+        },
+    )
+
+    assert PluginIndex.build(params, CATALOG).plugins(test_case, plugin_type) == expected
+
+
+def test_index_config_overrides_type_with_test_case():
+    params = make_params(config={"VM": {"timeout": 10, "retries": 1}, "tc-1": {"timeout": 60}})
+    index = PluginIndex.build(params, CATALOG, ["tc-1"])
+
+    assert index.config("tc-1", PluginInfoType.vm) == {"timeout": 60, "retries": 1}
+    assert index.config("tc-2", PluginInfoType.vm) == {"timeout": 10, "retries": 1}
+    assert index.config("tc-1", PluginInfoType.container) == {"timeout": 60}
+    with pytest.raises(TypeError):
+        index.config("tc-1", PluginInfoType.vm)["timeout"] = 1
+
+
+def test_index_is_shared_between_tasks():
+    params = make_params(plugin_extra_tc={"tc-1": [{"type": "VM", "params": {"plugin_set_names": ["kube"]}}]})
+
+    index = PluginIndex.for_task(params, CATALOG)
+    assert PluginIndex.for_task(params.model_copy(deep=True), PluginCatalog(dict(CATALOG))) is index
+    assert index.test_cases == {"tc-1"}
+    assert PluginIndex.for_task(params, PluginCatalog(dict(CATALOG), version="2")) is not index
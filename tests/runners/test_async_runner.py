@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+import pytest
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.http_client import SharedHttpClient
+from mozz_sec.services.runners.async_runner import AsyncBaseRunner, AsyncSubRunner
+from mozz_sec.services.tasks.bas_task import SubBasTask
+
+
+class ReportSubRunner(AsyncSubRunner):
+    async def run_task_async(self, client: SharedHttpClient):
+        response = await client.post("https://report.example.com/reports", json={"remark": self.task.remark})
+        response.raise_for_status()
+        self.task.report_url = response.json()["url"]
+
+
+@pytest.fixture
+def bas_task(make_bas_task):
+    task = make_bas_task("task-001")
+    task.detail.details.extend(SubBasTask(remark=str(i)) for i in range(20))
+    task.detail.details[3].remark = "fail"
+    return task
+
+
+def test_sub_runners_share_one_client(bas_task):
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if b"fail" in request.content:
+            return httpx.Response(400)
+        return httpx.Response(200, json={"url": "https://report.example.com/reports/1"})
+
+    client = SharedHttpClient(max_connections_per_host=5, transport=httpx.MockTransport(handler))
+    runner = AsyncBaseRunner(task=bas_task, concurrency=100)
+    runner.sub_runners = [ReportSubRunner(name="task-001", task=sub_task) for sub_task in bas_task.detail.details]
+
+    async def main():
+        await runner.run_task_async(client)
+        await client.aclose()
+
+    asyncio.run(main())
+
+    assert peak == 5
+    statuses = [sub_task.status for sub_task in bas_task.detail.details]
+    assert statuses.count(TaskStatus.Finished) == 19
+    assert bas_task.detail.details[3].status == TaskStatus.Fault
+    assert bas_task.detail.details[0].report_url == "https://report.example.com/reports/1"
+    assert bas_task.status == TaskStatus.Fault
+
+
+def test_run_task_runs_default_sub_runners(bas_task):
+    runner = AsyncBaseRunner(task=bas_task)
+    runner.run_task()
+
+    assert bas_task.status == TaskStatus.Finished
@@ -0,0 +1,61 @@
+import os
+from typing import ClassVar
+
+import pytest
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.runners.runner import BaseRunner, RunMode, SubRunner
+from mozz_sec.services.runners.sbc_runner import SbcRunner
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+from mozz_sec.services.tasks.task import BaseSubTask
+
+
+class PidSubRunner(SubRunner):
+    io_bound: ClassVar[bool] = False
+
+    def run_task(self):
+        if self.task.remark == "fail":
+            raise RuntimeError("scan failed")
+        self.task.message = str(os.getpid())
+
+
+@pytest.fixture
+def sbc_task():
+    task = SbcExecTask.model_validate(
+        {
+            "taskId": "task-001",
+            "detail": {"params": {"username": "", "password": "", "scan-type": {"binscope": True}}},
+        }
+    )
+    task.detail.details.extend([SubSbcTask(), SubSbcTask(remark="fail"), SubSbcTask()])
+    return task
+
+
+@pytest.mark.parametrize("mode", [RunMode.sequential, RunMode.thread, RunMode.process, RunMode.auto])
+def test_run_task_propagates_results(sbc_task, mode):
+    runner = BaseRunner(task=sbc_task, mode=mode, concurrency=2)
+    runner.sub_runners = [PidSubRunner(name="task-001", task=sub_task) for sub_task in sbc_task.detail.details]
+    runner.run_task()
+
+    finished, failed, _ = sbc_task.detail.details
+    assert finished.status == TaskStatus.Finished
+    assert finished.progress == 100
+    assert failed.status == TaskStatus.Fault
+    assert failed.message == "RuntimeError: scan failed"
+    assert sbc_task.status == TaskStatus.Fault
+    assert sbc_task.progress == 66
+    if mode in (RunMode.process, RunMode.auto):
+        assert finished.message != str(os.getpid())
+    else:
+        assert finished.message == str(os.getpid())
+
+
+def test_runner_creates_sub_runners_for_matching_sub_tasks(sbc_task):
+    sbc_task.detail.details.append(BaseSubTask())
+    runner = SbcRunner(task=sbc_task, mode=RunMode.sequential)
+
+    assert [r.task for r in runner.sub_runners] == sbc_task.detail.details[:3]
+    runner.run_task()
+    # The sub-tasks have no file, there is nothing to scan.
+    assert sbc_task.detail.details[0].status == TaskStatus.Fault
+    assert sbc_task.detail.details[0].message.startswith("File not found")
@@ -0,0 +1,122 @@
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from mozz_sec.data.sbc_data import ScanType
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.runners.runner import run_sub_runner
+from mozz_sec.services.runners.sbc_runner import SbcSubRunner
+from mozz_sec.services.scanners.binscope import ElfError, check_elf, check_file, check_files
+from mozz_sec.services.tasks.sbc_task import SubSbcTask
+
+SOURCE = """
+#include <stdio.h>
+#include <string.h>
+int main(int argc, char **argv) { char b[64]; strcpy(b, argv[0]); printf("%s %d\\n", b, argc); return 0; }
+"""
+VARIANTS = {
+    "hardened": ["-O2", "-fPIE", "-pie", "-fstack-protector-strong", "-D_FORTIFY_SOURCE=2", "-Wl,-z,relro,-z,now"],
+    "weak": ["-O0", "-no-pie", "-fno-stack-protector", "-Wl,-z,norelro", "-z", "execstack", "-Wl,-rpath,lib:/opt/x"],
+    "library": ["-O2", "-shared", "-fPIC", "-Wl,--enable-new-dtags,-rpath,$ORIGIN"],
+}
+
+
+@pytest.fixture(scope="module")
+def binaries(tmp_path_factory):
+    if shutil.which("gcc") is None:
+        pytest.skip("gcc is not installed")
+    directory = tmp_path_factory.mktemp("elf")
+    source = directory / "main.c"
+    source.write_text(SOURCE)
+    paths = {}
+    for name, flags in VARIANTS.items():
+        paths[name] = str(directory / name)
+        subprocess.run(["gcc", *flags, str(source), "-o", paths[name]], check=True, capture_output=True)
+    return paths
+
+
+def test_hardened_executable(binaries):
+    result = check_file(binaries["hardened"])
+
+    assert (result.kind, result.pie, result.relro, result.nx, result.canary, result.fortify) == (
+        "pie",
+        True,
+        "full",
+        True,
+        True,
+        True,
+    )
+    assert "__strcpy_chk" in result.fortified
+    assert result.issues == []
+
+
+def test_weak_executable(binaries):
+    result = check_file(binaries["weak"])
+
+    assert result.kind == "exec"
+    assert result.runpath == ["lib", "/opt/x"]
+    assert result.issues == ["no-pie", "no-relro", "exec-stack", "no-canary", "no-fortify", "runpath", "insecure-rpath"]
+
+
+def test_shared_library(binaries):
+    result = check_file(binaries["library"])
+
+    assert (result.kind, result.pie, result.relro, result.runpath) == ("dso", True, "partial", ["$ORIGIN"])
+    assert "insecure-rpath" not in result.issues
+
+
+def make_elf32_big_endian() -> bytes:
+    """Returns a minimal big endian ELF32 PIE with full RELRO, a non executable stack and a canary."""
+    strings = b"\x00__stack_chk_fail\x00libc.so.6\x00"
+    phnum = 5
+    phoff, dyn_offset, str_offset = 52, 0x100, 0x180
+    dynamic = struct.pack(">6i", 5, 0x1000 + str_offset, 10, len(strings), 30, 0x8) + struct.pack(">2i", 0, 0)
+    header = b"\x7fELF\x01\x02\x01" + bytes(9)
+    header += struct.pack(">HHIIIIIHHHHHH", 3, 20, 1, 0, phoff, 0, 0, 52, 32, phnum, 40, 0, 0)
+    programs = [
+        struct.pack(">8I", 3, 0, 0, 0, 0, 0, 4, 1),
+        struct.pack(">8I", 1, 0, 0x1000, 0x1000, 0x200, 0x200, 5, 0x1000),
+        struct.pack(">8I", 2, dyn_offset, 0x1100, 0x1100, len(dynamic), len(dynamic), 6, 4),
+        struct.pack(">8I", 0x6474E551, 0, 0, 0, 0, 0, 6, 16),
+        struct.pack(">8I", 0x6474E552, 0, 0x1000, 0x1000, 0x100, 0x100, 4, 1),
+    ]
+    data = bytearray(0x200)
+    data[: len(header)] = header
+    data[phoff : phoff + 32 * phnum] = b"".join(programs)
+    data[dyn_offset : dyn_offset + len(dynamic)] = dynamic
+    data[str_offset : str_offset + len(strings)] = strings
+    return bytes(data)
+
+
+def test_big_endian_elf32():
+    result = check_elf(make_elf32_big_endian())
+
+    assert (result.bits, result.kind, result.relro, result.nx, result.canary) == (32, "pie", "full", True, True)
+
+
+def test_invalid_files(tmp_path):
+    assert check_elf(b"#!/bin/sh\n").elf is False
+    with pytest.raises(ElfError):
+        check_elf(make_elf32_big_endian()[:60])
+
+    paths = []
+    for name, data in (("good", make_elf32_big_endian()), ("torn", make_elf32_big_endian()[:60]), ("text", b"x")):
+        (tmp_path / name).write_bytes(data)
+        paths.append(str(tmp_path / name))
+    results = dict(check_files(paths, workers=2))
+
+    assert list(results) == paths
+    assert results[paths[0]].issues == []
+    assert results[paths[1]].issues == ["invalid-elf"] and "Truncated" in results[paths[1]].error
+    assert results[paths[2]].elf is False
+
+
+def test_sbc_sub_runner_reports_the_hardening_of_its_file(binaries):
+    task = SubSbcTask(file_path=binaries["weak"])
+    runner = SbcSubRunner(name="t1", task=task, scan_type=ScanType(binscope=True), results=None)
+
+    assert run_sub_runner(runner)[1] == TaskStatus.Finished
+    assert task.remark.startswith("binscope: no-pie, no-relro, exec-stack")
+    assert runner.state["findings"]["binscope"]["kind"] == "exec"
@@ -0,0 +1,94 @@
+import re
+
+import pytest
+
+from mozz_sec.data.sbc_data import FileBlackList, TestDataSbc
+from mozz_sec.services.scanners.file_filter import FileFilter, FilterResult, PathTrie
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("usr/lib/libssl.so", True),
+        ("/usr/lib/", True),
+        ("./opt/app/bin/run", True),
+        ("opt\\app\\conf.json", True),
+        ("opt/application/run", False),
+        ("usr/libexec/run", False),
+        ("etc", False),
+    ],
+)
+def test_path_trie_covers(path, expected):
+    trie = PathTrie(["usr/lib", "/opt/app/"])
+    assert trie.covers(path) is expected
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("usr/lib/libssl.so", FilterResult(True)),
+        ("usr/lib/UEG 24.0.0.json", FilterResult(False, "^UEG.*json$")),
+        ("usr/lib/readme.md", FilterResult(False, r".*\.md$")),
+        ("usr/lib/aa.txt", FilterResult(False, r"(a)\1\.txt")),
+        ("usr/lib/README.TXT", FilterResult(False, r"(?i)readme")),
+        ("usr/bin/libssl.so", FilterResult(False)),
+    ],
+)
+def test_file_filter_check(path, expected):
+    file_filter = FileFilter(
+        path_whitelist=["usr/lib"],
+        file_blacklist=[
+            "^UEG.*json$",
+            r"(a)\1\.txt",
+            r".*\.md$",
+            FileBlackList(regex="(?i)readme", examples=["readme"]),
+        ],
+    )
+    assert file_filter.check(path) == expected
+
+
+def test_first_rule_wins_across_separate_rules():
+    file_filter = FileFilter(file_blacklist=[r"(x)\1", "xx", r"(?P<n>y)(?P=n)"])
+
+    assert file_filter.match_blacklist("xx") == r"(x)\1"
+    assert file_filter.match_blacklist("yy") == r"(?P<n>y)(?P=n)"
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("lib_a.so", "l|z"),
+        ("alib", None),
+        ("liz", "l|z"),
+        ("zz", "l|z"),
+        ("abc", "a?bc"),
+        ("bc", "a?bc"),
+        ("pkg.json", r"^pkg\.(json|xml)$"),
+        ("]x", "[]]x"),
+        ("other", None),
+    ],
+)
+def test_first_rule_wins_across_dispatched_rules(name, expected):
+    file_filter = FileFilter(file_blacklist=["l|z", "^lib.*", "a?bc", "^b.*", r"^pkg\.(json|xml)$", "[]]x"])
+
+    assert file_filter.match_blacklist(name) == expected
+
+
+def test_rules_with_clashing_group_names():
+    file_filter = FileFilter(file_blacklist=["(?P<n>a)", "(?P<n>b)"])
+
+    assert file_filter.match_blacklist("b") == "(?P<n>b)"
+
+
+def test_invalid_rule():
+    with pytest.raises(re.error):
+        FileFilter(file_blacklist=["("])
+
+
+def test_filter_is_shared_between_tasks():
+    params = TestDataSbc.model_validate(
+        {"scan-type": {"binscope": True}, "path-whitelist": ["lib"], "file-blacklist": [r".*\.md$"]}
+    )
+
+    assert FileFilter.for_task(params) is FileFilter.for_task(params.model_copy())
+    assert list(FileFilter.for_task(params).filter(["lib/a.so", "lib/a.md", "bin/b"])) == ["lib/a.so"]
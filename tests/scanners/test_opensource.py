@@ -0,0 +1,83 @@
+import sys
+
+import pytest
+
+from mozz_sec.data.sbc_data import ScanType
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.runners.runner import run_sub_runner
+from mozz_sec.services.runners.sbc_runner import SbcSubRunner
+from mozz_sec.services.scanners import opensource
+from mozz_sec.services.scanners.opensource import file_fingerprints, match_components
+from mozz_sec.services.scanners.pipeline import FilePipeline
+from mozz_sec.services.stores.fingerprints import FingerprintIndex
+from mozz_sec.services.stores.result_cache import ScanResultCache
+from mozz_sec.services.tasks.sbc_task import SubSbcTask
+
+
+def library(name: str, count: int) -> bytes:
+    return b"\x00".join(f"{name} message number {number}".encode() for number in range(count)) + b"\x00\x01"
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    root = tmp_path / "components"
+    for name, version, count in (("libfoo", "1.0", 20), ("libbar", "2.1", 4)):
+        (root / name / version / "lib").mkdir(parents=True)
+        (root / name / version / "lib" / f"{name}.so").write_bytes(library(name, count))
+    (root / "libfoo" / "1.0" / "README").write_bytes(b"common license text")
+    (root / "libbar" / "2.1" / "README").write_bytes(b"common license text")
+    path = str(tmp_path / "opensource.idx")
+    monkeypatch.setattr(sys, "argv", ["opensource", path, str(root), "--max-components", "1"])
+    opensource.main()
+    index = FingerprintIndex(path)
+    monkeypatch.setattr(opensource, "default_index", lambda: index)
+    yield index
+    index.close()
+
+
+def test_components_are_matched_by_their_strings_and_files(index):
+    package = library("libfoo", 12) + b"\x00" + library("libbar", 4) + b"common license text"
+
+    assert match_components(index, file_fingerprints(package), min_matches=8) == [
+        {"name": "libfoo", "version": "1.0", "matched": 12, "coverage": round(12 / 21, 4)},
+    ]  # libbar has 5 fingerprints, its strings and its file, small components must match all
+    assert match_components(index, file_fingerprints(library("libfoo", 5)), min_matches=8) == []
+    assert match_components(index, file_fingerprints(library("libbar", 4)), min_matches=8)[0]["coverage"] == 1.0
+
+
+def test_opensource_analyzer_runs_in_the_file_pipeline(index, tmp_path):
+    path = tmp_path / "app.bin"
+    path.write_bytes(library("libfoo", 20))
+
+    scan = FilePipeline.for_scan_type(ScanType(opensource=True)).scan_file(str(path))
+
+    assert [(match["name"], match["matched"]) for match in scan.findings["opensource"]] == [("libfoo", 21)]
+
+
+def test_sbc_sub_runner_keys_cached_results_by_the_build_of_the_index(index, tmp_path):
+    path = tmp_path / "app.bin"
+    path.write_bytes(library("libfoo", 20))
+    results = ScanResultCache(str(tmp_path / "results.db"))
+    task = SubSbcTask(file_path=str(path))
+    runner = SbcSubRunner(name="t1", task=task, scan_type=ScanType(opensource=True), results=results)
+
+    assert run_sub_runner(runner)[1] == TaskStatus.Finished
+    assert task.remark == "opensource: libfoo 1.0"
+    assert results.stats().stores == 1
+    key = runner._result_key(runner.pipeline(), task.file_hash)
+    assert key.endswith(f"+{index.build_id}/opensource/{task.file_hash}")
+    results.close()
+
+
+def test_sub_tasks_fault_without_an_index(monkeypatch, tmp_path):
+    opensource.default_index.cache_clear()
+    monkeypatch.setattr(opensource.SETTINGS, "opensource_index", None)
+    path = tmp_path / "app.bin"
+    path.write_bytes(b"some package content")
+    task = SubSbcTask(file_path=str(path))
+
+    run_sub_runner(SbcSubRunner(name="t1", task=task, scan_type=ScanType(opensource=True), results=None))
+
+    assert task.status == TaskStatus.Fault
+    assert "MOZZ_OPENSOURCE_INDEX" in task.message
+    opensource.default_index.cache_clear()
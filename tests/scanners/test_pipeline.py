@@ -0,0 +1,116 @@
+import hashlib
+import zlib
+from typing import ClassVar, List
+
+import pytest
+
+from mozz_sec.data.sbc_data import ScanType
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.runners.runner import run_sub_runner
+from mozz_sec.services.runners.sbc_runner import SbcSubRunner
+from mozz_sec.services.scanners import pipeline
+from mozz_sec.services.scanners.pipeline import Analyzer, FilePipeline
+from mozz_sec.services.tasks.sbc_task import SubSbcTask
+
+
+class Checksum(Analyzer):
+    name = "binscope"
+    views: ClassVar[List[memoryview]] = []
+
+    def analyze(self, path, data):
+        Checksum.views.append(data)
+        return zlib.crc32(data)
+
+
+class Magic(Analyzer):
+    name = "seninfo"
+
+    def analyze(self, path, data):
+        return bytes(data[:4]).decode()
+
+
+class Broken(Analyzer):
+    name = "securecat"
+
+    def analyze(self, path, data):
+        raise ValueError("corrupt")
+
+
+@pytest.fixture
+def registered(monkeypatch):
+    monkeypatch.setattr(
+        pipeline,
+        "ANALYZERS",
+        {"binscope": f"{__name__}:Checksum", "seninfo": f"{__name__}:Magic", "securecat": f"{__name__}:Broken"},
+    )
+    pipeline._cached_pipeline.cache_clear()
+    yield
+    pipeline._cached_pipeline.cache_clear()
+
+
+@pytest.mark.parametrize("mmap_threshold", [0, 1 << 20])
+def test_pipeline_reads_each_file_once_for_all_analyzers(tmp_path, mmap_threshold):
+    path = tmp_path / "lib.so"
+    path.write_bytes(b"\x7fELF" + bytes(5000))
+    Checksum.views = []
+    scans = FilePipeline([Checksum(), Magic()], mmap_threshold=mmap_threshold)
+
+    scan = scans.scan_file(str(path))
+
+    assert scan.findings == {"binscope": zlib.crc32(path.read_bytes()), "seninfo": "\x7fELF"}
+    assert scan.size == 5004 and not scan.errors
+    assert set(scan.seconds) == {"binscope", "seninfo"}
+    stats = scans.stats()
+    assert (stats.files, stats.bytes_read, stats.mapped) == (1, 5004, int(mmap_threshold == 0))
+    # The analyzers got the same buffer, released once the file is done.
+    with pytest.raises(ValueError):
+        Checksum.views[0].tobytes()
+
+
+@pytest.mark.parametrize("mmap_threshold", [0, 1 << 20])
+def test_pipeline_hashes_the_content_and_skips_reused_results(tmp_path, mmap_threshold):
+    path = tmp_path / "lib.so"
+    path.write_bytes(b"\x7fELF" + bytes(5000))
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    scans = FilePipeline([Checksum()], mmap_threshold=mmap_threshold)
+    Checksum.views = []
+
+    assert scans.scan_file(str(path)).digest == digest
+    scan = scans.scan_file(str(path), reuse={digest: {"remark": "cached"}}.get)
+
+    assert (scan.digest, scan.reused, scan.findings) == (digest, {"remark": "cached"}, {})
+    assert len(Checksum.views) == 1
+    assert (scans.stats().files, scans.stats().reused) == (2, 1)
+
+
+def test_pipeline_keeps_running_after_a_failing_analyzer(tmp_path):
+    path = tmp_path / "empty.so"
+    path.write_bytes(b"")
+
+    scan = FilePipeline([Broken(), Checksum()]).scan_file(str(path))
+
+    assert scan.findings == {"binscope": 0}
+    assert scan.errors == {"securecat": "ValueError: corrupt"}
+
+
+def test_pipeline_of_a_scan_type_has_the_enabled_analyzers(registered):
+    binscope = FilePipeline.for_scan_type(ScanType(binscope=True, opensource=True))
+
+    assert [analyzer.name for analyzer in binscope.analyzers] == ["binscope"]
+    assert FilePipeline.for_scan_type(ScanType(binscope=True)) is binscope
+
+
+def test_sbc_sub_runner_scans_with_the_pipeline(tmp_path, registered):
+    path = tmp_path / "lib.so"
+    path.write_bytes(b"\x7fELF")
+    runner = SbcSubRunner(
+        name="t1", task=SubSbcTask(file_path=str(path)), scan_type=ScanType(binscope=True, seninfo=True), results=None
+    )
+
+    assert run_sub_runner(runner)[1] == TaskStatus.Finished
+    assert runner.state["findings"] == {"binscope": zlib.crc32(b"\x7fELF"), "seninfo": "\x7fELF"}
+
+    failing = SbcSubRunner(
+        name="t1", task=SubSbcTask(file_path=str(path)), scan_type=ScanType(securecat=True), results=None
+    )
+    assert run_sub_runner(failing)[1:] == (TaskStatus.Fault, "securecat: ValueError: corrupt")
@@ -0,0 +1,198 @@
+import os
+import pickle
+import time
+from typing import ClassVar, List
+
+import pytest
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.runners.runner import BaseRunner, RunMode, SubRunner
+from mozz_sec.services.runners.sbc_runner import SbcRunner, SbcSubRunner
+from mozz_sec.services.runners.worker import ScanWorker
+from mozz_sec.services.stores.checkpoints import Checkpoint, CheckpointLog, restore_sub_tasks, resume_tasks
+from mozz_sec.services.stores.task_store import SqliteTaskStore
+from mozz_sec.services.stores.work_queue import SqliteWorkQueue
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+# The sub-tasks run by ``FileSubRunner``, by file.
+RUNS: List[str] = []
+
+
+class Crash(BaseException):
+    """Stands in for the executor dying in the middle of a sub-task."""
+
+
+class FileSubRunner(SbcSubRunner):
+    """Scans three parts of its file, checkpointing after each one and crashing on a ``crash`` remark."""
+
+    def run_task(self):
+        RUNS.append(str(self.task.file_path))
+        for part in range(self.state.get("parts", 0), 3):
+            if self.task.remark == "crash" and part == 1:
+                raise Crash()
+            self.task.progress = (part + 1) * 33
+            self.checkpoint(parts=part + 1)
+
+
+class FileRunner(SbcRunner):
+    sub_runner_class: ClassVar = FileSubRunner
+
+
+def files(*remarks: str) -> List[SubSbcTask]:
+    return [SubSbcTask(file_path=f"/f{index}", remark=remark) for index, remark in enumerate(remarks)]
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = CheckpointLog(str(tmp_path / "checkpoints" / "sbc_tasks.jsonl"), sync_interval=3600, sync_batch=3)
+    yield log
+    log.close()
+
+
+@pytest.fixture(autouse=True)
+def clear_runs():
+    RUNS.clear()
+
+
+def test_load_returns_the_last_checkpoint_of_the_tasks_not_ended(log):
+    log.write(Checkpoint(task_id="t1", index=0, progress=10, state={"parts": 1}))
+    log.write(Checkpoint(task_id="t1", index=0, progress=20, state={"parts": 2}))
+    log.write(Checkpoint(task_id="t1", index=1, status=TaskStatus.Finished, progress=100))
+    log.write(Checkpoint(task_id="t2", index=0))
+    log.end("t2")
+
+    saved = log.load()
+
+    assert list(saved) == ["t1"]
+    assert (saved["t1"][0].progress, saved["t1"][0].state) == (20, {"parts": 2})
+    assert saved["t1"][1].status == TaskStatus.Finished
+
+
+def test_torn_lines_are_skipped(log):
+    log.write(Checkpoint(task_id="t1", index=0, progress=10))
+    with open(log.path, "ab") as file:
+        file.write(b'{"taskId": "t1", "index": 0, "prog')
+
+    assert log.load()["t1"][0].progress == 10
+
+
+def test_fsync_is_batched(log, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    for index in range(7):
+        log.write(Checkpoint(task_id="t1", index=index))
+
+    assert len(synced) == 2
+    log.sync()
+    assert len(synced) == 3
+    log.sync()
+    assert len(synced) == 3
+
+
+def test_compact_keeps_the_last_checkpoints(log):
+    for progress in range(50):
+        log.write(Checkpoint(task_id="t1", index=0, progress=progress))
+    log.write(Checkpoint(task_id="t2", index=0))
+    log.end("t2")
+    size = os.path.getsize(log.path)
+
+    log.compact()
+    log.write(Checkpoint(task_id="t3", index=0))
+
+    assert os.path.getsize(log.path) < size / 10
+    assert sorted(log.load()) == ["t1", "t3"]
+    assert log.load()["t1"][0].progress == 49
+
+
+def test_a_pickled_log_writes_to_the_same_file(log):
+    copy = pickle.loads(pickle.dumps(log))
+    copy.write(Checkpoint(task_id="t1", index=0))
+    copy.close()
+
+    assert copy.path == log.path
+    assert list(log.load()) == ["t1"]
+
+
+def test_runner_resumes_an_interrupted_task(log, make_sbc_task):
+    task = make_sbc_task(*files("", "crash", ""), task_id="t1")
+    with pytest.raises(Crash):
+        FileRunner(task=task, mode=RunMode.sequential, checkpoints=log).run_task()
+    saved = log.load()["t1"]
+    assert saved[0].status == TaskStatus.Finished
+    assert (saved[1].status, saved[1].state) == (TaskStatus.Running, {"parts": 1})
+
+    RUNS.clear()
+    resumed = make_sbc_task(*files("", "", ""), task_id="t1")
+    FileRunner(task=resumed, mode=RunMode.sequential, checkpoints=log, resume_from=saved).run_task()
+
+    assert RUNS == ["/f1", "/f2"]
+    assert all(sub_task.status == TaskStatus.Finished for sub_task in resumed.detail.details)
+    assert resumed.detail.details[0].progress == 100
+    assert log.load() == {}
+
+
+def test_sub_runners_in_processes_write_their_checkpoints(log, make_sbc_task):
+    task = make_sbc_task(*files("", ""), task_id="t1")
+    runner = BaseRunner(task=task, mode=RunMode.process, concurrency=2, checkpoints=log)
+    runner.sub_runners = [
+        SubRunner(name="t1", task=sub_task, index=index, checkpoints=log)
+        for index, sub_task in enumerate(task.detail.details)
+    ]
+    runner._run_sub_runners()
+
+    assert {index: checkpoint.status for index, checkpoint in log.load()["t1"].items()} == {
+        0: TaskStatus.Finished,
+        1: TaskStatus.Finished,
+    }
+
+
+def test_restore_sub_tasks_sets_models_and_dictionaries(log, make_sbc_task):
+    task = make_sbc_task(*files("", ""), task_id="t1")
+    task.detail.details[1] = task.detail.details[1].model_dump(mode="json", by_alias=True)
+    saved = {index: Checkpoint(task_id="t1", index=index, progress=50, message="half") for index in range(3)}
+
+    restore_sub_tasks(task, saved)
+
+    model, data = task.detail.details
+    assert (model.progress, model.status, model.message) == (50, TaskStatus.Running, "half")
+    assert (data["progress"], data["status"], data["message"]) == (50, TaskStatus.Running.value, "half")
+
+
+def test_resume_tasks_resumes_the_running_tasks(tmp_path, log, make_sbc_task):
+    store = SqliteTaskStore(SbcExecTask, path=str(tmp_path / "tasks.db"), table="sbc_tasks")
+    running = make_sbc_task(*files("", ""), task_id="running")
+    running.detail.details[0].status = TaskStatus.Running
+    store["running"] = running
+    store["waiting"] = make_sbc_task(*files(""), task_id="waiting")
+    log.write(Checkpoint(task_id="running", index=0, progress=40))
+    log.write(Checkpoint(task_id="deleted", index=0))
+    store.flush()
+
+    resumed = []
+    assert resume_tasks(store, log, lambda task, saved: resumed.append((task.task_id, sorted(saved)))) == 1
+
+    assert resumed == [("running", [0])]
+    assert list(log.load()) == ["running"]
+    store.close()
+
+
+def test_scan_worker_takes_the_result_of_an_ended_sub_task_from_its_checkpoint(tmp_path, log, make_sbc_task):
+    db = str(tmp_path / "tasks.db")
+    store = SqliteTaskStore(SbcExecTask, path=db, table="sbc_tasks", shared=True)
+    queue = SqliteWorkQueue(db, "sbc_tasks_queue", lease=0.01)
+    store["t1"] = make_sbc_task(*files("", ""), task_id="t1")
+    queue.put("t1", [0, 1])
+    queue.claim("dead", 2)
+    time.sleep(0.02)
+    log.write(Checkpoint(task_id="t1", index=0, progress=100, status=TaskStatus.Finished, message="done before"))
+    log.write(Checkpoint(task_id="t1", index=1, progress=33, state={"parts": 1}))
+
+    ScanWorker(FileRunner, store, queue, "w1", checkpoints=log).run_once()
+
+    assert RUNS == ["/f1"]
+    first, second = store["t1"].detail.details
+    assert first["message"] == "done before"
+    assert second["status"] == TaskStatus.Finished.value
+    assert log.load() == {}
+    queue.close()
+    store.close()
@@ -0,0 +1,82 @@
+import pickle
+
+import pytest
+
+from mozz_sec.services.stores.fingerprints import (
+    Component,
+    FingerprintIndex,
+    FingerprintIndexError,
+    build_index,
+    fingerprint,
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "opensource.idx")
+    signatures = [
+        (Component(name="zlib", version="1.3"), [1, 2, 3, 100]),
+        (Component(name="zlib", version="1.2"), [1, 2, 4, 100]),
+        (Component(name="openssl", version="3.0"), [5, 6, 100]),
+    ]
+    assert build_index(path, signatures, max_components=2) == 8
+    index = FingerprintIndex(path)
+    yield index
+    index.close()
+
+
+def test_index_maps_fingerprints_to_their_components(index):
+    assert len(index) == 8
+    assert [(component.name, component.version, component.fingerprints) for component in index.components] == [
+        ("zlib", "1.3", 3),
+        ("zlib", "1.2", 3),
+        ("openssl", "3.0", 2),
+    ]
+    assert [component.version for component in index.lookup(1)] == ["1.3", "1.2"]
+    assert index.lookup(100) == []  # shared by more than max_components
+    assert index.lookup(7) == []
+
+
+def test_match_counts_the_fingerprints_of_every_component_in_one_batch(index):
+    assert index.match([4, 2, 1, 5, 7, 2, 2**64 - 1]) == {0: 2, 1: 3, 2: 1}
+    assert index.match([]) == {}
+
+
+def test_bloom_filter_passes_every_indexed_fingerprint(tmp_path):
+    path = str(tmp_path / "big.idx")
+    values = [fingerprint(str(number).encode()) for number in range(20000)]
+    build_index(path, [(Component(name="big"), values)])
+    index = FingerprintIndex(path)
+
+    assert all(value in index.bloom for value in values)
+    assert index.bloom.select(values) == values
+    assert len(index.bloom.select(fingerprint(f"other-{number}".encode()) for number in range(20000))) < 600
+    assert index.match(values) == {0: 20000}
+    assert index.match(fingerprint(f"other-{number}".encode()) for number in range(20000)) == {}
+    assert pickle.loads(pickle.dumps(index)).build_id == index.build_id
+    index.close()
+
+
+def test_rebuilding_changes_the_build_id_only_with_the_content(tmp_path):
+    path = str(tmp_path / "opensource.idx")
+    build_index(path, [(Component(name="a"), [1, 2])])
+    first = FingerprintIndex(path)
+    build_index(path, [(Component(name="a"), [2, 1])])
+    second = FingerprintIndex(path)
+    build_index(path, [(Component(name="a"), [1, 3])])
+
+    assert second.build_id == first.build_id != FingerprintIndex(path).build_id
+    assert first.match([1]) == {0: 1}  # the replaced file stays mapped
+
+
+def test_invalid_index_files_are_rejected(tmp_path):
+    path = tmp_path / "opensource.idx"
+    with pytest.raises(FingerprintIndexError):
+        FingerprintIndex(str(path))
+    path.write_bytes(b"not an index")
+    with pytest.raises(FingerprintIndexError):
+        FingerprintIndex(str(path))
+    build_index(str(path), [(Component(name="a"), range(100))])
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(FingerprintIndexError, match="truncated"):
+        FingerprintIndex(str(path))
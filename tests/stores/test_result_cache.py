@@ -0,0 +1,154 @@
+import hashlib
+import pickle
+from typing import ClassVar, List
+
+import pytest
+
+from mozz_sec.data.sbc_data import ScanType
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.runners import sbc_runner
+from mozz_sec.services.runners.runner import RunMode, run_sub_runner
+from mozz_sec.services.runners.sbc_runner import SbcRunner, SbcSubRunner
+from mozz_sec.services.scanners.pipeline import Analyzer, FilePipeline
+from mozz_sec.services.stores.bloom import BloomFilter
+from mozz_sec.services.stores import result_cache
+from mozz_sec.services.stores.result_cache import ScanResultCache, result_key
+from mozz_sec.services.tasks.sbc_task import SubSbcTask
+
+
+@pytest.fixture
+def results(tmp_path):
+    results = ScanResultCache(str(tmp_path / "results.db"))
+    yield results
+    results.close()
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter.of((f"key-{index}" for index in range(5000)), capacity=5000, error_rate=0.01)
+
+    assert all(f"key-{index}" in bloom for index in range(5000))
+    false_positives = sum(f"other-{index}" in bloom for index in range(10000))
+    assert false_positives < 300
+    assert BloomFilter(bloom.bits, bloom.hashes, bloom.to_bytes(), len(bloom)).error_rate == bloom.error_rate
+
+
+def test_result_key_depends_on_content_scan_type_and_version():
+    binscope = ScanType(binscope=True)
+
+    keys = {
+        result_key("h1", binscope, "1"),
+        result_key("h2", binscope, "1"),
+        result_key("h1", ScanType(binscope=True, seninfo=True), "1"),
+        result_key("h1", binscope, "2"),
+    }
+
+    assert len(keys) == 4
+    assert result_key("h1", ScanType(binscope=True), "1") in keys
+
+
+def test_cache_stores_results_and_filters_misses(results):
+    results.put("k1", {"remark": "clean"})
+
+    assert results.get("k1") == {"remark": "clean"}
+    assert results.get("k2") is None
+    stats = results.stats()
+    assert (stats.hits, stats.misses, stats.filtered, stats.stores, stats.entries) == (1, 1, 1, 1, 1)
+
+
+def test_cache_evicts_least_recently_used_results_over_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "USE_RESOLUTION", 0.0)
+    cache = ScanResultCache(str(tmp_path / "results.db"), budget=1000)
+    for index in range(8):
+        cache.put(f"k{index}", {"remark": "x" * 200})
+        cache.get("k0")
+
+    stats = cache.stats()
+    assert stats.size <= 1000
+    assert stats.evictions > 0
+    assert cache.get("k0") is not None
+    assert cache.get("k1") is None
+    assert cache.get("k7") is not None
+
+
+def test_cache_sees_results_of_other_processes_after_refresh(tmp_path):
+    path = str(tmp_path / "results.db")
+    writer, reader = ScanResultCache(path), ScanResultCache(path, refresh=0)
+    assert reader.get("k") is None
+
+    writer.put("k", {"remark": "shared"})
+
+    assert reader.get("k") == {"remark": "shared"}
+    assert pickle.loads(pickle.dumps(reader)).get("k") == {"remark": "shared"}
+
+
+class CountingAnalyzer(Analyzer):
+    name = "binscope"
+    scanned: ClassVar[List[str]] = []
+
+    def analyze(self, path, data):
+        CountingAnalyzer.scanned.append(path)
+        return len(data)
+
+    def summary(self, findings):
+        return f"{findings} bytes"
+
+
+class CountingSubRunner(SbcSubRunner):
+    def pipeline(self):
+        return FilePipeline([CountingAnalyzer()])
+
+
+class CountingRunner(SbcRunner):
+    sub_runner_class = CountingSubRunner
+
+
+def files(*paths, file_hash: str = "") -> List[SubSbcTask]:
+    return [SubSbcTask(file_path=str(path), file_hash=file_hash) for path in paths]
+
+
+def test_runners_reuse_scan_results_of_other_tasks(tmp_path, results, monkeypatch, make_sbc_task):
+    monkeypatch.setattr(sbc_runner, "SCAN_RESULTS", results)
+    CountingAnalyzer.scanned = []
+    (tmp_path / "a.so").write_bytes(b"same")
+    (tmp_path / "b.so").write_bytes(b"same")
+    (tmp_path / "c.so").write_bytes(b"other")
+
+    CountingRunner(task=make_sbc_task(*files(tmp_path / "a.so"), task_id="t1"), mode=RunMode.sequential).run_task()
+    second = make_sbc_task(*files(tmp_path / "b.so", tmp_path / "c.so", tmp_path / "missing.so"), task_id="t2")
+    CountingRunner(task=second, mode=RunMode.sequential).run_task()
+
+    assert CountingAnalyzer.scanned == [str(tmp_path / "a.so"), str(tmp_path / "c.so")]
+    reused, _, missing = second.detail.details
+    assert (reused.status, reused.remark) == (TaskStatus.Finished, "binscope: 4 bytes")
+    assert reused.file_hash == hashlib.sha256(b"same").hexdigest()
+    assert (missing.status, missing.message) == (TaskStatus.Fault, f"File not found: {tmp_path / 'missing.so'}")
+    assert results.stats().entries == 2
+
+
+def test_results_are_keyed_by_the_content_scanned_not_by_the_announced_hash(
+    tmp_path, results, monkeypatch, make_sbc_task
+):
+    monkeypatch.setattr(sbc_runner, "SCAN_RESULTS", results)
+    CountingAnalyzer.scanned = []
+    (tmp_path / "a.so").write_bytes(b"first")
+    (tmp_path / "b.so").write_bytes(b"second")
+    announced = hashlib.sha256(b"first").hexdigest()
+
+    CountingRunner(task=make_sbc_task(*files(tmp_path / "a.so"), task_id="t1"), mode=RunMode.sequential).run_task()
+    task = make_sbc_task(*files(tmp_path / "b.so", file_hash=announced), task_id="t2")
+    CountingRunner(task=task, mode=RunMode.sequential).run_task()
+
+    assert CountingAnalyzer.scanned == [str(tmp_path / "a.so"), str(tmp_path / "b.so")]
+    assert task.detail.details[0].remark == "binscope: 6 bytes"
+    assert task.detail.details[0].file_hash == hashlib.sha256(b"second").hexdigest()
+
+
+def test_failed_and_empty_scans_are_not_cached(tmp_path, results):
+    (tmp_path / "a.so").write_bytes(b"content")
+    task = SubSbcTask(file_path=str(tmp_path / "a.so"))
+
+    run_sub_runner(SbcSubRunner(name="t1", task=task, scan_type=ScanType(securecat=True), results=results))
+    run_sub_runner(SbcSubRunner(name="t1", task=SubSbcTask(), scan_type=ScanType(binscope=True), results=results))
+
+    assert task.status == TaskStatus.Finished
+    assert results.stats().stores == 0
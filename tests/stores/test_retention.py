@@ -0,0 +1,118 @@
+import pytest
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.stores.retention import RetentionManager
+from mozz_sec.services.stores.task_store import MemoryTaskStore, SqliteTaskStore
+from mozz_sec.services.tasks.bas_task import BasExecTask
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_evicts_finished_tasks_only(make_bas_task):
+    clock = FakeClock()
+    store = MemoryTaskStore(BasExecTask, RetentionManager(ttl=60, clock=clock))
+    store["task-001"] = make_bas_task("task-001", status=TaskStatus.Finished)
+    store["task-002"] = make_bas_task("task-002", status=TaskStatus.Running)
+
+    clock.now = 61
+    store["task-003"] = make_bas_task("task-003", status=TaskStatus.Finished)
+
+    assert "task-001" not in store
+    assert "task-002" in store
+    assert "task-003" in store
+    stats = store.stats()
+    assert (stats.evictions, stats.expirations, stats.resident) == (1, 1, 1)
+
+
+def test_memory_budget_evicts_least_recently_used(make_bas_task):
+    size = len(make_bas_task("task-001", status=TaskStatus.Finished).model_dump_json(by_alias=True))
+    store = MemoryTaskStore(BasExecTask, RetentionManager(memory_budget=size * 2))
+    store["task-001"] = make_bas_task("task-001", status=TaskStatus.Finished)
+    store["task-002"] = make_bas_task("task-002", status=TaskStatus.Finished)
+    store["task-001"]  # task-002 becomes the least recently used task
+    store["task-003"] = make_bas_task("task-003", status=TaskStatus.Finished)
+
+    assert sorted(store) == ["task-001", "task-003"]
+    stats = store.stats()
+    assert (stats.hits, stats.evictions, stats.resident) == (1, 1, 2)
+    assert stats.resident_bytes <= size * 2
+
+
+def test_archive_restores_evicted_tasks(make_bas_task):
+    store = MemoryTaskStore(BasExecTask, RetentionManager(memory_budget=0, archive=True))
+    task = make_bas_task("task-001", status=TaskStatus.Finished)
+    store["task-001"] = task
+
+    assert "task-001" in store
+    assert store["task-001"] == task
+    stats = store.stats()
+    assert (stats.misses, stats.archive_hits, stats.archived) == (1, 1, 1)
+    assert 0 < stats.archive_bytes < len(task.model_dump_json(by_alias=True))
+
+    del store["task-001"]
+    assert "task-001" not in store
+    assert store.stats().archived == 0
+
+
+def test_archive_budget_drops_oldest_archived_tasks(make_bas_task):
+    store = MemoryTaskStore(BasExecTask, RetentionManager(memory_budget=0, archive=True, archive_budget=1))
+    store["task-001"] = make_bas_task("task-001", status=TaskStatus.Finished)
+
+    with pytest.raises(KeyError):
+        store["task-001"]
+    assert store.stats().misses == 1
+
+
+def test_sqlite_store_retains_finished_tasks_within_budget(tmp_path, make_bas_task):
+    store = SqliteTaskStore(
+        BasExecTask, path=str(tmp_path / "tasks.db"), table="bas_tasks", retention=RetentionManager(ttl=3600)
+    )
+    store["task-001"] = make_bas_task("task-001", status=TaskStatus.Finished)
+    store.flush()
+
+    assert "task-001" in store._cache
+    store["task-001"]
+    assert store.stats().hits == 1
+    store.close()
+
+
+def test_resaved_tasks_update_the_resident_size(make_bas_task):
+    retention = RetentionManager()
+    task = make_bas_task("task-001", status=TaskStatus.Finished)
+    retention.track("task-001", task)
+    task.message = "x" * 1000
+    retention.track("task-001", task)
+
+    assert retention.stats.resident == 1
+    assert retention.stats.resident_bytes == len(task.model_dump_json(by_alias=True))
+
+
+def test_tasks_finished_in_place_are_evicted(make_bas_task):
+    clock = FakeClock()
+    store = MemoryTaskStore(BasExecTask, RetentionManager(ttl=60, clock=clock))
+    task = make_bas_task("task-001")
+    store["task-001"] = task
+    task.status = TaskStatus.Finished
+
+    clock.now = 61
+    store["task-002"] = make_bas_task("task-002")
+
+    assert "task-001" not in store
+    assert store.stats().expirations == 1
+
+    store = MemoryTaskStore(BasExecTask, RetentionManager(memory_budget=0))
+    task = make_bas_task("task-001")
+    store["task-001"] = task
+    task.status = TaskStatus.Running
+    assert store.stats().resident == 0
+    task.status = TaskStatus.Finished
+    store["task-002"] = make_bas_task("task-002")
+
+    assert sorted(store) == ["task-002"]
+    assert store.stats().evictions == 1
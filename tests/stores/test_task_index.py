@@ -0,0 +1,188 @@
+import sqlite3
+
+import pytest
+
+from mozz_sec.data.common_data import Common, InstanceInfo
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.stores.retention import RetentionManager
+from mozz_sec.services.stores.task_index import TaskFilter, TaskIndex, decode_cursor, encode_cursor, parse_status
+from mozz_sec.services.stores.task_store import MemoryTaskStore, SqliteTaskStore
+from mozz_sec.services.tasks.bas_task import BasExecTask
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryTaskStore(BasExecTask)
+        return
+    store = SqliteTaskStore(BasExecTask, path=str(tmp_path / "tasks.db"), table="bas_tasks")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def tasks(store, make_bas_task):
+    tasks = [make_bas_task(f"task-{i:03}", pbi=str(i % 3), instance_id=f"i{i % 2}") for i in range(30)]
+    for task in tasks:
+        store[task.task_id] = task
+    return tasks
+
+
+def ids(summaries):
+    return [summary.task_id for summary in summaries]
+
+
+@pytest.mark.parametrize(
+    "task_filter, expected",
+    [
+        (TaskFilter(), [f"task-{i:03}" for i in range(30)]),
+        (TaskFilter(pbi="1"), [f"task-{i:03}" for i in range(1, 30, 3)]),
+        (TaskFilter(pbi="1", instance_id="i0"), [f"task-{i:03}" for i in range(4, 30, 6)]),
+        (
+            TaskFilter(task_type="BAS_EXEC", status=TaskStatus.Waiting, pbi="0"),
+            [f"task-{i:03}" for i in range(0, 30, 3)],
+        ),
+        (TaskFilter(status=TaskStatus.Finished), []),
+        (TaskFilter(task_type="SBC_EXEC"), []),
+    ],
+)
+def test_select(store, tasks, task_filter, expected):
+    page, after = store.select(task_filter, limit=100)
+
+    assert ids(page) == expected
+    assert after is None
+
+
+def test_select_pages(store, tasks):
+    seen = []
+    after = None
+    while True:
+        page, after = store.select(TaskFilter(instance_id="i1"), after, limit=4)
+        seen.extend(ids(page))
+        if after is None:
+            break
+        assert after == page[-1].task_id
+
+    assert seen == [f"task-{i:03}" for i in range(1, 30, 2)]
+
+
+def test_index_follows_task_changes(store, tasks):
+    tasks[3].status = TaskStatus.Running
+    tasks[5].status = TaskStatus.Fault
+    tasks[5].message = "boom"
+    tasks[7].common = Common(pbi="42", instance_info=InstanceInfo(instance_id="i9", task_id="x"))
+
+    assert ids(store.select(TaskFilter(status=TaskStatus.Running))[0]) == ["task-003"]
+    [failed] = store.select(TaskFilter(status=TaskStatus.Fault))[0]
+    assert (failed.task_id, failed.message) == ("task-005", "boom")
+    assert ids(store.select(TaskFilter(pbi="42", instance_id="i9"))[0]) == ["task-007"]
+
+    del store["task-003"]
+    assert store.select(TaskFilter(status=TaskStatus.Running))[0] == []
+
+
+def test_index_seeks_past_the_cursor(make_bas_task):
+    index = TaskIndex()
+    for i in range(30):
+        index.update(f"task-{i:03}", make_bas_task(f"task-{i:03}", pbi=str(i % 3)))
+    index.update("task-004", make_bas_task("task-004", pbi="2"))
+    index.remove("task-007")
+    index.remove("missing")
+
+    assert index.select(TaskFilter(pbi="1"), "task-004", limit=3) == (["task-010", "task-013", "task-016"], True)
+    assert index.select(TaskFilter(pbi="2"), "task-020", limit=3) == (["task-023", "task-026", "task-029"], False)
+    assert index.select(TaskFilter(), "task-027") == (["task-028", "task-029"], False)
+    assert index.select(TaskFilter(pbi="9")) == ([], False)
+
+
+def test_memory_store_pages_past_tasks_deleted_meanwhile(monkeypatch, make_bas_task):
+    store = MemoryTaskStore(BasExecTask)
+    for i in range(5):
+        store[f"task-{i:03}"] = make_bas_task(f"task-{i:03}")
+    monkeypatch.setattr(store, "summaries", lambda task_ids: {})
+
+    assert store.select(TaskFilter(), limit=2) == ([], "task-001")
+
+
+@pytest.mark.parametrize(
+    "retention",
+    [RetentionManager(memory_budget=0), RetentionManager(memory_budget=0, archive=True, archive_budget=1)],
+)
+def test_tasks_dropped_for_good_leave_the_index(retention, make_bas_task):
+    store = MemoryTaskStore(BasExecTask, retention)
+    store["task-001"] = make_bas_task("task-001", status=TaskStatus.Finished)
+
+    assert "task-001" not in store
+    assert store.select(TaskFilter()) == ([], None)
+    assert store._index.select(TaskFilter()) == ([], False)
+
+
+def test_archived_tasks_stay_listed(make_bas_task):
+    store = MemoryTaskStore(BasExecTask, RetentionManager(memory_budget=0, archive=True))
+    store["task-001"] = make_bas_task("task-001", status=TaskStatus.Finished)
+
+    assert ids(store.select(TaskFilter(status=TaskStatus.Finished))[0]) == ["task-001"]
+
+
+def test_replaced_task_is_no_longer_observed(make_bas_task):
+    store = MemoryTaskStore(BasExecTask)
+    old = make_bas_task("task-001")
+    store["task-001"] = old
+    store["task-001"] = make_bas_task("task-001")
+
+    old.status = TaskStatus.Finished
+    assert ids(store.select(TaskFilter(status=TaskStatus.Waiting))[0]) == ["task-001"]
+
+
+def test_summaries(store, tasks):
+    tasks[2].progress = 40
+
+    summaries = store.summaries(["task-002", "missing", "task-010"])
+    assert list(summaries) == ["task-002", "task-010"]
+    assert summaries["task-002"].progress == 40
+    assert summaries["task-010"].pbi == "1"
+
+
+def test_sqlite_summaries_of_released_tasks(tmp_path, make_bas_task):
+    store = SqliteTaskStore(BasExecTask, path=str(tmp_path / "tasks.db"), table="bas_tasks")
+    task = make_bas_task("task-001", pbi="7")
+    store["task-001"] = task
+    task.status = TaskStatus.Finished
+    store.flush()
+
+    assert store._cache == {}
+    assert store.summaries(["task-001"])["task-001"].status == TaskStatus.Finished
+    assert ids(store.select(TaskFilter(status=TaskStatus.Finished, pbi="7"))[0]) == ["task-001"]
+    store.close()
+
+
+def test_sqlite_migrates_old_tables(tmp_path, make_bas_task):
+    path = str(tmp_path / "tasks.db")
+    task = make_bas_task("task-001", pbi="7", instance_id="i3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE bas_tasks (task_id TEXT PRIMARY KEY, status TEXT NOT NULL, task_type TEXT NOT NULL, "
+        "updated REAL NOT NULL, data BLOB NOT NULL)"
+    )
+    conn.execute(
+        "INSERT INTO bas_tasks VALUES (?, ?, ?, ?, ?)",
+        ("task-001", "W", "BAS_EXEC", 0.0, task.model_dump_json(by_alias=True)),
+    )
+    conn.commit()
+    conn.close()
+
+    store = SqliteTaskStore(BasExecTask, path=path, table="bas_tasks")
+    assert ids(store.select(TaskFilter(pbi="7", instance_id="i3"))[0]) == ["task-001"]
+    store.close()
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("task/ü")) == "task/ü"
+    assert decode_cursor(None) is None
+    with pytest.raises(ValueError):
+        decode_cursor("%%%")
+
+
+@pytest.mark.parametrize("value, expected", [("R", TaskStatus.Finished), ("Fault", TaskStatus.Fault), (None, None)])
+def test_parse_status(value, expected):
+    assert parse_status(value) is expected
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.settings import ExecutorSettings
+from mozz_sec.services.stores.task_store import MemoryTaskStore, SqliteTaskStore, create_task_store
+from mozz_sec.services.tasks.bas_task import BasExecTask
+
+
+@pytest.fixture
+def bas_task(make_bas_task):
+    return make_bas_task("task-001")
+
+
+def test_memory_store_behaves_like_dict(bas_task):
+    store = MemoryTaskStore(BasExecTask)
+    store["task-001"] = bas_task
+
+    assert "task-001" in store
+    assert store["task-001"] is bas_task
+    assert list(store) == ["task-001"]
+    del store["task-001"]
+    assert "task-001" not in store
+
+
+def test_sqlite_store_survives_restart(tmp_path, bas_task):
+    path = str(tmp_path / "tasks.db")
+    store = SqliteTaskStore(BasExecTask, path=path, table="bas_tasks")
+    store["task-001"] = bas_task
+    bas_task.progress = 50
+    store.save(bas_task)
+    store.close()
+
+    store = SqliteTaskStore(BasExecTask, path=path, table="bas_tasks")
+    assert "task-001" in store
+    assert "task-002" not in store
+    assert store["task-001"] == bas_task
+    assert len(store) == 1
+    store.close()
+
+
+def test_sqlite_store_releases_finished_tasks(tmp_path, bas_task):
+    store = SqliteTaskStore(BasExecTask, path=str(tmp_path / "tasks.db"), table="bas_tasks")
+    bas_task.status = TaskStatus.Finished
+    store["task-001"] = bas_task
+    store.flush()
+
+    assert store._cache == {}
+    assert store["task-001"].status == TaskStatus.Finished
+    store.close()
+
+
+def test_sqlite_store_flushes_full_batches(tmp_path, bas_task, monkeypatch):
+    store = SqliteTaskStore(
+        BasExecTask, path=str(tmp_path / "tasks.db"), table="bas_tasks", flush_interval=60, flush_batch=1
+    )
+    flushed = threading.Event()
+    flush = store.flush
+
+    def flush_and_notify():
+        flush()
+        flushed.set()
+
+    # The flusher thread calls ``self.flush``, which now tells the test when a flush is done.
+    monkeypatch.setattr(store, "flush", flush_and_notify)
+    store["task-001"] = bas_task
+
+    assert flushed.wait(timeout=10)
+    assert store._dirty == {}
+    store.close()
+
+
+@pytest.mark.parametrize(
+    "task_store, expected_type",
+    [
+        ("memory", MemoryTaskStore),
+        ("sqlite:///{tmp_path}/tasks.db", SqliteTaskStore),
+    ],
+)
+def test_create_task_store(tmp_path, task_store, expected_type):
+    settings = ExecutorSettings(task_store=task_store.format(tmp_path=tmp_path))
+    store = create_task_store(BasExecTask, "bas_tasks", settings)
+    assert type(store) is expected_type
+    store.close()
+
+
+def test_create_task_store_error_cases():
+    with pytest.raises(ValueError):
+        create_task_store(BasExecTask, "bas_tasks", ExecutorSettings(task_store="redis://localhost"))
@@ -0,0 +1,201 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.runners.sbc_runner import SbcRunner
+from mozz_sec.services.runners.worker import ScanWorker, queue_sub_tasks, start_workers, stop_workers
+from mozz_sec.services.scheduler import Priority
+from mozz_sec.services.settings import ExecutorSettings
+from mozz_sec.services.stores.task_store import SqliteTaskStore, create_task_store
+from mozz_sec.services.stores.work_queue import SqliteWorkQueue, create_work_queue
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+
+def files(count: int) -> List[SubSbcTask]:
+    return [SubSbcTask(file_path=f"/f{index}") for index in range(count)]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "tasks.db")
+
+
+@pytest.fixture
+def queue(db):
+    queue = SqliteWorkQueue(db, "sbc_tasks_queue", lease=30)
+    yield queue
+    queue.close()
+
+
+def test_claimed_sub_tasks_are_not_claimed_again(queue):
+    queue.put("t1", range(3))
+
+    first = queue.claim("a", 2)
+    second = queue.claim("b", 2)
+
+    assert [(item.task_id, item.index) for item in first] == [("t1", 0), ("t1", 1)]
+    assert [(item.task_id, item.index) for item in second] == [("t1", 2)]
+    assert queue.claim("c", 2) == []
+    queue.complete("a", first)
+    assert queue.depth() == 1
+
+
+def test_workers_prefer_their_task_and_steal_otherwise(queue):
+    queue.put("t1", range(3))
+    queue.put("t2", range(3))
+
+    assert {item.task_id for item in queue.claim("a", 2, affinity="t2")} == {"t2"}
+    assert [item.task_id for item in queue.claim("a", 3, affinity="t2")] == ["t1", "t1", "t2"]
+
+
+def test_higher_priorities_are_stolen_first(queue):
+    queue.put("low", range(2), priority=Priority.low)
+    queue.put("high", range(2), priority=Priority.high)
+
+    assert [item.task_id for item in queue.claim("a", 3)] == ["high", "high", "low"]
+
+
+def test_expired_leases_are_claimed_again(db):
+    queue = SqliteWorkQueue(db, "q", lease=0.05)
+    queue.put("t1", [0])
+    lost = queue.claim("dead", 1)
+    time.sleep(0.1)
+
+    assert queue.stats().expired == 1
+    retried = queue.claim("alive", 1)
+    assert [item.attempts for item in lost + retried] == [1, 2]
+    queue.complete("dead", lost)
+    assert queue.depth() == 1
+    queue.complete("alive", retried)
+    assert queue.depth() == 0
+    queue.close()
+
+
+def test_released_sub_tasks_go_back_to_the_queue(queue):
+    queue.put("t1", range(2))
+    items = queue.claim("a", 2)
+    queue.release("a", items[1:])
+
+    assert queue.stats() == queue.stats().model_copy(update={"queued": 1, "leased": 1})
+    assert queue.claim("b", 2)[0].attempts == 1
+
+
+def test_concurrent_claims_share_the_sub_tasks_out(db):
+    SqliteWorkQueue(db, "q").put("t1", range(500))
+    claimed = []
+    lock = threading.Lock()
+
+    def work(name):
+        queue = SqliteWorkQueue(db, "q")
+        while True:
+            items = queue.claim(name, 7)
+            if not items:
+                break
+            queue.complete(name, items)
+            with lock:
+                claimed.extend(item.index for item in items)
+        queue.close()
+
+    threads = [threading.Thread(target=work, args=(f"w{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == list(range(500))
+
+
+def test_shared_stores_see_the_changes_of_each_other(db, make_sbc_task):
+    api = SqliteTaskStore(SbcExecTask, path=db, table="sbc_tasks", shared=True)
+    worker = SqliteTaskStore(SbcExecTask, path=db, table="sbc_tasks", shared=True)
+    api["t1"] = make_sbc_task(*files(2), task_id="t1", securecat=True)
+
+    assert "t1" in worker
+    worker.apply("t1", lambda task: setattr(task, "message", "scanning"))
+    assert api["t1"].message == "scanning"
+    assert api._cache == {}
+    api.close()
+    worker.close()
+
+
+def test_shared_mode_needs_a_sqlite_store(db):
+    settings = ExecutorSettings(executor_mode="shared")
+
+    with pytest.raises(ValueError):
+        create_task_store(SbcExecTask, "sbc_tasks", settings)
+    with pytest.raises(ValueError):
+        create_work_queue("sbc_tasks", settings)
+    assert create_work_queue("sbc_tasks", ExecutorSettings()) is None
+
+
+def test_scan_worker_runs_the_queued_sub_tasks(db, queue, make_sbc_task):
+    store = SqliteTaskStore(SbcExecTask, path=db, table="sbc_tasks", shared=True)
+    store["t1"] = make_sbc_task(*files(5), task_id="t1", securecat=True)
+    queue_sub_tasks(queue, store["t1"])
+    worker = ScanWorker(SbcRunner, store, queue, "w1", batch=2)
+
+    claimed = [worker.run_once() for _ in range(4)]
+
+    task = store["t1"]
+    assert claimed == [2, 2, 1, 0]
+    assert (task.progress, task.status) == (100, TaskStatus.Finished)
+    assert [sub_task["status"] for sub_task in task.detail.details] == ["R"] * 5
+    assert queue.depth() == 0
+    store.close()
+
+
+def test_scan_worker_gives_up_after_the_last_attempt(db, make_sbc_task):
+    queue = SqliteWorkQueue(db, "sbc_tasks_queue", lease=0.01)
+    store = SqliteTaskStore(SbcExecTask, path=db, table="sbc_tasks", shared=True)
+    store["t1"] = make_sbc_task(*files(1), task_id="t1", securecat=True)
+    queue.put("t1", [0])
+    for _ in range(2):
+        queue.claim("dead", 1)
+        time.sleep(0.02)
+
+    ScanWorker(SbcRunner, store, queue, "w1", attempts=2).run_once()
+
+    assert store["t1"].detail.details[0]["status"] == TaskStatus.Fault.value
+    assert store["t1"].status == TaskStatus.Fault
+    store.close()
+    queue.close()
+
+
+def test_scan_worker_postpones_the_sub_tasks_of_missing_tasks(db, queue, make_sbc_task):
+    store = SqliteTaskStore(SbcExecTask, path=db, table="sbc_tasks", shared=True)
+    queue.put("t1", [0])
+    queue.put("t2", [0])
+    worker = ScanWorker(SbcRunner, store, queue, "w1", attempts=2, retry_delay=0.01)
+
+    assert worker.run_once() == 2
+    assert queue.stats().model_dump(include={"queued", "leased"}) == {"queued": 0, "leased": 2}
+    store["t1"] = make_sbc_task(*files(1), task_id="t1", securecat=True)
+    time.sleep(0.02)
+    assert worker.run_once() == 2
+
+    assert store["t1"].status == TaskStatus.Finished
+    assert queue.depth() == 0  # t2 was never stored, its sub-task is dropped after the last attempt
+    store.close()
+
+
+def test_worker_processes_run_the_sub_tasks(db, make_sbc_task):
+    settings = ExecutorSettings(executor_mode="shared", task_store=f"sqlite:///{db}", store_flush_interval=0.05)
+    store = create_task_store(SbcExecTask, "sbc_tasks", settings)
+    queue = create_work_queue("sbc_tasks", settings)
+    for index in range(3):
+        store[f"t{index}"] = make_sbc_task(*files(10), task_id=f"t{index}", securecat=True)
+        queue_sub_tasks(queue, store[f"t{index}"])
+
+    workers, stop = start_workers(SbcRunner, "sbc_tasks", 2, settings)
+    deadline = time.monotonic() + 60
+    while queue.depth() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    stop_workers(workers, stop, timeout=30)
+
+    assert queue.depth() == 0
+    assert all(store[f"t{index}"].status == TaskStatus.Finished for index in range(3))
+    queue.close()
+    store.close()
@@ -0,0 +1,191 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.apps import sbc_exec_app
+from mozz_sec.services.artifacts.cache import sha256_file
+from mozz_sec.services.scheduler import SchedulerFull
+from mozz_sec.services.tasks import rerun
+from mozz_sec.services.tasks.rerun import content_hash, plan_rerun
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+
+def finished(path: str, file_hash: str, **fields) -> SubSbcTask:
+    return SubSbcTask(
+        file_path=path,
+        file_hash=file_hash,
+        progress=100,
+        status=TaskStatus.Finished,
+        report_url="https://r.example/x",
+        **fields,
+    )
+
+
+@pytest.fixture
+def previous(make_sbc_task):
+    return make_sbc_task(
+        finished("/a", "ha", remark="clean"),
+        finished("/b", "hb"),
+        SubSbcTask(file_path="/c", file_hash="hc", progress=40, status=TaskStatus.Fault, message="boom"),
+        SubSbcTask(file_path="/d", file_hash="hd", status=TaskStatus.Stop),
+        finished("/e", ""),
+    )
+
+
+def test_rerun_reuses_unchanged_finished_files(previous, make_sbc_task):
+    task = make_sbc_task(
+        SubSbcTask(file_path="/a", file_hash="ha"),
+        SubSbcTask(file_path="/b", file_hash="changed"),
+        SubSbcTask(file_path="/c", file_hash="hc"),
+        SubSbcTask(file_path="/d", file_hash="hd"),
+        SubSbcTask(file_path="/e", file_hash="he"),
+        SubSbcTask(file_path="/new", file_hash="hn"),
+        rerun=True,
+    )
+
+    plan = plan_rerun(previous, task)
+
+    assert plan.reused == [0]
+    assert plan.pending == [1, 2, 3, 4, 5]
+    reused, changed, faulted = task.detail.details[:3]
+    assert (reused.status, reused.progress, reused.remark, reused.report_url) == (
+        TaskStatus.Finished,
+        100,
+        "clean",
+        "https://r.example/x",
+    )
+    assert (changed.status, changed.progress) == (TaskStatus.Waiting, 0)
+    assert (faulted.status, faulted.progress, faulted.message) == (TaskStatus.Waiting, 0, "")
+    assert (task.status, task.progress) == (TaskStatus.Running, 16)
+
+
+def test_rerun_with_another_scan_type_scans_everything(previous, make_sbc_task):
+    task = make_sbc_task(SubSbcTask(file_path="/a", file_hash="ha"), rerun=True, seninfo=True)
+
+    assert plan_rerun(previous, task).pending == [0]
+
+
+def test_rerun_hashes_local_files(tmp_path, previous, monkeypatch, make_sbc_task):
+    monkeypatch.setattr(rerun.SETTINGS, "sbc_workspace_dir", str(tmp_path))
+    path = tmp_path / "lib.so"
+    path.write_bytes(b"\x7fELF")
+    previous.detail.details.append(finished(str(path), sha256_file(path)))
+    task = make_sbc_task(SubSbcTask(file_path=str(path)), SubSbcTask(file_path="/missing"), rerun=True)
+
+    plan = plan_rerun(previous, task)
+
+    assert plan.reused == [0]
+    assert task.detail.details[0].file_hash == sha256_file(path)
+    path.write_bytes(b"\x7fELF changed")
+    assert plan_rerun(previous, make_sbc_task(SubSbcTask(file_path=str(path)), rerun=True)).pending == [0]
+
+
+def test_only_files_in_the_workspace_are_hashed(tmp_path):
+    workspace = tmp_path / "workspace"
+    (workspace / "pkg").mkdir(parents=True)
+    (workspace / "pkg" / "lib.so").write_bytes(b"\x7fELF")
+    (tmp_path / "secret").write_bytes(b"secret")
+    (workspace / "link").symlink_to(tmp_path / "secret")
+
+    assert content_hash(SubSbcTask(file_path=str(workspace / "pkg" / "lib.so")), str(workspace))
+    for path in (tmp_path / "secret", workspace / "pkg" / ".." / ".." / "secret", workspace / "link", workspace):
+        assert content_hash(SubSbcTask(file_path=str(path)), str(workspace)) == ""
+    assert content_hash(SubSbcTask(file_path=str(tmp_path / "secret")), "") == ""
+
+
+def test_rerun_of_tasks_read_from_json(previous, make_sbc_task):
+    previous = SbcExecTask.model_validate_json(previous.model_dump_json(by_alias=True))
+    task = make_sbc_task(rerun=True)
+    task.detail.details.extend(
+        [{"file": "/a", "fileHash": "ha", "status": "F"}, {"file": "/c", "fileHash": "hc", "status": "R"}]
+    )
+
+    assert plan_rerun(previous, task) == ([0], [1])
+    reused, pending = task.detail.details
+    assert (reused["status"], reused["progress"], reused["remark"]) == ("R", 100, "clean")
+    pending = SubSbcTask.model_validate(pending)
+    assert (pending.status, pending.progress, pending.file_hash) == (TaskStatus.Waiting, 0, "hc")
+
+
+def wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_rerun_replaces_an_ended_task(previous, make_sbc_task):
+    client = TestClient(sbc_exec_app.app)
+    sbc_exec_app.TASK_LIST["rerun-001"] = previous
+    task = make_sbc_task(SubSbcTask(file_path="/a", file_hash="ha"), SubSbcTask(file_path="/b", file_hash="hb2"))
+    body = json.loads(task.model_dump_json(by_alias=True))
+
+    assert client.post("/executor/v1/tools/sbc/tasks/rerun-001", json=body).status_code == 409
+    body["detail"]["params"]["rerun"] = True
+    assert client.post("/executor/v1/tools/sbc/tasks/rerun-001", json=body).status_code == 201
+
+    rerun = sbc_exec_app.TASK_LIST["rerun-001"]
+    assert rerun is not previous
+    wait_for(lambda: rerun.detail.details[0]["status"] == TaskStatus.Finished.value)
+    assert rerun.detail.details[1]["status"] == TaskStatus.Waiting.value
+
+
+def test_rerun_of_a_running_task_is_rejected(previous, make_sbc_task):
+    client = TestClient(sbc_exec_app.app)
+    previous.detail.details[2].status = TaskStatus.Running
+    sbc_exec_app.TASK_LIST["rerun-002"] = previous
+    body = json.loads(make_sbc_task(rerun=True).model_dump_json(by_alias=True))
+
+    response = client.post("/executor/v1/tools/sbc/tasks/rerun-002", json=body)
+
+    assert response.status_code == 409
+    assert "still running" in response.json()["detail"]
+
+
+def test_rerun_of_a_task_created_with_ended_sub_tasks(previous, make_sbc_task):
+    client = TestClient(sbc_exec_app.app)
+    data = json.loads(previous.model_dump_json(by_alias=True))
+    data["status"], data["progress"] = "W", 0
+    sbc_exec_app.TASK_LIST["rerun-003"] = SbcExecTask.model_validate(data)
+    body = json.loads(make_sbc_task(rerun=True).model_dump_json(by_alias=True))
+
+    assert client.post("/executor/v1/tools/sbc/tasks/rerun-003", json=body).status_code == 201
+
+
+class FullScheduler:
+    def submit_many(self, function, calls, priority=None):
+        return 0, SchedulerFull(0, 1)
+
+    def retry_after(self):
+        return 1
+
+
+def test_batches_rerun_ended_tasks(previous, make_sbc_task, monkeypatch):
+    client = TestClient(sbc_exec_app.app)
+    sbc_exec_app.TASK_LIST["rerun-batch-1"] = previous
+    running = make_sbc_task(SubSbcTask(status=TaskStatus.Running))
+    sbc_exec_app.TASK_LIST["rerun-batch-2"] = running
+    rerun_task = json.loads(make_sbc_task(rerun=True).model_dump_json(by_alias=True))
+    task = json.loads(make_sbc_task().model_dump_json(by_alias=True))
+    body = [
+        {"taskId": "rerun-batch-1", "task": rerun_task},
+        {"taskId": "rerun-batch-2", "task": rerun_task},
+        {"taskId": "rerun-batch-2", "task": task},
+    ]
+
+    results = client.post("/executor/v1/tools/sbc/tasks:batchCreate", json=body).json()
+
+    assert [result["statusCode"] for result in results] == [201, 409, 409]
+    assert "still running" in results[1]["detail"]
+    assert "already exists" in results[2]["detail"]
+    assert sbc_exec_app.TASK_LIST["rerun-batch-1"] is not previous
+    assert sbc_exec_app.TASK_LIST["rerun-batch-2"] is running
+
+    sbc_exec_app.TASK_LIST["rerun-batch-3"] = previous
+    monkeypatch.setattr(sbc_exec_app, "SCHEDULER", FullScheduler())
+    body = [{"taskId": "rerun-batch-3", "task": rerun_task}]
+    assert client.post("/executor/v1/tools/sbc/tasks:batchCreate", json=body).json()[0]["statusCode"] == 429
+    assert sbc_exec_app.TASK_LIST["rerun-batch-3"] is previous
@@ -0,0 +1,268 @@
+import copy
+import json
+import pickle
+from pathlib import Path
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.events import change_event
+from mozz_sec.services.runners.sbc_runner import SbcRunner
+from mozz_sec.services.tasks.columnar import SubTaskColumns
+from mozz_sec.services.tasks.sbc_task import SbcCleanseTask, SbcExecTask, SubSbcTask
+
+
+@pytest.fixture
+def sbc_task():
+    return SbcExecTask.model_validate(
+        {
+            "detail": {
+                "params": {
+                    "username": "p_mozzps",
+                    "password": "Huawei12#$",
+                    "url-list": [],
+                    "scan-type": {"binscope": True},
+                }
+            }
+        }
+    )
+
+
+def sub_tasks(count: int) -> List[SubSbcTask]:
+    statuses = list(TaskStatus)
+    return [
+        SubSbcTask(
+            file_path=f"/data/pkg/lib{index}.so",
+            progress=index % 101,
+            status=statuses[index % len(statuses)],
+            category="binscope" if index % 2 else "",
+            remark="" if index % 3 else f"remark {index}",
+            cover=index % 5 != 0,
+            category_url="https://secguard.example.com/category",
+        )
+        for index in range(count)
+    ]
+
+
+def test_details_are_stored_as_columns(sbc_task):
+    sbc_task.detail.details = sub_tasks(3)
+
+    assert isinstance(sbc_task.detail.details, SubTaskColumns)
+    assert len(sbc_task.detail.details) == 3
+
+
+class ListCleanseTask(SbcCleanseTask):
+    sub_task_model = None
+
+
+@pytest.mark.parametrize("slim", [False, True])
+def test_json_matches_a_list_of_sub_tasks(sbc_task, slim):
+    sbc_task.detail.details = sub_tasks(20)
+    expected = ListCleanseTask(details=sub_tasks(20), params=sbc_task.detail.params)
+
+    context = {"slim": True} if slim else None
+    assert type(expected.details) is not SubTaskColumns
+    assert sbc_task.detail.model_dump_json(by_alias=True, context=context) == expected.model_dump_json(
+        by_alias=True, context=context
+    )
+
+
+def test_python_dump_matches_a_list_of_sub_tasks(sbc_task):
+    sbc_task.detail.details = sub_tasks(7)
+    dumped = sbc_task.detail.model_dump()["details"]
+
+    assert dumped == [sub_task.model_dump() for sub_task in sub_tasks(7)]
+    assert isinstance(dumped[1]["file_path"], Path)
+    assert dumped[1]["status"] is TaskStatus.Running
+
+
+def test_materialized_sub_tasks_equal_the_originals(sbc_task):
+    sbc_task.detail.details = sub_tasks(5)
+
+    assert list(sbc_task.detail.details) == sub_tasks(5)
+    assert sbc_task.detail.details[-1].model_fields_set == {"file_path", "progress", "status", "category_url"}
+
+
+def test_views_are_kept_while_referenced_and_write_back(sbc_task):
+    details = sbc_task.detail.details
+    details.extend(sub_tasks(3))
+    view = details[1]
+
+    assert details[1] is view
+    assert details.index_of(view) == 1
+    view.message = "scanned"
+    view.file_path = Path("/data/other.so")
+    del view
+
+    assert details[1].message == "scanned"
+    assert details[1].file_path == Path("/data/other.so")
+
+
+def test_changes_of_views_roll_up(sbc_task):
+    details = sbc_task.detail.details
+    details.extend(SubSbcTask() for _ in range(4))
+    versions = [sbc_task.version]
+
+    for sub_task in details:
+        sub_task.progress = 100
+        sub_task.status = TaskStatus.Finished
+        versions.append(sbc_task.version)
+
+    assert sbc_task.progress == 100
+    assert sbc_task.status == TaskStatus.Finished
+    assert versions == sorted(set(versions))
+
+
+def test_added_and_removed_sub_tasks_roll_up(sbc_task):
+    details = sbc_task.detail.details
+    details.extend([SubSbcTask(progress=100, status=TaskStatus.Finished), SubSbcTask()])
+    assert (sbc_task.progress, sbc_task.status) == (50, TaskStatus.Running)
+
+    version = sbc_task.version
+    del details[1]
+    assert (sbc_task.progress, sbc_task.status) == (100, TaskStatus.Finished)
+    assert sbc_task.version > version
+
+    details.insert(0, {"progress": 0, "status": "W"})
+    assert sbc_task.progress == 50
+    details.clear()
+    assert len(details) == 0
+
+
+def test_insert_and_delete_move_views(sbc_task):
+    details = sbc_task.detail.details
+    details.extend(sub_tasks(4))
+    last = details[3]
+
+    details.insert(0, SubSbcTask(category="first"))
+    assert details[4] is last
+    del details[0:2]
+    assert details[2] is last
+    assert details.index_of(last) == 2
+
+    last.progress = 77
+    assert sbc_task.detail.details.dump()[2]["progress"] == 77
+
+
+def test_removed_views_are_released(sbc_task):
+    details = sbc_task.detail.details
+    details.extend(sub_tasks(2))
+    view = details.pop(0)
+    version = sbc_task.version
+
+    view.progress = 42
+
+    assert view._parent is None
+    assert sbc_task.version == version
+    assert details[0].file_path == Path("/data/pkg/lib1.so")
+
+
+def test_values_the_columns_cannot_hold_keep_the_sub_task(sbc_task):
+    details = sbc_task.detail.details
+    details.extend(sub_tasks(3))
+    view = details[1]
+
+    view.progress = 1000
+    view.message = "kept"
+    del view
+
+    assert details[1].progress == 1000
+    assert details[1].message == "kept"
+    assert details.dump()[1]["progress"] == 1000
+    assert sbc_task.progress == int((0 + 1000 + 2) / 3)
+
+
+def test_other_details_are_kept_as_they_are(sbc_task):
+    item = {"file": "/x", "progress": 100, "status": "F", "extra": 1}
+    details = sbc_task.detail.details
+    details.extend([SubSbcTask(), item, SubSbcTask.model_construct(progress=1000)])
+
+    assert details[1] is item
+    assert details.dump()[1] is item
+    assert details[2].progress == 1000
+    assert json.loads(sbc_task.dump_json_cached(slim=True))["detail"]["details"] == [{}, item, {"progress": 1000}]
+
+
+def test_details_from_json_keep_their_keys():
+    task = SbcExecTask.model_validate_json(
+        json.dumps(
+            {
+                "detail": {
+                    "params": {"username": "", "password": "", "scan-type": {"binscope": True}},
+                    "details": [{"progress": 100, "status": "F", "custom": True}],
+                }
+            }
+        )
+    )
+
+    assert task.detail.details[0] == {"progress": 100, "status": "F", "custom": True}
+    assert task.detail.progress == 100
+
+
+def test_shallow_copies_have_their_own_columns(sbc_task):
+    sbc_task.detail.details = sub_tasks(3)
+    copied = copy.copy(sbc_task.detail)
+
+    copied.details.append(SubSbcTask())
+    copied.details[0].progress = 100
+
+    assert len(sbc_task.detail.details) == 3
+    assert sbc_task.detail.details[0].progress == 0
+    assert copied.details.owner is copied
+
+
+@pytest.mark.parametrize("clone", [copy.deepcopy, lambda task: pickle.loads(pickle.dumps(task))])
+def test_copies_have_their_own_columns(sbc_task, clone):
+    sbc_task.detail.details = sub_tasks(3)
+    copied = clone(sbc_task)
+
+    copied.detail.details[0].progress = 100
+    copied.detail.details.append(SubSbcTask())
+
+    assert len(sbc_task.detail.details) == 3
+    assert sbc_task.detail.details[0].progress == 0
+    assert copied.detail.details.owner is copied.detail
+    assert copied.model_dump_json(by_alias=True) != sbc_task.model_dump_json(by_alias=True)
+    assert copied.detail.progress == int((100 + 1 + 2 + 0) / 4)
+
+
+def test_columns_given_to_another_task_are_copied(sbc_task):
+    sbc_task.detail.details = sub_tasks(2)
+    other = SbcCleanseTask(details=sbc_task.detail.details, params=sbc_task.detail.params)
+
+    assert other.details is not sbc_task.detail.details
+    assert other.details == sbc_task.detail.details
+    assert sbc_task.detail.details.owner is sbc_task.detail
+
+
+def test_many_distinct_strings_are_stored_as_strings(sbc_task):
+    details = sbc_task.detail.details
+    details.extend(SubSbcTask(file_path=f"/f{index}", remark=f"r{index % 3}") for index in range(5000))
+
+    assert details[4999].file_path == Path("/f4999")
+    assert details[2].remark == "r2"
+    assert details.dump()[4321] == TypeAdapter(SubSbcTask).dump_python(
+        SubSbcTask(file_path="/f4321", remark="r1"), mode="json", by_alias=True
+    )
+
+
+def test_events_of_views_have_their_index(sbc_task):
+    events = []
+    sbc_task.observe(lambda task, source, name: events.append(change_event(task, source, name)))
+    sbc_task.detail.details.extend(sub_tasks(3))
+
+    sbc_task.detail.details[2].message = "done"
+
+    frames = [event.frame.decode() for event in events if event is not None]
+    assert '"count":3' in frames[0]
+    assert any('"index":2' in frame and '"value":"done"' in frame for frame in frames)
+
+
+def test_runner_updates_the_columns(sbc_task):
+    sbc_task.detail.details = sub_tasks(3)
+    runner = SbcRunner(task=sbc_task, mode="sequential")
+
+    assert [sub_runner.task for sub_runner in runner.sub_runners] == list(sbc_task.detail.details)
+    assert runner.sub_runners[0].task is sbc_task.detail.details[0]
@@ -0,0 +1,152 @@
+import copy
+import pickle
+
+import pytest
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.tasks.bas_task import SubBasTask
+from mozz_sec.services.tasks.sbc_task import SbcExecTask, SubSbcTask
+
+
+@pytest.fixture
+def sbc_task():
+    return SbcExecTask.model_validate(
+        {
+            "detail": {
+                "params": {
+                    "username": "p_mozzps",
+                    "password": "Huawei12#$",
+                    "url-list": [],
+                    "scan-type": {"binscope": True},
+                }
+            }
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "statuses, expected_status",
+    [
+        ([TaskStatus.Waiting, TaskStatus.Waiting], TaskStatus.Waiting),
+        ([TaskStatus.Finished, TaskStatus.Waiting], TaskStatus.Running),
+        ([TaskStatus.Running, TaskStatus.Fault], TaskStatus.Running),
+        ([TaskStatus.Finished, TaskStatus.Finished], TaskStatus.Finished),
+        ([TaskStatus.Finished, TaskStatus.Fault], TaskStatus.Fault),
+        ([TaskStatus.Finished, TaskStatus.Stop], TaskStatus.Stop),
+    ],
+)
+def test_status_roll_up(sbc_task, statuses, expected_status):
+    sub_tasks = [SubSbcTask() for _ in statuses]
+    sbc_task.detail.details.extend(sub_tasks)
+    for sub_task, sub_status in zip(sub_tasks, statuses):
+        sub_task.status = sub_status
+
+    assert sbc_task.detail.status == expected_status
+    assert sbc_task.status == expected_status
+
+
+def test_progress_roll_up(sbc_task):
+    sub_tasks = [SubSbcTask(progress=10) for _ in range(3)]
+    sbc_task.detail.details.extend(sub_tasks)
+    sub_tasks[0].progress = 100
+    sub_tasks[1].progress = 50
+
+    assert sbc_task.detail.progress == 53
+    assert sbc_task.progress == 53
+
+    sbc_task.detail.details.pop(0)
+    assert sbc_task.progress == 30
+
+    sbc_task.detail.details[0] = SubSbcTask(progress=90)
+    assert sbc_task.progress == 50
+    assert sub_tasks[1]._parent is None
+
+
+def test_removing_the_last_detail_resets_the_roll_up(sbc_task):
+    sbc_task.detail.details.append(SubSbcTask(progress=100, status=TaskStatus.Finished))
+    assert (sbc_task.progress, sbc_task.status) == (100, TaskStatus.Finished)
+
+    sbc_task.detail.details.clear()
+    assert (sbc_task.detail.progress, sbc_task.detail.status) == (0, TaskStatus.Waiting)
+    assert (sbc_task.progress, sbc_task.status) == (0, TaskStatus.Waiting)
+
+    sbc_task.detail.details = [SubSbcTask(progress=40, status=TaskStatus.Running)]
+    sbc_task.detail.details = []
+    assert (sbc_task.progress, sbc_task.status) == (0, TaskStatus.Waiting)
+
+
+def test_update_progress_is_idempotent(sbc_task):
+    sbc_task.detail.details.append(SubSbcTask(progress=40))
+    sbc_task.update_progress()
+    sbc_task.update_progress()
+    sbc_task.update_status()
+
+    assert sbc_task.progress == 40
+    assert sbc_task.status == TaskStatus.Waiting
+
+
+def test_roll_up_of_validated_details():
+    task = SbcExecTask.model_validate(
+        {
+            "detail": {
+                "params": {"username": "", "password": "", "scan-type": {"binscope": True}},
+                "details": [{"progress": 100, "status": "R"}, {"progress": 0, "status": "B"}],
+            }
+        }
+    )
+
+    assert task.detail.progress == 50
+    assert task.detail.status == TaskStatus.Running
+
+
+def test_tasks_built_from_ended_sub_tasks_take_their_roll_up():
+    task = SbcExecTask.model_validate(
+        {
+            "status": "W",
+            "detail": {
+                "params": {"username": "", "password": "", "scan-type": {"binscope": True}},
+                "details": [{"progress": 100, "status": "R"}, {"progress": 100, "status": "R"}],
+            },
+        }
+    )
+
+    assert (task.status, task.progress) == (TaskStatus.Finished, 100)
+    assert SbcExecTask.model_validate_json(task.model_dump_json(by_alias=True)).status == TaskStatus.Finished
+    params = {"username": "", "password": "", "scan-type": {"binscope": True}}
+    assert SbcExecTask.model_validate({"status": "B", "detail": {"params": params}}).status == TaskStatus.Running
+
+
+def test_replaced_details_are_detached(sbc_task):
+    old = SubSbcTask()
+    sbc_task.detail.details.append(old)
+    sbc_task.detail.details = [SubSbcTask(progress=20)]
+    old.progress = 100
+
+    assert sbc_task.progress == 20
+
+
+@pytest.mark.parametrize("clone", [copy.deepcopy, lambda task: pickle.loads(pickle.dumps(task))])
+def test_copies_keep_their_own_roll_up(sbc_task, clone):
+    sbc_task.detail.details.append(SubSbcTask())
+    cloned = clone(sbc_task)
+    cloned.detail.details[0].progress = 100
+
+    assert cloned.progress == 100
+    assert sbc_task.progress == 0
+
+
+def test_detail_lists_keep_the_index_of_their_sub_tasks(make_bas_task):
+    details = make_bas_task().detail.details
+    details.extend(SubBasTask(remark=str(index)) for index in range(5))
+    details.insert(1, SubBasTask(remark="inserted"))
+    details.append(SubBasTask(remark="appended"))
+    del details[0]
+    details.remove(details[2])
+    details.pop(-2)
+    details[1:3] = [SubBasTask(remark="sliced")]
+    details[0] = SubBasTask(remark="replaced")
+
+    assert [detail.remark for detail in details] == ["replaced", "sliced", "appended"]
+    assert [detail._row for detail in details] == [0, 1, 2]
+    assert [details.index_of(detail) for detail in details] == [0, 1, 2]
+    assert details.index_of(SubBasTask(remark="appended")) == -1
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mozz_sec.services._types import TaskStatus
+from mozz_sec.services.apps.sbc_exec_app import app, TASK_LIST
+from mozz_sec.services.events import TaskEventHub
+from mozz_sec.services.tasks.sbc_task import SubSbcTask
+
+
+def parse(frames: bytes):
+    events = []
+    for frame in frames.decode("utf-8").split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_delta_events(make_sbc_task):
+    async def run():
+        hub = TaskEventHub()
+        task = make_sbc_task(SubSbcTask(), SubSbcTask(), task_id="t1")
+        hub.watch(task)
+        subscription = hub.subscribe("t1")
+
+        task.detail.details[1].progress = 40
+        task.detail.details.append(SubSbcTask())
+        await asyncio.sleep(0)
+        events = []
+        while not subscription._queue.empty():
+            events.extend(parse((await subscription.get()).frame))
+        subscription.close()
+        return events, hub.subscribers()
+
+    events, subscribers = asyncio.run(run())
+    changes = [
+        (kind, data.get("index"), data.get("field"), data.get("value"), data.get("count")) for kind, data in events
+    ]
+    assert changes == [
+        ("subTask", 1, "progress", 40, None),
+        ("detail", None, "progress", 20, None),
+        ("task", None, "progress", 20, None),
+        ("details", None, None, None, 3),
+        ("detail", None, "progress", 13, None),
+        ("task", None, "progress", 13, None),
+    ]
+    assert subscribers == 0
+
+
+def test_slow_subscriber_is_dropped(make_sbc_task):
+    async def run():
+        hub = TaskEventHub(max_queue=2)
+        task = make_sbc_task(SubSbcTask(), SubSbcTask(), task_id="t2")
+        hub.watch(task)
+        slow = hub.subscribe("t2")
+        everything = hub.subscribe()
+        for progress in range(1, 4):
+            task.message = str(progress)
+        await asyncio.sleep(0)
+        return slow, everything, hub
+
+    slow, everything, hub = asyncio.run(run())
+    assert slow.dropped and everything.dropped
+    assert hub.subscribers() == 0
+
+
+def test_events_from_worker_threads(make_sbc_task):
+    async def run():
+        hub = TaskEventHub()
+        task = make_sbc_task(SubSbcTask(), SubSbcTask(), task_id="t3")
+        hub.watch(task)
+        subscription = hub.subscribe("t3")
+        for sub_task in task.detail.details:
+            threading.Thread(target=setattr, args=(sub_task, "status", TaskStatus.Finished)).start()
+        changes = []
+        event = None
+        while event is None or not event.terminal:
+            event = await subscription.get(timeout=1)
+            assert event is not None
+            kind, data = parse(event.frame)[0]
+            changes.append((kind, data.get("field"), data.get("value")))
+        return changes
+
+    changes = asyncio.run(run())
+    assert changes.count(("subTask", "status", TaskStatus.Finished.value)) == 2
+    assert changes[-1] == ("task", "status", TaskStatus.Finished.value)
+
+
+def test_task_stream_ends_with_the_task(make_sbc_task):
+    task = make_sbc_task(SubSbcTask(), SubSbcTask(), task_id="task-sse")
+    TASK_LIST["task-sse"] = task
+
+    def finish():
+        time.sleep(0.3)
+        for sub_task in task.detail.details:
+            sub_task.progress = 100
+            sub_task.status = TaskStatus.Finished
+
+    threading.Thread(target=finish).start()
+    with TestClient(app) as client:
+        response = client.get("/executor/v1/tools/sbc/tasks/task-sse/events")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse(response.content)
+    assert events[0][0] == "snapshot"
+    assert events[0][1]["task"]["taskId"] == "task-sse"
+    assert ("subTask", 1, "status", "R") in [(k, d.get("index"), d.get("field"), d.get("value")) for k, d in events]
+    kind, data = events[-1]
+    assert (kind, data["field"], data["value"]) == ("task", "status", "R")
+
+
+def test_task_stream_of_unknown_task():
+    assert TestClient(app).get("/executor/v1/tools/sbc/tasks/missing/events").status_code == 404
@@ -0,0 +1,128 @@
+import asyncio
+
+import httpx
+import pytest
+
+from mozz_sec.services.http_client import SharedHttpClient, _parse_retry_after
+
+
+def make_client(handler, **kwargs) -> SharedHttpClient:
+    return SharedHttpClient(backoff=0, transport=httpx.MockTransport(handler), **kwargs)
+
+
+@pytest.mark.parametrize(
+    "responses, expected_status, expected_calls",
+    [
+        ([200], 200, 1),
+        ([503, 502, 200], 200, 3),
+        ([429, 429, 429, 429], 429, 4),
+        ([404, 200], 404, 1),
+    ],
+)
+def test_request_retries_retryable_status(responses, expected_status, expected_calls):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(responses[len(calls) - 1], headers={"Retry-After": "0"})
+
+    async def main():
+        client = make_client(handler, retries=3)
+        response = await client.get("https://secguard.rnd.huawei.com/")
+        await client.aclose()
+        return response
+
+    assert asyncio.run(main()).status_code == expected_status
+    assert len(calls) == expected_calls
+
+
+def test_request_retries_transport_errors():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        raise httpx.ConnectError("connection refused", request=request)
+
+    async def main():
+        client = make_client(handler, retries=2)
+        with pytest.raises(httpx.ConnectError):
+            await client.get("https://secguard.rnd.huawei.com/")
+
+    asyncio.run(main())
+    assert len(calls) == 3
+
+
+def test_client_follows_the_event_loop():
+    client = make_client(lambda request: httpx.Response(200))
+
+    async def main():
+        await client.get("https://secguard.rnd.huawei.com/")
+        return client.client
+
+    first = asyncio.run(main())
+    second = asyncio.run(main())
+    assert first is not second
+
+
+@pytest.mark.parametrize("value, expected", [("3", 3.0), ("-1", 0.0), ("soon", None)])
+def test_parse_retry_after(value, expected):
+    assert _parse_retry_after(value) == expected
+
+
+@pytest.mark.parametrize(
+    "method, error, expected_calls",
+    [
+        ("GET", httpx.ReadError, 3),
+        ("POST", httpx.ReadError, 1),
+        ("PUT", httpx.RemoteProtocolError, 1),
+        ("POST", httpx.ConnectError, 3),
+        ("PUT", httpx.ConnectTimeout, 3),
+    ],
+)
+def test_requests_that_may_have_been_processed_are_not_sent_again(method, error, expected_calls):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        raise error("failed", request=request)
+
+    async def main():
+        client = make_client(handler, retries=2)
+        with pytest.raises(error):
+            await client.request(method, "https://secguard.rnd.huawei.com/", json={})
+
+    asyncio.run(main())
+    assert len(calls) == expected_calls
+
+
+@pytest.mark.parametrize(
+    "method, responses, expected_status, expected_calls",
+    [
+        ("POST", [502, 200], 502, 1),
+        ("PUT", [504, 200], 504, 1),
+        ("POST", [503, 429, 200], 200, 3),
+        ("GET", [502, 504, 200], 200, 3),
+    ],
+)
+def test_gateway_errors_are_only_retried_for_idempotent_methods(method, responses, expected_status, expected_calls):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(responses[len(calls) - 1], headers={"Retry-After": "0"})
+
+    async def main():
+        client = make_client(handler, retries=3)
+        response = await client.request(method, "https://secguard.rnd.huawei.com/", json={})
+        await client.aclose()
+        return response
+
+    assert asyncio.run(main()).status_code == expected_status
+    assert len(calls) == expected_calls
+
+
+def test_retry_after_is_capped():
+    client = make_client(lambda request: httpx.Response(503), max_retry_after=2)
+    response = httpx.Response(503, headers={"Retry-After": "86400"})
+
+    assert client._delay(0, response) == 2
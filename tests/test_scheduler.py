@@ -0,0 +1,260 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mozz_sec.services.apps import sbc_exec_app
+from mozz_sec.services.scheduler import Priority, SchedulerFull, TaskScheduler
+from mozz_sec.services.tasks.sbc_task import SbcExecTask
+
+
+class Gate:
+    """A job blocking its worker until opened."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.opened = threading.Event()
+
+    def __call__(self):
+        self.started.set()
+        assert self.opened.wait(5)
+
+
+def run_all(scheduler: TaskScheduler) -> None:
+    done = threading.Event()
+    scheduler.submit(done.set, priority=Priority.low, tenant="zz-last")
+    assert done.wait(5)
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = TaskScheduler("test", workers=1, max_queue=100)
+    yield scheduler
+    scheduler.shutdown()
+
+
+@pytest.fixture
+def blocked(scheduler):
+    gate = Gate()
+    scheduler.submit(gate)
+    assert gate.started.wait(5)
+    yield gate
+    gate.opened.set()
+
+
+def test_higher_priorities_start_first(scheduler, blocked):
+    order = []
+    for priority in (Priority.low, Priority.normal, Priority.high, Priority.normal):
+        scheduler.submit(order.append, priority.value, priority=priority)
+
+    blocked.opened.set()
+    run_all(scheduler)
+
+    assert order == ["high", "normal", "normal", "low"]
+
+
+def test_tenants_take_turns(scheduler, blocked):
+    order = []
+    for index in range(3):
+        scheduler.submit(order.append, f"a{index}", tenant="a")
+    scheduler.submit(order.append, "b0", tenant="b")
+    scheduler.submit(order.append, "b1", tenant="b")
+    scheduler.submit(order.append, "c0", tenant="c")
+
+    blocked.opened.set()
+    run_all(scheduler)
+
+    assert order == ["a0", "b0", "c0", "a1", "b1", "a2"]
+
+
+def test_full_queue_rejects_with_retry_after():
+    scheduler = TaskScheduler("full", workers=1, max_queue=2)
+    gate = Gate()
+    scheduler.submit(gate)
+    assert gate.started.wait(5)
+    scheduler.submit(print)
+    scheduler.submit(print)
+
+    with pytest.raises(SchedulerFull) as exc_info:
+        scheduler.submit(print)
+
+    assert 1 <= exc_info.value.retry_after <= 300
+    stats = scheduler.stats()
+    assert (stats.queued, stats.running, stats.rejected, stats.submitted) == (2, 1, 1, 3)
+    gate.opened.set()
+    scheduler.shutdown()
+
+
+def test_submit_many_queues_what_fits_in_one_step():
+    scheduler = TaskScheduler("many", workers=1, max_queue=2)
+    gate = Gate()
+    scheduler.submit(gate)
+    assert gate.started.wait(5)
+    order = []
+
+    queued, exc = scheduler.submit_many(order.append, [(("a0",), "a"), (("a1",), "a"), (("b0",), "b")])
+
+    assert queued == 2
+    assert isinstance(exc, SchedulerFull) and 1 <= exc.retry_after <= 300
+    stats = scheduler.stats()
+    assert (stats.queued, stats.rejected, stats.submitted) == (2, 1, 3)
+    gate.opened.set()
+    deadline = time.monotonic() + 5
+    while scheduler.stats().completed < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert order == ["a0", "a1"]
+    assert scheduler.submit_many(order.append, [(("c0",), "c")]) == (1, None)
+    scheduler.shutdown()
+
+
+def test_workers_are_bounded():
+    scheduler = TaskScheduler("bounded", workers=3, max_queue=100)
+    gates = [Gate() for _ in range(5)]
+    for gate in gates:
+        scheduler.submit(gate)
+    assert all(gate.started.wait(5) for gate in gates[:3])
+
+    assert not gates[3].started.is_set()
+    assert scheduler.stats().running == 3
+    assert scheduler.stats().queued == 2
+    for gate in gates:
+        gate.opened.set()
+    run_all(scheduler)
+    scheduler.shutdown()
+
+
+def test_stats_count_waits_and_failures(scheduler):
+    def fail():
+        raise RuntimeError("boom")
+
+    scheduler.submit(fail)
+    run_all(scheduler)
+    stats = scheduler.stats()
+
+    assert (stats.completed, stats.failed, stats.queued) == (1, 1, 0)
+    assert stats.wait_seconds_max >= stats.wait_seconds_avg >= 0
+    assert stats.model_dump(by_alias=True)["queuedByPriority"] == {"high": 0, "normal": 0, "low": 0}
+
+
+def test_scheduler_runs_again_after_shutdown(scheduler, blocked):
+    scheduler.submit(print)
+    blocked.opened.set()
+    scheduler.shutdown()
+
+    assert scheduler.stats().cancelled == 1
+    run_all(scheduler)
+
+
+def test_shutdown_stops_waiting_after_the_timeout(scheduler, blocked):
+    started = time.monotonic()
+    scheduler.shutdown(timeout=0.1)
+
+    assert time.monotonic() - started < 2
+    blocked.opened.set()
+
+
+def test_aclose_waits_for_running_jobs_off_the_event_loop(scheduler, blocked):
+    async def close():
+        closing = asyncio.ensure_future(scheduler.aclose())
+        await asyncio.sleep(0.05)
+        assert not closing.done()
+        blocked.opened.set()
+        await asyncio.wait_for(closing, 5)
+
+    asyncio.run(close())
+
+
+@pytest.fixture
+def task_data():
+    data = {"detail": {"params": {"username": "u", "password": "p", "url-list": [], "scan-type": {"binscope": True}}}}
+    return json.loads(SbcExecTask.model_validate(data).model_dump_json(by_alias=True))
+
+
+@pytest.fixture
+def full_app(monkeypatch):
+    scheduler = TaskScheduler("sbc-test", workers=1, max_queue=0)
+    gate = Gate()
+    scheduler.submit(gate)
+    assert gate.started.wait(5)
+    monkeypatch.setattr(sbc_exec_app, "SCHEDULER", scheduler)
+    yield TestClient(sbc_exec_app.app)
+    gate.opened.set()
+    scheduler.shutdown()
+
+
+def test_create_task_is_rejected_when_the_queue_is_full(full_app, task_data):
+    response = full_app.post("/executor/v1/tools/sbc/tasks/scheduler-full", json=task_data)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert "scheduler-full" not in sbc_exec_app.TASK_LIST
+
+
+def test_batch_items_are_rejected_when_the_queue_is_full(full_app, task_data):
+    body = [{"taskId": "scheduler-batch", "task": task_data}]
+    response = full_app.post("/executor/v1/tools/sbc/tasks:batchCreate", json=body)
+
+    assert response.status_code == 200
+    assert response.json()[0]["statusCode"] == 429
+    assert "Retry-After" in response.headers
+    assert "scheduler-batch" not in sbc_exec_app.TASK_LIST
+
+
+def test_batch_overflow_is_rejected_in_one_scheduling_step(monkeypatch, task_data):
+    scheduler = TaskScheduler("sbc-test", workers=1, max_queue=1)
+    gate = Gate()
+    scheduler.submit(gate)
+    assert gate.started.wait(5)
+    monkeypatch.setattr(sbc_exec_app, "SCHEDULER", scheduler)
+    body = [{"taskId": f"scheduler-overflow-{index}", "task": task_data} for index in range(3)]
+
+    response = TestClient(sbc_exec_app.app).post("/executor/v1/tools/sbc/tasks:batchCreate", json=body)
+
+    assert [result["statusCode"] for result in response.json()] == [201, 429, 429]
+    assert "Retry-After" in response.headers
+    assert "scheduler-overflow-0" in sbc_exec_app.TASK_LIST
+    assert "scheduler-overflow-1" not in sbc_exec_app.TASK_LIST
+    assert scheduler.stats().submitted == 2
+    gate.opened.set()
+    scheduler.shutdown()
+
+
+def test_scheduler_stats_endpoint(task_data):
+    client = TestClient(sbc_exec_app.app)
+    client.post("/executor/v1/tools/sbc/tasks/scheduler-stats?priority=high", json=task_data)
+    response = client.get("/executor/v1/tools/sbc/scheduler")
+
+    assert response.status_code == 200
+    assert response.json()["submitted"] >= 1
+    assert client.post("/executor/v1/tools/sbc/tasks/scheduler-bad?priority=urgent", json=task_data).status_code == 422
+
+
+class InlineScheduler:
+    """Runs every job as it is submitted, before ``submit`` returns."""
+
+    def submit(self, function, *args, tenant=None, priority=None, **kwargs):
+        function(*args, **kwargs)
+
+    def submit_many(self, function, calls, priority=None):
+        for args, _ in calls:
+            function(*args)
+        return len(calls), None
+
+
+def test_tasks_are_stored_before_they_run(monkeypatch, task_data):
+    stored = []
+
+    def create_task(task, *args):
+        stored.append(task.task_id in sbc_exec_app.TASK_LIST)
+
+    monkeypatch.setattr(sbc_exec_app, "SCHEDULER", InlineScheduler())
+    monkeypatch.setattr(sbc_exec_app, "_create_task", create_task)
+    client = TestClient(sbc_exec_app.app)
+
+    assert client.post("/executor/v1/tools/sbc/tasks/scheduler-stored", json=task_data).status_code == 201
+    body = [{"taskId": "scheduler-stored-batch", "task": task_data}]
+    assert client.post("/executor/v1/tools/sbc/tasks:batchCreate", json=body).json()[0]["statusCode"] == 201
+    assert stored == [True, True]
@@ -0,0 +1,34 @@
+import pytest
+from pydantic import HttpUrl, TypeAdapter, ValidationError
+
+from mozz_sec.services._types import Url, _normalize_url, normalize_url
+from mozz_sec.services.tasks.task import BaseSubTask
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["https://www.huawei.com", "http://secguard.example.com/report?id=1", HttpUrl("https://example.com/a")],
+)
+def test_url_is_normalized_like_http_url(value):
+    assert TypeAdapter(Url).validate_python(value) == str(TypeAdapter(HttpUrl).validate_python(value))
+
+
+def test_urls_of_sub_tasks_are_normalized():
+    sub_task = BaseSubTask(category_url="https://secguard.example.com")
+
+    assert sub_task.category_url == "https://secguard.example.com/"
+
+
+@pytest.mark.parametrize("value", ["not a url", "ftp://example.com", 42])
+def test_invalid_urls_are_rejected_every_time(value):
+    for _ in range(2):
+        with pytest.raises(ValidationError):
+            BaseSubTask(report_url=value)
+
+
+def test_normalized_urls_are_cached():
+    normalize_url("https://cached.example.com")
+    hits = _normalize_url.cache_info().hits
+
+    assert normalize_url("https://cached.example.com") == "https://cached.example.com/"
+    assert _normalize_url.cache_info().hits == hits + 1